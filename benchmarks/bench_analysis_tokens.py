@@ -0,0 +1,100 @@
+"""Benchmark: prompt tokens per subsequent bid decision
+
+Replays a long auction and asks for advice at every subsequent bid decision of
+North: with the analyses rebuilt from the whole history at every decision, and
+with an AnalysisStore for the deal, where only the calls made since the
+previous decision are analyzed. The scripted analyst restates the previous analysis and appends a
+sentence, like an LLM asked to update it, so without compaction the stored
+text would grow with the auction.
+
+Usage: python -m benchmarks.bench_analysis_tokens
+"""
+
+import ast
+import io
+import os
+import re
+from contextlib import redirect_stdout
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui.advice_pipeline import (  # noqa: E402
+    recognize_bidding_stage, run_bidding_advice)
+from bridgegui.analysis_store import AnalysisStore  # noqa: E402
+from bridgegui.llm_metrics import count_llm_calls  # noqa: E402
+from bridgegui.notation import as_protocol_call  # noqa: E402
+from benchmarks.bench_llm_calls import (  # noqa: E402
+    ALLOWED_BIDS, HAND, _patch_models)
+from benchmarks.scripted_llm import ScriptedChatModel  # noqa: E402
+
+POSITIONS = ("north", "east", "south", "west")
+# Every call is a bid, the longest possible auction without doubles
+AUCTION = [
+    "%d%s" % (level, strain) for level in range(1, 8)
+    for strain in ("C", "D", "H", "S", "NT")] + ["Pass"] * 3
+
+_PREVIOUS_REGEX = re.compile(r"Previouse analisis: (.*)\nLast 4 bids: (.*)")
+
+
+def respond(messages):
+    """Answer as analyst (one sentence per analyzed call) or as bid advisor"""
+    prompt = "\n".join(message.content for message in messages)
+    match = _PREVIOUS_REGEX.search(prompt)
+    if match:
+        previous, bids = match.groups()
+        sentences = [previous] if previous else []
+        for bid in ast.literal_eval(bids):
+            sentences.append(
+                "%s narrows the strength and the length of the suit shown." %
+                bid.capitalize())
+        return " ".join(sentences)
+    return "The auction is competitive. So your bid is Pass."
+
+
+class _RebuildStore:
+    """Store that never remembers, all calls are new at every decision"""
+
+    def lookup(self, position, bidding_history):
+        return "", "", list(bidding_history)
+
+    def update(self, *args):
+        pass
+
+
+def _decisions():
+    history = []
+    for index, call in enumerate(AUCTION):
+        position = POSITIONS[index % 4]
+        if (position == "north" and
+                recognize_bidding_stage(position, history) == "Subsequent"):
+            yield list(history)
+        history.append({position: as_protocol_call(call)})
+
+
+def _measure(store):
+    model = ScriptedChatModel(responder=respond)
+    rows = []
+    with _patch_models(model), redirect_stdout(io.StringIO()):
+        for history in _decisions():
+            with count_llm_calls() as counter:
+                run_bidding_advice(
+                    "north", HAND, ALLOWED_BIDS, history,
+                    analysis_store=store)
+            rows.append((len(history), counter.prompt_tokens))
+    return rows
+
+
+def main():
+    rebuilt = _measure(_RebuildStore())
+    store = AnalysisStore()
+    # North's opening decision is stored like in a real deal
+    store.update(
+        "north", [], "You have 15 HCP and five spades, you open 1S.", "")
+    stored = _measure(store)
+    print("%-14s %18s %18s" % ("calls so far", "rebuilt", "analysis store"))
+    for (calls, tokens), (_, stored_tokens) in zip(rebuilt, stored):
+        print("%-14d %18d %18d" % (calls, tokens, stored_tokens))
+
+
+if __name__ == "__main__":
+    main()
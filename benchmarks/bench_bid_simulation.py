@@ -0,0 +1,64 @@
+"""Benchmark: double dummy solving and simulation bid evaluation
+
+The double dummy solver is timed on random deals in every strain (north
+declaring), with a time limit per solve. Then a subsequent bid (north
+deciding after 1S - Pass - 2S - Pass) is evaluated by simulation within the
+time budget, and the deals solved in time and the ranking are reported.
+
+Usage: python -m benchmarks.bench_bid_simulation [deals] [time budget]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui.auction import STRAIN_ORDER  # noqa: E402
+from bridgegui.double_dummy import declarer_tricks  # noqa: E402
+from bridgegui.simulation import (  # noqa: E402
+    BidEvaluator, format_evaluations)
+from benchmarks.bench_prompt_tokens import _deal  # noqa: E402
+
+SOLVE_LIMIT = 60.0
+HISTORY = ["north: 1S", "east: Pass", "south: 2S", "west: Pass"]
+HAND = [
+    {"rank": rank, "suit": suit}
+    for suit, ranks in (
+        ("spades", ("ace", "king", "9", "5", "3")),
+        ("hearts", ("king", "queen", "2")), ("diamonds", ("ace", "4")),
+        ("clubs", ("7", "6", "3")))
+    for rank in ranks]
+
+
+def main(deals=4, time_budget=60.0):
+    times = []
+    unsolved = 0
+    for seed in range(deals):
+        hands = _deal(seed)
+        for strain in STRAIN_ORDER:
+            start = time.perf_counter()
+            try:
+                declarer_tricks(
+                    hands, strain, "north", time.time() + SOLVE_LIMIT)
+            except TimeoutError:
+                unsolved += 1
+                continue
+            times.append(time.perf_counter() - start)
+    if times:
+        print("%d solves, median %.2f s, mean %.2f s, max %.2f s" % (
+            len(times), statistics.median(times), statistics.mean(times),
+            max(times)))
+    print("%d solves over the %.0f s limit" % (unsolved, SOLVE_LIMIT))
+    evaluator = BidEvaluator(deals=deals, time_budget=time_budget, seed=1)
+    start = time.perf_counter()
+    evaluations = evaluator.evaluate("north", HAND, HISTORY)
+    print("Evaluation with %d workers in %.1f s" % (
+        evaluator.workers, time.perf_counter() - start))
+    print(format_evaluations(evaluations) or "No deal solved in time")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]),
+         *(float(arg) for arg in sys.argv[2:3]))
@@ -0,0 +1,97 @@
+"""Benchmark: hit rate and accuracy of the feature-bucketed decision cache
+
+The decision cache is pre-warmed by bidding a corpus of random deals with
+the advice pipeline, then a fresh set of deals is bid with the warm cache.
+The advice graphs are replaced by a stand-in whose call depends on the real
+hand (the cheapest bid in the longest suit with 10 or more HCP, pass
+otherwise) and that counts its runs, so only the decisions the decision
+table leaves to the LLM reach the cache. For growing corpus sizes, the hit
+rate of the opening and response decisions on the fresh deals is reported,
+with the share of the hits whose cached call differs from the call of the
+stand-in for the hand at hand.
+
+Usage: python -m benchmarks.bench_decision_cache [fresh deals]
+"""
+
+import os
+import sys
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui import advice_pipeline  # noqa: E402
+from bridgegui.decision_cache import (  # noqa: E402
+    DecisionCache, prewarm, random_deals)
+from bridgegui.holdings import hand_hcp, suit_lengths  # noqa: E402
+
+CORPUS_SIZES = (1000, 5000, 20000)
+MIN_BID_HCP = 10
+# The strains of the suits in SUIT_ORDER
+_STRAINS = ("S", "H", "D", "C")
+
+
+def _call(hand, allowed_bids):
+    # The call of the stand-in for a hand
+    if hand_hcp(hand) < MIN_BID_HCP:
+        return "Pass"
+    lengths = suit_lengths(hand)
+    strain = _STRAINS[lengths.index(max(lengths))]
+    for call in allowed_bids:
+        if call[0].isdigit() and call[1:] == strain:
+            return call
+    return "Pass"
+
+
+class _HandGraph:
+
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, hand, allowed_bids, **kwargs):
+        self.runs += 1
+        return {"advice": {
+            "your_team_analysis": "", "opponent_analysis": "",
+            "bid_suggestion": _call(hand, allowed_bids),
+            "play_suggestion": ""}}
+
+
+class _HitChecker:
+    # Advice function counting the cache hits that differ from the stand-in
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.wrong = 0
+
+    def __call__(self, position, hand, allowed_bids, *args, **kwargs):
+        hits = self.cache.hits
+        advice = advice_pipeline.run_bidding_advice(
+            position, hand, allowed_bids, *args, **kwargs)
+        if self.cache.hits > hits and \
+                advice["bid_suggestion"] != _call(hand, allowed_bids):
+            self.wrong += 1
+        return advice
+
+
+def main(deals=1000):
+    graph = _HandGraph()
+    graphs = dict.fromkeys(advice_pipeline.STAGE_GRAPHS, graph)
+    fresh = random_deals(deals, seed=0)
+    with mock.patch.object(advice_pipeline, "STAGE_GRAPHS", graphs):
+        for size in CORPUS_SIZES:
+            cache = DecisionCache()
+            prewarm(cache, random_deals(size, seed=size))
+            cache.reset_statistics()
+            graph.runs = 0
+            checker = _HitChecker(cache)
+            prewarm(cache, fresh, checker)
+            print(
+                "corpus %6d deals: %6d entries, %5d cached decisions, "
+                "hit rate %.0f%%, wrong hits %.1f%%, %d LLM decisions "
+                "left" % (
+                    size, len(cache), cache.hits + cache.misses,
+                    100 * cache.hit_rate,
+                    100 * checker.wrong / max(cache.hits, 1), graph.runs))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,53 @@
+"""Benchmark: decisions served by the bidding system decision table
+
+Random deals are bid with the decision table of the bidding system. The
+decisions the table leaves to the LLM are answered with pass by the stand-in,
+so the auction goes on. The coverage report shows the share of the decisions
+served by the table per bidding stage, and the mean lookup time is measured
+over all decisions.
+
+Usage: python -m benchmarks.bench_decision_table [deals]
+"""
+
+import random
+import sys
+import time
+
+from bridgegui.auction import AuctionState
+from bridgegui.bidding_system import DecisionTable
+from benchmarks.bench_prompt_tokens import POSITIONS, _deal
+
+
+def _bid(table, hands, dealer):
+    auction = AuctionState(dealer)
+    elapsed = 0.0
+    lookups = 0
+    while not auction.completed:
+        position = auction.turn
+        stage = auction.stage(position)
+        start = time.perf_counter()
+        rule = table.lookup(auction, hands[position], stage)
+        elapsed += time.perf_counter() - start
+        lookups += 1
+        auction.call(position, "Pass" if rule is None else rule.call)
+    return elapsed, lookups
+
+
+def main(deals=2000):
+    table = DecisionTable()
+    generator = random.Random(1)
+    elapsed = 0.0
+    lookups = 0
+    for seed in range(deals):
+        hands = _deal(seed)
+        deal_elapsed, deal_lookups = _bid(
+            table, hands, generator.choice(POSITIONS))
+        elapsed += deal_elapsed
+        lookups += deal_lookups
+    print("%d deals, %d rules, mean lookup %.1f us" % (
+        deals, len(table), 1e6 * elapsed / lookups))
+    print(table.coverage_report())
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
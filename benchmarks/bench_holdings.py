@@ -0,0 +1,70 @@
+"""Benchmark: hand evaluation with the holding lookup tables
+
+The HCP, suit distribution and dominant suit of random hands are computed
+with the utils2 functions (iterating the cards once per feature), with the
+scalar table path (suit masks and four table reads per feature) and with the
+NumPy batch path, and the mean time per hand is reported. The conversion of
+the cards to suit masks is timed separately, as the callers holding masks do
+not pay it.
+
+Usage: python -m benchmarks.bench_holdings [hands]
+"""
+
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import numpy  # noqa: E402
+
+from bridgegui import holdings, utils2  # noqa: E402
+from bridgegui.double_dummy import hand_masks  # noqa: E402
+from bridgegui.schemas import Card  # noqa: E402
+from benchmarks.bench_prompt_tokens import _deal  # noqa: E402
+
+
+def _timed(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return 1e6 * (time.perf_counter() - start) / len(items)
+
+
+def _utils2(cards):
+    return (
+        utils2.count_hcp(cards), utils2.get_suit_distribution(cards),
+        utils2.dominant_suit_function(cards))
+
+
+def _tables(masks):
+    lengths = holdings.suit_lengths(masks)
+    return (
+        holdings.hand_hcp(masks), holdings.suit_distribution(lengths),
+        holdings.dominant_suit(lengths))
+
+
+def main(hands=20000):
+    logging.disable(logging.DEBUG)
+    deals = [_deal(seed) for seed in range((hands + 3) // 4)]
+    card_hands = [hand for deal in deals for hand in deal.values()][:hands]
+    cards = [[Card(**card) for card in hand] for hand in card_hands]
+    masks = [hand_masks(hand) for hand in card_hands]
+    print("utils2 functions:      %.2f us per hand" % _timed(_utils2, cards))
+    print("cards to suit masks:   %.2f us per hand" % _timed(
+        hand_masks, card_hands))
+    print("scalar table path:     %.2f us per hand" % _timed(_tables, masks))
+    print("scalar evaluate_hand:  %.2f us per hand (all %d fields)" % (
+        _timed(holdings.evaluate_hand, masks), len(holdings.HOLDING_FIELDS)))
+    array = numpy.array(masks)
+    start = time.perf_counter()
+    batch = holdings.evaluate_batch(array)
+    totals = {field: values.sum(axis=1) for field, values in batch.items()}
+    elapsed = time.perf_counter() - start
+    print("NumPy batch path:      %.3f us per hand (all %d fields)" % (
+        1e6 * elapsed / len(masks), len(totals)))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,198 @@
+"""Benchmark: LLM calls per bidding decision
+
+Counts the LLM calls made for one bidding decision by the legacy ReAct routing
+and by the advice pipeline. All models are replaced by a scripted stand-in that
+follows the steps prescribed by each agent prompt, so the benchmark runs
+offline and the counts are deterministic.
+
+Usage: python -m benchmarks.bench_llm_calls
+"""
+
+import io
+import json
+import os
+from contextlib import ExitStack, redirect_stdout
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui import (  # noqa: E402
+    analyze_opening_llm, bid_analisis, bid_opening_agent, bridge_broker_agent,
+    opening_bid_llm, response_bid_llm, subsequent_bid_agent,
+    subsequent_bid_suggestion_llm)
+from bridgegui.advice_pipeline import run_bidding_advice  # noqa: E402
+from bridgegui.llm_metrics import count_llm_calls  # noqa: E402
+from benchmarks.scripted_llm import (  # noqa: E402
+    ScriptedChatModel, agent_step, react_action, react_final)
+
+HAND = [
+    {"rank": "ace", "suit": "spades"}, {"rank": "king", "suit": "spades"},
+    {"rank": "queen", "suit": "spades"}, {"rank": "7", "suit": "spades"},
+    {"rank": "4", "suit": "spades"}, {"rank": "king", "suit": "hearts"},
+    {"rank": "8", "suit": "hearts"}, {"rank": "3", "suit": "hearts"},
+    {"rank": "queen", "suit": "diamonds"}, {"rank": "5", "suit": "diamonds"},
+    {"rank": "jack", "suit": "clubs"}, {"rank": "9", "suit": "clubs"},
+    {"rank": "2", "suit": "clubs"},
+]
+ALLOWED_BIDS = [
+    "Pass", "1S", "1NT", "2C", "2D", "2H", "2S", "2NT", "3C", "3D", "3H", "3S",
+    "3NT", "4C", "4D", "4H", "4S", "4NT", "X"]
+
+
+def _bid(level, strain):
+    return {"type": "bid", "bid": {"level": level, "strain": strain}}
+
+
+PASS = {"type": "pass"}
+SCENARIOS = {
+    "Opening": [],
+    "Response": [{"south": _bid(1, "hearts")}, {"west": PASS}],
+    "Subsequent": [
+        {"south": PASS}, {"west": PASS}, {"north": _bid(1, "spades")},
+        {"east": _bid(2, "diamonds")}, {"south": _bid(2, "spades")},
+        {"west": PASS}],
+}
+
+
+def _broker_script(messages, step):
+    if step == 0:
+        return react_action(
+            "recognize_bidding_stage_tool",
+            {"position": "north", "bidding_history": []})
+    if step == 1:
+        return react_action("opening_bidding_tool", {
+            "position": "north", "hand": HAND, "allowed_bids": ALLOWED_BIDS,
+            "bidding_history": []})
+    return react_final(json.dumps({"bid_suggestion": "1S"}))
+
+
+def _opening_agent_script(messages, step):
+    actions = [
+        ("count_hcp_tool", {"hand": HAND}),
+        ("get_suit_distribution_tool", {"hand": HAND}),
+        ("is_balanced_hand_tool",
+         {"clubs": 3, "diamonds": 2, "hearts": 3, "spades": 5}),
+        ("dominant_suit_tool", {"hand": HAND}),
+        ("opening_bid_tool", {
+            "hcp": 15, "distribution": "3-2-3-5", "balanced_hand": False,
+            "dominant_suit": "spades"}),
+    ]
+    if step < len(actions):
+        return react_action(*actions[step])
+    return react_final(json.dumps({"bid_suggestion": "1S"}))
+
+
+def _subsequent_agent_script(messages, step):
+    history = ["north: 1S", "east: 2D", "south: 2S", "west: Pass"]
+    analysis = {
+        "position": "north", "last_4_bids": history}
+    actions = [
+        ("last_4_bids_tool", json.dumps({"bidding_history": history})),
+        ("update_your_team_analisis_tool", json.dumps(
+            dict(analysis, perspective="Your team", your_team_analisis=""))),
+        ("update_opponents_bid_analisis_tool", json.dumps(
+            dict(analysis, perspective="Your opponents",
+                 opponents_bid_analisis=""))),
+        ("get_subsequent_bid_suggestion_tool", json.dumps({
+            "position": "north", "updated_your_team_analisis": "",
+            "updated_opponents_bid_analisis": "", "bidding_history": history,
+            "allowed_bids": ALLOWED_BIDS})),
+        ("is_allowed_bid_tool", {
+            "proposed_bid": "4S", "allowed_bids": ALLOWED_BIDS,
+            "bidding_history": []}),
+    ]
+    if step < len(actions):
+        return react_action(*actions[step])
+    return react_final(json.dumps({"bid_suggestion": "4S"}))
+
+
+AGENT_SCRIPTS = (
+    ("recognize_bidding_stage_tool:", _broker_script),
+    ("opening_bid_tool:", _opening_agent_script),
+    ("last_4_bids_tool:", _subsequent_agent_script),
+)
+
+LEAF_ANSWERS = (
+    ("specialised in opening bid.", json.dumps(
+        {"your_team_analysis": "15 HCP and five spades.",
+         "bid_suggestion": "1S"})),
+    ("specialised in analyzing bids opening", (
+        "Your partner is South, who has bid 1H. Your partner's hand is likely "
+        "to have 12-18 HCP and at least 5 hearts.")),
+    ("specialised in responses to opening bid", (
+        "You have 3 hearts and 13 HCP, so you support hearts. So your bid is "
+        "4H.")),
+    ("specialised in analyzing bridge bidding situation", (
+        "Your partner supported spades with 2S showing 7-10 HCP and 3+ "
+        "spades.")),
+    ("specialised in subsequent bids analisis", (
+        "Combined 22-25 HCP with 8+ spades. So your bid is 3S.")),
+)
+
+
+def respond(messages):
+    """Answer as the agent or leaf prompt in messages expects"""
+    system = messages[0].content
+    for marker, script in AGENT_SCRIPTS:
+        if marker in system:
+            return script(messages, agent_step(messages))
+    prompt = "\n".join(message.content for message in messages)
+    for marker, answer in LEAF_ANSWERS:
+        if marker in prompt:
+            return answer
+    raise ValueError("Unexpected prompt: %.200r" % prompt)
+
+
+def _patch_models(model):
+    stack = ExitStack()
+    for module in (
+            analyze_opening_llm, bid_analisis, opening_bid_llm,
+            response_bid_llm, subsequent_bid_suggestion_llm):
+        stack.enter_context(mock.patch.object(module, "llm", model))
+    for agent in (
+            bridge_broker_agent.agent, bid_opening_agent.opening_bidding_agent,
+            subsequent_bid_agent.subsequent_bidding_agent):
+        stack.enter_context(
+            mock.patch.object(agent.agent.llm_chain, "llm", model))
+    return stack
+
+
+def _measure(func):
+    model = ScriptedChatModel(responder=respond)
+    # The agents are verbose, keep their trace out of the report
+    with _patch_models(model), count_llm_calls() as counter, \
+            redirect_stdout(io.StringIO()):
+        func()
+    return counter.calls
+
+
+def _legacy(stage, history):
+    if stage == "Opening":
+        return lambda: bridge_broker_agent.get_bridge_advice_react(
+            position="north", phase="bidding", hand=HAND,
+            allowed_bids=ALLOWED_BIDS, bidding_history=history)
+    if stage == "Subsequent":
+        # The broker has no tool for this stage, only the sub-agent is measured
+        return lambda: subsequent_bid_agent.get_subsequent_bid_advice(
+            position="north", hand=HAND, your_team_analisis="",
+            your_last_bid="1S", opponents_bid_analisis="",
+            allowed_bids=ALLOWED_BIDS, bidding_history=history)
+    # The broker has no tool for the response stage and the tools of the
+    # response agent do not accept their own schemas, so the legacy path
+    # cannot complete a response decision
+    return None
+
+
+def main():
+    print("%-12s %14s %14s" % ("stage", "legacy calls", "pipeline calls"))
+    for stage, history in SCENARIOS.items():
+        legacy = _legacy(stage, history)
+        legacy_calls = "n/a" if legacy is None else str(_measure(legacy))
+        pipeline_calls = _measure(
+            lambda: run_bidding_advice(
+                "north", HAND, ALLOWED_BIDS, history))
+        print("%-12s %14s %14d" % (stage, legacy_calls, pipeline_calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark: load test against the local stand-in server
+
+Plays N tables at once against the local stand-in server (see
+bridgegui.local_server). Every seat is either an autopilot process of the
+frontend or a protocol bot of the server module, run in threads of this
+process. The decision latency (from the turn event to the call or play,
+measured at the server) is reported as percentiles, with the boards per hour
+of all tables and the CPU time and peak memory of each seat, read from
+/proc (not reported where /proc is not available).
+
+The options after the seat kind are passed to each autopilot. The
+autopilots make their LLM calls to the OPENAI_BASE_URL of the environment,
+which may be a fake server (python -m bridgegui.fake_llm_server) to
+measure the frontend at a known LLM latency.
+
+Usage: python -m benchmarks.bench_load [tables [boards [bots|autopilot
+       [autopilot options...]]]]
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui.local_server import BotClient, LocalServer  # noqa: E402
+from bridgegui.notation import POSITION_TAGS  # noqa: E402
+
+TIMEOUT = 3600
+_SAMPLE_INTERVAL = 0.5
+
+
+def _free_endpoint():
+    # A base endpoint whose port and the next port are both free
+    while True:
+        with socket.socket() as first:
+            first.bind(("127.0.0.1", 0))
+            port = first.getsockname()[1]
+            with socket.socket() as second:
+                try:
+                    second.bind(("127.0.0.1", port + 1))
+                except OSError:
+                    continue
+        return "tcp://127.0.0.1:%d" % port
+
+
+def process_usage(pid):
+    """Return the CPU seconds and peak resident memory in MB of a process
+
+    Returns None if the process or /proc is not available.
+    """
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/%d/status" % pid) as f:
+            status = dict(
+                line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    memory = int(status.get("VmHWM", "0 kB").split()[0]) / 1024
+    return cpu, memory
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of the values"""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _start_seats(endpoint, games, kind, options):
+    seats = []
+    for n, game in enumerate(games):
+        for position in POSITION_TAGS:
+            if kind == "autopilot":
+                seats.append(subprocess.Popen(
+                    [sys.executable, "-m", "bridgegui", "--autopilot",
+                     "--game", game, "--position", position, endpoint] +
+                    list(options),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            else:
+                bot = BotClient(endpoint, game, position, seed=n)
+                bot.start()
+                seats.append(bot)
+    return seats
+
+
+def main(tables=2, boards=4, kind="bots", *options):
+    tables, boards = int(tables), int(boards)
+    endpoint = _free_endpoint()
+    server = LocalServer(endpoint, boards=boards, seed=1)
+    games = [server.create_game() for _ in range(tables)]
+    server.start()
+    start = time.time()
+    seats = _start_seats(endpoint, games, kind, options)
+    usage = {}
+    try:
+        while server.statistics()["boards"] < tables * boards and \
+                time.time() - start < TIMEOUT:
+            time.sleep(_SAMPLE_INTERVAL)
+            if kind == "autopilot":
+                for n, seat in enumerate(seats):
+                    usage[n] = process_usage(seat.pid) or usage.get(n)
+        elapsed = time.time() - start
+        if kind != "autopilot":
+            # The bots share this process
+            total = process_usage(os.getpid())
+            usage = {
+                n: total and (total[0] / len(seats), total[1] / len(seats))
+                for n in range(len(seats))}
+    finally:
+        for seat in seats:
+            if kind == "autopilot":
+                seat.terminate()
+                seat.wait()
+            else:
+                seat.stop()
+        server.stop()
+    statistics = server.statistics()
+    latencies = statistics["latencies"]
+    print("%d tables, %d boards each, %s seats" % (tables, boards, kind))
+    print("boards completed: %d in %.1fs (%.0f boards/hour)" % (
+        statistics["boards"], elapsed, statistics["boards"] * 3600 / elapsed))
+    print("decisions: %d, latency p50 %.4fs p95 %.4fs p99 %.4fs" % (
+        len(latencies), percentile(latencies, 0.5),
+        percentile(latencies, 0.95), percentile(latencies, 0.99)))
+    measured = [value for value in usage.values() if value]
+    if measured:
+        print("per seat: CPU %.2fs (max %.2fs), peak memory %.1f MB "
+              "(max %.1f MB)" % (
+                  sum(cpu for cpu, _ in measured) / len(measured),
+                  max(cpu for cpu, _ in measured),
+                  sum(memory for _, memory in measured) / len(measured),
+                  max(memory for _, memory in measured)))
+    else:
+        print("per seat: CPU and memory not available")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,174 @@
+"""Benchmark: tricks and decision time of the MCTS and LLM card play policies
+
+A fixed set of random deals is played with a random contract. The local
+play rules decide the plays they cover for both sides, the defenders make
+their open plays at random, and the open plays of the declarer (and the
+dummy) are decided by the policy: the LLM policy of the autopilot (both
+prompts, answered by a scripted stand-in playing a random allowed card after
+a fixed latency, so the benchmark runs offline), or the information set
+Monte Carlo tree search. The tricks taken by the declarer and the mean time
+per open decision are reported for each policy.
+
+Usage: python -m benchmarks.bench_mcts_play [deals] [iterations] [latency ms]
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import types
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui.decision_cache import random_deals  # noqa: E402
+from bridgegui.llm_integration import LLMIntegration  # noqa: E402
+from bridgegui.mcts_play import MCTSPolicy  # noqa: E402
+from bridgegui.notation import (  # noqa: E402
+    POSITION_TAGS, RANK_FORMATS, SUIT_FORMATS, SUIT_ORDER)
+from bridgegui.play_rules import (  # noqa: E402
+    PlayRules, played_cards, representatives)
+
+_RANKS = {format_: rank for rank, format_ in RANK_FORMATS.items()}
+_SUITS = {format_: suit for suit, format_ in SUIT_FORMATS.items()}
+
+
+class _ScriptedClient:
+    # Stand-in of the OpenAI client: the analysis is a fixed text, and the
+    # card is drawn at random from the allowed cards of the prompt
+
+    def __init__(self, latency, generator):
+        self._latency = latency
+        self._generator = generator
+        self.chat = types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature):
+        time.sleep(self._latency)
+        content = messages[-1]["content"]
+        match = re.search(r"Allowed cards: (.*)\n", content)
+        text = "I would play a card of the allowed cards."
+        if match and "Analysis:" in content:
+            cards = [
+                {"rank": _RANKS[rank], "suit": _SUITS[holding[0]]}
+                for holding in match.group(1).split()
+                for rank in holding[2:]]
+            text = '{"rank": "%s", "suit": "%s"}' % tuple(
+                self._generator.choice(cards).values())
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(
+            message=types.SimpleNamespace(content=text))])
+
+
+def _llm_decide(llm, position, allowed, trick, hands, played):
+    choices = representatives(position, allowed, hands, played, trick)
+    analysis = llm.get_card_play_suggestion(
+        "Own hand", position, hands[position], {}, trick, choices, None,
+        "", [], [])
+    answer = llm.get_card_play_prompt(analysis, choices)
+    card = json.loads(answer)
+    return card if card in allowed else choices[0]
+
+
+def _play_deal(rules, hands, generator, decide):
+    # The tricks of the declarer, the open decisions of the declarer side
+    # and their time
+    declarer = generator.choice(POSITION_TAGS)
+    dummy = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 2) % 4]
+    trump = generator.choice(SUIT_ORDER + ("notrump",))
+    hands = {position: list(cards) for position, cards in hands.items()}
+    tricks = []
+    leader = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 1) % 4]
+    taken = open_decisions = 0
+    elapsed = 0.0
+    for _ in range(13):
+        trick = []
+        for n in range(4):
+            position = POSITION_TAGS[(POSITION_TAGS.index(leader) + n) % 4]
+            hand = hands[position]
+            allowed = hand
+            if trick:
+                suit = trick[0]["card"]["suit"]
+                allowed = [
+                    card for card in hand if card["suit"] == suit] or hand
+            player = declarer if position == dummy else position
+            visible = {position: hand}
+            if tricks or trick:
+                visible[dummy] = hands[dummy]
+            if player == declarer:
+                visible[declarer] = hands[declarer]
+            current = tricks + [{"cards": trick}]
+            played = played_cards(current)
+            decision = rules.decide(
+                position, allowed, trick, visible, trump, played, current)
+            if decision is not None:
+                card = decision.card
+            elif player == declarer:
+                start = time.perf_counter()
+                card = decide(
+                    position, allowed, trick, visible, trump, played, current,
+                    declarer)
+                elapsed += time.perf_counter() - start
+                open_decisions += 1
+            else:
+                card = generator.choice(allowed)
+            hand.remove(card)
+            trick.append({"position": position, "card": card})
+        winner = _winner(trick, trump)
+        tricks.append({"cards": trick, "winner": winner})
+        taken += winner in (declarer, dummy)
+        leader = winner
+    return taken, open_decisions, elapsed
+
+
+def _winner(trick, trump):
+    best = trick[0]
+    for play in trick[1:]:
+        card, best_card = play["card"], best["card"]
+        if card["suit"] == best_card["suit"]:
+            if _order(card) > _order(best_card):
+                best = play
+        elif card["suit"] == trump:
+            best = play
+    return best["position"]
+
+
+def _order(card):
+    return list(RANK_FORMATS).index(card["rank"])
+
+
+def main(deals=10, iterations=300, latency_ms=0):
+    logging.disable(logging.WARNING)
+    llm = LLMIntegration("sk-benchmark")
+    llm.client = _ScriptedClient(latency_ms / 1000, random.Random(2))
+    mcts = MCTSPolicy(iterations=iterations, time_budget=60.0, seed=3)
+
+    def llm_decide(position, allowed, trick, hands, trump, played, tricks,
+                   declarer):
+        return _llm_decide(llm, position, allowed, trick, hands, played)
+
+    def mcts_decide(position, allowed, trick, hands, trump, played, tricks,
+                    declarer):
+        return mcts.decide(
+            position, allowed, trick, hands, trump, tricks, declarer).card
+
+    for name, decide in (("LLM (scripted)", llm_decide),
+                         ("MCTS (%d iterations)" % iterations, mcts_decide)):
+        rules = PlayRules()
+        taken = open_decisions = 0
+        elapsed = 0.0
+        for n, (_, hands, _) in enumerate(random_deals(deals, seed=1)):
+            # The same contract for both policies
+            result = _play_deal(rules, hands, random.Random(n), decide)
+            taken += result[0]
+            open_decisions += result[1]
+            elapsed += result[2]
+        print("%s: %.2f declarer tricks per deal, %d open decisions, "
+              "%.1f ms per decision" % (
+                  name, taken / deals, open_decisions,
+                  1e3 * elapsed / max(open_decisions, 1)))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,80 @@
+"""Benchmark: share of card plays answered by the local play rules
+
+Random deals are played out with a random contract: every play is offered
+to the play rules with the own hand and the dummy visible (the dummy after
+the opening lead, the declarer's hand when playing from the dummy), and the
+open plays are made at random among the allowed cards. The share of the
+plays answered locally per rule and the mean decision time are reported,
+without and with the endgame solver, with the open plays (the LLM calls) per
+deal.
+
+Usage: python -m benchmarks.bench_play_rules [deals] [endgame cards]
+"""
+
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui.decision_cache import random_deals  # noqa: E402
+from bridgegui.endgame import EndgameSolver  # noqa: E402
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER  # noqa: E402
+from bridgegui.play_rules import PlayRules, played_cards  # noqa: E402
+
+
+def _play_deal(rules, hands, generator):
+    declarer = generator.choice(POSITION_TAGS)
+    dummy = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 2) % 4]
+    trump = generator.choice(SUIT_ORDER + ("notrump",))
+    hands = {position: list(cards) for position, cards in hands.items()}
+    tricks = []
+    leader = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 1) % 4]
+    for _ in range(13):
+        trick = []
+        for n in range(4):
+            position = POSITION_TAGS[(POSITION_TAGS.index(leader) + n) % 4]
+            hand = hands[position]
+            allowed = hand
+            if trick:
+                suit = trick[0]["card"]["suit"]
+                allowed = [
+                    card for card in hand if card["suit"] == suit] or hand
+            player = declarer if position == dummy else position
+            visible = {position: hand}
+            if tricks or trick:
+                visible[dummy] = hands[dummy]
+            if player == declarer:
+                visible[declarer] = hands[declarer]
+            current = tricks + [{"cards": trick}]
+            decision = rules.decide(
+                position, allowed, trick, visible, trump,
+                played_cards(current), current)
+            card = decision.card if decision else generator.choice(allowed)
+            hand.remove(card)
+            trick.append({"position": position, "card": card})
+        tricks.append({"cards": trick})
+        leader = generator.choice(POSITION_TAGS)
+
+
+def main(deals=200, endgame_cards=4):
+    logging.disable(logging.DEBUG)
+    for endgame in (None, EndgameSolver(endgame_cards)):
+        rules = PlayRules(endgame)
+        generator = random.Random(1)
+        start = time.perf_counter()
+        for _, hands, _ in random_deals(deals, seed=1):
+            _play_deal(rules, hands, generator)
+        elapsed = time.perf_counter() - start
+        print("Endgame solver: %s" % (
+            "up to %d cards" % endgame_cards if endgame else "off"))
+        print(rules.report())
+        print("Open plays per deal: %.1f" % (rules.open_decisions / deals))
+        print("Mean time per play: %.1f us (including the random play)\n" % (
+            1e6 * elapsed / (52 * deals)))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
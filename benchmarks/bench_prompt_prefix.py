@@ -0,0 +1,125 @@
+"""Benchmark: provider prompt caching with the static prompt prefix
+
+A sequence of bid and card play decisions of all four positions is sent to a
+stand-in of the provider prompt cache, which models the caching of OpenAI
+compatible providers: prompts of at least MIN_CACHED_TOKENS tokens are cached,
+and the longest prefix shared with an earlier prompt is reused in blocks of
+CACHE_BLOCK_TOKENS tokens. Time to first token is modelled as a fixed base
+plus a per token cost, with reused tokens ten times cheaper.
+
+The legacy layout sent the whole template as a single user message that
+started with the position of the player, so no two positions shared a prefix.
+With the static prefix the instructions are an invariant system message and
+the game state follows it.
+
+Usage: python -m benchmarks.bench_prompt_prefix
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui import llm_integration  # noqa: E402
+from benchmarks.bench_prompt_tokens import (  # noqa: E402
+    ALLOWED_BIDS, AUCTION, CONTRACT, POSITIONS, SEEDS, TRICKS_PLAYED, _deal,
+    _play)
+from benchmarks.scripted_llm import _ENCODING  # noqa: E402
+
+MIN_CACHED_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+BASE_TTFT = 0.15
+UNCACHED_TOKEN_TTFT = 0.0002
+CACHED_TOKEN_TTFT = UNCACHED_TOKEN_TTFT / 10
+LEGACY_OPENING = "You are an expert Bridge player."
+
+
+def _tokens(text):
+    if _ENCODING is None:
+        return text.split(" ")
+    return _ENCODING.encode(text)
+
+
+class PrefixCache:
+    """Stand-in of the provider prompt cache"""
+
+    def __init__(self):
+        self._prompts = []
+
+    def send(self, tokens):
+        """Return the number of reused tokens of the prompt"""
+        shared = 0
+        for previous in self._prompts:
+            length = 0
+            for left, right in zip(previous, tokens):
+                if left != right:
+                    break
+                length += 1
+            shared = max(shared, length)
+        if len(tokens) >= MIN_CACHED_TOKENS:
+            self._prompts.append(tokens)
+        if shared < MIN_CACHED_TOKENS:
+            return 0
+        return shared - shared % CACHE_BLOCK_TOKENS
+
+
+def _legacy_text(prompt, position, messages):
+    # The legacy templates started with the position of the player
+    prefix = prompt.prefix.replace(
+        LEGACY_OPENING,
+        "%s Your position is %s." % (LEGACY_OPENING, position), 1)
+    return "%s\n\n%s" % (prefix, messages[-1]["content"])
+
+
+def _decisions():
+    client = llm_integration.LLMIntegration("sk-benchmark")
+    for seed in SEEDS:
+        hands = _deal(seed)
+        tricks = _play(hands, TRICKS_PLAYED)
+        for position in POSITIONS:
+            messages = client._get_bid_suggestion_messages(
+                position, hands[position], ALLOWED_BIDS, AUCTION[:3])
+            yield llm_integration.BID_SUGGESTION_PROMPT, position, messages
+        for position in POSITIONS:
+            messages = client._get_card_play_suggestion_messages(
+                "Own hand", position, hands[position], {}, [],
+                hands[position], CONTRACT, "north, south", AUCTION,
+                [tricks])
+            yield (
+                llm_integration.CARD_PLAY_SUGGESTION_PROMPT, position,
+                messages)
+
+
+def _measure(layout):
+    cache = PrefixCache()
+    total = reused = 0
+    ttft = 0.0
+    for prompt, position, messages in _decisions():
+        if layout == "legacy":
+            text = _legacy_text(prompt, position, messages)
+        else:
+            text = "%s\n\n%s" % (messages[0]["content"], messages[-1]["content"])
+        tokens = _tokens(text)
+        cached = cache.send(tokens)
+        total += len(tokens)
+        reused += cached
+        ttft += (
+            BASE_TTFT + (len(tokens) - cached) * UNCACHED_TOKEN_TTFT +
+            cached * CACHED_TOKEN_TTFT)
+    return total, reused, ttft
+
+
+def main():
+    decisions = 2 * len(POSITIONS) * len(SEEDS)
+    print("%d decisions, cache blocks of %d tokens from %d tokens" % (
+        decisions, CACHE_BLOCK_TOKENS, MIN_CACHED_TOKENS))
+    print("%-14s %10s %10s %8s %16s" % (
+        "layout", "tokens", "reused", "ratio", "mean TTFT (ms)"))
+    for layout in ("legacy", "static prefix"):
+        total, reused, ttft = _measure(layout)
+        print("%-14s %10d %10d %7.0f%% %16.1f" % (
+            layout, total, reused, 100.0 * reused / total,
+            1000.0 * ttft / decisions))
+
+
+if __name__ == "__main__":
+    main()
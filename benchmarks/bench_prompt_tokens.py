@@ -0,0 +1,174 @@
+"""Benchmark: prompt tokens with the compact notation
+
+Builds the card play and bid prompts of LLMIntegration and the leaf analysis
+prompts for a fixed set of deals, once with the game state encoded by the
+compact notation and once with the legacy encoders (json.dumps of the protocol
+objects, allowed cards and bids with indent=4, Python lists of bids). The
+templates are the same in both columns, so the difference is the encoding of
+the game state only.
+
+Usage: python -m benchmarks.bench_prompt_tokens
+"""
+
+import json
+import os
+import random
+from contextlib import ExitStack
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui import (  # noqa: E402
+    analyze_opening_llm, bid_analisis, notation, subsequent_bid_suggestion_llm)
+from bridgegui.llm_integration import LLMIntegration  # noqa: E402
+from benchmarks.scripted_llm import count_tokens  # noqa: E402
+
+SEEDS = (1, 2, 3, 4, 5, 6, 7, 8)
+POSITIONS = ("north", "east", "south", "west")
+RANKS = (
+    "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king",
+    "ace")
+SUITS = ("clubs", "diamonds", "hearts", "spades")
+TRICKS_PLAYED = 5
+AUCTION = [
+    {"north": {"type": "bid", "bid": {"level": 1, "strain": "hearts"}}},
+    {"east": {"type": "pass"}},
+    {"south": {"type": "bid", "bid": {"level": 2, "strain": "clubs"}}},
+    {"west": {"type": "pass"}},
+    {"north": {"type": "bid", "bid": {"level": 2, "strain": "hearts"}}},
+    {"east": {"type": "pass"}},
+    {"south": {"type": "bid", "bid": {"level": 4, "strain": "hearts"}}},
+    {"west": {"type": "pass"}},
+    {"north": {"type": "pass"}},
+    {"east": {"type": "pass"}},
+]
+CONTRACT = {"bid": {"level": 4, "strain": "hearts"}, "doubling": "undoubled"}
+ALLOWED_BIDS = [{"type": "pass"}, {"type": "double"}] + [
+    {"type": "bid", "bid": {"level": level, "strain": strain}}
+    for level in range(2, 8)
+    for strain in ("clubs", "diamonds", "hearts", "spades", "notrump")]
+BID_HISTORY = ["north: 1H", "east: Pass", "south: 2C", "west: Pass"]
+
+
+def _legacy_calls(calls):
+    return json.dumps(calls, indent=4) if isinstance(calls, str) else str(calls)
+
+
+def _legacy_auction(history):
+    history = list(history)
+    return json.dumps(history) if history and isinstance(
+        history[0], dict) else str(history)
+
+
+LEGACY_ENCODERS = {
+    "format_hand": json.dumps,
+    "format_hands": json.dumps,
+    "format_trick": json.dumps,
+    "format_tricks": json.dumps,
+    "format_cards": lambda cards: json.dumps(cards, indent=4),
+    "format_contract": json.dumps,
+    "format_calls": _legacy_calls,
+    "format_auction": _legacy_auction,
+}
+
+
+def _deal(seed):
+    deck = [
+        {"rank": rank, "suit": suit} for suit in SUITS for rank in RANKS]
+    random.Random(seed).shuffle(deck)
+    return {
+        position: deck[13 * index:13 * index + 13]
+        for index, position in enumerate(POSITIONS)}
+
+
+def _play(hands, tricks):
+    """Play tricks where everybody plays the lowest card following suit"""
+    history = []
+    leader = "east"
+    for _ in range(tricks):
+        cards = []
+        for offset in range(4):
+            position = POSITIONS[(POSITIONS.index(leader) + offset) % 4]
+            hand = hands[position]
+            followers = [
+                card for card in hand
+                if cards and card["suit"] == cards[0]["card"]["suit"]]
+            card = min(followers or hand, key=lambda c: RANKS.index(c["rank"]))
+            hand.remove(card)
+            cards.append({"position": position, "card": card})
+        winner = max(
+            (play for play in cards
+             if play["card"]["suit"] == cards[0]["card"]["suit"]),
+            key=lambda play: RANKS.index(play["card"]["rank"]))["position"]
+        history.append({"cards": cards, "winner": winner})
+        leader = winner
+    return history
+
+
+def _text(messages):
+    return "\n\n".join(message["content"] for message in messages)
+
+
+def _prompts(seed):
+    hands = _deal(seed)
+    llm_integration = LLMIntegration("sk-benchmark")
+    prompts = {
+        "bid suggestion": _text(llm_integration._get_bid_suggestion_messages(
+            "south", hands["south"], ALLOWED_BIDS, AUCTION[:3])),
+    }
+    tricks = _play(hands, TRICKS_PLAYED)
+    leader = tricks[-1]["winner"]
+    current = [{"position": leader, "card": hands[leader][0]}]
+    allowed = [
+        card for card in hands["east"]
+        if card["suit"] == current[0]["card"]["suit"]] or hands["east"]
+    prompts["card play"] = _text(
+        llm_integration._get_card_play_suggestion_messages(
+            "Own hand", "east", hands["east"], {"north": hands["north"]},
+            current, allowed, CONTRACT, "north, south", AUCTION,
+            [tricks[:index + 1] for index in range(len(tricks))]))
+    prompts["card choice"] = _text(llm_integration._get_card_play_messages(
+        "I would play the lowest card.", notation.format_cards(allowed)))
+    prompts["bid analysis"] = bid_analisis.bid_analisis_prompt.format(
+        position="south", perspective="Your team", previouse_analisis="",
+        last_n_bids=notation.format_auction(BID_HISTORY))
+    prompts["subsequent bid"] = (
+        subsequent_bid_suggestion_llm.bid_analisis_prompt.format(
+            position="south", your_team_analisis="",
+            opponents_bid_analisis="",
+            bidding_history=notation.format_auction(BID_HISTORY),
+            allowed_bids=notation.format_calls(
+                [notation.format_call(call) for call in ALLOWED_BIDS])))
+    prompts["opening analysis"] = (
+        analyze_opening_llm.opening_bidding_prompt.format(
+            position="south",
+            bidding_history=notation.format_auction(BID_HISTORY[:2])))
+    return prompts
+
+
+def _measure(legacy):
+    stack = ExitStack()
+    if legacy:
+        for name, encoder in LEGACY_ENCODERS.items():
+            stack.enter_context(mock.patch.object(notation, name, encoder))
+    totals = {}
+    with stack:
+        for seed in SEEDS:
+            for name, prompt in _prompts(seed).items():
+                totals[name] = totals.get(name, 0) + count_tokens(prompt)
+    return {name: total / len(SEEDS) for name, total in totals.items()}
+
+
+def main():
+    before = _measure(legacy=True)
+    after = _measure(legacy=False)
+    print("Mean prompt tokens over %d deals" % len(SEEDS))
+    print("%-18s %10s %10s %8s" % ("prompt", "legacy", "compact", "saved"))
+    for name in before:
+        print("%-18s %10.0f %10.0f %7.0f%%" % (
+            name, before[name], after[name],
+            100.0 * (before[name] - after[name]) / before[name]))
+
+
+if __name__ == "__main__":
+    main()
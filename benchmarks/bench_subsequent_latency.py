@@ -0,0 +1,65 @@
+"""Benchmark: latency of a subsequent bid decision
+
+Every LLM call is replaced by the scripted stand-in with a fixed latency. The
+sequential chain (team analysis, opponents analysis, suggestion) is compared
+with the subsequent bid graph, where both analyses run concurrently. The graph
+should take about two call latencies instead of three.
+
+Usage: python -m benchmarks.bench_subsequent_latency [latency seconds]
+"""
+
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bridgegui import subsequent_bid_agent  # noqa: E402
+from bridgegui.llm_metrics import count_llm_calls  # noqa: E402
+from benchmarks.bench_llm_calls import (  # noqa: E402
+    ALLOWED_BIDS, _patch_models, respond)
+from benchmarks.scripted_llm import ScriptedChatModel  # noqa: E402
+
+HISTORY = ["north: 1S", "east: 2D", "south: 2S", "west: Pass"]
+ROUNDS = 5
+
+
+def _sequential():
+    # The same leaves as the graph, one after another
+    team = subsequent_bid_agent._your_team_analisis("north", HISTORY, "")
+    opponents = subsequent_bid_agent._opponents_bid_analisis(
+        "north", HISTORY, "")
+    return subsequent_bid_agent._bid_suggestion(
+        "north", team, opponents, ALLOWED_BIDS, HISTORY)
+
+
+def _graph():
+    return subsequent_bid_agent.get_subsequent_bid_graph_advice(
+        position="north", your_team_analisis="", opponents_bid_analisis="",
+        allowed_bids=ALLOWED_BIDS, bidding_history=HISTORY)
+
+
+def _measure(func, latency):
+    model = ScriptedChatModel(responder=respond, latency=latency)
+    elapsed = []
+    with _patch_models(model), count_llm_calls() as counter, \
+            redirect_stdout(io.StringIO()):
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            func()
+            elapsed.append(time.perf_counter() - start)
+    return counter.calls // ROUNDS, sorted(elapsed)[ROUNDS // 2]
+
+
+def main(latency=0.2):
+    print("LLM call latency: %.3fs" % latency)
+    print("%-12s %8s %12s" % ("variant", "calls", "median (s)"))
+    for name, func in (("sequential", _sequential), ("graph", _graph)):
+        calls, median = _measure(func, latency)
+        print("%-12s %8d %12.3f" % (name, calls, median))
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:2]))
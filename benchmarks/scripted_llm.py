@@ -0,0 +1,79 @@
+"""Scripted chat model used as LLM stand-in by the benchmarks
+
+The model answers from a responder function instead of calling a provider, so
+the number of LLM calls made by the agents and the advice pipeline can be
+measured offline and deterministically. Token usage is reported like a
+provider does, counted with tiktoken if it is installed and estimated from the
+text length otherwise.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its data cannot be loaded
+    _ENCODING = None
+
+
+def count_tokens(text):
+    """Return the number of tokens of text"""
+    if _ENCODING is None:
+        return (len(text) + 3) // 4
+    return len(_ENCODING.encode(text))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model answering with responder(messages) after latency seconds"""
+
+    responder: Callable[[list], str]
+    latency: float = 0.0
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._lock:
+            self._calls += 1
+        text = self.responder(messages)
+        if self.latency:
+            time.sleep(self.latency)
+        usage = {
+            "prompt_tokens": sum(
+                count_tokens(message.content) for message in messages),
+            "completion_tokens": count_tokens(text),
+        }
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={"token_usage": usage})
+
+
+def react_action(action, action_input):
+    """Return a structured chat agent step invoking action"""
+    return "Action:\n```\n%s\n```" % json.dumps(
+        {"action": action, "action_input": action_input})
+
+
+def react_final(answer):
+    """Return a structured chat agent final answer"""
+    return react_action("Final Answer", answer)
+
+
+def agent_step(messages):
+    """Return the number of tool observations in the agent scratchpad"""
+    return messages[-1].content.count("Observation:")
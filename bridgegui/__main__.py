@@ -9,6 +9,7 @@ import json
 import logging
 import re
 import sys
+import time
 import uuid
 
 from PyQt5.QtCore import QSocketNotifier, QTimer, QObject, QCoreApplication
@@ -30,7 +31,24 @@ from dotenv import load_dotenv
 from bridgegui.llm_integration import LLMIntegration
 from collections import namedtuple
 from bridgegui.copilot_widget import Copilot  # Import the Copilot widget
+from bridgegui.analysis_store import AnalysisStore
+from bridgegui.decision_cache import DecisionCache
+from bridgegui.declarer_plan import DeclarerPlan
+from bridgegui.endgame import DEFAULT_MAX_CARDS, EndgameSolver
+from bridgegui.hand_inference import HandInference
+from bridgegui.hand_ranges import infer_hand_ranges
+from bridgegui.mcts_play import (
+    DEFAULT_ITERATIONS, MCTSPolicy, rollout_policies)
+from bridgegui.message_journal import JournaledSocket, MessageJournal
+from bridgegui.opening_lead import (
+    CRITERIA, OpeningLeadEngine, format_lead_evaluations)
+from bridgegui.auction import AuctionState, calls_mask, encode_call, mask_calls
+from bridgegui.bidding_system import DECISION_TABLE
 from bridgegui.bridge_broker_agent import get_bridge_advice
+from bridgegui.notation import as_protocol_call, format_card_classes
+from bridgegui.play_rules import (
+    PlayRules, equivalence_classes, played_cards, representatives)
+from bridgegui.simulation import BidEvaluator
 from bridgegui.game_label_widget import GameLabel  # Import GameLabel from the appropriate module
 
 
@@ -65,11 +83,16 @@ CARDS_TAG = "cards"
 TRICKS_TAG = "tricks"
 VULNERABILITY_TAG = "vulnerability"
 
+Card = namedtuple("Card", ["rank", "suit"])
+
+
 class BridgeAutopilot(QObject):
     """Handles the autopilot mode without GUI."""
 
     def __init__(self, control_socket, event_socket, position, game_uuid,
-                 create_game, player_uuid, autopilot, model):
+                 create_game, player_uuid, autopilot, model,
+                 bid_evaluator=None, decision_cache=None, endgame=None,
+                 play_policy=None, lead_engine=None, recorder=None):
         super().__init__()  # Initialize QObject
         load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
@@ -97,7 +120,17 @@ class BridgeAutopilot(QObject):
         self._contractors = None
         self._bids_history = []
         self._tricks_history = []
+        self._analysis_store = AnalysisStore()
+        self._auction = AuctionState()
+        self._bid_evaluator = bid_evaluator
+        self._decision_cache = decision_cache
+        self._vulnerability = None
         self._current_trick = []
+        self._inference = None
+        self._play_rules = PlayRules(endgame=endgame)
+        self._play_policy = play_policy
+        self._lead_engine = lead_engine
+        self._recorder = recorder
         self._phase = "bidding"
 
 
@@ -155,7 +188,7 @@ class BridgeAutopilot(QObject):
                 self._get_event_type(TRICK_COMMAND): self._handle_trick_event,
                 self._get_event_type(DEALEND_COMMAND): self._handle_dealend_event,
                 self._get_event_type(PLAYER_COMMAND): self._handle_player_event,
-            })
+            }, self._recorder)
 
     def _start_handling_events(self):
         logging.info("Starting event handling")
@@ -280,37 +313,33 @@ class BridgeAutopilot(QObject):
                     logging.info(f"allowed_calls: {allowed_calls}")
                     bids_history = self._bids_history
                     logging.info(f"bids_history: {bids_history}")
-                    allowed_biddings = self._llm_integration_instance.get_allowed_bidding(allowed_calls)
+                    allowed_biddings = mask_calls(calls_mask(allowed_calls))
                     
                     get_bid_suggestion = get_bridge_advice(
                         position = position, 
                         phase = self._phase, 
                         hand = hand,
                         allowed_bids = allowed_biddings, 
-                        bidding_history = bids_history
+                        bidding_history = bids_history,
+                        analysis_store = self._analysis_store,
+                        auction = self._auction,
+                        bid_evaluator = self._bid_evaluator,
+                        vulnerability = self._vulnerability,
+                        decision_cache = self._decision_cache
                         )
                     logging.info(f"get_bid_suggestion: {get_bid_suggestion}")
 
-                    # Directly access the 'output' dictionary
-                    output_json = get_bid_suggestion['output']  # No need for json.loads
-                    your_team_analysis = output_json.get('your_team_analysis', '')
-                    bid_suggestion = output_json.get('bid_suggestion', 'pass')
+                    your_team_analysis = get_bid_suggestion.get('your_team_analysis', '')
+                    bid_suggestion = get_bid_suggestion.get('bid_suggestion', 'pass')
 
                     logging.info(f"your_team_analysis: {your_team_analysis}")
                     logging.info(f"bid_suggestion: {bid_suggestion}")
-                    if self._autopilot:
-                        self._copilot_widget.append_message(f"Analysis: {your_team_analysis}")
-                    try:
-                        # Remove backticks and extra formatting
-                        cleaned_response = get_bid.strip("```json").strip("```").strip()
-                        get_bid = json.loads(cleaned_response)
-                        logging.info(f"after cleaning get_bid: {get_bid}")
-                        # Call _send_call_command to send the bid to the server
-                        self._send_call_command(get_bid)
-                    except json.JSONDecodeError as e:
-                        logging.error(f"Failed to parse JSON from get_bid: {e}")
-                    except Exception as e:
-                        logging.error(f"Unexpected error while handling get_bid: {e}")
+                    get_bid = as_protocol_call(bid_suggestion)
+                    if get_bid is None or not calls_mask(allowed_calls) >> encode_call(get_bid) & 1:
+                        logging.error(f"Bid {get_bid} is not in allowed calls: {allowed_calls}")
+                        get_bid = {"type": "pass"}
+                    # Call _send_call_command to send the bid to the server
+                    self._send_call_command(get_bid)
                 else:
                     get_bid = allowed_calls[0]
                     logging.info(f"only allowed bid: {get_bid}")
@@ -346,14 +375,60 @@ class BridgeAutopilot(QObject):
                 logging.info(f"contractors: {contractors}")
                 logging.info(f"bids_history: {bids_history}")
                 logging.info(f"tricks_history: {tricks_history}")
-                get_card_play_suggestion = self._llm_integration_instance.get_card_play_suggestion(play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history)
+                play_position = (
+                    position if position_in_turn is missing
+                    else position_in_turn)
+                current_trick, hands, trump, played = _play_state(
+                    pubstate, self._cards, contract)
+                decision = self._play_rules.decide(
+                    play_position, allowed_cards, current_trick, hands, trump,
+                    played, pubstate.get(TRICKS_TAG) or [])
+                if decision is not None:
+                    logging.info(
+                        "Card played by rule %r: %r", decision.rule,
+                        decision.card)
+                    self._send_play_command(Card(**decision.card))
+                    return
+                if (self._lead_engine is not None and contract and
+                        not current_trick and not any(played)):
+                    start = time.time()
+                    evaluations = self._lead_engine.evaluate(
+                        play_position, allowed_cards, self._auction, contract)
+                    if evaluations:
+                        self._play_rules.record_open(time.time() - start)
+                        logging.info(
+                            "Opening lead: %s",
+                            format_lead_evaluations(evaluations))
+                        self._send_play_command(Card(**evaluations[0].card))
+                        return
+                if self._play_policy is not None:
+                    start = time.time()
+                    decision = self._play_policy.decide(
+                        play_position, allowed_cards, current_trick, hands,
+                        trump, pubstate.get(TRICKS_TAG) or [],
+                        self._declarer, self._inference)
+                    if decision is not None:
+                        self._play_rules.record_open(time.time() - start)
+                        logging.info(
+                            "Card played by policy %r: %r", decision.rule,
+                            decision.card)
+                        self._send_play_command(Card(**decision.card))
+                        return
+                # One card of each class of equivalent cards is offered
+                choices = representatives(
+                    play_position, allowed_cards, hands, played,
+                    current_trick)
+                hidden_hands = (
+                    self._inference.summary() if self._inference else None)
+                start = time.time()
+                get_card_play_suggestion = self._llm_integration_instance.get_card_play_suggestion(play_from, position, own_hand, partners_hand, trick, choices, contract, contractors, bids_history, tricks_history, hidden_hands=hidden_hands)
                 logging.info(f"get_card_play_suggestion: {get_card_play_suggestion}")
                 try:
                     if not get_card_play_suggestion:
                         raise ValueError("get_card_play_suggestion is empty or invalid.")
                     
                     get_card_play_prompt = self._llm_integration_instance.get_card_play_prompt(
-                        get_card_play_suggestion, allowed_cards
+                        get_card_play_suggestion, choices
                     )
                     logging.info(f"get_card_play_prompt: {get_card_play_prompt}")
 
@@ -367,7 +442,6 @@ class BridgeAutopilot(QObject):
                     logging.info(f"after cleaning get_card_play_prompt: {get_card_play_prompt}")
 
                     # Call _send_play_command to send the play to the server
-                    Card = namedtuple("Card", ["rank", "suit"])
                     card = Card(**get_card_play_prompt)
 
                     # Convert the Card object to a dictionary for comparison
@@ -376,6 +450,7 @@ class BridgeAutopilot(QObject):
                     if card_dict not in allowed_cards:
                         logging.error(f"Card {card_dict} is not in allowed cards: {allowed_cards}")
                         return
+                    self._play_rules.record_open(time.time() - start)
                     self._send_play_command(card)
                 except ValueError as e:
                     logging.error(f"Validation error: {e}")
@@ -398,6 +473,8 @@ class BridgeAutopilot(QObject):
                     self._current_trick = []
                     tricks_won[positions.partnershipFor(winner)] += 1
         vulnerability = pubstate.get(VULNERABILITY_TAG, missing)
+        if vulnerability is not missing:
+            self._vulnerability = vulnerability
 
     def _handle_call_reply(self, **kwargs):
         logging.debug("Call successful")
@@ -413,6 +490,10 @@ class BridgeAutopilot(QObject):
         if self._is_stale_event(counter):
             return
         logging.debug("Cards dealt")
+        self._bids_history = []
+        self._analysis_store.reset()
+        self._auction.reset(opener)
+        self._vulnerability = vulnerability
         self._request(PUBSTATE_TAG, PRIVSTATE_TAG)
 
     def _handle_turn_event(self, position=None, counter=None, **kwargs):
@@ -431,6 +512,10 @@ class BridgeAutopilot(QObject):
             return
         logging.debug("Call made. Position: %r, Call: %r", position, call)
         self._bids_history.append({position: call})
+        try:
+            self._auction.call(position, call)
+        except ValueError as e:
+            logging.warning("Auction state out of sync: %s", e)
 
     def _handle_bidding_event(
             self, declarer=None, contract=None, counter=None, **kwargs):
@@ -442,6 +527,8 @@ class BridgeAutopilot(QObject):
         self._declarer = declarer
         self._contract = contract
         self._contractors = 'north, south' if declarer == 'north' or declarer == 'south' else 'east, west'
+        self._inference = _hand_inference(
+            self._position, declarer, contract, self._cards, self._auction)
 
     def _handle_play_event(
             self, position=None, card=None, counter=None, **kwargs):
@@ -449,6 +536,8 @@ class BridgeAutopilot(QObject):
         if self._is_stale_event(counter):
             return
         logging.debug("Card played. Position: %r, Card: %r", position, card)
+        if self._inference is not None:
+            self._inference.play(position, card)
         self._current_trick.append({"position": position, "card": card})
 
     def _handle_dummy_event(
@@ -457,6 +546,14 @@ class BridgeAutopilot(QObject):
         if self._is_stale_event(counter):
             return
         logging.debug("Dummy hand revealed")
+        if self._inference is not None:
+            self._inference.reveal(position, cards or [])
+        plan = _declarer_plan(
+            self._position, self._declarer, self._contract, self._cards,
+            cards, self._current_trick)
+        if plan is not None:
+            logging.info("Declarer plan:\n%s", plan.summary())
+        self._play_rules.set_plan(plan)
 
     def _handle_trick_event(self, winner, counter=None, **kwargs):
         logging.debug("Trick event")
@@ -469,6 +566,13 @@ class BridgeAutopilot(QObject):
         if self._is_stale_event(counter):
             return
         logging.debug("Deal ended. Result: %r", result)
+        logging.info(
+            "Decisions served by the bidding system:\n%s",
+            DECISION_TABLE.coverage_report())
+        logging.info("Card play rules:\n%s", self._play_rules.report())
+        self._play_rules.reset()
+        self._play_rules.set_plan(None)
+        self._inference = None
 
     def _handle_player_event(self, player, position, **kwargs):
         logging.debug("Player joined. Player: %r. Position: %r", player, position)
@@ -484,7 +588,8 @@ class BridgeWindow(QMainWindow):
 
     def __init__(
             self, control_socket, event_socket, position, game_uuid,
-            create_game, player_uuid, copilot, model):
+            create_game, player_uuid, copilot, model, bid_evaluator=None,
+            decision_cache=None):
         """Initialize BridgeWindow
 
         Keyword Arguments:
@@ -496,6 +601,10 @@ class BridgeWindow(QMainWindow):
         player_uuid    -- the UUID of the player (optional)
         copilot        -- flag indicating whether the client should start in copilot mode
         model          -- the model to be used for copilot mode
+        bid_evaluator  -- the simulation bid evaluator for the subsequent bids
+                          (optional, see simulation.BidEvaluator)
+        decision_cache -- the cache of the opening and response calls
+                          (optional, see decision_cache.DecisionCache)
         """
         super().__init__()
         load_dotenv()
@@ -521,7 +630,13 @@ class BridgeWindow(QMainWindow):
         self._contractors = None
         self._bids_history = []
         self._tricks_history = []
+        self._analysis_store = AnalysisStore()
+        self._auction = AuctionState()
+        self._bid_evaluator = bid_evaluator
+        self._decision_cache = decision_cache
+        self._vulnerability = None
         self._current_trick = []
+        self._inference = None
         self._phase = "bidding"
         
 
@@ -753,14 +868,19 @@ class BridgeWindow(QMainWindow):
                     logging.info(f"allowed_calls: {allowed_calls}") 
                     bids_history = self._bids_history
                     logging.info(f"bids_history: {bids_history}")
-                    allowed_biddings = self._llm_integration_instance.get_allowed_bidding(allowed_calls)
+                    allowed_biddings = mask_calls(calls_mask(allowed_calls))
                     #get_bid_suggestion = self._llm_integration_instance.get_bid_suggestion(position, hand, allowed_biddings, bids_history,self._model)
                     get_bid_suggestion = get_bridge_advice(
                         position = position, 
                         phase = self._phase, 
                         hand = hand,
                         allowed_bids = allowed_biddings, 
-                        bidding_history = bids_history
+                        bidding_history = bids_history,
+                        analysis_store = self._analysis_store,
+                        auction = self._auction,
+                        bid_evaluator = self._bid_evaluator,
+                        vulnerability = self._vulnerability,
+                        decision_cache = self._decision_cache
                         )
                     logging.info(f"get_bid_suggestion: {get_bid_suggestion}")
 
@@ -810,10 +930,24 @@ class BridgeWindow(QMainWindow):
                 logging.info(f"bids_history: {bids_history}")
                 logging.info(f"tricks_history: {tricks_history}")
                 if (self._copilot):
-                    get_card_play_suggestion = self._llm_integration_instance.get_card_play_suggestion(play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history)
+                    current_trick, hands, _, played = _play_state(
+                        pubstate, self._cards, contract)
+                    classes = equivalence_classes(
+                        position if position_in_turn is missing
+                        else position_in_turn, allowed_cards, hands, played,
+                        current_trick)
+                    choices = [class_[0] for class_ in classes]
+                    hidden_hands = (
+                        self._inference.summary() if self._inference
+                        else None)
+                    get_card_play_suggestion = self._llm_integration_instance.get_card_play_suggestion(play_from, position, own_hand, partners_hand, trick, choices, contract, contractors, bids_history, tricks_history, hidden_hands=hidden_hands)
                     logging.info(f"get_card_play_suggestion: {get_card_play_suggestion}")
                     if self._copilot:
-                        self._card_area.displayMessage(get_card_play_suggestion)
+                        self._card_area.displayMessage(
+                            "%s\n\nEquivalent cards: %s\nHidden hands: %s" % (
+                                get_card_play_suggestion,
+                                format_card_classes(classes),
+                                hidden_hands or "unknown"))
         tricks = pubstate.get(TRICKS_TAG, missing)
         if tricks is not missing:
             if tricks:
@@ -833,6 +967,7 @@ class BridgeWindow(QMainWindow):
             self._tricks_won_label.setTricksWon(tricks_won)
         vulnerability = pubstate.get(VULNERABILITY_TAG, missing)
         if vulnerability is not missing:
+            self._vulnerability = vulnerability
             self._call_table.setVulnerability(vulnerability)
 
     def _handle_call_reply(self, **kwargs):
@@ -849,6 +984,10 @@ class BridgeWindow(QMainWindow):
         if self._is_stale_event(counter):
             return
         logging.debug("Cards dealt")
+        self._bids_history = []
+        self._analysis_store.reset()
+        self._auction.reset(opener)
+        self._vulnerability = vulnerability
         self._card_area.setPositionInTurn(opener)
         self._call_table.setVulnerability(vulnerability)
         self._bidding_result_label.setBiddingResult(None, None)
@@ -875,6 +1014,10 @@ class BridgeWindow(QMainWindow):
         logging.debug("Call made. Position: %r, Call: %r", position, call)
         self._call_table.addCall(position, call)
         self._bids_history.append({position: call})
+        try:
+            self._auction.call(position, call)
+        except ValueError as e:
+            logging.warning("Auction state out of sync: %s", e)
 
     def _handle_bidding_event(
             self, declarer=None, contract=None, counter=None, **kwargs):
@@ -886,6 +1029,8 @@ class BridgeWindow(QMainWindow):
         self._declarer = declarer
         self._contract = contract
         self._contractors = 'north, south' if declarer == 'north' or declarer == 'south' else 'east, west'
+        self._inference = _hand_inference(
+            self._position, declarer, contract, self._cards, self._auction)
         self._bidding_result_label.setBiddingResult(declarer, contract)
 
     def _handle_play_event(
@@ -894,6 +1039,8 @@ class BridgeWindow(QMainWindow):
         if self._is_stale_event(counter):
             return
         logging.debug("Card played. Position: %r, Card: %r", position, card)
+        if self._inference is not None:
+            self._inference.play(position, card)
         self._card_area.playCard(position, card)
         self._current_trick.append({"position": position, "card": card})
 
@@ -903,7 +1050,15 @@ class BridgeWindow(QMainWindow):
         if self._is_stale_event(counter):
             return
         logging.debug("Dummy hand revealed")
+        if self._inference is not None:
+            self._inference.reveal(position, cards or [])
         self._card_area.setCards({ position: cards })
+        plan = _declarer_plan(
+            self._position, self._declarer, self._contract, self._cards,
+            cards, self._current_trick)
+        if plan is not None and self._copilot:
+            self._card_area.displayMessage(
+                "Declarer plan:\n%s" % plan.summary())
 
     def _handle_trick_event(self, winner, counter=None, **kwargs):
         logging.debug("Trick event")
@@ -917,8 +1072,12 @@ class BridgeWindow(QMainWindow):
         if self._is_stale_event(counter):
             return
         logging.debug("Deal ended. Result: %r", result)
+        logging.info(
+            "Decisions served by the bidding system:\n%s",
+            DECISION_TABLE.coverage_report())
         self._score_table.addResult(result)
         self._call_table.setCalls([])
+        self._inference = None
 
     def _handle_player_event(self, player, position, **kwargs):
         logging.debug("Player joined. Player: %r. Position: %r", player, position)
@@ -929,6 +1088,39 @@ class BridgeWindow(QMainWindow):
         self._card_area._stop_all_bots()  # Call the method to stop all bots
         super().closeEvent(event)  # Call the parent class's closeEvent
 
+
+def _declarer_plan(position, declarer, contract, cards, dummy_cards, trick):
+    # The plan of the declarer at the dummy reveal, if the player declares
+    if not position or position != declarer or not contract or not (
+            contract.get("bid")):
+        return None
+    return DeclarerPlan(
+        declarer, contract, cards.get(declarer) or [], dummy_cards or [],
+        played_cards(trick))
+
+
+def _hand_inference(position, declarer, contract, cards, auction):
+    # The inference of the hidden hands from the end of the auction, if the
+    # deal is played and the own hand is known
+    hand = cards.get(position) if position else None
+    if not hand or not declarer or not contract or not contract.get("bid"):
+        return None
+    ranges, _ = infer_hand_ranges(auction, hand, position)
+    return HandInference(position, hand, declarer, ranges)
+
+
+def _play_state(pubstate, cards, contract):
+    # The current trick, the visible hands, the trump suit and the cards
+    # played, for the play rules
+    tricks = pubstate.get(TRICKS_TAG) or []
+    trick = []
+    if tricks and not tricks[-1].get("winner"):
+        trick = tricks[-1].get("cards") or []
+    trump = ((contract or {}).get("bid") or {}).get("strain")
+    hands = {position: cards_ for position, cards_ in cards.items() if cards_}
+    return trick, hands, trump, played_cards(tricks)
+
+
 def _get_key_from_file(f):
     logging.debug("Reading key from file %r", f)
     if f:
@@ -987,6 +1179,68 @@ def main():
     parser.add_argument(
         '--model',
         help="""The model to use for the autopilot or copilote mode. List of models currently supported: gpt-3.5-turbo, gpt-4-turbo""")
+    parser.add_argument(
+        '--simulation-budget', type=float, metavar="SECONDS",
+        help="""If provided, the subsequent bids are chosen by double dummy
+             simulation on the local CPUs within the given time budget, and
+             the LLM is only consulted if no deal is evaluated in time.""")
+    parser.add_argument(
+        '--simulation-workers', type=int, default=1, metavar="N",
+        help="""The number of processes solving the simulated deals of the
+             bids and of the opening leads. The processes are started at the
+             first simulation and reused.""")
+    parser.add_argument(
+        '--decision-cache', metavar="FILE",
+        help="""Pre-warmed decision cache of the opening and response calls
+             (see python -m bridgegui.decision_cache). If omitted, the cache
+             starts empty.""")
+    parser.add_argument(
+        '--endgame-cards', type=int, default=DEFAULT_MAX_CARDS, metavar="N",
+        help="""In autopilot mode, the plays are solved exactly when every
+             hand has at most N cards left or the position is fully
+             determined, and claims are played out without the LLM. 0
+             disables the endgame solver.""")
+    parser.add_argument(
+        '--play-policy', choices=("llm", "mcts"), default="llm",
+        help="""In autopilot mode, the policy deciding the card plays the
+             local rules leave open: the LLM, or information set Monte
+             Carlo tree search on the local CPUs.""")
+    parser.add_argument(
+        '--mcts-budget', type=float, default=2.0, metavar="SECONDS",
+        help="""The time budget of the tree search per card play.""")
+    parser.add_argument(
+        '--mcts-iterations', type=int, default=DEFAULT_ITERATIONS,
+        metavar="N",
+        help="""The maximum number of iterations of the tree search per card
+             play and worker. The search stops at the time budget or after
+             the iterations, whichever comes first.""")
+    parser.add_argument(
+        '--mcts-workers', type=int, default=1, metavar="N",
+        help="""The number of processes searching their own trees per card
+             play (root parallelism).""")
+    parser.add_argument(
+        '--mcts-rollout', choices=rollout_policies(), default="heuristic",
+        help="""The rollout policy of the tree search.""")
+    parser.add_argument(
+        '--lead-budget', type=float, metavar="SECONDS",
+        help="""If provided, in autopilot mode the opening lead is chosen by
+             double dummy simulation of deals consistent with the auction
+             on the local CPUs within the given time budget.""")
+    parser.add_argument(
+        '--lead-criterion', choices=CRITERIA, default=CRITERIA[0],
+        help="""Rank the opening leads by the mean tricks of the defense, or
+             by the chance of beating the contract.""")
+    parser.add_argument(
+        '--record-events', type=argparse.FileType("a"), metavar="FILE",
+        help="""In autopilot mode, append the events received from the
+             server to FILE as JSON lines. The recordings can be checked
+             against the local rules with rules_engine.verify_messages.""")
+    parser.add_argument(
+        '--journal', metavar="FILE",
+        help="""Append every message frame sent to and received from the
+             server to the binary journal FILE (and its FILE.idx index). The
+             journal is printed with python -m bridgegui.message_journal
+             FILE, and can be replayed with message_journal.replay.""")
     parser.add_argument(
         "--verbose", "-v", action="count", default=0,
         help="""Increase logging levels. Repeat for even more logging.""")
@@ -1013,33 +1267,76 @@ def main():
     event_socket = zmqctx.socket(zmq.SUB)
     messaging.setupCurve(event_socket, curve_server_key)
     event_socket.connect(next(endpoint_generator))
+    journal = None
+    if args.journal:
+        journal = MessageJournal(args.journal)
+        control_socket = JournaledSocket(control_socket, journal, "control")
+        event_socket = JournaledSocket(event_socket, journal, "events")
     model = args.model
     if model is None:
         model = 'gpt-3.5-turbo'
     logging.info(f"Model: {model}")
+    bid_evaluator = None
+    if args.simulation_budget:
+        bid_evaluator = BidEvaluator(
+            time_budget=args.simulation_budget,
+            workers=args.simulation_workers)
+    if args.decision_cache:
+        decision_cache = DecisionCache.load(args.decision_cache)
+    else:
+        decision_cache = DecisionCache()
 
     if args.autopilot:
         logging.info("Running in autopilot mode without GUI.")
+        play_policy = None
+        if args.play_policy == "mcts":
+            play_policy = MCTSPolicy(
+                iterations=args.mcts_iterations, time_budget=args.mcts_budget,
+                workers=args.mcts_workers, rollout=args.mcts_rollout)
+        lead_engine = None
+        if args.lead_budget:
+            lead_engine = OpeningLeadEngine(
+                time_budget=args.lead_budget, criterion=args.lead_criterion,
+                workers=args.simulation_workers)
         # Run in headless mode without creating any QWidget
         bridge_autopilot = BridgeAutopilot(
             control_socket, event_socket, args.position, args.game,
-            args.create_game, args.player, args.autopilot, model)
+            args.create_game, args.player, args.autopilot, model,
+            bid_evaluator, decision_cache,
+            EndgameSolver(args.endgame_cards) if args.endgame_cards else None,
+            play_policy, lead_engine,
+            messaging.MessageRecorder(args.record_events)
+            if args.record_events else None)
         bridge_autopilot.start()
         try:
             while True:
                 pass  # Keep the process alive
         except KeyboardInterrupt:
             logging.info("Autopilot mode interrupted by user.")
+        finally:
+            if bid_evaluator:
+                bid_evaluator.close()
+            if lead_engine:
+                lead_engine.close()
+            if play_policy:
+                play_policy.close()
+            if journal:
+                journal.close()
     else:
         logging.info("Starting main window")
         app = QApplication(sys.argv)
         window = BridgeWindow(
             control_socket, event_socket, args.position, args.game,
-            args.create_game, args.player, args.copilot, model)
+            args.create_game, args.player, args.copilot, model,
+            bid_evaluator, decision_cache)
         code = app.exec_()
+        if bid_evaluator:
+            bid_evaluator.close()
 
         logging.info("Main window closed. Closing sockets.")
         zmqctx.destroy(linger=0)
+        if journal:
+            journal.close()
         return code
 
 
@@ -0,0 +1,100 @@
+"""Static dependency graph for advice pipelines
+
+This module contains a small executor for static graphs of named nodes. Each
+node is a plain callable whose keyword arguments are the results of the nodes
+(or initial inputs) it depends on. Nodes whose dependencies are satisfied are
+run concurrently on a thread pool, so independent branches (typically LLM
+calls) overlap instead of running back to back.
+
+Classes:
+AdviceGraph -- graph of named nodes with explicit dependencies
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+from collections import namedtuple
+
+Node = namedtuple("Node", ("func", "dependencies"))
+
+
+class AdviceGraph:
+    """Graph of named nodes executed in dependency order"""
+
+    def __init__(self, name, max_workers=4):
+        """Initialize advice graph
+
+        Keyword Arguments:
+        name        -- the name of the graph (for logging)
+        max_workers -- maximum number of nodes executed concurrently
+        """
+        self._name = str(name)
+        self._max_workers = max_workers
+        self._nodes = {}
+
+    @property
+    def name(self):
+        """Return the name of the graph"""
+        return self._name
+
+    def add_node(self, name, func, dependencies=()):
+        """Add node to the graph
+
+        The node is executed once all its dependencies are available. The
+        dependencies are either names of other nodes or names of the inputs
+        given to run(). The callable receives the dependencies as keyword
+        arguments.
+
+        Keyword Arguments:
+        name         -- the name of the node (also the key of its result)
+        func         -- the callable computing the result of the node
+        dependencies -- names of the nodes or inputs the node depends on
+        """
+        if name in self._nodes:
+            raise ValueError("Duplicate node in %s: %r" % (self._name, name))
+        self._nodes[name] = Node(func, tuple(dependencies))
+        return self
+
+    def nodes(self):
+        """Return names of the nodes in insertion order"""
+        return list(self._nodes)
+
+    def run(self, **inputs):
+        """Execute the graph and return the results of all nodes
+
+        The returned dictionary contains the inputs and the result of every
+        node keyed by node name. An exception raised by a node is propagated to
+        the caller after the running nodes have finished. Inputs may not have
+        the name of a node.
+        """
+        shadowed = sorted(set(inputs) & set(self._nodes))
+        if shadowed:
+            raise ValueError(
+                "Inputs of %s shadow nodes: %r" % (self._name, shadowed))
+        results = dict(inputs)
+        pending = dict(self._nodes)
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers) as executor:
+            while pending or running:
+                for name, node in list(pending.items()):
+                    if all(dep in results for dep in node.dependencies):
+                        kwargs = {dep: results[dep] for dep in node.dependencies}
+                        # Copy the context so that callbacks registered through
+                        # context variables (e.g. LLM call counters) see the
+                        # calls made from worker threads
+                        context = contextvars.copy_context()
+                        future = executor.submit(context.run, node.func, **kwargs)
+                        running[future] = name
+                        del pending[name]
+                if not running:
+                    raise ValueError(
+                        "Unsatisfiable dependencies in %s: %r" %
+                        (self._name, sorted(pending)))
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    logging.debug("%s: node %r done", self._name, name)
+        return results
@@ -0,0 +1,424 @@
+"""Deterministic advice pipeline
+
+This module replaces the ReAct routing of the broker agent with static advice
+graphs. Phase and bidding stage are recognized in code and the decision is
+dispatched directly to the graph of the stage. The LLM is only called at the
+leaf nodes that actually make a bridge decision (opening bid, analysis of the
+partner's opening, response, subsequent bid), and independent leaves run
+concurrently.
+
+The text representation of calls is shared with the prompts (see notation).
+
+Functions:
+recognize_bidding_stage  -- determine the bidding stage without an LLM
+extract_bid              -- extract the suggested bid from a free text answer
+run_bidding_advice       -- run the advice graph for a bidding decision
+run_play_advice          -- produce advice for a card play decision
+"""
+
+import json
+import logging
+
+from bridgegui.advice_graph import AdviceGraph
+from bridgegui.analyze_opening_llm import get_opening_analisis
+from bridgegui.bidding_system import DECISION_TABLE
+from bridgegui.decision_cache import decision_key, describe_key
+from bridgegui.double_dummy import hand_masks
+from bridgegui.hand_ranges import (
+    HAND_CARDS, describe_hand_ranges, infer_hand_ranges)
+from bridgegui.holdings import (
+    dominant_suit, hand_hcp, suit_distribution, suit_lengths)
+from bridgegui.auction import (
+    COMPETITIVE_STAGE, OPENING_STAGE, OVERCALL_STAGE, RESPONSE_STAGE,
+    SUBSEQUENT_STAGE, AuctionState, calls_mask, encode_call)
+from bridgegui.notation import (
+    PASS_FORMAT, as_protocol_call, find_calls, format_call,
+    normalize_bidding_history, parse_call)
+from bridgegui.opening_bid_llm import get_opening_bid
+from bridgegui.response_bid_llm import get_response_analisis
+from bridgegui.schemas import OpeningBidToolInput
+from bridgegui.simulation import candidate_calls, format_evaluations
+from bridgegui.subsequent_bid_agent import get_subsequent_bid_graph_advice
+from bridgegui.utils2 import is_balanced_hand
+
+# There are no dedicated graphs for the competitive stages yet: an overcall is
+# decided like an opening and a competitive call like a subsequent bid
+ROUTED_STAGES = {
+    OPENING_STAGE: OPENING_STAGE,
+    OVERCALL_STAGE: OPENING_STAGE,
+    RESPONSE_STAGE: RESPONSE_STAGE,
+    SUBSEQUENT_STAGE: SUBSEQUENT_STAGE,
+    COMPETITIVE_STAGE: SUBSEQUENT_STAGE,
+}
+# Routed stages whose advice is kept in the decision cache
+CACHED_STAGES = (OPENING_STAGE, RESPONSE_STAGE)
+
+
+def _history_strings(pairs):
+    return ["%s: %s" % pair for pair in pairs]
+
+
+def recognize_bidding_stage(position, bidding_history, auction=None):
+    """Determine the bidding stage in code
+
+    The stage is Opening if neither the player nor the partner has made a bid,
+    Response if only the partner has made a single bid and Subsequent
+    otherwise. Passes do not count as bids. The detailed stage of the auction
+    (see auction.AuctionState.stage) is mapped to one of these by
+    ROUTED_STAGES.
+
+    If the auction state of the deal is given and accounts for the whole
+    bidding history, the stage is read from it without scanning the history.
+
+    Keyword Arguments:
+    position        -- the position of the player
+    bidding_history -- the bidding history (see normalize_bidding_history)
+    auction         -- the auction state of the deal (optional)
+    """
+    auction = _auction_state(bidding_history, auction)
+    return ROUTED_STAGES[auction.stage(position)]
+
+
+def _auction_state(bidding_history, auction):
+    if auction is None or len(auction) != len(bidding_history):
+        auction = AuctionState.from_history(bidding_history)
+    return auction
+
+
+def _normalize_allowed_bids(allowed_bids):
+    if isinstance(allowed_bids, str):
+        allowed_bids = allowed_bids.split(",")
+    normalized = []
+    for bid in allowed_bids or ():
+        call = format_call(bid) if isinstance(bid, dict) else parse_call(bid)
+        if call is not None:
+            normalized.append(call)
+    return normalized
+
+
+def extract_bid(text, allowed_bids=None):
+    """Extract the suggested bid from a free text answer
+
+    The last call mentioned in the text is taken as the conclusion of the
+    answer. If allowed bids are given and the call is not among them, pass is
+    returned instead.
+
+    Keyword Arguments:
+    text         -- the answer of the LLM
+    allowed_bids -- the allowed bids (optional)
+    """
+    calls = find_calls(text)
+    if not calls:
+        return PASS_FORMAT
+    call = calls[-1]
+    allowed = calls_mask(_normalize_allowed_bids(allowed_bids))
+    if allowed and not allowed >> encode_call(call) & 1 and \
+            call != PASS_FORMAT:
+        logging.warning("Suggested bid %r not allowed, passing", call)
+        return PASS_FORMAT
+    return call
+
+
+def _parse_llm_json(text):
+    cleaned = (text or "").strip().strip("`")
+    if cleaned.startswith("json"):
+        cleaned = cleaned[len("json"):]
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        return json.loads(cleaned[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+
+########################################
+# LEAF AND CODE NODES
+########################################
+
+
+def _hand_features(hand):
+    # Four reads of the holding tables instead of iterating the cards once
+    # per feature (same results as the utils2 functions)
+    masks = hand_masks(hand)
+    lengths = suit_lengths(masks)
+    spades, hearts, diamonds, clubs = lengths
+    return {
+        "hcp": hand_hcp(masks),
+        "distribution": suit_distribution(lengths),
+        "balanced_hand": is_balanced_hand(clubs, diamonds, hearts, spades),
+        "dominant_suit": dominant_suit(lengths),
+    }
+
+
+def _hand_analysis(hand_features):
+    clubs, diamonds, hearts, spades = hand_features["distribution"].split("-")
+    return (
+        "You have {hcp} HCP. {spades} Spades, {hearts} Hearts, {diamonds} "
+        "Diamonds, and {clubs} Clubs.".format(
+            hcp=hand_features["hcp"], spades=spades, hearts=hearts,
+            diamonds=diamonds, clubs=clubs))
+
+
+def _history(bidding_history):
+    return _history_strings(normalize_bidding_history(bidding_history))
+
+
+def _opening_bid(hand_features):
+    return get_opening_bid(OpeningBidToolInput(**hand_features))
+
+
+def _opening_advice(opening_bid, allowed_bids):
+    answer = _parse_llm_json(opening_bid)
+    suggestion = answer.get("bid_suggestion") or opening_bid
+    return {
+        "your_team_analysis": answer.get("your_team_analysis", opening_bid),
+        "opponent_analysis": "",
+        "bid_suggestion": extract_bid(str(suggestion), allowed_bids),
+        "play_suggestion": "",
+    }
+
+
+def _partner_analysis(position, history):
+    return get_opening_analisis(position=position, bidding_history=history)
+
+
+def _response_analysis(partner_analysis, hand_analysis):
+    return get_response_analisis(
+        partners_opening_bid_analysis=partner_analysis,
+        your_hand_analysis=hand_analysis)
+
+
+def _response_advice(partner_analysis, response_analysis, allowed_bids):
+    return {
+        "your_team_analysis": "%s\n%s" % (partner_analysis, response_analysis),
+        "opponent_analysis": "",
+        "bid_suggestion": extract_bid(response_analysis, allowed_bids),
+        "play_suggestion": "",
+    }
+
+
+def _system_advice(rule, your_team_analysis, opponent_analysis):
+    return {
+        "your_team_analysis": your_team_analysis or "Bidding system: %s" % (
+            rule.description),
+        "opponent_analysis": opponent_analysis,
+        "bid_suggestion": rule.call,
+        "play_suggestion": "",
+    }
+
+
+def _cached_advice(call, key, your_team_analysis, opponent_analysis):
+    # The analyses of the cached call were made for another hand, so they
+    # are not cached, and the features of the key are given instead
+    return {
+        "your_team_analysis": your_team_analysis or describe_key(key),
+        "opponent_analysis": opponent_analysis,
+        "bid_suggestion": call,
+        "play_suggestion": "",
+    }
+
+
+def _simulation_advice(
+        bid_evaluator, position, hand, allowed_bids, auction, ranges,
+        vulnerability):
+    candidates = candidate_calls(auction)
+    allowed = calls_mask(_normalize_allowed_bids(allowed_bids))
+    if allowed:
+        candidates = [
+            call for call in candidates if allowed >> encode_call(call) & 1]
+    evaluations = bid_evaluator.evaluate(
+        position, hand, auction, candidates=candidates, ranges=ranges,
+        vulnerability=vulnerability)
+    if not evaluations:
+        return None
+    _, opponent_analysis = describe_hand_ranges(ranges, position)
+    return {
+        "your_team_analysis": format_evaluations(evaluations),
+        "opponent_analysis": opponent_analysis,
+        "bid_suggestion": evaluations[0].call,
+        "play_suggestion": "",
+    }
+
+
+def _subsequent_advice(
+        position, history, allowed_bids, your_team_analysis,
+        opponent_analysis, new_bids):
+    advice = get_subsequent_bid_graph_advice(
+        position=position, your_team_analisis=your_team_analysis,
+        opponents_bid_analisis=opponent_analysis,
+        allowed_bids=allowed_bids, bidding_history=history,
+        new_bids=new_bids)
+    return {
+        "your_team_analysis": advice["your_team_analisis"],
+        "opponent_analysis": advice["opponents_bid_analisis"],
+        "bid_suggestion": extract_bid(advice["bid_suggestion"], allowed_bids),
+        "play_suggestion": "",
+    }
+
+
+########################################
+# STATIC ADVICE GRAPHS
+########################################
+
+
+def _build_opening_graph():
+    graph = AdviceGraph("opening advice graph")
+    graph.add_node("hand_features", _hand_features, ("hand",))
+    graph.add_node("opening_bid", _opening_bid, ("hand_features",))
+    graph.add_node(
+        "advice", _opening_advice, ("opening_bid", "allowed_bids"))
+    return graph
+
+
+def _build_response_graph():
+    graph = AdviceGraph("response advice graph")
+    graph.add_node("history", _history, ("bidding_history",))
+    graph.add_node("hand_features", _hand_features, ("hand",))
+    graph.add_node("hand_analysis", _hand_analysis, ("hand_features",))
+    graph.add_node(
+        "partner_analysis", _partner_analysis, ("position", "history"))
+    graph.add_node(
+        "response_analysis", _response_analysis,
+        ("partner_analysis", "hand_analysis"))
+    graph.add_node(
+        "advice", _response_advice,
+        ("partner_analysis", "response_analysis", "allowed_bids"))
+    return graph
+
+
+def _build_subsequent_graph():
+    graph = AdviceGraph("subsequent advice graph")
+    graph.add_node("history", _history, ("bidding_history",))
+    graph.add_node(
+        "advice", _subsequent_advice,
+        ("position", "history", "allowed_bids", "your_team_analysis",
+         "opponent_analysis", "new_bids"))
+    return graph
+
+
+STAGE_GRAPHS = {
+    OPENING_STAGE: _build_opening_graph(),
+    RESPONSE_STAGE: _build_response_graph(),
+    SUBSEQUENT_STAGE: _build_subsequent_graph(),
+}
+
+
+def run_bidding_advice(
+        position, hand, allowed_bids, bidding_history,
+        your_team_analysis="", opponent_analysis="", analysis_store=None,
+        auction=None, decision_table=DECISION_TABLE, bid_evaluator=None,
+        vulnerability=None, decision_cache=None):
+    """Run the advice graph for a bidding decision
+
+    Returns dictionary with the keys of getBrdidgeAdviceResponse. The
+    bid_suggestion is in the short text representation (see format_call).
+
+    The decision is first looked up in the decision table of the bidding
+    system, and the advice graph of the stage is only run if no rule of the
+    system covers it. If every call of the auction is known to the system,
+    the subsequent bid is suggested from the inferred hand ranges (see
+    hand_ranges) without analyzing the calls. If a bid evaluator is given,
+    the subsequent bid is chosen by simulation instead of the LLM, unless no
+    deal could be evaluated in time.
+
+    If decision_cache (see decision_cache.DecisionCache) is given, the
+    opening and response calls are looked up in it by the decision key before
+    the advice graph is run, and the call of the graph is stored in it. The
+    analysis store is left alone on a hit.
+
+    If analysis_store (see analysis_store.AnalysisStore) is given, the
+    analyses stored for the position are used unless passed explicitly, only
+    the calls made since they were stored are analyzed, and the updated
+    analyses are stored back.
+
+    Keyword Arguments:
+    position           -- the position of the player
+    hand               -- the hand of the player (list of cards)
+    allowed_bids       -- the allowed bids
+    bidding_history    -- the bidding history
+    your_team_analysis -- the previous analysis of the own team
+    opponent_analysis  -- the previous analysis of the opponents
+    analysis_store     -- the analysis store of the deal (optional)
+    auction            -- the auction state of the deal (optional, see
+                          recognize_bidding_stage)
+    decision_table     -- the decision table of the bidding system (see
+                          bidding_system), None to always consult the LLM
+    bid_evaluator      -- the simulation bid evaluator for the subsequent
+                          bids (optional, see simulation.BidEvaluator)
+    vulnerability      -- the vulnerability object of the bridge protocol
+                          (optional, used by the bid evaluator and the
+                          decision cache)
+    decision_cache     -- the decision cache of the opening and response
+                          calls (optional)
+    """
+    auction = _auction_state(bidding_history, auction)
+    stage = recognize_bidding_stage(position, bidding_history, auction)
+    logging.debug("Bidding stage for %s: %s", position, stage)
+    if decision_table is not None:
+        rule = decision_table.lookup(auction, hand, stage)
+        if rule is not None:
+            logging.debug("Bidding system rule: %s", rule.description)
+            return _system_advice(rule, your_team_analysis, opponent_analysis)
+    history = _history(bidding_history)
+    new_bids = None
+    if analysis_store is not None:
+        stored_team_analysis, stored_opponent_analysis, new_bids = (
+            analysis_store.lookup(position, history))
+        your_team_analysis = your_team_analysis or stored_team_analysis
+        opponent_analysis = opponent_analysis or stored_opponent_analysis
+    cache_key = None
+    if decision_cache is not None and stage in CACHED_STAGES and \
+            len(hand) == HAND_CARDS:
+        cache_key = decision_key(position, hand, auction, vulnerability)
+        call = decision_cache.lookup(cache_key)
+        if call is not None:
+            logging.debug("Decision cache hit for %s", position)
+            return _cached_advice(
+                call, cache_key, your_team_analysis, opponent_analysis)
+    if stage == SUBSEQUENT_STAGE:
+        ranges, complete = infer_hand_ranges(auction, hand, position)
+        if bid_evaluator is not None and len(hand) == HAND_CARDS:
+            advice = _simulation_advice(
+                bid_evaluator, position, hand, allowed_bids, auction, ranges,
+                vulnerability)
+            if advice is not None:
+                if analysis_store is not None:
+                    analysis_store.update(
+                        position, history,
+                        *describe_hand_ranges(ranges, position))
+                return advice
+        if complete:
+            # The whole auction is explained by the bidding system, so the
+            # analyses are the inferred hand ranges instead of LLM analyses
+            your_team_analysis, opponent_analysis = describe_hand_ranges(
+                ranges, position)
+            new_bids = []
+    results = STAGE_GRAPHS[stage].run(
+        position=position, hand=hand, allowed_bids=allowed_bids,
+        bidding_history=bidding_history,
+        your_team_analysis=your_team_analysis,
+        opponent_analysis=opponent_analysis, new_bids=new_bids)
+    advice = results["advice"]
+    if cache_key is not None:
+        decision_cache.store(cache_key, advice["bid_suggestion"])
+    if analysis_store is not None:
+        analysis_store.update(
+            position, history, advice["your_team_analysis"],
+            advice["opponent_analysis"])
+    return advice
+
+
+def run_play_advice(allowed_cards):
+    """Produce advice for a card play decision
+
+    Card play decisions are made by LLMIntegration. Here the first allowed card
+    is suggested, as the play analysis tool of the broker agent did.
+    """
+    play_suggestion = allowed_cards[0] if allowed_cards else "No valid card"
+    return {
+        "your_team_analysis": "",
+        "opponent_analysis": "",
+        "bid_suggestion": "",
+        "play_suggestion": play_suggestion,
+    }
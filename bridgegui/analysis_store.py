@@ -0,0 +1,117 @@
+"""Per-deal memory of the bidding analyses
+
+The subsequent bid analyses are meant to be incremental: the previous analysis
+is updated with the calls made since. This module keeps the latest team and
+opponent analyses of each position during a deal, tells which calls are new
+since the analyses were made and compacts the stored text to a bounded size,
+so that the prompts of an analysis update do not grow with the auction.
+
+Functions:
+compact_analysis -- shorten analysis text to a bounded size
+
+Classes:
+AnalysisStore -- per-deal store of the latest analyses of each position
+"""
+
+import collections
+import re
+import threading
+
+MAX_ANALYSIS_LENGTH = 800
+
+_SENTENCE_END_REGEX = re.compile(r"(?<=[.!?])\s+")
+
+_Entry = collections.namedtuple(
+    "_Entry", ("history", "your_team_analysis", "opponent_analysis"))
+
+
+def compact_analysis(text, max_length=MAX_ANALYSIS_LENGTH):
+    """Shorten analysis text to at most max_length characters
+
+    An updated analysis restates the conclusions of the previous one, so the
+    most recent sentences are kept and the oldest ones are dropped. A single
+    sentence longer than max_length is cut from the front.
+
+    Keyword Arguments:
+    text       -- the analysis
+    max_length -- the maximum length of the result
+    """
+    text = " ".join((text or "").split())
+    if len(text) <= max_length:
+        return text
+    kept = []
+    length = -1
+    for sentence in reversed(_SENTENCE_END_REGEX.split(text)):
+        if length + 1 + len(sentence) > max_length:
+            break
+        kept.append(sentence)
+        length += 1 + len(sentence)
+    if not kept:
+        return text[-max_length:]
+    return " ".join(reversed(kept))
+
+
+class AnalysisStore:
+    """Per-deal store of the latest bidding analyses
+
+    The analyses are stored per position together with the bidding history
+    they account for. The store must be reset when a new deal starts. A
+    bidding history that does not extend the stored one (for example because
+    the reset was missed) invalidates the entry of the position.
+    """
+
+    def __init__(self, max_length=MAX_ANALYSIS_LENGTH):
+        """Initialize analysis store
+
+        Keyword Arguments:
+        max_length -- the maximum length of a stored analysis
+        """
+        self._max_length = max_length
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def reset(self):
+        """Forget the analyses of the previous deal"""
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, position, bidding_history):
+        """Return the stored analyses and the calls made since
+
+        Returns tuple (your_team_analysis, opponent_analysis, new_calls). The
+        bidding history and new_calls are lists of "position: call" strings.
+        If nothing is stored for the position, the analyses are empty and
+        new_calls is None.
+
+        Keyword Arguments:
+        position        -- the position of the player
+        bidding_history -- the current bidding history
+        """
+        history = tuple(bidding_history)
+        with self._lock:
+            entry = self._entries.get(position)
+        if entry is None or history[:len(entry.history)] != entry.history:
+            return "", "", None
+        return (
+            entry.your_team_analysis, entry.opponent_analysis,
+            list(history[len(entry.history):]))
+
+    def update(
+            self, position, bidding_history, your_team_analysis,
+            opponent_analysis):
+        """Store the analyses of position made for bidding_history
+
+        The analyses are compacted before they are stored.
+
+        Keyword Arguments:
+        position           -- the position of the player
+        bidding_history    -- the bidding history the analyses account for
+        your_team_analysis -- the analysis of the own team
+        opponent_analysis  -- the analysis of the opponents
+        """
+        entry = _Entry(
+            tuple(bidding_history),
+            compact_analysis(your_team_analysis, self._max_length),
+            compact_analysis(opponent_analysis, self._max_length))
+        with self._lock:
+            self._entries[position] = entry
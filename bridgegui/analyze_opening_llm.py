@@ -1,7 +1,9 @@
 import os
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
+from bridgegui import notation
 
 
 ########################################
@@ -16,9 +18,8 @@ from langchain_community.chat_models import ChatOpenAI
 # 3) SET UP THE PROMPT FOR THE AGENT
 ########################################
 
-opening_bidding_prompt = PromptTemplate(
-    input_variables=["position", "bidding_history"],
-    template="""
+opening_bidding_prompt = StaticPrefixPrompt(
+    prefix="""
 You are a Bridge Advisor specialised in analyzing bids opening. 
 
 You assume that the opening strategy is as described in bidding strategy below.
@@ -67,8 +68,7 @@ Your task is:
 ### Position
 - North
 ### Bidding History
-- South: 1H
-- West: Pass
+- S:1H-P
 
 ## Example Output
 Analisis:
@@ -76,11 +76,15 @@ Your partner is South, who has bid 1H.
 Your partner's hand is likely to have 12-18 HCP and at least 5 hearts.
 Your partner's hand is likely to be unbalanced (5-3-3-2 or 5-4-2-2).
 
+{notation}
+""",
+    suffix="""
 Position: {position}
 Bidding History: {bidding_history}
 Analisis:
-
-""".strip()
+""",
+    input_variables=["position", "bidding_history"],
+    partial_variables={"notation": notation.AUCTION_LEGEND}
 )
 
 ########################################
@@ -94,6 +98,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -124,9 +130,9 @@ def get_opening_analisis(
     print("DEBUG: Prompt input:", prompt_input)
 
     response = llm.invoke(
-        opening_bidding_prompt.format(
+        opening_bidding_prompt.format_messages(
             position=prompt_input["position"],
-            bidding_history=prompt_input["bidding_history"]
+            bidding_history=notation.format_auction(prompt_input["bidding_history"])
             )
         )
     # Debug: Log the response
@@ -0,0 +1,428 @@
+"""Self-play arena with duplicate scoring
+
+Bidding and play policies cannot be measured at scale through the server and
+the GUI. This module plays sessions of boards in the process instead, on the
+rules engine (see rules_engine.RulesEngine), with a policy per partnership:
+
+- TablePolicy bids with the decision table of the bidding system (passing
+  where it has no rule) and plays with the local play rules, the lowest
+  card of the first class of equivalent cards for the open plays
+- SearchPolicy plays the open plays with the information set tree search
+  (see mcts_play) and solves the endgames exactly
+- AgentPolicy bids with the advice pipeline of the autopilot (the agents,
+  with the bidding system first) and plays the open plays with the LLM of
+  LLMIntegration; the LLM and the models of the agents can be replaced by
+  stand-ins so that the arena runs offline
+
+Every board is played at two tables with the partnerships swapped, and the
+first policy is scored against the second in IMPs and matchpoints (see
+scoring). The boards are played in parallel in worker processes, and the
+result of each board is written as a line of JSON as soon as it is known.
+
+Policies see only what the player sees: the own hand, the dummy after the
+opening lead, the auction and the cards played (see SeatView). The policies
+are made in the workers, so the arena is given factories (classes or other
+picklable callables) instead of policy objects.
+
+Functions:
+make_boards     -- duplicate boards with random deals
+play_table      -- play a board at one table
+summarize       -- IMPs and matchpoints of a session
+
+Classes:
+SeatView     -- what a player sees when making a decision
+TablePolicy  -- bidding system table and local play rules
+SearchPolicy -- tree search for the open card plays
+AgentPolicy  -- advice pipeline and LLM of the autopilot
+Arena        -- duplicate self-play of two policies
+"""
+
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+from bridgegui import rules_engine
+from bridgegui.auction import decode_call, encode_call
+from bridgegui.bidding_system import DECISION_TABLE
+from bridgegui.endgame import EndgameSolver
+from bridgegui.mcts_play import MCTSPolicy
+from bridgegui.notation import (
+    POSITION_TAGS, format_auction, format_contract, format_hands)
+from bridgegui.play_rules import PlayRules, played_cards, representatives
+from bridgegui.rules_engine import BIDDING, PLAYING, RulesEngine
+from bridgegui.scoring import imps, matchpoints
+
+DEFAULT_CHUNK_SIZE = 4
+
+Board = collections.namedtuple(
+    "Board", ("number", "dealer", "vulnerability", "hands"))
+
+SeatView = collections.namedtuple("SeatView", (
+    "position", "hand", "allowed", "auction", "history", "vulnerability",
+    "contract", "declarer", "trick", "tricks", "hands"))
+SeatView.__doc__ = """What a player sees when making a decision
+
+position      -- the position of the hand the decision is made for (the
+                 dummy when the declarer plays from it)
+hand          -- the cards of the hand
+allowed       -- the legal calls (short text) or the legal cards
+auction       -- the auction state (read only)
+history       -- the bidding history as "position: call" strings
+vulnerability -- the vulnerability object of the bridge protocol
+contract      -- the contract object, None in the auction
+declarer      -- the position of the declarer, None in the auction
+trick         -- the plays of the current trick
+tricks        -- the trick objects of the deal, the current trick included
+hands         -- dictionary from position to the cards of the visible hands
+"""
+
+Summary = collections.namedtuple(
+    "Summary", ("boards", "imps", "matchpoints"))
+
+
+def make_boards(count, seed=None, first=1):
+    """Return duplicate boards with random deals
+
+    The dealer and the vulnerability follow the board numbers.
+
+    Keyword Arguments:
+    count -- the number of boards
+    seed  -- the seed of the deals (optional)
+    first -- the number of the first board
+    """
+    generator = random.Random(seed)
+    return [
+        Board(number, rules_engine.board_dealer(number),
+              rules_engine.board_vulnerability(number),
+              rules_engine.deal(generator))
+        for number in range(first, first + count)]
+
+
+def _trump(contract):
+    return contract["bid"]["strain"] if contract else None
+
+
+class TablePolicy:
+    """Bidding system table and local play rules
+
+    The policy passes where the bidding system has no rule, so it bids the
+    auctions of the system only.
+    """
+
+    def __init__(self, decision_table=DECISION_TABLE, endgame=None):
+        """Initialize the policy
+
+        Keyword Arguments:
+        decision_table -- the decision table of the bidding system
+        endgame        -- the endgame solver of the play rules (optional)
+        """
+        self._decision_table = decision_table
+        self._play_rules = PlayRules(endgame=endgame)
+
+    def call(self, view):
+        """Return the call for the position in turn"""
+        rule = self._decision_table.match(view.auction, view.hand)
+        return rule.call if rule is not None else "Pass"
+
+    def play(self, view):
+        """Return the card played from the position in turn"""
+        decision = self._play_rules.decide(
+            view.position, view.allowed, view.trick, view.hands,
+            _trump(view.contract), None, view.tricks)
+        if decision is not None:
+            return decision.card
+        return self.open_play(view)
+
+    def open_play(self, view):
+        """Return the card of a play the play rules leave open"""
+        return representatives(
+            view.position, view.allowed, view.hands,
+            played_cards(view.tricks), view.trick)[0]
+
+
+class SearchPolicy(TablePolicy):
+    """Tree search for the open card plays"""
+
+    def __init__(
+            self, iterations=200, time_budget=1.0,
+            decision_table=DECISION_TABLE, seed=None):
+        """Initialize the policy
+
+        Keyword Arguments:
+        iterations     -- the iterations of the search per open play
+        time_budget    -- the time budget of the search per open play
+        decision_table -- the decision table of the bidding system
+        seed           -- the seed of the search (optional)
+        """
+        super().__init__(decision_table, EndgameSolver())
+        self._search = MCTSPolicy(
+            iterations=iterations, time_budget=time_budget, seed=seed)
+
+    def open_play(self, view):
+        decision = self._search.decide(
+            view.position, view.allowed, view.trick, view.hands,
+            _trump(view.contract), view.tricks, view.declarer)
+        if decision is None:
+            return super().open_play(view)
+        return decision.card
+
+
+class AgentPolicy(TablePolicy):
+    """Advice pipeline and LLM of the autopilot
+
+    The agents of the advice pipeline use the chat models of their modules,
+    and the card play uses LLMIntegration. To run offline, give an
+    LLMIntegration whose client is a stand-in, and replace the chat models
+    of the agents in the factory of the policy.
+    """
+
+    def __init__(self, llm=None, bid_evaluator=None,
+                 decision_table=DECISION_TABLE):
+        """Initialize the policy
+
+        Keyword Arguments:
+        llm            -- the LLM integration of the card play (by default
+                          made with the API key of the environment)
+        bid_evaluator  -- the simulation bid evaluator of the subsequent bids
+                          (optional, see simulation.BidEvaluator)
+        decision_table -- the decision table of the bidding system
+        """
+        super().__init__(decision_table)
+        if llm is None:
+            from bridgegui.llm_integration import LLMIntegration
+            llm = LLMIntegration(os.getenv("OPENAI_API_KEY"))
+        self._llm = llm
+        self._bid_evaluator = bid_evaluator
+
+    def call(self, view):
+        from bridgegui.advice_pipeline import run_bidding_advice
+        advice = run_bidding_advice(
+            view.position, view.hand, view.allowed, view.history,
+            auction=view.auction, decision_table=self._decision_table,
+            bid_evaluator=self._bid_evaluator,
+            vulnerability=view.vulnerability)
+        return advice["bid_suggestion"]
+
+    def open_play(self, view):
+        choices = representatives(
+            view.position, view.allowed, view.hands,
+            played_cards(view.tricks), view.trick)
+        contractors = ", ".join(
+            position for position in POSITION_TAGS
+            if view.declarer in (position, POSITION_TAGS[
+                (POSITION_TAGS.index(position) + 2) % 4]))
+        try:
+            analysis = self._llm.get_card_play_suggestion(
+                "Own hand", view.position, view.hand, view.hands, view.trick,
+                choices, view.contract, contractors, view.history,
+                view.tricks)
+            card = json.loads(self._llm.get_card_play_prompt(
+                analysis, choices).strip("```json").strip("```").strip())
+        except (ValueError, TypeError):
+            card = None
+        return card if card in view.allowed else choices[0]
+
+
+def _partner(index):
+    return (index + 2) % 4
+
+
+def play_table(board, north_south, east_west):
+    """Play a board at one table
+
+    Returns dictionary with the auction, the contract, the declarer, the
+    tricks of the declarer, the score of north-south and the number of
+    illegal decisions (replaced by pass or the lowest legal card).
+
+    Keyword Arguments:
+    board       -- the board (see make_boards)
+    north_south -- the policy of north and south
+    east_west   -- the policy of east and west
+    """
+    engine = RulesEngine(board.hands, board.dealer, board.vulnerability)
+    policies = (north_south, east_west)
+    history = []
+    illegal = 0
+    while engine.phase == BIDDING:
+        position = engine.turn
+        index = POSITION_TAGS.index(position)
+        view = SeatView(
+            position, engine.hand(position), engine.legal_calls(),
+            engine.auction, list(history), board.vulnerability, None, None,
+            [], [], {position: engine.hand(position)})
+        call = policies[index % 2].call(view)
+        if not engine.is_legal_call(call):
+            call = "Pass"
+            illegal += 1
+        engine.call(call)
+        history.append("%s: %s" % (position, decode_call(encode_call(call))))
+    tricks = []
+    while engine.phase == PLAYING:
+        position = engine.turn
+        index = POSITION_TAGS.index(position)
+        declarer = POSITION_TAGS.index(engine.declarer)
+        player = declarer if index == _partner(declarer) else index
+        hands = {POSITION_TAGS[player]: engine.hand(POSITION_TAGS[player])}
+        if engine.dummy_exposed:
+            hands[engine.dummy] = engine.hand(engine.dummy)
+        hands[position] = engine.hand(position)
+        if not engine.trick:
+            tricks.append({"cards": []})
+        trick = tricks[-1]["cards"]
+        view = SeatView(
+            position, hands[position], engine.legal_cards(), engine.auction,
+            history, board.vulnerability, engine.contract, engine.declarer,
+            list(trick), [dict(trick_) for trick_ in tricks], hands)
+        card = policies[index % 2].play(view)
+        if not engine.is_legal_play(card):
+            card = view.allowed[0]
+            illegal += 1
+        engine.play(card)
+        trick.append({"position": position, "card": card})
+        if not engine.trick:
+            tricks[-1]["winner"] = engine.last_winner
+    score = engine.score()
+    if engine.declarer in ("east", "west"):
+        score = -score
+    return {
+        "auction": format_auction(history),
+        "contract": format_contract(engine.contract),
+        "declarer": engine.declarer, "tricks": engine.declarer_tricks(),
+        "score": score, "illegal": illegal}
+
+
+def _board_record(board, names, first, second):
+    # Team A (the first policy) sits north-south at the first table and
+    # east-west at the second
+    scores = (first["score"], second["score"])
+    return {
+        "board": board.number, "dealer": board.dealer,
+        "vulnerability": board.vulnerability,
+        "deal": format_hands({
+            position: rules_engine.mask_cards(hand)
+            for position, hand in zip(POSITION_TAGS, board.hands)}),
+        "tables": [
+            dict(first, north_south=names[0], east_west=names[1]),
+            dict(second, north_south=names[1], east_west=names[0])],
+        "imps": imps(scores[0] - scores[1]),
+        "matchpoints": matchpoints(scores)[0],
+    }
+
+
+def _play_boards(boards, names, factories):
+    # Worker: the records of the boards played by policies made here
+    first, second = (factory() for factory in factories)
+    return [
+        _board_record(
+            board, names, play_table(board, first, second),
+            play_table(board, second, first))
+        for board in boards]
+
+
+def summarize(records):
+    """Return the IMPs and matchpoints of a session
+
+    Returns Summary with the number of boards, the IMPs of the first policy
+    and its matchpoints as a share of the top.
+
+    Keyword Arguments:
+    records -- the records of the boards (see Arena.run)
+    """
+    records = list(records)
+    if not records:
+        return Summary(0, 0, 0.0)
+    return Summary(
+        len(records), sum(record["imps"] for record in records),
+        sum(record["matchpoints"] for record in records) / len(records))
+
+
+class Arena:
+    """Duplicate self-play of two policies"""
+
+    def __init__(self, policies, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Initialize the arena
+
+        Keyword Arguments:
+        policies   -- the two policies as (name, factory) pairs or an ordered
+                      dictionary from name to factory, the first is scored
+                      against the second (a policy named like the first is
+                      renamed with a "-2" suffix)
+        workers    -- the number of worker processes (by default the number
+                      of CPUs, 1 to play in the calling process)
+        chunk_size -- the number of boards a worker plays at once
+        """
+        if isinstance(policies, dict):
+            policies = policies.items()
+        policies = list(policies)
+        if len(policies) != 2:
+            raise ValueError("Two policies are needed, got %d" % len(policies))
+        names = [name for name, _ in policies]
+        if names[0] == names[1]:
+            names[1] += "-2"
+        self._names = tuple(names)
+        self._factories = tuple(factory for _, factory in policies)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def run(self, boards, output=None):
+        """Play the boards and yield their records as they complete
+
+        With several workers the records come in the order the chunks of
+        boards complete.
+
+        Keyword Arguments:
+        boards -- the boards (see make_boards)
+        output -- the text file the records are written to as JSON lines
+                  (optional)
+        """
+        for record in self._records(list(boards)):
+            if output is not None:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            yield record
+
+    def _records(self, boards):
+        if self.workers == 1:
+            for board in boards:
+                yield from _play_boards(
+                    [board], self._names, self._factories)
+            return
+        chunks = [
+            boards[n:n + self.chunk_size]
+            for n in range(0, len(boards), self.chunk_size)]
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(
+                    _play_boards, chunk, self._names, self._factories)
+                for chunk in chunks]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
+
+
+POLICIES = {
+    "table": TablePolicy, "search": SearchPolicy, "agents": AgentPolicy}
+
+
+def main(output, boards="100", first="search", second="table", workers="0"):
+    """Play a session between two policies and print the summary"""
+    arena = Arena(
+        ((first, POLICIES[first]), (second, POLICIES[second])),
+        int(workers) or None)
+    start = time.time()
+    with open(output, "a") as file:
+        summary = summarize(arena.run(make_boards(int(boards)), file))
+    elapsed = time.time() - start
+    print("%s against %s: %d boards, %+d IMPs (%+.2f per board), "
+          "%.0f%% matchpoints, %.0f boards per hour" % (
+              first, second, summary.boards, summary.imps,
+              summary.imps / max(summary.boards, 1),
+              100 * summary.matchpoints, 3600 * summary.boards / elapsed))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:6])
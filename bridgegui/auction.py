@@ -0,0 +1,387 @@
+"""Incremental auction state
+
+This module contains the state machine of the auction. The state is updated
+once per call (in the frontend once per call event), and the bidding stage of
+any position, the last contract bid, the doubling state, the position in turn
+and the legal calls are then available in constant time, without scanning
+the bidding history.
+
+The calls are stored as a byte array of call codes: 0 is pass, 1 double, 2
+redouble and 3 + 5 * (level - 1) + strain the bids, with the strains ranked
+clubs, diamonds, hearts, spades, notrump. Sets of calls, in particular the
+legal calls, are 38-bit masks with bit code set for each call, so legality is
+checked with bit operations. The packed auction (opener and call codes) is
+hashable and can be used as cache key or written to logs.
+
+Functions:
+partner_of  -- return the partner of a position
+encode_call -- return the code of a call
+decode_call -- return the short text representation of a call code
+calls_mask  -- return the mask of a collection of calls
+mask_calls  -- return the calls of a mask
+
+Classes:
+AuctionState -- state of the auction updated call by call
+"""
+
+from bridgegui.notation import (
+    DOUBLE_FORMAT, PASS_FORMAT, POSITION_TAGS, REDOUBLE_FORMAT, format_call,
+    normalize_bidding_history)
+
+OPENING_STAGE = "Opening"
+OVERCALL_STAGE = "Overcall"
+RESPONSE_STAGE = "Response"
+SUBSEQUENT_STAGE = "Subsequent"
+COMPETITIVE_STAGE = "Competitive"
+
+UNDOUBLED = "undoubled"
+DOUBLED = "doubled"
+REDOUBLED = "redoubled"
+
+# Strains in the order of rank, as in the short text representation of calls
+STRAIN_ORDER = ("C", "D", "H", "S", "NT")
+
+PASS_CODE = 0
+DOUBLE_CODE = 1
+REDOUBLE_CODE = 2
+FIRST_BID_CODE = 3
+CALL_CODES = FIRST_BID_CODE + 7 * len(STRAIN_ORDER)
+
+CALL_FORMATS = (PASS_FORMAT, DOUBLE_FORMAT, REDOUBLE_FORMAT) + tuple(
+    "%d%s" % (level, strain)
+    for level in range(1, 8) for strain in STRAIN_ORDER)
+_CALL_CODES = {call: code for code, call in enumerate(CALL_FORMATS)}
+
+# Bids higher than the bid with code index (index PASS_CODE for no bid yet)
+_ALL_BIDS_MASK = ((1 << CALL_CODES) - 1) & ~((1 << FIRST_BID_CODE) - 1)
+_HIGHER_BIDS_MASKS = (_ALL_BIDS_MASK, 0, 0) + tuple(
+    _ALL_BIDS_MASK & ~((1 << (code + 1)) - 1)
+    for code in range(FIRST_BID_CODE, CALL_CODES))
+
+_POSITION_INDEXES = {
+    position: index for index, position in enumerate(POSITION_TAGS)}
+
+
+def _index(position):
+    try:
+        return _POSITION_INDEXES[position.lower()]
+    except (AttributeError, KeyError):
+        raise ValueError("Invalid position: %r" % position)
+
+
+def partner_of(position):
+    """Return the partner of position"""
+    return POSITION_TAGS[(_index(position) + 2) % 4]
+
+
+def encode_call(call):
+    """Return the code of call
+
+    Raises ValueError if call is not a call.
+
+    Keyword Arguments:
+    call -- the call in the serialized or text representation, or its code
+    """
+    if isinstance(call, int):
+        if not 0 <= call < CALL_CODES:
+            raise ValueError("Invalid call code: %r" % call)
+        return call
+    try:
+        return _CALL_CODES[format_call(call)]
+    except (KeyError, ValueError, TypeError):
+        raise ValueError("Invalid call: %r" % call)
+
+
+def decode_call(code):
+    """Return the short text representation of call code"""
+    return CALL_FORMATS[code]
+
+
+def calls_mask(calls):
+    """Return the mask of calls
+
+    Keyword Arguments:
+    calls -- iterable of calls (see encode_call)
+    """
+    mask = 0
+    for call in calls:
+        mask |= 1 << encode_call(call)
+    return mask
+
+
+def mask_calls(mask):
+    """Return the short text representations of the calls in mask"""
+    return [call for code, call in enumerate(CALL_FORMATS) if mask >> code & 1]
+
+
+class AuctionState:
+    """State of the auction updated call by call
+
+    Calls are accepted in the serialized representation (see bridge protocol
+    specification), as text or as call codes. If the opener is not given, the
+    position of the first call is taken as the opener.
+    """
+
+    def __init__(self, opener=None):
+        """Initialize auction state
+
+        Keyword Arguments:
+        opener -- the position that makes the first call (optional)
+        """
+        self.reset(opener)
+
+    @classmethod
+    def from_history(cls, bidding_history, opener=None):
+        """Create auction state from bidding history
+
+        Keyword Arguments:
+        bidding_history -- the bidding history (see
+                           notation.normalize_bidding_history)
+        opener          -- the position that made the first call (optional)
+        """
+        auction = cls(opener)
+        for position, call in normalize_bidding_history(bidding_history):
+            auction.call(position, call)
+        return auction
+
+    @classmethod
+    def unpack(cls, data):
+        """Create auction state from packed auction (see pack)"""
+        if not data:
+            return cls()
+        auction = cls(POSITION_TAGS[data[0]])
+        for code in data[1:]:
+            auction.call(auction.turn, code)
+        return auction
+
+    def reset(self, opener=None):
+        """Start a new auction
+
+        Keyword Arguments:
+        opener -- the position that makes the first call (optional)
+        """
+        self._opener = None if opener is None else _index(opener)
+        self._codes = bytearray()
+        self._bids = [0, 0, 0, 0]
+        self._last_bid_code = PASS_CODE
+        self._last_bidder = None
+        self._doubling = UNDOUBLED
+        self._doubler = None
+        self._passes = 0
+
+    def __len__(self):
+        return len(self._codes)
+
+    @property
+    def codes(self):
+        """Return the call codes as bytes"""
+        return bytes(self._codes)
+
+    @property
+    def calls(self):
+        """Return the calls made as tuple of (position, call) pairs"""
+        return tuple(
+            (POSITION_TAGS[(self._opener + n) % 4], CALL_FORMATS[code])
+            for n, code in enumerate(self._codes))
+
+    def pack(self):
+        """Return the packed auction
+
+        The packed auction is bytes with the index of the opener followed by
+        the call codes (empty if the opener is unknown). It is hashable, so
+        that it can be used as cache key, and auction A is a prefix of
+        auction B if and only if the packed A is a prefix of the packed B.
+        """
+        if self._opener is None:
+            return b""
+        return bytes((self._opener,)) + self._codes
+
+    def startswith(self, prefix):
+        """Determine if the auction starts with prefix
+
+        Keyword Arguments:
+        prefix -- another auction state or a packed auction
+        """
+        if isinstance(prefix, AuctionState):
+            prefix = prefix.pack()
+        return self.pack().startswith(prefix)
+
+    @property
+    def opener(self):
+        """Return the position that makes the first call, or None if unknown"""
+        return None if self._opener is None else POSITION_TAGS[self._opener]
+
+    @property
+    def turn(self):
+        """Return the position in turn
+
+        Returns None if the auction is completed or the opener is unknown.
+        """
+        if self._opener is None or self.completed:
+            return None
+        return POSITION_TAGS[(self._opener + len(self._codes)) % 4]
+
+    @property
+    def last_bid(self):
+        """Return the last contract bid ("1H"), or None if there is none"""
+        if self._last_bidder is None:
+            return None
+        return CALL_FORMATS[self._last_bid_code]
+
+    @property
+    def last_bidder(self):
+        """Return the position that made the last contract bid"""
+        if self._last_bidder is None:
+            return None
+        return POSITION_TAGS[self._last_bidder]
+
+    @property
+    def doubling(self):
+        """Return the doubling state of the last contract bid
+
+        The doubling state is one of "undoubled", "doubled" and "redoubled" as
+        in the contract object of the bridge protocol.
+        """
+        return self._doubling
+
+    @property
+    def doubler(self):
+        """Return the position that made the last double or redouble
+
+        Returns None if the last contract bid is undoubled.
+        """
+        return None if self._doubler is None else POSITION_TAGS[self._doubler]
+
+    @property
+    def completed(self):
+        """Return True if the auction is completed
+
+        The auction is completed after four passes, or after three passes
+        following a contract bid.
+        """
+        if self._last_bidder is None:
+            return self._passes == 4
+        return self._passes == 3
+
+    def stage(self, position=None):
+        """Return the bidding stage of position
+
+        The stage is determined from the number of contract bids made by each
+        position:
+
+        Opening     -- nobody has bid
+        Overcall    -- only the opponents have bid
+        Response    -- only the partner has bid, exactly once, and the player
+                       has not bid
+        Subsequent  -- the own side has bid, the opponents have not
+        Competitive -- both sides have bid (except for Response)
+
+        Keyword Arguments:
+        position -- the position of the player (by default the position in
+                    turn)
+        """
+        if position is None:
+            position = self.turn
+            if position is None:
+                raise ValueError("Position in turn is not known")
+        index = _index(position)
+        own = self._bids[index]
+        partner = self._bids[(index + 2) % 4]
+        opponents = self._bids[(index + 1) % 4] + self._bids[(index + 3) % 4]
+        if own == 0 and partner == 0:
+            return OVERCALL_STAGE if opponents else OPENING_STAGE
+        if own == 0 and partner == 1:
+            return RESPONSE_STAGE
+        return COMPETITIVE_STAGE if opponents else SUBSEQUENT_STAGE
+
+    def legal_mask(self, position=None):
+        """Return the mask of the legal calls
+
+        Keyword Arguments:
+        position -- the position making the call (by default the position in
+                    turn)
+        """
+        if self.completed:
+            return 0
+        mask = 1 << PASS_CODE | _HIGHER_BIDS_MASKS[self._last_bid_code]
+        if position is not None:
+            index = _index(position)
+        elif self._opener is not None:
+            index = (self._opener + len(self._codes)) % 4
+        else:
+            return mask
+        if self._last_bidder is not None:
+            same_side = (index - self._last_bidder) % 2 == 0
+            if self._doubling == UNDOUBLED and not same_side:
+                mask |= 1 << DOUBLE_CODE
+            elif self._doubling == DOUBLED and same_side:
+                mask |= 1 << REDOUBLE_CODE
+        return mask
+
+    def legal_calls(self, position=None):
+        """Return the short text representations of the legal calls"""
+        return mask_calls(self.legal_mask(position))
+
+    def is_legal(self, call, position=None):
+        """Determine if call is legal
+
+        Keyword Arguments:
+        call     -- the call
+        position -- the position making the call (by default the position in
+                    turn)
+        """
+        try:
+            code = encode_call(call)
+        except ValueError:
+            return False
+        return bool(self.legal_mask(position) >> code & 1)
+
+    def call(self, position, call):
+        """Record a call
+
+        Raises ValueError if the position is not in turn or the call is not
+        legal.
+
+        Keyword Arguments:
+        position -- the position making the call
+        call     -- the call
+        """
+        index = _index(position)
+        if self._opener is None and not self._codes:
+            self._opener = index
+        if self.turn != POSITION_TAGS[index]:
+            raise ValueError("Position not in turn: %r" % position)
+        code = encode_call(call)
+        if not self.legal_mask(position) >> code & 1:
+            raise ValueError("Illegal call: %r" % decode_call(code))
+        if code == PASS_CODE:
+            self._passes += 1
+        else:
+            self._passes = 0
+            if code == DOUBLE_CODE:
+                self._doubling = DOUBLED
+                self._doubler = index
+            elif code == REDOUBLE_CODE:
+                self._doubling = REDOUBLED
+                self._doubler = index
+            else:
+                self._last_bid_code = code
+                self._last_bidder = index
+                self._doubling = UNDOUBLED
+                self._doubler = None
+                self._bids[index] += 1
+        self._codes.append(code)
+
+    def undo(self):
+        """Take back the last call
+
+        The calls before it are replayed, which is cheap for the length of
+        any auction. Raises ValueError if no call has been made.
+        """
+        if not self._codes:
+            raise ValueError("No call to take back")
+        opener, codes = self._opener, self._codes[:-1]
+        self.reset()
+        self._opener = opener
+        for n, code in enumerate(codes):
+            self.call(POSITION_TAGS[(opener + n) % 4], code)
@@ -1,8 +1,10 @@
 import os
 from dotenv import load_dotenv
 import logging
-from langchain.prompts import PromptTemplate
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
+from bridgegui import notation
 
 
 ########################################
@@ -17,10 +19,9 @@ from langchain_community.chat_models import ChatOpenAI
 # 3) SET UP THE PROMPT FOR THE AGENT
 ########################################
 
-bid_analisis_prompt = PromptTemplate(
-    input_variables=["position","perspective","previouse_analisis", "last_n_bids"],
-    template="""
-You are a Bridge Advisor specialised in analyzing bridge bidding situation of {perspective} team. 
+bid_analisis_prompt = StaticPrefixPrompt(
+    prefix="""
+You are a Bridge Advisor specialised in analyzing bridge bidding situation of the team given as perspective. 
 
 You assume that the team follows strategy as described in bidding strategy below.
 
@@ -142,7 +143,7 @@ Counting High Card Points (HCP):
         Position: north
         Perspective: Your team
         Previous analisis: Your partner opened with Pass. So it is likely that your partner has 0-12 HCP and no 5-card suit. You have 20 HCP. So in total you have between 20-32 HCP and at least 5 spades. In total you have at least 5 hearts. In total you have at least 3 diamonds. In total you have at least 3 clubs. Your last bid was 2S to indicate to your partner strong hand with 5 spades and 20 HCP.,
-        Last 4 bids: ["north 2S", "east: 2NT", "south: 3S", "west: Pass"]
+        Last 4 bids: N:2S-2NT-3S-P
     Your answer:
         Your partner is South, and his first bid was pass but he responded to your opening 2S with 3S which indicates 3-4 cards in spades and 7 to 11 HCP
         Your partner has betwen 7-11 HCP. You have 20 HCP. So in total you have between 27-31 HCP.
@@ -155,7 +156,7 @@ Counting High Card Points (HCP):
         Position: north
         Perspective: Opponents
         Previous analisis: Your opponents are West and East. West has passed. So it is likely that West has 0-12 HCP and no 5-card suit,
-        Last 4 bids: ["north 2S", "east: 2NT", "south: 3S", "west: Pass"]
+        Last 4 bids: N:2S-2NT-3S-P
     Your answer:
         Your opponents East has bid 2NT. So it is likely that East has 12-18 HCP and no 5-card suit. West has passed again which indicates that West has below 6 HCP since was not able to respond to East's 2NT bid.
         Assuming that east have 12-18 HCP and west has 0-6 HCP. So in total you have between 12-24 HCP. So probably they will stop bidding at 3NT.
@@ -163,13 +164,17 @@ Counting High Card Points (HCP):
 
 ## End of Examples
 
+{notation}
+""",
+    suffix="""
 Position: {position}
 Perspective: {perspective}
 Previouse analisis: {previouse_analisis}
 Last 4 bids: {last_n_bids}
 Analisis:
-
-""".strip()
+""",
+    input_variables=["position","perspective","previouse_analisis", "last_n_bids"],
+    partial_variables={"notation": notation.AUCTION_LEGEND}
 )
 
 ########################################
@@ -183,6 +188,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -217,11 +224,11 @@ def get_bid_analisis(
     print("DEBUG: Prompt input:", prompt_input)
 
     response = llm.invoke(
-        bid_analisis_prompt.format(
+        bid_analisis_prompt.format_messages(
             position=prompt_input["position"],
             perspective=prompt_input["perspective"],
             previouse_analisis=prompt_input["previouse_analisis"],
-            last_n_bids=prompt_input["last_n_bids"]
+            last_n_bids=notation.format_auction(prompt_input["last_n_bids"])
             )
         )
     # Debug: Log the response
@@ -5,6 +5,7 @@ from langchain.agents import AgentType
 from langchain_community.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
 import json
 import logging
 from typing import Dict
@@ -96,6 +97,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -0,0 +1,332 @@
+"""Bidding system compiled into a decision table
+
+The bidding system of the prompts (see opening_bid_llm and response_bid_llm)
+is written here declaratively, one rule per line:
+
+    auction | call | hand constraints
+
+The auction is the sequence of calls before the decision with the leading
+passes left out ("-" for none), so that "1C-P" is the response to the partner
+opening 1C after a pass of the right hand opponent in any seat. The hand
+constraints are ranges of HCP and suit lengths ("hcp 12-18", "S 5+", "H 0-2",
+"D 4") and the words "balanced" or "unbalanced" (a balanced hand has no
+5-card suit, see utils2.is_balanced_hand). The rules of an auction are tried
+in order and the first rule the hand satisfies gives the call.
+
+The rules are compiled into a table indexed by the call codes of the auction
+(see auction.encode_call), so a decision is a dictionary lookup and a few
+range comparisons. Decisions the table does not cover are left to the LLM.
+
+Functions:
+hand_features  -- HCP and suit lengths of a hand
+compile_system -- compile a bidding system into a decision table index
+hcp_boundaries -- HCP values starting the HCP ranges of a bidding system
+
+Classes:
+DecisionTable -- decision table of a bidding system with coverage counters
+"""
+
+import collections
+import threading
+
+from bridgegui.auction import (
+    PASS_CODE, AuctionState, decode_call, encode_call)
+from bridgegui.double_dummy import hand_masks
+from bridgegui.holdings import TABLES
+
+SYSTEM = """
+# Openings
+-          | P   | hcp 0-11
+-          | 1S  | hcp 12-18 S 5+
+-          | 1H  | hcp 12-18 H 5+
+-          | 1D  | hcp 12-18 D 5+
+-          | 1C  | hcp 12-18 C 5+
+-          | 1C  | hcp 12-14 balanced
+-          | 1NT | hcp 15-18 balanced
+-          | 2S  | hcp 19+ S 5+
+-          | 2H  | hcp 19+ H 5+
+-          | 2D  | hcp 19+ D 5+
+-          | 2C  | hcp 19+ C 5+
+-          | 2C  | hcp 19-23 balanced
+-          | 3NT | hcp 24+ balanced
+
+# Responses to 1C
+1C-P       | P   | hcp 0-6
+1C-P       | 2S  | hcp 13+ S 5+
+1C-P       | 2H  | hcp 13+ H 5+
+1C-P       | 2D  | hcp 13+ D 5+
+1C-P       | 1S  | hcp 7-12 S 5+
+1C-P       | 1H  | hcp 7-12 H 4+
+1C-P       | 1S  | hcp 7-12 S 4+
+1C-P       | 1D  | hcp 7-12 D 5+
+1C-P       | 2C  | hcp 7-10 C 6+
+1C-P       | 3C  | hcp 11-12 C 6+
+1C-P       | 1NT | hcp 7-10
+1C-P       | 2NT | hcp 11-12
+1C-P       | 5C  | hcp 13+ C 7+
+1C-P       | 1H  | hcp 13+ H 4
+1C-P       | 1S  | hcp 13+ S 4
+1C-P       | 3NT | hcp 13+
+
+# Responses to 1D
+1D-P       | P   | hcp 0-6
+1D-P       | 1S  | hcp 7-12 S 5+
+1D-P       | 1H  | hcp 7-12 H 4+
+1D-P       | 1S  | hcp 7-12 S 4+
+1D-P       | 2D  | hcp 7-10 D 4+
+1D-P       | 3D  | hcp 11-12 D 4+
+1D-P       | 1NT | hcp 7-10
+1D-P       | 2NT | hcp 11-12
+1D-P       | 2S  | hcp 13+ S 5+
+1D-P       | 2H  | hcp 13+ H 5+
+1D-P       | 2C  | hcp 13+ C 5+
+1D-P       | 1H  | hcp 13+ H 4
+1D-P       | 1S  | hcp 13+ S 4
+1D-P       | 5D  | hcp 13+ D 6+
+1D-P       | 3NT | hcp 13+
+
+# Responses to 1H
+1H-P       | P   | hcp 0-6
+1H-P       | 2H  | hcp 7-10 H 3+
+1H-P       | 3H  | hcp 11-12 H 3+
+1H-P       | 4H  | hcp 13-18 H 3+
+1H-P       | 1S  | hcp 7-12 H 0-2 S 4+
+1H-P       | 1NT | hcp 7-10 H 0-2
+1H-P       | 2NT | hcp 11-12 H 0-2
+1H-P       | 2S  | hcp 13+ H 0-2 S 5+
+1H-P       | 2D  | hcp 13+ H 0-2 D 5+
+1H-P       | 2C  | hcp 13+ H 0-2 C 5+
+1H-P       | 1S  | hcp 13+ H 0-2 S 4
+1H-P       | 3NT | hcp 13+ H 0-2
+
+# Responses to 1S
+1S-P       | P   | hcp 0-6
+1S-P       | 2S  | hcp 7-10 S 3+
+1S-P       | 3S  | hcp 11-12 S 3+
+1S-P       | 4S  | hcp 13-18 S 3+
+1S-P       | 1NT | hcp 7-10 S 0-2 H 4+
+1S-P       | 2NT | hcp 11-12 S 0-2 H 4+
+1S-P       | 2H  | hcp 13+ S 0-2 H 5+
+1S-P       | 2D  | hcp 13+ S 0-2 D 5+
+1S-P       | 2C  | hcp 13+ S 0-2 C 5+
+1S-P       | 3NT | hcp 13+ S 0-2
+
+# Responses to 1NT
+1NT-P      | 2H  | S 5+
+1NT-P      | 2D  | H 5+
+1NT-P      | 3C  | D 6+
+1NT-P      | 3S  | C 6+
+1NT-P      | P   | hcp 0-7
+1NT-P      | 2NT | hcp 8-9
+1NT-P      | 3NT | hcp 10-15
+1NT-P      | 4NT | hcp 16-17
+1NT-P      | 6NT | hcp 18-20
+
+# Completing the transfers after 1NT
+1NT-P-2H-P | 2S  |
+1NT-P-2D-P | 2H  |
+1NT-P-3C-P | 3D  |
+1NT-P-3S-P | 3C  |
+"""
+
+# Order of the suit lengths in the features and constraints (SUIT_ORDER)
+SUITS = ("S", "H", "D", "C")
+_HCP = TABLES["hcp"]
+_LENGTH = TABLES["length"]
+FEATURES = ("hcp",) + SUITS
+# Maximum HCP and suit lengths of a hand
+MAX_FEATURES = (37, 13, 13, 13, 13)
+
+Rule = collections.namedtuple(
+    "Rule", ("call", "low", "high", "balanced", "description"))
+
+
+def hand_features(hand):
+    """Return tuple (hcp, spades, hearts, diamonds, clubs) of hand
+
+    The features are read from the holding tables (see holdings.TABLES),
+    like the other hand evaluations.
+
+    Keyword Arguments:
+    hand -- the cards, serialized or objects with rank and suit attributes
+    """
+    masks = hand_masks(hand)
+    return (sum(_HCP[mask] for mask in masks),) + tuple(
+        _LENGTH[mask] for mask in masks)
+
+
+def _parse_range(text):
+    if text.endswith("+"):
+        return int(text[:-1]), None
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def _compile_rule(call, constraints):
+    low = [0] * len(FEATURES)
+    high = list(MAX_FEATURES)
+    balanced = None
+    tokens = constraints.split()
+    while tokens:
+        token = tokens.pop(0)
+        if token in ("balanced", "unbalanced"):
+            balanced = token == "balanced"
+            continue
+        if token not in FEATURES or not tokens:
+            raise ValueError("Invalid constraint: %r" % constraints)
+        index = FEATURES.index(token)
+        low[index], maximum = _parse_range(tokens.pop(0))
+        if maximum is not None:
+            high[index] = maximum
+    description = "%s: %s" % (call, constraints or "any hand")
+    return Rule(call, tuple(low), tuple(high), balanced, description)
+
+
+def compile_system(text=SYSTEM):
+    """Compile bidding system into decision table index
+
+    Returns dictionary from the call codes of the auction (leading passes
+    left out, as bytes) to the tuple of the rules of the auction in order.
+    Raises ValueError if a line is not a valid rule.
+
+    Keyword Arguments:
+    text -- the bidding system (see SYSTEM)
+    """
+    index = collections.defaultdict(list)
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            auction, call, constraints = (
+                field.strip() for field in line.split("|"))
+            codes = bytes(
+                encode_call(call_) for call_ in auction.split("-")
+                if auction != "-")
+            call = decode_call(encode_call(call))
+        except ValueError:
+            raise ValueError("Invalid rule: %r" % line)
+        index[codes].append(_compile_rule(call, constraints))
+    return {codes: tuple(rules) for codes, rules in index.items()}
+
+
+def hcp_boundaries(system=SYSTEM):
+    """Return sorted tuple of the HCP values starting the HCP ranges
+
+    The values are the lower bounds of the HCP ranges of the rules and the
+    values following their upper bounds, so the hands of an interval
+    between two values satisfy the HCP constraints of the same rules.
+
+    Keyword Arguments:
+    system -- the bidding system (see SYSTEM)
+    """
+    boundaries = set()
+    for rules in compile_system(system).values():
+        for rule in rules:
+            boundaries.add(rule.low[0])
+            if rule.high[0] < MAX_FEATURES[0]:
+                boundaries.add(rule.high[0] + 1)
+    boundaries.discard(0)
+    return tuple(sorted(boundaries))
+
+
+class DecisionTable:
+    """Decision table of a bidding system
+
+    The table counts its lookups and the decisions it served, so that the
+    share of the decisions served without the LLM can be reported.
+    """
+
+    def __init__(self, system=SYSTEM):
+        """Initialize decision table
+
+        Keyword Arguments:
+        system -- the bidding system (see SYSTEM)
+        """
+        self._index = compile_system(system)
+        self._lock = threading.Lock()
+        self._lookups = collections.Counter()
+        self._hits = collections.Counter()
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._index.values())
+
+    def match(self, auction, hand):
+        """Return the rule matching the auction and the hand
+
+        Returns None if no rule matches, the call of the matching rule is not
+        legal or the hand is not complete. Unlike lookup, does not count the
+        decision.
+
+        Keyword Arguments:
+        auction -- the auction state (see auction.AuctionState)
+        hand    -- the hand of the player in turn
+        """
+        if len(hand) != 13:
+            return None
+        codes = auction.codes.lstrip(bytes((PASS_CODE,)))
+        rules = self._index.get(codes)
+        if not rules:
+            return None
+        features = hand_features(hand)
+        balanced = max(features[1:]) < 5
+        for rule in rules:
+            if rule.balanced is not None and rule.balanced != balanced:
+                continue
+            if all(
+                    low <= value <= high for low, value, high in zip(
+                        rule.low, features, rule.high)):
+                return rule if auction.is_legal(rule.call) else None
+        return None
+
+    def lookup(self, auction, hand, stage=None):
+        """Return the call of the system for the decision
+
+        Returns the matching rule (see Rule) or None if the decision is left
+        to the LLM.
+
+        Keyword Arguments:
+        auction -- the auction state, or the bidding history
+        hand    -- the hand of the player in turn
+        stage   -- the bidding stage the decision is counted under (optional)
+        """
+        if not isinstance(auction, AuctionState):
+            auction = AuctionState.from_history(auction)
+        rule = self.match(auction, hand)
+        with self._lock:
+            self._lookups[stage] += 1
+            if rule is not None:
+                self._hits[stage] += 1
+        return rule
+
+    def reset_coverage(self):
+        """Reset the coverage counters"""
+        with self._lock:
+            self._lookups.clear()
+            self._hits.clear()
+
+    def coverage(self):
+        """Return dictionary from stage to (decisions served, decisions)"""
+        with self._lock:
+            return {
+                stage: (self._hits[stage], lookups)
+                for stage, lookups in self._lookups.items()}
+
+    def coverage_report(self):
+        """Return text report of the share of decisions served by the table"""
+        coverage = self.coverage()
+        lines = ["%-12s %8s %8s %8s" % ("stage", "served", "total", "share")]
+        total_hits = total = 0
+        for stage, (hits, lookups) in sorted(
+                coverage.items(), key=lambda item: str(item[0])):
+            lines.append("%-12s %8d %8d %7.0f%%" % (
+                stage or "-", hits, lookups, 100.0 * hits / lookups))
+            total_hits += hits
+            total += lookups
+        lines.append("%-12s %8d %8d %7.0f%%" % (
+            "all", total_hits, total,
+            100.0 * total_hits / total if total else 0.0))
+        return "\n".join(lines)
+
+
+DECISION_TABLE = DecisionTable()
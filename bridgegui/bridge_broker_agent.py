@@ -4,6 +4,7 @@ from langchain.agents import Tool, initialize_agent
 from langchain.agents import AgentType
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
 import json
 import logging
 from typing import List
@@ -11,6 +12,13 @@ from bridgegui.utils2 import parse_input_data
 from bridgegui.bid_opening_agent import get_opening_advice
 from bridgegui.bid_response_agent import get_opening_response_advice
 from bridgegui.subsequent_bid_agent import get_subsequent_bid_advice
+from bridgegui.advice_pipeline import (
+    recognize_bidding_stage, run_bidding_advice, run_play_advice)
+from bridgegui.analysis_store import AnalysisStore
+from bridgegui.decision_cache import DecisionCache
+from bridgegui.simulation import BidEvaluator
+from bridgegui.auction import AuctionState
+from bridgegui.notation import parse_call
 from langchain.tools import StructuredTool
 from bridgegui.schemas import (
     OpeningBiddingToolInput,
@@ -44,29 +52,12 @@ def recognize_bidding_stage_function(position: str, bidding_history: List[Biddin
         "position": position,
         "bidding_history": bidding_history
     })
-    
-    # Determine partner's position
-    if position.lower() == "north":
-        partners_position = "south"
-    elif position.lower() == "south":
-        partners_position = "north"
-    elif position.lower() == "east":
-        partners_position = "west"
-    elif position.lower() == "west":
-        partners_position = "east"
-    else:
-        raise ValueError("Invalid position. Must be one of: north, south, east, west.")
-
-    # Count occurrences of position in bidding history
-    position_count = sum(1 for bid in bidding_history if bid.lower().startswith(position.lower()))
-    partners_count = sum(1 for bid in bidding_history if bid.lower().startswith(partners_position.lower()))
 
-    if position_count == 0 and partners_count == 0:
-        return "Opening"
-    elif position_count == 0 and partners_count == 1:
-        return "Response"
-    else:
-        return "Subsequent"
+    bidding_history = [
+        item.model_dump() if hasattr(item, "model_dump") else item
+        for item in bidding_history
+    ]
+    return recognize_bidding_stage(position, bidding_history)
     
 def opening_bidding_stage_function(position: str, hand: List[Card], allowed_bids: List[str], bidding_history: List[BiddingHistoryItem]) -> OpeningBiddingToolReponse:
     """
@@ -93,7 +84,22 @@ def opening_bidding_stage_function(position: str, hand: List[Card], allowed_bids
     return response.get("output", "pass")  # Adjust based on the expected response format
 
 
-def analyze_bidding_function(position, hand, bidding_history, allowed_bids, bidding_stage) -> str:
+def _simulated_bid(bid_evaluator, position, hand, bidding_history, allowed_bids):
+    """Return the best call by simulation, or None if no deal was evaluated"""
+    history = [
+        item.model_dump() if hasattr(item, "model_dump") else item
+        for item in bidding_history]
+    cards = [card.model_dump() if hasattr(card, "model_dump") else card for card in hand]
+    evaluations = bid_evaluator.evaluate(position, cards, AuctionState.from_history(history))
+    allowed = [parse_call(bid) for bid in allowed_bids if isinstance(bid, str)]
+    for evaluation in evaluations:
+        if not allowed or evaluation.call in allowed:
+            return evaluation.call
+    return None
+
+
+def analyze_bidding_function(position, hand, bidding_history, allowed_bids, bidding_stage,
+                             bid_evaluator=None) -> str:
     """
     Parses the input_data string to a dictionary and applies bidding heuristics.
     Args:
@@ -102,6 +108,8 @@ def analyze_bidding_function(position, hand, bidding_history, allowed_bids, bidd
         bidding_history (List[str]): The history of bids made in the game.
         allowed_bids (List[str]): The list of allowed bids.
         bidding_stage (str): The current stage of the bidding process.
+        bid_evaluator (BidEvaluator): The simulation bid evaluator. If given, the subsequent
+            bids are chosen by simulation, falling back to the LLM if no deal is evaluated.
     Returns:
         str: The recommended bid.
     """
@@ -124,13 +132,17 @@ def analyze_bidding_function(position, hand, bidding_history, allowed_bids, bidd
             bidding_history=bidding_history
         )
     elif bidding_stage == "Subsequent": 
-        # Call the subsequent bidding stage tool
-        response = get_subsequent_bid_advice(
-            position=position,
-            hand=hand,
-            allowed_bids=allowed_bids,
-            bidding_history=bidding_history
-        )
+        response = None
+        if bid_evaluator is not None:
+            response = _simulated_bid(bid_evaluator, position, hand, bidding_history, allowed_bids)
+        if response is None:
+            # Call the subsequent bidding stage tool
+            response = get_subsequent_bid_advice(
+                position=position,
+                hand=hand,
+                allowed_bids=allowed_bids,
+                bidding_history=bidding_history
+            )
     else:
         raise ValueError("Invalid bidding stage. Must be one of: Opening, Response, Subsequent.")
     # Debug: Log the response from the bidding analysis
@@ -314,6 +326,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -341,12 +355,110 @@ def get_bridge_advice(
     allowed_cards: list[str] = None,
     contract: str = None,
     tricks_taken: dict[str, int] = None,
-    tricks_history: list[str] = None
+    tricks_history: list[str] = None,
+    your_team_analysis: str = "",
+    opponent_analysis: str = "",
+    analysis_store: AnalysisStore = None,
+    auction: AuctionState = None,
+    bid_evaluator: BidEvaluator = None,
+    vulnerability: dict = None,
+    decision_cache: DecisionCache = None
 
 ) -> getBrdidgeAdviceResponse:
     """
     This function is the "broker" that orchestrates context gathering
-    and calls the LLM agent for a recommendation.
+    and returns a recommendation.
+    The phase and the bidding stage are recognized in code and the decision
+    is dispatched directly to the static advice graph of the stage (see
+    advice_pipeline). The LLM is only called at the leaf decision nodes.
+    Args:
+        position (str): The position of the player (e.g., "north", "south", "east", "west").
+        phase (str): The phase of the game ("bidding" or "play").
+        hand (list[str]): The player's hand, represented as a list of dictionaries with 'rank' and 'suit'.
+        allowed_bids (list[str]): A list of allowed bids.
+        bidding_history (list[str]): A list of strings representing the history of bids.
+        dummy_hand (list[str]): The dummy hand, represented as a list of dictionaries with 'rank' and 'suit'.
+        current_trick (list[str]): The current trick, represented as a list of strings.
+        allowed_cards (list[str]): A list of allowed cards to play.
+        contract (str): The contract for the game.
+        tricks_taken (dict[str, int]): A dictionary representing the number of tricks taken by each team.
+        tricks_history (list[str]): A list of strings representing the history of tricks taken.
+        your_team_analysis (str): The previous analysis of your team.
+        opponent_analysis (str): The previous analysis of the opponents.
+        analysis_store (AnalysisStore): The per-deal store of the analyses. If given, the analyses
+            are kept between the decisions of the deal and only the new calls are analyzed.
+        auction (AuctionState): The auction state of the deal. If given, the bidding stage is read
+            from it instead of scanning the bidding history.
+        bid_evaluator (BidEvaluator): The simulation bid evaluator. If given, the subsequent
+            bids are chosen by simulation instead of the LLM whenever deals are evaluated in time.
+        vulnerability (dict): The vulnerability object of the bridge protocol, for the
+            scores of the simulation and the keys of the decision cache.
+        decision_cache (DecisionCache): The cache of the opening and response calls by
+            decision key, kept between the deals.
+    Returns:
+        getBrdidgeAdviceResponse schema as dictionary:
+            your_team_analysis: "<updated_your_team_analysis>",
+            opponent_analysis: "<updated_opponent_analysis>",
+            bid_suggestion: "<subsequent_bid_suggestion>",
+            play_suggestion: "<card_to_play>"
+    """
+    if allowed_bids is None:
+        allowed_bids = []
+    if bidding_history is None:
+        bidding_history = []
+    if allowed_cards is None:
+        allowed_cards = []
+
+    logging.debug("DEBUG: Advice input: %s", {
+        "position": position,
+        "phase": phase,
+        "hand": hand,
+        "allowed_bids": allowed_bids,
+        "bidding_history": bidding_history,
+        "allowed_cards": allowed_cards,
+    })
+
+    if phase.lower() == "bidding":
+        advice = run_bidding_advice(
+            position=position,
+            hand=hand,
+            allowed_bids=allowed_bids,
+            bidding_history=bidding_history,
+            your_team_analysis=your_team_analysis,
+            opponent_analysis=opponent_analysis,
+            analysis_store=analysis_store,
+            auction=auction,
+            bid_evaluator=bid_evaluator,
+            vulnerability=vulnerability,
+            decision_cache=decision_cache
+        )
+    else:
+        advice = run_play_advice(allowed_cards)
+    logging.debug("DEBUG: Advice: %s", advice)
+
+    return getBrdidgeAdviceResponse(**{
+        key: value if isinstance(value, str) else json.dumps(value)
+        for key, value in advice.items()
+    }).model_dump()
+
+
+def get_bridge_advice_react(
+    position: str,
+    phase: str,
+    hand: list[str],
+    allowed_bids: list[str] = None,
+    bidding_history: list[str] = None,
+    dummy_hand: list[str] = None,
+    current_trick: list[str] = None,
+    allowed_cards: list[str] = None,
+    contract: str = None,
+    tricks_taken: dict[str, int] = None,
+    tricks_history: list[str] = None
+
+) -> getBrdidgeAdviceResponse:
+    """
+    Legacy broker that routes the decision through the ReAct agent. Kept for
+    comparison with the advice pipeline (see get_bridge_advice).
     It takes a dictionary or a JSON string as input and returns the
     recommendation as a dictionary.
     Args:
@@ -0,0 +1,277 @@
+"""Feature-bucketed cache of bidding decisions
+
+Exact-match caching rarely hits in bidding, because every hand is a new key.
+The opening (and overcall) and response decisions mostly depend on a few
+features of the hand, so this module caches the call by an abstract
+decision key: the HCP range, the shape and the suit lengths, the suits
+holding two of the top honors (ace, king, queen), the vulnerability of both sides
+and the auction so far. The auction is keyed by its call codes from the
+first bid (the passes before it are left out unless nobody has bid), so the
+seat of the player is its seat relative to the first bidder, and the
+vulnerability is keyed from the point of view of the player. Only the
+call is cached: the analyses of the advice were made for another hand of
+the same key, so a hit is explained by the features of the key instead
+(see describe_key).
+
+The cache evicts the least recently used entries, counts its hits and
+misses, and can be saved and loaded, so it can be pre-warmed offline by
+running the advice pipeline over a deal corpus (see prewarm, or run
+python -m bridgegui.decision_cache OUTPUT [DEALS]).
+
+Functions:
+decision_key -- abstract key of a bidding decision
+describe_key -- text description of the hands of a decision key
+random_deals -- random deal corpus for pre-warming
+prewarm      -- fill a cache by bidding a deal corpus with the advice
+                pipeline
+
+Classes:
+DecisionCache -- LRU cache of bidding calls by decision key
+"""
+
+import bisect
+import collections
+import json
+import random
+import sys
+import threading
+
+from bridgegui.auction import PASS_CODE, AuctionState, mask_calls
+from bridgegui.bidding_system import hcp_boundaries
+from bridgegui.double_dummy import RANKS, hand_masks
+from bridgegui.holdings import TABLES
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+from bridgegui.positions import PARTNERSHIP_TAGS
+from bridgegui.simulation import is_vulnerable
+
+DEFAULT_MAX_SIZE = 100000
+# Lower bounds of the HCP ranges of the key (the boundaries of the ranges of
+# the bidding system, so the hands of a range are bid alike by the system)
+HCP_BUCKETS = hcp_boundaries()
+LONG_SUIT = 5
+GOOD_SUIT_HONORS = 2
+_HCP = TABLES["hcp"]
+_LENGTH = TABLES["length"]
+_TOP_HONORS = TABLES["top_honors"]
+
+
+def decision_key(position, hand, auction, vulnerability=None):
+    """Return the abstract key of a bidding decision
+
+    The key is a tuple of the HCP range (the index in HCP_BUCKETS), the
+    sorted suit lengths, the suit lengths in SUIT_ORDER, a mark for each
+    suit in SUIT_ORDER (1 if it has two of the top honors, 0 otherwise),
+    the vulnerability of the own side and the opponents, and the call codes
+    of the auction from the first bid in hexadecimal.
+
+    Keyword Arguments:
+    position      -- the position of the player
+    hand          -- the cards of the player, or the suit masks (see
+                     double_dummy.hand_masks)
+    auction       -- the auction state
+    vulnerability -- the vulnerability object of the bridge protocol
+                     (optional)
+    """
+    masks = hand if hand and isinstance(hand[0], int) else hand_masks(hand)
+    lengths = [_LENGTH[mask] for mask in masks]
+    hcp = sum(_HCP[mask] for mask in masks)
+    marks = tuple(
+        int(_TOP_HONORS[mask] >= GOOD_SUIT_HONORS) for mask in masks)
+    opponent = POSITION_TAGS[(POSITION_TAGS.index(position) + 1) % 4]
+    codes = auction.codes
+    first_bid = len(codes) - len(codes.lstrip(bytes([PASS_CODE])))
+    if first_bid < len(codes):
+        codes = codes[first_bid:]
+    return (bisect.bisect_right(HCP_BUCKETS, hcp),) + tuple(
+        sorted(lengths, reverse=True)) + tuple(lengths) + marks + (
+            int(is_vulnerable(vulnerability, position)),
+            int(is_vulnerable(vulnerability, opponent)), codes.hex())
+
+
+def describe_key(key):
+    """Return text description of the hands of a decision key
+
+    Keyword Arguments:
+    key -- the decision key (see decision_key)
+    """
+    bucket, shape, lengths, marks = key[0], key[1:5], key[5:9], key[9:13]
+    if bucket == 0:
+        hcp = "0-%d" % (HCP_BUCKETS[0] - 1)
+    elif bucket == len(HCP_BUCKETS):
+        hcp = "%d+" % HCP_BUCKETS[-1]
+    elif HCP_BUCKETS[bucket] - HCP_BUCKETS[bucket - 1] == 1:
+        hcp = "%d" % HCP_BUCKETS[bucket - 1]
+    else:
+        hcp = "%d-%d" % (HCP_BUCKETS[bucket - 1], HCP_BUCKETS[bucket] - 1)
+    suits = [
+        ("good %s" if mark else "long %s") % suit
+        for suit, length, mark in zip(SUIT_ORDER, lengths, marks)
+        if length >= LONG_SUIT]
+    return "Decision cache: %s HCP, shape %s (%s)%s." % (
+        hcp, "-".join(str(length) for length in shape),
+        "=".join(str(length) for length in lengths),
+        "".join(", " + suit for suit in suits))
+
+
+class DecisionCache:
+    """LRU cache of bidding calls by decision key
+
+    The cache is thread safe. The calls are stored in the short text
+    representation (see notation.format_call).
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """Initialize decision cache
+
+        Keyword Arguments:
+        max_size -- the maximum number of entries
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """Return the share of the lookups that were hits"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, key):
+        """Return the call stored for a key, or None
+
+        Keyword Arguments:
+        key -- the decision key (see decision_key)
+        """
+        with self._lock:
+            call = self._entries.get(key)
+            if call is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return call
+
+    def store(self, key, call):
+        """Store the call of a key, evicting the least recently used entry
+
+        Keyword Arguments:
+        key  -- the decision key (see decision_key)
+        call -- the call
+        """
+        with self._lock:
+            self._entries[key] = call
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def reset_statistics(self):
+        """Reset the hit and miss counts"""
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def save(self, path):
+        """Save the entries to a JSON file, least recently used first
+
+        Keyword Arguments:
+        path -- the path of the file
+        """
+        with self._lock:
+            entries = [[list(key), call] for key, call in (
+                self._entries.items())]
+        with open(path, "w") as output:
+            json.dump(entries, output)
+
+    @classmethod
+    def load(cls, path, max_size=DEFAULT_MAX_SIZE):
+        """Create decision cache from a file written by save
+
+        The advice dictionaries of the files saved before only the calls
+        were cached are read as their suggested calls.
+
+        Keyword Arguments:
+        path     -- the path of the file
+        max_size -- the maximum number of entries
+        """
+        cache = cls(max_size)
+        with open(path) as input_:
+            for key, call in json.load(input_):
+                if isinstance(call, dict):
+                    call = call["bid_suggestion"]
+                cache.store(tuple(key), call)
+        return cache
+
+
+def random_deals(count, seed=None):
+    """Return random deal corpus for pre-warming
+
+    Returns list of (dealer, hands, vulnerability) tuples, hands a dictionary
+    from position to the list of cards.
+
+    Keyword Arguments:
+    count -- the number of deals
+    seed  -- the seed of the random number generator (optional)
+    """
+    generator = random.Random(seed)
+    deck = [
+        {"rank": rank, "suit": suit} for suit in SUIT_ORDER for rank in RANKS]
+    deals = []
+    for _ in range(count):
+        generator.shuffle(deck)
+        hands = {
+            position: deck[13 * n:13 * (n + 1)]
+            for n, position in enumerate(POSITION_TAGS)}
+        vulnerability = {
+            tag: generator.random() < 0.5 for tag in PARTNERSHIP_TAGS}
+        deals.append((generator.choice(POSITION_TAGS), hands, vulnerability))
+    return deals
+
+
+def prewarm(cache, deals, advise=None):
+    """Fill a cache by bidding a deal corpus with the advice pipeline
+
+    Every call of every deal is made by the advice pipeline with the cache,
+    so the decisions of the cached stages missing from the cache are stored
+    in it. Suggestions that are not legal are replaced by pass.
+
+    Keyword Arguments:
+    cache  -- the decision cache
+    deals  -- iterable of (dealer, hands, vulnerability) tuples (see
+              random_deals)
+    advise -- function with the signature of
+              advice_pipeline.run_bidding_advice (by default the advice
+              pipeline)
+    """
+    if advise is None:
+        from bridgegui.advice_pipeline import run_bidding_advice
+        advise = run_bidding_advice
+    for dealer, hands, vulnerability in deals:
+        auction = AuctionState(dealer)
+        history = []
+        while not auction.completed:
+            position = auction.turn
+            advice = advise(
+                position, hands[position], mask_calls(auction.legal_mask()),
+                list(history), auction=auction, decision_cache=cache,
+                vulnerability=vulnerability)
+            call = advice["bid_suggestion"]
+            if not auction.is_legal(call):
+                call = "Pass"
+            auction.call(position, call)
+            history.append("%s: %s" % (position, call))
+
+
+def main(output, deals="100"):
+    """Pre-warm a decision cache with random deals and save it"""
+    cache = DecisionCache()
+    prewarm(cache, random_deals(int(deals)))
+    cache.save(output)
+    print("%d entries, hit rate %.0f%%" % (len(cache), 100 * cache.hit_rate))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
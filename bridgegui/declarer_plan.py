@@ -0,0 +1,342 @@
+"""Declarer play plan
+
+The declarer's plan is made once, when the dummy is revealed, instead of
+rediscovering the winners, losers and entries of the two hands for every
+card. For each suit the plan counts the sure winners of the declarer and the
+dummy together, the losers, the tricks the suit can be established for, the
+finesses (a tenace over a missing honor) and, in a trump contract, the ruffs
+in the hand short in trumps. From the tricks needed it orders the steps of
+the play:
+
+- ruff the losers of a suit in the short trump hand, if the sure winners are
+  not enough
+- draw the trumps of the opponents
+- establish the long suit giving most tricks
+- take the finesses
+- cash the winners
+
+The plan is updated incrementally: when cards are played only the suits
+they belong to are analyzed again, and the steps done are dropped. Each card
+of the declarer and the dummy is looked up from the first step that applies
+(a lead for the step, the finessing card in the tenace hand, or a ruff). If
+no step applies the plan is broken for the decision, and the play is left to
+the LLM.
+
+Functions:
+analyze_suit -- winners, losers and play opportunities of a suit
+
+Classes:
+SuitAnalysis -- analysis of one suit of the declarer's side
+Step         -- step of the plan (kind and suit)
+DeclarerPlan -- plan of the declarer, updated as the cards are played
+"""
+
+import collections
+
+from bridgegui.double_dummy import RANKS, card_move, hand_masks, move_card
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+from bridgegui.play_rules import PLAN, PlayDecision
+
+RUFF = "ruff"
+DRAW_TRUMPS = "draw trumps"
+ESTABLISH = "establish"
+FINESSE = "finesse"
+CASH = "cash"
+
+_FULL_SUIT = (1 << len(RANKS)) - 1
+
+SuitAnalysis = collections.namedtuple(
+    "SuitAnalysis", ("winners", "losers", "length_tricks", "finesse"))
+Step = collections.namedtuple("Step", ("kind", "suit"))
+
+
+def _count(mask):
+    return bin(mask).count("1")
+
+
+def _top(mask):
+    return 1 << (mask.bit_length() - 1) if mask else 0
+
+
+def _lowest(mask):
+    return mask & -mask
+
+
+def analyze_suit(declarer, dummy, outstanding):
+    """Return the analysis of a suit of the declarer's side
+
+    The sure winners are the top cards held by the side (at most the length
+    of the longer hand). The losers are the rounds needed to exhaust the
+    opponents (splitting evenly) the winners do not cover, and the length
+    tricks are the cards of the longer hand left after them. The finesse is
+    (tenace hand, finessing card, missing honor), the tenace hand being
+    "declarer" or "dummy", if one hand holds the cards on both sides of the
+    highest missing card, or None.
+
+    Keyword Arguments:
+    declarer    -- the mask of the cards of the declarer in the suit
+    dummy       -- the mask of the cards of the dummy in the suit
+    outstanding -- the mask of the cards of the opponents in the suit
+    """
+    combined = declarer | dummy
+    long = max(_count(declarer), _count(dummy))
+    remaining = combined | outstanding
+    winners = 0
+    while remaining and combined & _top(remaining):
+        remaining ^= _top(remaining)
+        winners += 1
+    winners = min(winners, long)
+    rounds = min(long, (_count(outstanding) + 1) // 2)
+    losers = max(0, rounds - winners)
+    length_tricks = long - winners - losers
+    finesse = None
+    missing = _top(outstanding)
+    if missing and combined & ~(missing - 1) & ~missing:
+        for hand, mask in (("dummy", dummy), ("declarer", declarer)):
+            above = mask & ~((missing << 1) - 1)
+            below = mask & (missing - 1)
+            # The finessing card is the highest card below the missing one,
+            # if no other missing card lies between them
+            if above and below and not outstanding & (missing - 1) & ~(
+                    (_top(below) << 1) - 1):
+                finesse = (hand, _top(below), missing)
+                break
+    return SuitAnalysis(winners, losers, length_tricks, finesse)
+
+
+class DeclarerPlan:
+    """Plan of the declarer, updated as the cards are played"""
+
+    def __init__(self, declarer, contract, declarer_cards, dummy_cards,
+                 played=None):
+        """Initialize declarer plan
+
+        Keyword Arguments:
+        declarer       -- the position of the declarer
+        contract       -- the contract object of the bridge protocol
+        declarer_cards -- the cards of the declarer
+        dummy_cards    -- the cards of the dummy
+        played         -- the suit masks of the cards played so far (see
+                          play_rules.played_cards)
+        """
+        self.declarer = declarer
+        self.dummy = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 2) % 4]
+        bid = contract["bid"]
+        strain = bid["strain"]
+        self.trump = None if strain == "notrump" else SUIT_ORDER.index(strain)
+        self.needed = bid["level"] + 6
+        self.breaks = 0
+        self._hands = {
+            self.declarer: hand_masks(declarer_cards),
+            self.dummy: hand_masks(dummy_cards)}
+        self._played = [0, 0, 0, 0]
+        self._analyses = [None] * 4
+        for suit in range(4):
+            self._analyze(suit)
+        self.steps = self._order_steps()
+        self.update(played or [0, 0, 0, 0])
+
+    def _outstanding(self, suit):
+        return _FULL_SUIT & ~(
+            self._played[suit] | self._hands[self.declarer][suit] |
+            self._hands[self.dummy][suit])
+
+    def _analyze(self, suit):
+        self._analyses[suit] = analyze_suit(
+            self._hands[self.declarer][suit], self._hands[self.dummy][suit],
+            self._outstanding(suit))
+
+    @property
+    def sure_winners(self):
+        """Return the sure winners of the side"""
+        return sum(analysis.winners for analysis in self._analyses)
+
+    def _ruff_hand(self, suit):
+        # The hand short in trumps that can ruff the losers of suit, or None
+        trump = self.trump
+        if trump is None or suit == trump:
+            return None
+        declarer, dummy = self._hands[self.declarer], self._hands[self.dummy]
+        short, long = (
+            (self.dummy, self.declarer)
+            if _count(dummy[trump]) <= _count(declarer[trump])
+            else (self.declarer, self.dummy))
+        if (self._hands[short][trump] and
+                _count(self._hands[short][suit]) <
+                _count(self._hands[long][suit]) and
+                self._analyses[suit].losers):
+            return short
+        return None
+
+    def _order_steps(self):
+        short_of = self.sure_winners < self.needed
+        steps = []
+        if short_of:
+            steps.extend(
+                Step(RUFF, suit) for suit in range(4)
+                if self._ruff_hand(suit) is not None)
+        if self.trump is not None and self._outstanding(self.trump):
+            steps.append(Step(DRAW_TRUMPS, self.trump))
+        if short_of:
+            establish = sorted(
+                (suit for suit in range(4)
+                 if self._analyses[suit].length_tricks and suit != self.trump),
+                key=lambda suit: -self._analyses[suit].length_tricks)
+            steps.extend(Step(ESTABLISH, suit) for suit in establish[:1])
+            steps.extend(
+                Step(FINESSE, suit) for suit in range(4)
+                if self._analyses[suit].finesse)
+        steps.extend(
+            Step(CASH, suit) for suit in range(4)
+            if self._analyses[suit].winners)
+        return steps
+
+    def update(self, played):
+        """Update the plan with the cards played
+
+        Only the suits with new cards played are analyzed again.
+
+        Keyword Arguments:
+        played -- the suit masks of the cards played so far
+        """
+        for suit, mask in enumerate(played):
+            new = mask & ~self._played[suit]
+            if not new:
+                continue
+            self._played[suit] |= new
+            for hand in self._hands.values():
+                hand[suit] &= ~new
+            self._analyze(suit)
+            if self.trump is not None and suit != self.trump:
+                # A ruff changes the trumps, played in another suit
+                self._analyze(self.trump)
+        self.steps = [step for step in self.steps if not self._done(step)]
+
+    def _done(self, step):
+        kind, suit = step
+        declarer, dummy = self._hands[self.declarer], self._hands[self.dummy]
+        if not declarer[suit] | dummy[suit] and kind != RUFF:
+            return True
+        if kind == DRAW_TRUMPS:
+            return not self._outstanding(suit)
+        if kind == RUFF:
+            return self._ruff_hand(suit) is None
+        if kind == ESTABLISH:
+            return not self._analyses[suit].losers
+        if kind == FINESSE:
+            return self._analyses[suit].finesse is None
+        return not self._analyses[suit].winners
+
+    def summary(self):
+        """Return text summary of the plan"""
+        lines = ["Tricks needed %d, sure winners %d" % (
+            self.needed, self.sure_winners)]
+        for suit, analysis in enumerate(self._analyses):
+            finesse = ""
+            if analysis.finesse:
+                hand, card, missing = analysis.finesse
+                finesse = ", finesse the %s in %s against the %s" % (
+                    RANKS[card.bit_length() - 1], hand,
+                    RANKS[missing.bit_length() - 1])
+            lines.append("%s: %d winners, %d losers, %d length tricks%s" % (
+                SUIT_ORDER[suit], analysis.winners, analysis.losers,
+                analysis.length_tricks, finesse))
+        lines.append("Plan: %s" % (", ".join(
+            "%s %s" % (kind, SUIT_ORDER[suit]) for kind, suit in self.steps)
+            or "play it out"))
+        return "\n".join(lines)
+
+    def decide(self, position, allowed_cards, trick, played):
+        """Return the card of the plan for a play, or None if no step applies
+
+        Keyword Arguments:
+        position      -- the position the card is played from (the
+                         declarer or the dummy)
+        allowed_cards -- the allowed cards
+        trick         -- the plays of the current trick
+        played        -- the suit masks of the cards played so far, the
+                         current trick included
+        """
+        if position not in self._hands:
+            return None
+        self.update(played)
+        allowed = hand_masks(allowed_cards)
+        for step in self.steps:
+            if trick:
+                card = self._follow(step, position, allowed, trick)
+            else:
+                card = self._lead(step, position, allowed)
+            if card is not None:
+                return PlayDecision(move_card(*card), PLAN)
+        if not trick:
+            self.breaks += 1
+        return None
+
+    def _hand_name(self, position):
+        return "dummy" if position == self.dummy else "declarer"
+
+    def _partner(self, position):
+        return self.dummy if position == self.declarer else self.declarer
+
+    def _lead(self, step, position, allowed):
+        kind, suit = step
+        hand = allowed[suit]
+        if not hand:
+            return None
+        partner = self._hands[self._partner(position)][suit]
+        outstanding = self._outstanding(suit)
+        winner = _top(hand) if _top(hand) > outstanding else 0
+        if kind == RUFF:
+            ruffer = self._ruff_hand(suit)
+            if ruffer == position or partner:
+                return None
+            return suit, _lowest(hand)
+        if kind == FINESSE:
+            tenace, card, _ = self._analyses[suit].finesse
+            if tenace == self._hand_name(position) or not partner & card:
+                return None
+            return suit, _lowest(hand)
+        if winner:
+            return suit, winner
+        if _top(partner) > outstanding:
+            # Towards the winner of the partner
+            return suit, _lowest(hand)
+        if kind == ESTABLISH:
+            return suit, _lowest(hand)
+        return None
+
+    def _follow(self, step, position, allowed, trick):
+        kind, suit = step
+        led = SUIT_ORDER.index(trick[0]["card"]["suit"])
+        if led != suit:
+            return None
+        winning = self._winning(trick)
+        if winning[2] == self._partner(position):
+            return None
+        if kind == FINESSE and allowed[suit]:
+            tenace, card, missing = self._analyses[suit].finesse
+            if tenace != self._hand_name(position):
+                return None
+            if allowed[suit] & card and winning[0] == suit and \
+                    winning[1] < card:
+                return suit, card
+            return None
+        if kind == RUFF and not allowed[suit] and self.trump is not None:
+            if self._ruff_hand(suit) != position:
+                return None
+            trumps = allowed[self.trump]
+            if winning[0] == self.trump:
+                trumps &= ~((winning[1] << 1) - 1)
+            if trumps:
+                return self.trump, _lowest(trumps)
+        return None
+
+    def _winning(self, trick):
+        # (suit, card, position) of the card winning the trick so far
+        best = None
+        for play in trick:
+            suit, card = card_move(play["card"])
+            if best is None or suit == best[0] and card > best[1] or \
+                    suit == self.trump and best[0] != self.trump:
+                best = (suit, card, play["position"])
+        return best
@@ -0,0 +1,632 @@
+"""Double dummy solver
+
+This module computes the number of tricks a side takes when all four hands
+are known and every player plays perfectly. It is a pure Python alpha-beta
+search over the cards:
+
+- the hands are 13-bit masks per suit (bit 0 is the two, bit 12 the ace)
+- cards in sequence (with the cards played removed) are equivalent, so only
+  one card of each sequence is tried
+- the search answers "can the side take n tricks" questions with a null
+  window, and the number of tricks is found by bisection
+- the tricks the side on lead can cash from the top (also by leading to the
+  partner's winners) and the top trumps of the other side bound the result
+  before the trick is searched
+- the positions at the start of each trick are stored in a transposition
+  table by the owners of the cards down to the lowest card that decided a
+  trick, so the entries also answer positions differing in the small cards
+
+A full deal takes from well under a second to tens of seconds, so callers
+with a time budget pass a deadline and handle TimeoutError.
+
+Functions:
+card_bit        -- suit index and rank bit of a card
+card_move       -- (suit index, card mask) move of a card
+move_card       -- card of a (suit index, card mask) move
+hand_masks      -- suit masks of a hand
+solve           -- tricks taken by the side of the player on lead
+declarer_tricks -- tricks taken by the declarer in a strain
+
+Classes:
+DoubleDummySolver -- solver of one deal with a reusable transposition table
+"""
+
+import functools
+import time
+
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+
+# Ranks in the order of the bits of the suit masks
+RANKS = (
+    "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king",
+    "ace")
+_RANK_BITS = {rank: bit for bit, rank in enumerate(RANKS)}
+_SUIT_INDEXES = {suit: index for index, suit in enumerate(SUIT_ORDER)}
+_BIT_COUNTS = [bin(mask).count("1") for mask in range(1 << 13)]
+# Strains in the short text representation, with the index of the trump suit
+# in the suit masks (None for notrump)
+TRUMP_INDEXES = {"S": 0, "H": 1, "D": 2, "C": 3, "NT": None}
+
+
+def card_bit(card):
+    """Return tuple of the index of the suit in SUIT_ORDER and the rank bit
+
+    Keyword Arguments:
+    card -- the card, serialized or object with rank and suit attributes
+    """
+    if isinstance(card, dict):
+        return _SUIT_INDEXES[card["suit"]], _RANK_BITS[card["rank"]]
+    return _SUIT_INDEXES[card.suit], _RANK_BITS[card.rank]
+
+
+def card_move(card):
+    """Return the (suit index, card mask) move of a card
+
+    Keyword Arguments:
+    card -- the card, serialized or object with rank and suit attributes
+    """
+    suit, bit = card_bit(card)
+    return suit, 1 << bit
+
+
+def move_card(suit, card):
+    """Return the serialized card of a move
+
+    Keyword Arguments:
+    suit -- the index of the suit in SUIT_ORDER
+    card -- the mask of the card
+    """
+    return {"rank": RANKS[card.bit_length() - 1], "suit": SUIT_ORDER[suit]}
+
+
+def hand_masks(hand):
+    """Return list of the suit masks of hand in SUIT_ORDER
+
+    Keyword Arguments:
+    hand -- the cards, serialized or objects with rank and suit attributes
+    """
+    masks = [0, 0, 0, 0]
+    for card in hand:
+        suit, bit = card_bit(card)
+        masks[suit] |= 1 << bit
+    return masks
+
+
+def _top(mask):
+    return 1 << (mask.bit_length() - 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _suit_state(north, east, south, west):
+    # Returns (owners, count, lengths): the owners of the remaining cards of a
+    # suit from the highest (two bits per card after a leading one bit), the
+    # number of remaining cards and the lengths of the hands packed in four
+    # bits each
+    remaining = north | east | south | west
+    owners = 1
+    count = 0
+    while remaining:
+        top = _top(remaining)
+        owners = owners << 2 | (
+            0 if north & top else 1 if east & top else 2 if south & top
+            else 3)
+        remaining ^= top
+        count += 1
+    lengths = (
+        bin(north).count("1") << 12 | bin(east).count("1") << 8 |
+        bin(south).count("1") << 4 | bin(west).count("1"))
+    return owners, count, lengths
+
+
+@functools.lru_cache(maxsize=None)
+def _cashable(mask, others):
+    # The top cards of mask above all other cards of the suit, and their
+    # number
+    cards = 0
+    count = 0
+    remaining = mask | others
+    while remaining and mask & _top(remaining):
+        top = _top(remaining)
+        cards |= top
+        remaining ^= top
+        count += 1
+    return count, cards
+
+
+@functools.lru_cache(maxsize=None)
+def _top_cards(remaining, count):
+    # The count highest cards of remaining
+    cards = 0
+    for _ in range(count):
+        top = _top(remaining)
+        cards |= top
+        remaining ^= top
+    return cards
+
+
+@functools.lru_cache(maxsize=None)
+def _segment(remaining, relevant):
+    # The remaining cards at or above the lowest relevant card, and their
+    # number
+    segment = remaining & ~((relevant & -relevant) - 1)
+    return segment, bin(segment).count("1")
+
+
+@functools.lru_cache(maxsize=None)
+def _moves(mask, remaining):
+    # One card of each sequence of the mask (the lowest), from the highest
+    # sequence to the lowest
+    moves = []
+    previous = False
+    while remaining:
+        top = _top(remaining)
+        if mask & top:
+            if previous:
+                moves[-1] = top
+            else:
+                moves.append(top)
+            previous = True
+        else:
+            previous = False
+        remaining ^= top
+    return tuple(moves)
+
+
+class DoubleDummySolver:
+    """Solver of one deal
+
+    The transposition table is kept between the calls of tricks, so solving
+    the deal for several leaders or targets in the same strain reuses the
+    positions searched before.
+
+    Every search also returns the relevant cards: the cards whose rank
+    decided a trick somewhere in the search. Only the owners of the cards at
+    or above the lowest relevant card of each suit are stored in the
+    transposition table (with the lengths of the hands), so the entry also
+    answers positions that only differ in the small cards. The relevant
+    cards are packed in one integer with 16 bits per suit.
+    """
+
+    def __init__(self, hands, strain, deadline=None):
+        """Initialize solver
+
+        Keyword Arguments:
+        hands    -- list of the four hands in POSITION_TAGS order, each a list
+                    of suit masks (see hand_masks) or a list of cards
+        strain   -- the strain in the short text representation ("S", "NT")
+        deadline -- time (see time.time) after which the search raises
+                    TimeoutError (optional)
+        """
+        self._hands = [
+            list(hand) if hand and isinstance(hand[0], int)
+            else hand_masks(hand) for hand in hands]
+        self._trump = TRUMP_INDEXES[strain]
+        self._table = {}
+        self._best_leads = {}
+        self._deadline = deadline
+        self.nodes = 0
+
+    def tricks(self, leader):
+        """Return the tricks taken by the side of leader
+
+        Keyword Arguments:
+        leader -- the position (or index in POSITION_TAGS) on lead
+        """
+        if isinstance(leader, str):
+            leader = POSITION_TAGS.index(leader)
+        remaining = sum(bin(mask).count("1") for mask in self._hands[leader])
+        low, high = 0, remaining
+        while low < high:
+            target = (low + high + 1) // 2
+            if self._search(leader, leader % 2, target, remaining)[0]:
+                low = target
+            else:
+                high = target - 1
+        return low
+
+    def play_tricks(self, leader, played, moves=None):
+        """Return the tricks taken after each card of the player in turn
+
+        The cards played to the current trick must be removed from the hands.
+        Returns dictionary from (suit index, card mask) move to the tricks
+        taken by the side of the player in turn, the current trick included.
+
+        Keyword Arguments:
+        leader -- the position (or index in POSITION_TAGS) on lead to the
+                  current trick
+        played -- list of (suit index, card mask) played to the trick so far
+        moves  -- the moves to evaluate (by default one card of each
+                  sequence the player can play)
+        """
+        if isinstance(leader, str):
+            leader = POSITION_TAGS.index(leader)
+        played = list(played)
+        seat = (leader + len(played)) % 4
+        side = seat % 2
+        hand = self._hands[seat]
+        remaining = sum(_BIT_COUNTS[mask] for mask in hand)
+        if moves is None:
+            if played:
+                moves = self._following_moves(hand, played, leader, seat)
+            else:
+                moves = self._leading_moves(seat)
+        results = {}
+        for suit, card in moves:
+            hand[suit] ^= card
+            try:
+                low, high = 0, remaining
+                while low < high:
+                    target = (low + high + 1) // 2
+                    if self._after_card(
+                            leader, side, target, remaining,
+                            played + [(suit, card)])[0]:
+                        low = target
+                    else:
+                        high = target - 1
+            finally:
+                hand[suit] ^= card
+            results[suit, card] = low
+        return results
+
+    def _after_card(self, leader, side, target, remaining, played):
+        # The result of the search after a card is added to the trick
+        if len(played) < 4:
+            return self._trick(leader, side, target, remaining, played)
+        winner = self._winner(played)
+        winner_seat = (leader + winner) % 4
+        return self._search(
+            winner_seat, side, target - (winner_seat % 2 == side),
+            remaining - 1)
+
+    def _quick_tricks(self, leader):
+        # Tricks the side of the leader can cash from the top before the
+        # opponents get in, either from the hand of the leader or from the
+        # hand of the partner after leading low to its winner. Returns the
+        # tricks and the cards cashed.
+        hands = self._hands
+        hand = hands[leader]
+        partner = hands[(leader + 2) % 4]
+        tricks, relevant, _ = self._top_tricks(hand, partner, leader)
+        if tricks < (
+                _BIT_COUNTS[hand[0]] + _BIT_COUNTS[hand[1]] +
+                _BIT_COUNTS[hand[2]] + _BIT_COUNTS[hand[3]]):
+            partner_tricks, partner_relevant, entries = self._top_tricks(
+                partner, hand, leader)
+            for suit in range(4):
+                if entries >> suit & 1 and hand[suit]:
+                    if partner_tricks > tricks:
+                        tricks, relevant = partner_tricks, partner_relevant
+                    break
+        return tricks, relevant
+
+    def _top_tricks(self, hand, partner, leader):
+        # Returns the tricks hand can cash from the top of its suits, the
+        # cards cashed and the mask of the suits with at least one trick
+        hands = self._hands
+        left, right = hands[(leader + 1) % 4], hands[(leader + 3) % 4]
+        trump = self._trump
+        tricks = 0
+        relevant = 0
+        suits = 0
+        for suit in range(4):
+            if not hand[suit]:
+                continue
+            count, cards = _cashable(
+                hand[suit], partner[suit] | left[suit] | right[suit])
+            if not count:
+                continue
+            if trump is not None and suit != trump:
+                if left[trump] and _BIT_COUNTS[left[suit]] < count:
+                    count = _BIT_COUNTS[left[suit]]
+                    cards = _top_cards(cards, count)
+                if right[trump] and _BIT_COUNTS[right[suit]] < count:
+                    count = _BIT_COUNTS[right[suit]]
+                    cards = _top_cards(cards, count)
+            if count:
+                tricks += count
+                relevant |= cards << 16 * suit
+                suits |= 1 << suit
+        return tricks, relevant, suits
+
+    def _top_trumps(self, side):
+        # Returns the number of top trumps held by one hand of side and the
+        # cards
+        trump = self._trump
+        hands = self._hands
+        remaining = (
+            hands[0][trump] | hands[1][trump] | hands[2][trump] |
+            hands[3][trump])
+        if not remaining:
+            return 0, 0
+        top = _top(remaining)
+        for seat in (side, side + 2):
+            mask = hands[seat][trump]
+            if mask & top:
+                count = 0
+                while remaining and mask & _top(remaining):
+                    remaining ^= _top(remaining)
+                    count += 1
+                return count, _top_cards(mask, count) << 16 * trump
+        return 0, 0
+
+    def _trick_relevance(self, played, winner):
+        # The winning card is relevant if it beat a card of its suit
+        suit, card = played[winner]
+        for n in range(4):
+            if n != winner and played[n][0] == suit:
+                return card << 16 * suit
+        return 0
+
+    def _last_trick(self, leader, side):
+        # Each hand has one card left, so the trick plays itself
+        hands = self._hands
+        played = []
+        for n in range(4):
+            hand = hands[(leader + n) % 4]
+            suit = 0 if hand[0] else 1 if hand[1] else 2 if hand[2] else 3
+            played.append((suit, hand[suit]))
+        winner = self._winner(played)
+        return ((leader + winner) % 2 == side,
+                self._trick_relevance(played, winner))
+
+    def _search(self, leader, side, target, remaining):
+        # Determine if side takes target of the remaining tricks with leader
+        # on lead. Returns the result and the relevant cards.
+        if target <= 0:
+            return True, 0
+        if target > remaining:
+            return False, 0
+        if remaining == 1:
+            return self._last_trick(leader, side)
+        north, east, south, west = hands = self._hands
+        states = (
+            _suit_state(north[0], east[0], south[0], west[0]),
+            _suit_state(north[1], east[1], south[1], west[1]),
+            _suit_state(north[2], east[2], south[2], west[2]),
+            _suit_state(north[3], east[3], south[3], west[3]))
+        table_key = (
+            leader, side, states[0][2], states[1][2], states[2][2],
+            states[3][2])
+        entries = self._table.get(table_key)
+        if entries is None:
+            entries = self._table[table_key] = {}
+        else:
+            for patterns, (low, high) in entries.items():
+                if (states[0][0] >> patterns[0][0] == patterns[0][1] and
+                        states[1][0] >> patterns[1][0] == patterns[1][1] and
+                        states[2][0] >> patterns[2][0] == patterns[2][1] and
+                        states[3][0] >> patterns[3][0] == patterns[3][1]):
+                    if low >= target or high < target:
+                        return low >= target, self._pattern_cards(patterns)
+        maximizing = leader % 2 == side
+        quick, relevant = self._quick_tricks(leader)
+        if maximizing and quick >= target:
+            return True, relevant
+        if not maximizing and remaining - quick < target:
+            return False, relevant
+        if self._trump is not None:
+            # The top trumps of one hand of the other side take a trick each
+            sure, relevant = self._top_trumps((leader + 1) % 2)
+            if maximizing and remaining - sure < target:
+                return False, relevant
+            if not maximizing and sure >= target:
+                return True, relevant
+        self.nodes += 1
+        if (self._deadline is not None and not self.nodes & 0xff and
+                time.time() > self._deadline):
+            raise TimeoutError("Double dummy search out of time")
+        hand = hands[leader]
+        moves = self._leading_moves(leader)
+        # The lead that decided the position before goes first
+        lead_key = (leader, states[0][0], states[1][0], states[2][0],
+                    states[3][0])
+        best = self._best_leads.get(lead_key)
+        if best in moves:
+            moves.remove(best)
+            moves.insert(0, best)
+        result = not maximizing
+        relevant = 0
+        for suit, card in moves:
+            hand[suit] ^= card
+            outcome, cards = self._trick(
+                leader, side, target, remaining, [(suit, card)])
+            hand[suit] ^= card
+            if outcome == maximizing:
+                result = outcome
+                relevant = cards
+                self._best_leads[lead_key] = (suit, card)
+                break
+            relevant |= cards
+        # Store the result for the positions with the same owners of the
+        # cards down to the lowest relevant card of each suit
+        patterns = []
+        segments = 0
+        for suit in range(4):
+            owners, count, _ = states[suit]
+            cards = relevant >> 16 * suit & 0x1fff
+            if cards:
+                segment, depth = _segment(
+                    north[suit] | east[suit] | south[suit] | west[suit], cards)
+                segments |= segment << 16 * suit
+            else:
+                depth = 0
+            shift = 2 * (count - depth)
+            patterns.append((shift, owners >> shift, depth))
+        patterns = tuple(patterns)
+        low, high = entries.get(patterns, (0, remaining))
+        if result:
+            entries[patterns] = (max(low, target), high)
+        else:
+            entries[patterns] = (low, min(high, target - 1))
+        return result, segments
+
+    def _pattern_cards(self, patterns):
+        # The cards of the current position covered by a stored pattern
+        hands = self._hands
+        cards = 0
+        for suit in range(4):
+            depth = patterns[suit][2]
+            if depth:
+                cards |= _top_cards(
+                    hands[0][suit] | hands[1][suit] | hands[2][suit] |
+                    hands[3][suit], depth) << 16 * suit
+        return cards
+
+    def _trick(self, leader, side, target, remaining, played):
+        # played is the list of (suit, card) played to the trick so far.
+        # Returns the result and the relevant cards.
+        hands = self._hands
+        seat = (leader + len(played)) % 4
+        hand = hands[seat]
+        maximizing = seat % 2 == side
+        relevant = 0
+        for suit, card in self._following_moves(hand, played, leader, seat):
+            hand[suit] ^= card
+            played.append((suit, card))
+            if len(played) == 4:
+                winner = self._winner(played)
+                winner_seat = (leader + winner) % 4
+                result, cards = self._search(
+                    winner_seat, side, target - (winner_seat % 2 == side),
+                    remaining - 1)
+                cards |= self._trick_relevance(played, winner)
+            else:
+                result, cards = self._trick(
+                    leader, side, target, remaining, played)
+            played.pop()
+            hand[suit] ^= card
+            if result == maximizing:
+                return result, cards
+            relevant |= cards
+        return not maximizing, relevant
+
+    def _winner(self, played):
+        # Index of the card winning the trick so far
+        trump = self._trump
+        winner = 0
+        best_suit, best = played[0]
+        for n in range(1, len(played)):
+            suit, card = played[n]
+            if suit == best_suit:
+                if card > best:
+                    winner, best = n, card
+            elif suit == trump:
+                winner, best_suit, best = n, suit, card
+        return winner
+
+    def _leading_moves(self, seat):
+        # Leads ordered by a cheap estimate of their value: cashing a winner,
+        # leading towards a winner of the partner, then the rest from the
+        # lowest
+        hands = self._hands
+        hand = hands[seat]
+        partner = hands[(seat + 2) % 4]
+        scored = []
+        for suit in range(4):
+            mask = hand[suit]
+            if not mask:
+                continue
+            remaining = (
+                hands[0][suit] | hands[1][suit] | hands[2][suit] |
+                hands[3][suit])
+            top = _top(remaining)
+            for card in _moves(mask, remaining):
+                if card == top:
+                    score = 3
+                elif partner[suit] & top:
+                    score = 2
+                else:
+                    score = 0
+                scored.append((-score, card, suit))
+        scored.sort()
+        return [(suit, card) for _, card, suit in scored]
+
+    def _following_moves(self, hand, played, leader, seat):
+        hands = self._hands
+        led = played[0][0]
+        winner = self._winner(played)
+        best_suit, best = played[winner]
+        partner_winning = (leader + winner - seat) % 2 == 0
+        mask = hand[led]
+        if mask:
+            if not mask & (mask - 1):
+                return ((led, mask),)
+            # The cards played to the trick still separate the sequences
+            remaining = (
+                hands[0][led] | hands[1][led] | hands[2][led] | hands[3][led])
+            for suit, card in played:
+                if suit == led:
+                    remaining |= card
+            cards = _moves(mask, remaining)
+            if best_suit != led:
+                # Ruffed: every card loses, the lowest first
+                return [(led, card) for card in reversed(cards)]
+            # The cards are from the highest, so the winning ones come first
+            winning = [(led, card) for card in cards if card > best]
+            losing = [(led, card) for card in cards if card < best]
+            winning.reverse()
+            losing.reverse()
+        else:
+            trump = self._trump
+            winning = []
+            losing = []
+            for suit in range(4):
+                mask = hand[suit]
+                if not mask:
+                    continue
+                remaining = (
+                    hands[0][suit] | hands[1][suit] | hands[2][suit] |
+                    hands[3][suit])
+                for suit_, card in played:
+                    if suit_ == suit:
+                        remaining |= card
+                for card in reversed(_moves(mask, remaining)):
+                    if suit == trump and (best_suit != trump or card > best):
+                        winning.append((suit, card))
+                    else:
+                        losing.append((suit, card))
+            # Discards before the losing trumps, each from the lowest
+            losing.sort(key=lambda move: (move[0] == trump, move[1]))
+        if partner_winning:
+            # The partner is winning the trick: the lowest cards first
+            return losing + winning
+        # The cheapest card winning the trick, then the lowest cards
+        return winning[:1] + losing + winning[1:]
+
+
+def _hand_list(hands):
+    if isinstance(hands, dict):
+        return [hands[position] for position in POSITION_TAGS]
+    return hands
+
+
+def solve(hands, strain, leader, deadline=None):
+    """Return the tricks taken by the side of the player on lead
+
+    Keyword Arguments:
+    hands    -- dictionary from position to the cards of the position (see
+                hand_masks), or list of the hands in POSITION_TAGS order
+    strain   -- the strain in the short text representation ("S", "NT")
+    leader   -- the position on lead
+    deadline -- time after which TimeoutError is raised (optional)
+    """
+    return DoubleDummySolver(_hand_list(hands), strain, deadline).tricks(
+        leader)
+
+
+def declarer_tricks(hands, strain, declarer, deadline=None):
+    """Return the tricks taken by the declarer in strain
+
+    The opening lead is made by the left hand opponent of the declarer.
+
+    Keyword Arguments:
+    hands    -- the hands (see solve)
+    strain   -- the strain in the short text representation ("S", "NT")
+    declarer -- the position of the declarer
+    deadline -- time after which TimeoutError is raised (optional)
+    """
+    hands = _hand_list(hands)
+    index = POSITION_TAGS.index(declarer)
+    solver = DoubleDummySolver(hands, strain, deadline)
+    total = sum(_BIT_COUNTS[mask] for mask in solver._hands[index])
+    return total - solver.tricks((index + 1) % 4)
@@ -0,0 +1,240 @@
+"""Exact endgame solver with claim detection
+
+Near the end of a deal few cards are left, and the position is often fully
+known: the declarer sees the dummy, and the cards of the hidden hands follow
+from the cards played and the suits the players have shown out of. This
+module plays these positions without the LLM:
+
+- claim: the player on lead holds only top winners (no other unplayed card
+  of their suits is higher, and the opponents cannot ruff), so every card
+  wins and the highest card is played at once
+- endgame: the layouts of the hidden cards consistent with the hand sizes
+  and the voids shown are enumerated, and if the position is fully
+  determined (one layout) or every hand has at most max_cards cards left,
+  each allowed card (one of each equivalence class) is scored by the double
+  dummy solver over all layouts and the card taking the most tricks is
+  played
+
+The results of the solved positions are memoized, so the copilot and the
+autopilot asking for the same position, or the same layouts reached again,
+are answered from the cache. The solver runs under a time budget and leaves
+the decision open if it runs out.
+
+Classes:
+EndgameSolver -- endgame and claim decisions for the play rules
+"""
+
+import collections
+import itertools
+import math
+import time
+
+from bridgegui.double_dummy import (
+    RANKS, DoubleDummySolver, card_move, hand_masks, move_card)
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+from bridgegui.play_rules import (
+    CLAIM, ENDGAME, PlayDecision, played_cards, representatives)
+
+DEFAULT_MAX_CARDS = 4
+DEFAULT_MAX_LAYOUTS = 256
+DEFAULT_TIME_BUDGET = 2.0
+DEFAULT_CACHE_SIZE = 4096
+_FULL_SUIT = (1 << len(RANKS)) - 1
+_STRAINS = ("S", "H", "D", "C")
+
+
+def _bit_count(mask):
+    return bin(mask).count("1")
+
+
+class EndgameSolver:
+    """Endgame and claim decisions for the play rules
+
+    The solver is consulted by play_rules.PlayRules (see its endgame
+    argument) after the trivial rules.
+    """
+
+    def __init__(
+            self, max_cards=DEFAULT_MAX_CARDS, max_layouts=DEFAULT_MAX_LAYOUTS,
+            time_budget=DEFAULT_TIME_BUDGET):
+        """Initialize endgame solver
+
+        Keyword Arguments:
+        max_cards   -- the number of cards left per hand up to which the
+                       layouts of the hidden cards are solved
+        max_layouts -- the maximum number of layouts solved per decision
+        time_budget -- the time in seconds the solver may take per decision
+        """
+        self.max_cards = max_cards
+        self.max_layouts = max_layouts
+        self.time_budget = time_budget
+        self._cache = collections.OrderedDict()
+
+    def decide(self, position, allowed_cards, trick, hands, trump, tricks):
+        """Return the decision for a play, or None if the play is open
+
+        Keyword Arguments:
+        position      -- the position the card is played from
+        allowed_cards -- the allowed cards
+        trick         -- the plays of the current trick
+        hands         -- dictionary from position to the cards of the visible
+                         hands (cards already played are ignored)
+        trump         -- the index of the trump suit in SUIT_ORDER (None for
+                         notrump)
+        tricks        -- the trick objects of the deal so far (with cards
+                         key), the current trick included
+        """
+        played = played_cards(tricks)
+        for card in trick:
+            suit, mask = card_move(card["card"])
+            played[suit] |= mask
+        visible = {
+            position_: [
+                mask & ~done for mask, done in zip(hand_masks(cards), played)]
+            for position_, cards in hands.items()}
+        if not trick and position in visible:
+            decision = self._claim(position, visible, trump, played)
+            if decision is not None:
+                return decision
+        return self._solve_endgame(
+            position, allowed_cards, trick, hands, visible, trump, tricks,
+            played)
+
+    def _claim(self, position, visible, trump, played):
+        own = visible[position]
+        partner = POSITION_TAGS[(POSITION_TAGS.index(position) + 2) % 4]
+        # Unplayed cards of the other hands, and those the opponents may
+        # hold
+        others = [
+            _FULL_SUIT & ~(mask | done) for mask, done in zip(own, played)]
+        opponents = list(others)
+        if partner in visible:
+            opponents = [
+                mask & ~partner_mask
+                for mask, partner_mask in zip(others, visible[partner])]
+        for suit, mask in enumerate(own):
+            if not mask:
+                continue
+            if others[suit].bit_length() > (mask & -mask).bit_length():
+                return None
+            if trump is not None and suit != trump and opponents[trump]:
+                return None
+        if not any(own):
+            return None
+        suit = trump if trump is not None and own[trump] else next(
+            suit for suit, mask in enumerate(own) if mask)
+        return PlayDecision(
+            move_card(suit, 1 << (own[suit].bit_length() - 1)), CLAIM)
+
+    def _layouts(self, visible, counts, voids, played):
+        # The layouts of the hidden cards: lists of the hands in
+        # POSITION_TAGS order, or None if there are too many
+        unknown = [_FULL_SUIT & ~done for done in played]
+        for masks in visible.values():
+            unknown = [mask & ~hand for mask, hand in zip(unknown, masks)]
+        hidden = [
+            position for position in POSITION_TAGS
+            if position not in visible]
+        if sum(counts[position] for position in hidden) != sum(
+                _bit_count(mask) for mask in unknown):
+            return None
+        base = [visible.get(position) for position in POSITION_TAGS]
+        if len(hidden) == 1:
+            base[POSITION_TAGS.index(hidden[0])] = unknown
+            return [base]
+        if len(hidden) != 2:
+            return None
+        first, second = hidden
+        forced = [[0, 0, 0, 0], [0, 0, 0, 0]]
+        free = []
+        for suit, mask in enumerate(unknown):
+            if suit in voids[first] and suit in voids[second]:
+                if mask:
+                    return None
+            elif suit in voids[second]:
+                forced[0][suit] = mask
+            elif suit in voids[first]:
+                forced[1][suit] = mask
+            else:
+                free.extend(
+                    (suit, 1 << bit) for bit in range(len(RANKS))
+                    if mask >> bit & 1)
+        needed = counts[first] - sum(_bit_count(mask) for mask in forced[0])
+        if needed < 0 or needed > len(free):
+            return None
+        if math.comb(len(free), needed) > self.max_layouts:
+            return None
+        layouts = []
+        for chosen in itertools.combinations(free, needed):
+            hands = [list(forced[0]), list(forced[1])]
+            chosen = set(chosen)
+            for suit, card in free:
+                hands[0 if (suit, card) in chosen else 1][suit] |= card
+            layout = list(base)
+            layout[POSITION_TAGS.index(first)] = hands[0]
+            layout[POSITION_TAGS.index(second)] = hands[1]
+            layouts.append(layout)
+        return layouts
+
+    def _solve_endgame(
+            self, position, allowed_cards, trick, hands, visible, trump,
+            tricks, played):
+        counts = {position_: 13 for position_ in POSITION_TAGS}
+        voids = {position_: set() for position_ in POSITION_TAGS}
+        for trick_ in tricks or ():
+            plays = trick_.get("cards") or []
+            for play in plays:
+                counts[play["position"]] -= 1
+                if play["card"]["suit"] != plays[0]["card"]["suit"]:
+                    voids[play["position"]].add(
+                        SUIT_ORDER.index(plays[0]["card"]["suit"]))
+        if any(
+                sum(_bit_count(mask) for mask in masks) != counts[position_]
+                for position_, masks in visible.items()):
+            # The visible hands do not agree with the tricks
+            return None
+        layouts = self._layouts(visible, counts, voids, played)
+        if not layouts:
+            return None
+        if len(layouts) > 1 and max(counts.values()) > self.max_cards:
+            return None
+        leader = POSITION_TAGS.index(
+            trick[0]["position"] if trick else position)
+        if (leader + len(trick)) % 4 != POSITION_TAGS.index(position):
+            return None
+        strain = "NT" if trump is None else _STRAINS[trump]
+        moves = tuple(
+            card_move(card) for card in representatives(
+                position, allowed_cards, hands, played, trick))
+        played_moves = tuple(card_move(play["card"]) for play in trick)
+        deadline = time.time() + self.time_budget
+        totals = [0] * len(moves)
+        try:
+            for layout in layouts:
+                results = self._solve_layout(
+                    tuple(tuple(hand) for hand in layout), strain, leader,
+                    played_moves, moves, deadline)
+                totals = [
+                    total + result for total, result in zip(totals, results)]
+                if time.time() > deadline:
+                    return None
+        except TimeoutError:
+            return None
+        best = max(range(len(moves)), key=lambda n: (totals[n], -n))
+        return PlayDecision(move_card(*moves[best]), ENDGAME)
+
+    def _solve_layout(self, hands, strain, leader, played, moves, deadline):
+        # The tricks of the side in turn after each move in one layout,
+        # memoized
+        key = (hands, strain, leader, played, moves)
+        results = self._cache.get(key)
+        if results is None:
+            solver = DoubleDummySolver(
+                [list(hand) for hand in hands], strain, deadline)
+            tricks = solver.play_tricks(leader, played, moves)
+            results = self._cache[key] = tuple(tricks[move] for move in moves)
+            while len(self._cache) > DEFAULT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return results
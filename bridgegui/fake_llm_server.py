@@ -0,0 +1,353 @@
+"""Fake OpenAI compatible chat completions server
+
+The LLM integration and the langchain chat models talk to the OpenAI chat
+completions API. Pointing them at this server (the OPENAI_BASE_URL
+environment variable, see llm_integration) makes the LLM behaviour and
+latency reproducible offline:
+
+- the answers come from a responder function, for example a script of
+  answers or rules matching the prompt (see scripted and rule_based)
+- every request waits for a latency drawn from a distribution (see
+  fixed_latency, uniform_latency and lognormal_latency) before answering
+- the answers are streamed as server-sent events when asked to
+- 429 and 5xx errors are injected at random rates or for the next requests
+- the token usage is reported like the provider does, and accounted by the
+  server
+
+Tokens are counted with tiktoken if it is installed and estimated from the
+text length otherwise.
+
+Functions:
+count_tokens      -- number of tokens of a text
+scripted          -- responder answering from a script
+rule_based        -- responder answering by the first matching rule
+fixed_latency     -- latency distribution of a constant
+uniform_latency   -- latency distribution uniform in an interval
+lognormal_latency -- latency distribution log-normal around a median
+
+Classes:
+FakeLLMServer -- fake chat completions server running in a thread
+"""
+
+import itertools
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its data cannot be loaded
+    _ENCODING = None
+
+DEFAULT_RESPONSE = '{"type": "pass"}'
+_COMPLETIONS_PATHS = ("/v1/chat/completions", "/chat/completions")
+_ERROR_TYPES = {
+    429: ("rate_limit_exceeded", "Rate limit reached"),
+    500: ("server_error", "The server had an error"),
+    502: ("server_error", "Bad gateway"),
+    503: ("server_error", "The engine is currently overloaded"),
+}
+_PIECE = re.compile(r"\s*\S+|\s+$")
+
+
+def count_tokens(text):
+    """Return the number of tokens of text"""
+    if _ENCODING is None:
+        return (len(text) + 3) // 4
+    return len(_ENCODING.encode(text))
+
+
+def scripted(responses, default=DEFAULT_RESPONSE):
+    """Return responder answering with the responses in order
+
+    The default is answered when the script is exhausted.
+    """
+    iterator = iter(responses)
+    lock = threading.Lock()
+
+    def respond(messages, model):
+        with lock:
+            return next(iterator, default)
+    return respond
+
+
+def rule_based(rules, default=DEFAULT_RESPONSE):
+    """Return responder answering by the first rule matching the prompt
+
+    Keyword Arguments:
+    rules   -- iterable of (pattern, answer) pairs, where the regular
+               expression is searched in the last message and the answer is
+               either text or function of the match object
+    default -- the answer if no rule matches
+    """
+    rules = [(re.compile(pattern), answer) for pattern, answer in rules]
+
+    def respond(messages, model):
+        prompt = _content(messages[-1]) if messages else ""
+        for pattern, answer in rules:
+            match = pattern.search(prompt)
+            if match:
+                return answer(match) if callable(answer) else answer
+        return default
+    return respond
+
+
+def fixed_latency(seconds):
+    """Return latency distribution of constant seconds"""
+    return lambda generator: seconds
+
+
+def uniform_latency(low, high):
+    """Return latency distribution uniform between low and high seconds"""
+    return lambda generator: generator.uniform(low, high)
+
+
+def lognormal_latency(median, sigma=0.5):
+    """Return latency distribution log-normal around median seconds
+
+    The long right tail is how provider latencies are distributed.
+    """
+    mu = math.log(median)
+    return lambda generator: generator.lognormvariate(mu, sigma)
+
+
+def _content(message):
+    content = message.get("content") or ""
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # The request handler of the server (the fake server is the server
+    # attribute of the HTTP server)
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.server.fake._handle(self)
+
+    def do_GET(self):
+        self.server.fake._send_json(self, 404, _error(404, "Not found"))
+
+
+def _error(status, message):
+    kind = _ERROR_TYPES.get(status, ("server_error", message))[0]
+    return {"error": {"message": message, "type": kind, "code": kind}}
+
+
+class FakeLLMServer:
+    """Fake OpenAI compatible chat completions server running in a thread"""
+
+    def __init__(
+            self, responder=None, latency=None, error_rates=None,
+            chunk_interval=0.0, seed=None, host="127.0.0.1", port=0):
+        """Initialize the server
+
+        Keyword Arguments:
+        responder      -- function of the messages and the model returning
+                          the answer text (by default DEFAULT_RESPONSE)
+        latency        -- function of a random generator returning the
+                          seconds before answering (by default no latency)
+        error_rates    -- dictionary from HTTP status (429 or 5xx) to the
+                          fraction of requests failed with it
+        chunk_interval -- the seconds between the streamed chunks
+        seed           -- the seed of the latencies and errors (optional)
+        host           -- the host the server listens on
+        port           -- the port the server listens on (by default any
+                          free port)
+        """
+        self.responder = responder or (
+            lambda messages, model: DEFAULT_RESPONSE)
+        self.latency = latency
+        self.error_rates = dict(error_rates or {})
+        self.chunk_interval = chunk_interval
+        self._generator = random.Random(seed)
+        self._failures = []
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("requests", "errors", "prompt_tokens", "completion_tokens"), 0)
+        self._latencies = []
+        self._ids = itertools.count(1)
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Return the base URL of the API (the OPENAI_BASE_URL value)"""
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d/v1" % (host, port)
+
+    def start(self):
+        """Serve in a new thread"""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake LLM server",
+            daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def fail_next(self, status, count=1):
+        """Fail the next count requests with the HTTP status"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def statistics(self):
+        """Return the statistics of the server
+
+        Returns dictionary with the numbers of requests, errors, prompt and
+        completion tokens, and the latencies applied in seconds.
+        """
+        with self._lock:
+            return dict(self._counters, latencies=list(self._latencies))
+
+    def _draw(self):
+        # The injected failure (or None) and the latency of a request
+        with self._lock:
+            self._counters["requests"] += 1
+            if self._failures:
+                failure = self._failures.pop(0)
+            else:
+                failure = None
+                draw = self._generator.random()
+                for status, rate in sorted(self.error_rates.items()):
+                    if draw < rate:
+                        failure = status
+                        break
+                    draw -= rate
+            latency = self.latency(self._generator) if self.latency else 0.0
+            if failure is not None:
+                self._counters["errors"] += 1
+            else:
+                self._latencies.append(latency)
+        return failure, latency
+
+    def _handle(self, handler):
+        path = handler.path.split("?", 1)[0]
+        try:
+            length = int(handler.headers.get("Content-Length") or 0)
+            request = json.loads(handler.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(handler, 400, _error(400, "Invalid JSON body"))
+            return
+        if path not in _COMPLETIONS_PATHS:
+            self._send_json(handler, 404, _error(404, "Not found"))
+            return
+        failure, latency = self._draw()
+        if failure is not None:
+            self._send_json(
+                handler, failure,
+                _error(failure, _ERROR_TYPES.get(
+                    failure, (None, "Injected error"))[1]),
+                {"retry-after-ms": "10"} if failure == 429 else None)
+            return
+        if latency:
+            time.sleep(latency)
+        messages = request.get("messages") or []
+        model = request.get("model", "")
+        text = self.responder(messages, model)
+        usage = {
+            "prompt_tokens": sum(count_tokens(_content(message))
+                                 for message in messages),
+            "completion_tokens": count_tokens(text),
+        }
+        usage["total_tokens"] = (
+            usage["prompt_tokens"] + usage["completion_tokens"])
+        with self._lock:
+            self._counters["prompt_tokens"] += usage["prompt_tokens"]
+            self._counters["completion_tokens"] += usage["completion_tokens"]
+        identifier = "chatcmpl-fake-%d" % next(self._ids)
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get(
+                "include_usage")
+            self._stream(
+                handler, identifier, model, text,
+                usage if include_usage else None)
+            return
+        self._send_json(handler, 200, {
+            "id": identifier, "object": "chat.completion",
+            "created": int(time.time()), "model": model,
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": text}}],
+            "usage": usage})
+
+    def _send_json(self, handler, status, body, headers=None):
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.send_header("x-request-id", str(uuid.uuid4()))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _stream(self, handler, identifier, model, text, usage):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None, usage=None):
+            body = {
+                "id": identifier, "object": "chat.completion.chunk",
+                "created": created, "model": model,
+                "choices": [] if delta is None else [{
+                    "index": 0, "delta": delta,
+                    "finish_reason": finish_reason}]}
+            if usage is not None:
+                body["usage"] = usage
+            handler.wfile.write(b"data: " + json.dumps(body).encode() +
+                                b"\n\n")
+            handler.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        for piece in _PIECE.findall(text):
+            if self.chunk_interval:
+                time.sleep(self.chunk_interval)
+            chunk({"content": piece})
+        chunk({}, "stop")
+        if usage is not None:
+            chunk(None, usage=usage)
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+def main(port=8000, latency=0.0):
+    """Serve the default answer on the port until interrupted"""
+    server = FakeLLMServer(
+        latency=fixed_latency(float(latency)) if float(latency) else None,
+        port=int(port))
+    print("OPENAI_BASE_URL=%s" % server.base_url)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,387 @@
+"""Inference of the hidden hands during the play
+
+The prompts of the card play describe the hidden hands only through the raw
+bidding and trick history, so whatever the play has shown is reconstructed
+on every call. This module keeps a weight for every seat and every card
+instead, and updates the weights as the cards are played:
+
+- the weights start from the hand ranges shown by the auction (see
+  hand_ranges): a card of a suit is weighted by the expected length of the
+  seat in the suit, and the honors by the expected HCP of the seat
+- the own hand and the dummy are known cards
+- a played card is removed from every seat
+- a player not following suit has shown out, and holds no card of the suit
+- a defender playing an honor third in hand denies the card below it (the
+  lowest of equal honors is played third in hand)
+- a spot card discarded, or played by a defender on the lead of the partner,
+  is an attitude signal (with standard carding high encourages, with upside
+  down carding low encourages), raising or lowering the weights of the
+  honors of the suit
+
+Every update touches at most the cards of one suit. The deals consistent
+with the weights are sampled for the solvers (the cards are dealt to the
+hidden seats in proportion to the weights, and the deals the hand ranges
+exclude are rejected), and a compact summary of the inference is given for
+the prompts and the copilot.
+
+Classes:
+HandInference -- weights of the hidden cards, updated on each play
+"""
+
+import random
+
+from bridgegui.double_dummy import RANKS
+from bridgegui.hand_ranges import HAND_CARDS, UNKNOWN_RANGE
+from bridgegui.notation import (
+    POSITION_FORMATS, POSITION_TAGS, RANK_FORMATS, SUIT_FORMATS, SUIT_ORDER)
+
+STANDARD = "standard"
+UPSIDE_DOWN = "upside down"
+CONVENTIONS = (STANDARD, UPSIDE_DOWN)
+
+# Weight factors of the honors of a suit after an attitude signal, and of
+# the card denied by an honor played third in hand
+SIGNAL_FACTOR = 2.0
+DENIAL_FACTOR = 0.25
+# Probability from which an honor is listed in the summary
+LIKELY_PROBABILITY = 0.7
+
+_AVERAGE_HCP = 10
+_FITTING_ROUNDS = 50
+_SUIT_CARDS = len(RANKS)
+_DECK_CARDS = len(SUIT_ORDER) * _SUIT_CARDS
+_TEN = RANKS.index("10")
+_JACK = RANKS.index("jack")
+# Spot cards below the six are low signals, from the seven up high signals
+_LOW_SIGNAL = RANKS.index("5")
+_HIGH_SIGNAL = RANKS.index("7")
+_PLAYED = -1
+_UNKNOWN = None
+
+
+def _index(card):
+    return (SUIT_ORDER.index(card["suit"]) * _SUIT_CARDS +
+            RANKS.index(card["rank"]))
+
+
+def _format_index(index):
+    suit, bit = divmod(index, _SUIT_CARDS)
+    return SUIT_FORMATS[SUIT_ORDER[suit]] + RANK_FORMATS[RANKS[bit]]
+
+
+def _features(masks):
+    # (hcp, spades, hearts, diamonds, clubs) of the suit masks of a hand
+    hcp = sum(
+        (mask >> (_JACK + n) & 1) * (n + 1)
+        for mask in masks for n in range(4))
+    return (hcp,) + tuple(bin(mask).count("1") for mask in masks)
+
+
+class HandInference:
+    """Weights of the hidden cards, updated on each play"""
+
+    def __init__(self, position, hand, declarer=None, ranges=None,
+                 convention=STANDARD):
+        """Initialize hand inference
+
+        Keyword Arguments:
+        position   -- the position of the player
+        hand       -- the cards of the player
+        declarer   -- the position of the declarer (optional, the signals
+                      of the defenders are read only if it is known)
+        ranges     -- dictionary from position to HandRange shown by the
+                      auction (see hand_ranges.infer_hand_ranges), optional
+        convention -- the carding convention of the signals (one of
+                      CONVENTIONS)
+        """
+        if convention not in CONVENTIONS:
+            raise ValueError("Unknown carding convention: %r" % convention)
+        self.position = position
+        self.convention = convention
+        self._seat = POSITION_TAGS.index(position)
+        self._defenders = ()
+        if declarer is not None:
+            seat = POSITION_TAGS.index(declarer)
+            self._defenders = ((seat + 1) % 4, (seat + 3) % 4)
+        self._ranges = [None] * 4
+        if ranges:
+            for seat, position_ in enumerate(POSITION_TAGS):
+                range_ = ranges.get(position_, UNKNOWN_RANGE)
+                # A seat whose calls contradict each other shows nothing
+                if all(map(
+                        lambda low, high: low <= high, range_.low,
+                        range_.high)):
+                    self._ranges[seat] = range_
+                else:
+                    self._ranges[seat] = UNKNOWN_RANGE
+        self._holders = [_UNKNOWN] * _DECK_CARDS
+        self._left = [HAND_CARDS] * 4
+        self._known = [0] * 4
+        self._played = [[0, 0, 0, 0] for _ in range(4)]
+        self._voids = [set() for _ in range(4)]
+        self._trick = []
+        self._probabilities = None
+        self._weights = [self._prior(seat) for seat in range(4)]
+        self._learn(self._seat, hand)
+
+    def _prior(self, seat):
+        # The weights of the cards of a seat from its hand range, the honors
+        # weighted against a hand of average strength
+        range_ = self._ranges[seat]
+        if range_ is None:
+            return [1.0] * _DECK_CARDS
+        honor_factor = ((range_.low[0] + range_.high[0]) / 2 + 1) / (
+            _AVERAGE_HCP + 1)
+        weights = []
+        for suit in range(len(SUIT_ORDER)):
+            low, high = range_.low[suit + 1], range_.high[suit + 1]
+            length = (low + high) / 2 if high else 0.0
+            weights.extend(
+                length * (honor_factor if bit >= _JACK else 1.0)
+                for bit in range(_SUIT_CARDS))
+        return weights
+
+    def _learn(self, seat, cards):
+        for card in cards:
+            index = _index(card)
+            if self._holders[index] is not _UNKNOWN:
+                continue
+            self._holders[index] = seat
+            self._known[seat] += 1
+            self._probabilities = None
+            for seat_ in range(4):
+                self._weights[seat_][index] = float(seat_ == seat)
+
+    def reveal(self, position, cards):
+        """Record the cards of a hand becoming known (the dummy)
+
+        Keyword Arguments:
+        position -- the position of the hand
+        cards    -- the cards of the hand not yet played
+        """
+        self._learn(POSITION_TAGS.index(position), cards)
+
+    def play(self, position, card):
+        """Update the weights with a card played
+
+        The cards are expected in the order of the play: the plays of the
+        current trick are kept to recognize show-outs and signals.
+
+        Keyword Arguments:
+        position -- the position the card is played from
+        card     -- the card
+        """
+        seat = POSITION_TAGS.index(position)
+        index = _index(card)
+        suit, bit = divmod(index, _SUIT_CARDS)
+        if self._holders[index] == seat:
+            self._known[seat] -= 1
+        self._holders[index] = _PLAYED
+        self._probabilities = None
+        for weights in self._weights:
+            weights[index] = 0.0
+        self._left[seat] -= 1
+        self._played[seat][suit] |= 1 << bit
+        if len(self._trick) == 4:
+            self._trick = []
+        trick = self._trick
+        trick.append((seat, suit, bit))
+        if len(trick) == 1:
+            return
+        led = trick[0][1]
+        defender = seat in self._defenders
+        if suit != led:
+            self._show_out(seat, led)
+            if defender:
+                self._signal(seat, suit, bit)
+        elif defender and trick[0][0] == (seat + 2) % 4:
+            self._signal(seat, suit, bit)
+        if defender and suit == led and len(trick) == 3 and bit >= _TEN:
+            self._scale(seat, suit * _SUIT_CARDS + bit - 1, DENIAL_FACTOR)
+
+    def _show_out(self, seat, suit):
+        self._voids[seat].add(suit)
+        weights = self._weights[seat]
+        for index in range(suit * _SUIT_CARDS, (suit + 1) * _SUIT_CARDS):
+            if self._holders[index] is _UNKNOWN:
+                weights[index] = 0.0
+
+    def _signal(self, seat, suit, bit):
+        if bit >= _TEN or _LOW_SIGNAL < bit < _HIGH_SIGNAL:
+            return
+        encourage = (bit >= _HIGH_SIGNAL) == (self.convention == STANDARD)
+        factor = SIGNAL_FACTOR if encourage else 1 / SIGNAL_FACTOR
+        for bit_ in range(_JACK, _SUIT_CARDS):
+            self._scale(seat, suit * _SUIT_CARDS + bit_, factor)
+
+    def _scale(self, seat, index, factor):
+        if self._holders[index] is _UNKNOWN:
+            self._weights[seat][index] *= factor
+
+    def _hidden(self):
+        return [
+            seat for seat in range(4) if self._left[seat] > self._known[seat]]
+
+    def _marginals(self):
+        # The probabilities of the unknown cards for each seat: the weights
+        # balanced (by iterative proportional fitting) so that every card is
+        # in one hidden hand and every hand holds the number of cards it has
+        # left
+        if self._probabilities is not None:
+            return self._probabilities
+        hidden = self._hidden()
+        slots = [self._left[seat] - self._known[seat] for seat in range(4)]
+        unknown = [
+            index for index, holder in enumerate(self._holders)
+            if holder is _UNKNOWN]
+        probabilities = [list(weights) for weights in self._weights]
+        for _ in range(_FITTING_ROUNDS):
+            for seat in hidden:
+                total = sum(probabilities[seat][index] for index in unknown)
+                if total:
+                    factor = slots[seat] / total
+                    for index in unknown:
+                        probabilities[seat][index] *= factor
+            for index in unknown:
+                total = sum(probabilities[seat][index] for seat in hidden)
+                if total:
+                    for seat in hidden:
+                        probabilities[seat][index] /= total
+        self._probabilities = probabilities
+        return probabilities
+
+    def probability(self, position, card):
+        """Return the probability that a seat holds a card
+
+        Keyword Arguments:
+        position -- the position of the seat
+        card     -- the card
+        """
+        index = _index(card)
+        holder = self._holders[index]
+        seat = POSITION_TAGS.index(position)
+        if holder is not _UNKNOWN:
+            return float(holder == seat)
+        if seat not in self._hidden():
+            return 0.0
+        return self._marginals()[seat][index]
+
+    def expected_lengths(self, position):
+        """Return the expected numbers of cards left of a seat in each suit
+
+        The numbers are in SUIT_ORDER. The unknown cards are counted with
+        their probability (see probability).
+
+        Keyword Arguments:
+        position -- the position of the seat
+        """
+        seat = POSITION_TAGS.index(position)
+        hidden = seat in self._hidden()
+        lengths = [0.0] * len(SUIT_ORDER)
+        for index, holder in enumerate(self._holders):
+            if holder is _UNKNOWN:
+                if hidden:
+                    lengths[index // _SUIT_CARDS] += (
+                        self._marginals()[seat][index])
+            elif holder == seat:
+                lengths[index // _SUIT_CARDS] += 1
+        return lengths
+
+    def sample(self, count, generator=None, max_attempts=None):
+        """Sample deals consistent with the inference
+
+        The unknown cards are dealt to the hidden seats (the most
+        constrained cards first), each to a seat with cards left to receive
+        in proportion to its weight, and the deals whose hands (with the
+        cards played) are out of the hand ranges are rejected. Returns a
+        list of at most count deals, each a list of the suit masks of the
+        cards left in the four hands in POSITION_TAGS order (see
+        double_dummy.hand_masks). Fewer deals are returned if max_attempts
+        deals are rejected first.
+
+        Keyword Arguments:
+        count        -- the number of deals
+        generator    -- the random number generator (optional)
+        max_attempts -- the maximum number of deals tried (by default 100
+                        per deal)
+        """
+        generator = generator or random.Random()
+        if max_attempts is None:
+            max_attempts = 100 * count
+        hidden = self._hidden()
+        unknown = [
+            index for index, holder in enumerate(self._holders)
+            if holder is _UNKNOWN]
+        slots = [self._left[seat] - self._known[seat] for seat in range(4)]
+        if sum(slots[seat] for seat in hidden) != len(unknown):
+            return []
+        base = [[0, 0, 0, 0] for _ in range(4)]
+        for index, holder in enumerate(self._holders):
+            if holder is not _UNKNOWN and holder != _PLAYED:
+                base[holder][index // _SUIT_CARDS] |= 1 << (
+                    index % _SUIT_CARDS)
+        unknown.sort(key=lambda index: sum(
+            1 for seat in hidden if self._weights[seat][index]))
+        deals = []
+        for _ in range(max_attempts):
+            if len(deals) == count:
+                break
+            deal = self._deal(hidden, unknown, list(slots), base, generator)
+            if deal is not None:
+                deals.append(deal)
+        return deals
+
+    def _deal(self, hidden, unknown, slots, base, generator):
+        deal = [list(masks) for masks in base]
+        for index in unknown:
+            choices = [
+                (seat, self._weights[seat][index] * slots[seat])
+                for seat in hidden if slots[seat]]
+            total = sum(weight for _, weight in choices)
+            if not total:
+                return None
+            point = generator.random() * total
+            for seat, weight in choices:
+                point -= weight
+                if point < 0:
+                    break
+            slots[seat] -= 1
+            deal[seat][index // _SUIT_CARDS] |= 1 << (index % _SUIT_CARDS)
+        for seat in hidden:
+            range_ = self._ranges[seat]
+            if range_ is not None and not range_.contains(_features([
+                    mask | played
+                    for mask, played in zip(deal[seat], self._played[seat])
+            ])):
+                return None
+        return deal
+
+    def summary(self):
+        """Return compact text summary of the hidden hands
+
+        For each hidden seat the summary lists the expected number of cards
+        left in each suit and the honors it likely holds ("W: S 2.4, H void,
+        D 3.1, C 1.5 (likely HK, DQ)").
+        """
+        parts = []
+        for seat in self._hidden():
+            position = POSITION_TAGS[seat]
+            lengths = self.expected_lengths(position)
+            suits = ", ".join(
+                "%s %s" % (
+                    SUIT_FORMATS[SUIT_ORDER[suit]],
+                    "void" if suit in self._voids[seat] else
+                    "%.1f" % length)
+                for suit, length in enumerate(lengths))
+            probabilities = self._marginals()[seat]
+            likely = [
+                _format_index(suit * _SUIT_CARDS + bit)
+                for suit in range(len(SUIT_ORDER))
+                for bit in reversed(range(_JACK, _SUIT_CARDS))
+                if self._holders[suit * _SUIT_CARDS + bit] is _UNKNOWN and
+                probabilities[suit * _SUIT_CARDS + bit] >=
+                LIKELY_PROBABILITY]
+            parts.append("%s: %s%s" % (
+                POSITION_FORMATS[position], suits,
+                " (likely %s)" % ", ".join(likely) if likely else ""))
+        return "; ".join(parts) if parts else "all hands known"
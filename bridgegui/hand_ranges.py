@@ -0,0 +1,265 @@
+"""Hand ranges inferred from the auction
+
+Every call of the bidding system promises a range of HCP and suit lengths.
+This module stores these promises in a trie keyed by the auction prefix, and
+infers the hand range of every seat for an auction by intersecting the
+promises of its calls and propagating the intervals between the seats (the
+deal has 40 HCP and 13 cards of each suit, every hand has 13 cards).
+
+The ranges describe what the partner and the opponents have shown, so the
+prompts of the subsequent bids use them instead of reconstructing the
+analyses from the raw auction, and the deal sampler uses them to draw hands
+consistent with the auction.
+
+Functions:
+infer_hand_ranges    -- infer the hand range of every seat for an auction
+format_hand_range    -- compact text representation of a hand range
+describe_hand_ranges -- team and opponent analyses from the hand ranges
+
+Classes:
+HandRange   -- ranges of HCP and suit lengths of a hand
+AuctionTrie -- promises of the calls of the bidding system by auction prefix
+"""
+
+import collections
+
+from bridgegui.auction import PASS_CODE, AuctionState, encode_call
+from bridgegui.bidding_system import (
+    FEATURES, MAX_FEATURES, SUITS, compile_system, hand_features)
+from bridgegui.notation import POSITION_TAGS
+
+# HCP and cards of each suit in the deal
+DEAL_TOTALS = (40, 13, 13, 13, 13)
+HAND_CARDS = 13
+
+
+class HandRange(collections.namedtuple("HandRange", ("low", "high"))):
+    """Ranges of HCP and suit lengths of a hand
+
+    The low and high fields are tuples of the lower and upper bounds of the
+    features (see bidding_system.FEATURES: HCP, spades, hearts, diamonds,
+    clubs).
+    """
+
+    __slots__ = ()
+
+    def intersect(self, other):
+        """Return the intersection with another hand range"""
+        return HandRange(
+            tuple(map(max, self.low, other.low)),
+            tuple(map(min, self.high, other.high)))
+
+    def hull(self, other):
+        """Return the smallest range containing both hand ranges"""
+        return HandRange(
+            tuple(map(min, self.low, other.low)),
+            tuple(map(max, self.high, other.high)))
+
+    def contains(self, features):
+        """Determine if hand features (see hand_features) are in the range"""
+        return all(
+            low <= value <= high
+            for low, value, high in zip(self.low, features, self.high))
+
+
+UNKNOWN_RANGE = HandRange((0,) * len(FEATURES), MAX_FEATURES)
+
+
+class _Node:
+    __slots__ = ("children", "promises")
+
+    def __init__(self):
+        self.children = {}
+        self.promises = {}
+
+
+class AuctionTrie:
+    """Promises of the calls of the bidding system by auction prefix
+
+    Each node is an auction prefix (leading passes left out, as in the
+    decision table). The promise of a call at a node is the smallest hand
+    range containing the constraints of all rules giving the call after the
+    prefix.
+    """
+
+    def __init__(self, index=None):
+        """Initialize auction trie
+
+        Keyword Arguments:
+        index -- the compiled bidding system (see
+                 bidding_system.compile_system), by default the system of the
+                 decision table
+        """
+        if index is None:
+            index = compile_system()
+        self._root = _Node()
+        for codes, rules in index.items():
+            node = self._node(codes)
+            for rule in rules:
+                code = encode_call(rule.call)
+                promise = HandRange(rule.low, rule.high)
+                if code in node.promises:
+                    promise = promise.hull(node.promises[code])
+                node.promises[code] = promise
+                node.children.setdefault(code, _Node())
+
+    def _node(self, codes):
+        node = self._root
+        for code in codes:
+            node = node.children.setdefault(code, _Node())
+        return node
+
+    def walk(self, codes):
+        """Return the promises of the calls of an auction
+
+        Returns tuple (promises, complete), where promises has the promise of
+        each call (None if the call promises nothing), and complete tells if
+        every call was made after an auction prefix in the trie. The calls
+        after the auction leaves the trie promise nothing.
+
+        Keyword Arguments:
+        codes -- the call codes of the auction
+        """
+        promises = []
+        complete = True
+        node = self._root
+        for code in codes:
+            if node is None:
+                promises.append(None)
+                complete = False
+                continue
+            promises.append(node.promises.get(code))
+            # Leading passes do not leave the root
+            if node is not self._root or code != PASS_CODE:
+                node = node.children.get(code)
+        return promises, complete
+
+
+AUCTION_TRIE = AuctionTrie()
+
+
+def _propagate(lows, highs):
+    # Interval propagation between the features of a hand and between the
+    # hands of the deal until nothing changes, or until some range is empty
+    # (the bounds of a contradiction would be narrowed without end)
+    changed = True
+    while changed:
+        if any(low[feature] > high[feature]
+               for low, high in zip(lows, highs)
+               for feature in range(len(FEATURES))):
+            return
+        changed = False
+        for seat in range(4):
+            low, high = lows[seat], highs[seat]
+            low_cards, high_cards = sum(low[1:]), sum(high[1:])
+            for feature in range(1, len(FEATURES)):
+                new_low = max(
+                    low[feature], HAND_CARDS - (high_cards - high[feature]))
+                new_high = min(
+                    high[feature], HAND_CARDS - (low_cards - low[feature]))
+                if (new_low, new_high) != (low[feature], high[feature]):
+                    low[feature], high[feature] = new_low, new_high
+                    low_cards, high_cards = sum(low[1:]), sum(high[1:])
+                    changed = True
+        for feature, total in enumerate(DEAL_TOTALS):
+            low_total = sum(low[feature] for low in lows)
+            high_total = sum(high[feature] for high in highs)
+            for seat in range(4):
+                low, high = lows[seat], highs[seat]
+                new_low = max(
+                    low[feature], total - (high_total - high[feature]))
+                new_high = min(
+                    high[feature], total - (low_total - low[feature]))
+                if (new_low, new_high) != (low[feature], high[feature]):
+                    low_total += new_low - low[feature]
+                    high_total += new_high - high[feature]
+                    low[feature], high[feature] = new_low, new_high
+                    changed = True
+
+
+def infer_hand_ranges(auction, hand=None, position=None, trie=AUCTION_TRIE):
+    """Infer the hand range of every seat for an auction
+
+    Returns tuple (ranges, complete), where ranges is a dictionary from
+    position to HandRange and complete tells if every call of the auction was
+    made after an auction prefix known to the bidding system. If a call
+    contradicts the earlier calls of the same seat, the range of the seat may
+    be empty (some low bound above the high bound).
+
+    Keyword Arguments:
+    auction  -- the auction state, or the bidding history
+    hand     -- the hand of the player (optional)
+    position -- the position of the player (required with hand)
+    trie     -- the auction trie of the bidding system
+    """
+    if not isinstance(auction, AuctionState):
+        auction = AuctionState.from_history(auction)
+    ranges = [UNKNOWN_RANGE] * 4
+    promises, complete = trie.walk(auction.codes)
+    if promises:
+        opener = POSITION_TAGS.index(auction.opener)
+        for n, promise in enumerate(promises):
+            if promise is not None:
+                seat = (opener + n) % 4
+                ranges[seat] = ranges[seat].intersect(promise)
+    if hand:
+        features = hand_features(hand)
+        ranges[POSITION_TAGS.index(position)] = HandRange(features, features)
+    lows = [list(range_.low) for range_ in ranges]
+    highs = [list(range_.high) for range_ in ranges]
+    _propagate(lows, highs)
+    return {
+        position_: HandRange(tuple(lows[seat]), tuple(highs[seat]))
+        for seat, position_ in enumerate(POSITION_TAGS)}, complete
+
+
+def _format_interval(low, high, maximum):
+    if low == high:
+        return "%d" % low
+    if high >= maximum:
+        return "%d+" % low
+    return "%d-%d" % (low, high)
+
+
+def format_hand_range(hand_range):
+    """Return compact text representation of hand range
+
+    The representation lists the HCP and the suit lengths that are
+    constrained ("12-18 HCP, S 5+, H 0-3"), or "no information".
+    """
+    low, high = hand_range
+    parts = []
+    if (low[0], high[0]) != (0, MAX_FEATURES[0]):
+        parts.append(
+            "%s HCP" % _format_interval(low[0], high[0], MAX_FEATURES[0]))
+    for feature, suit in enumerate(SUITS, 1):
+        if (low[feature], high[feature]) != (0, MAX_FEATURES[feature]):
+            parts.append("%s %s" % (
+                suit, _format_interval(
+                    low[feature], high[feature], MAX_FEATURES[feature])))
+    return ", ".join(parts) if parts else "no information"
+
+
+def describe_hand_ranges(ranges, position):
+    """Return team and opponent analyses from the hand ranges
+
+    Returns tuple (your_team_analysis, opponent_analysis) with the hand
+    ranges of the own side and the opponents, for the prompts of the
+    subsequent bids.
+
+    Keyword Arguments:
+    ranges   -- the hand ranges (see infer_hand_ranges)
+    position -- the position of the player
+    """
+    index = POSITION_TAGS.index(position)
+
+    def describe(label, offset):
+        position_ = POSITION_TAGS[(index + offset) % 4]
+        return "%s (%s): %s." % (
+            label, position_, format_hand_range(ranges[position_]))
+
+    your_team_analysis = "Shown by the auction: %s %s" % (
+        describe("You", 0), describe("Partner", 2))
+    opponent_analysis = "Shown by the auction: %s %s" % (
+        describe("Left hand opponent", 1), describe("Right hand opponent", 3))
+    return your_team_analysis, opponent_analysis
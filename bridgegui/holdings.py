@@ -0,0 +1,245 @@
+"""Per-suit holding lookup tables
+
+A holding of one suit is a 13-bit mask (bit 0 is the two, bit 12 the ace, as
+in double_dummy), so there are only 8192 of them. The hand evaluation
+features of every holding are precomputed into tables of one byte per
+holding, and a hand is evaluated by reading the four holdings of its suits
+and summing.
+
+The tables are generated by build_tables and shipped as package data
+(data/holdings.bin, regenerated with python -m bridgegui.holdings). The
+fields are:
+
+hcp          -- high card points (ace 4, king 3, queen 2, jack 1)
+length       -- number of cards
+top_honors   -- number of the ace, king and queen held
+quick_tricks -- quick tricks in half tricks (AK 4, AQ 3, A and KQ 2, Kx 1)
+losers       -- losing trick count (losers among the top min(length, 3)
+                cards)
+stopper      -- stopper quality for notrump (2 for A, Kx, Qxx or Jxxx, 1 for
+                Qx or Jxx, 0 otherwise)
+sequence     -- number of touching cards headed by the highest card
+
+The scalar functions read the tables as arrays, and evaluate_batch reads the
+same tables as NumPy arrays for many hands at once (NumPy is only needed for
+the batch path).
+
+Functions:
+build_tables        -- compute the holding tables
+holding_value       -- value of a field for a holding
+evaluate_hand       -- sums of the fields over the suits of a hand
+hand_hcp            -- high card points of a hand
+suit_lengths        -- suit lengths of a hand
+suit_distribution   -- distribution string as in utils2.get_suit_distribution
+dominant_suit       -- dominant suit as in utils2.dominant_suit_function
+evaluate_batch      -- evaluate many hands with NumPy
+"""
+
+import array
+import os
+
+import pkg_resources
+
+from bridgegui.double_dummy import hand_masks
+from bridgegui.notation import SUIT_ORDER
+
+HOLDINGS = 1 << 13
+HOLDING_FIELDS = (
+    "hcp", "length", "top_honors", "quick_tricks", "losers", "stopper",
+    "sequence")
+DATA_FILE = os.path.join("data", "holdings.bin")
+NO_DOMINANT_SUIT = "No dominant suit"
+
+_ACE, _KING, _QUEEN, _JACK = 1 << 12, 1 << 11, 1 << 10, 1 << 9
+_HCP_BITS = ((_ACE, 4), (_KING, 3), (_QUEEN, 2), (_JACK, 1))
+
+
+def _cards_from_top(mask):
+    return [bit for bit in range(12, -1, -1) if mask >> bit & 1]
+
+
+def _quick_tricks(mask, length):
+    if mask & _ACE:
+        if mask & _KING:
+            return 4
+        return 3 if mask & _QUEEN else 2
+    if mask & _KING:
+        if mask & _QUEEN:
+            return 2
+        return 1 if length >= 2 else 0
+    return 0
+
+
+def _losers(mask, length):
+    top = min(length, 3)
+    honors = (_ACE, _KING, _QUEEN)[:top]
+    return top - sum(1 for honor in honors if mask & honor)
+
+
+def _stopper(mask, length):
+    if mask & _ACE or mask & _KING and length >= 2 or \
+            mask & _QUEEN and length >= 3 or mask & _JACK and length >= 4:
+        return 2
+    if mask & _QUEEN and length == 2 or mask & _JACK and length == 3:
+        return 1
+    return 0
+
+
+def _sequence(cards):
+    count = 0
+    for n, bit in enumerate(cards):
+        if bit != cards[0] - n:
+            break
+        count += 1
+    return count
+
+
+def build_tables():
+    """Compute the holding tables
+
+    Returns dictionary from field (see HOLDING_FIELDS) to bytes with the value
+    of the field for each holding.
+    """
+    tables = {field: bytearray(HOLDINGS) for field in HOLDING_FIELDS}
+    for mask in range(HOLDINGS):
+        cards = _cards_from_top(mask)
+        length = len(cards)
+        tables["hcp"][mask] = sum(
+            value for bit, value in _HCP_BITS if mask & bit)
+        tables["length"][mask] = length
+        tables["top_honors"][mask] = sum(
+            1 for bit in (_ACE, _KING, _QUEEN) if mask & bit)
+        tables["quick_tricks"][mask] = _quick_tricks(mask, length)
+        tables["losers"][mask] = _losers(mask, length)
+        tables["stopper"][mask] = _stopper(mask, length)
+        tables["sequence"][mask] = _sequence(cards)
+    return {field: bytes(table) for field, table in tables.items()}
+
+
+def _load_tables():
+    # The tables are computed if the data file is not there (when it is
+    # generated)
+    try:
+        data = pkg_resources.resource_string(__name__, DATA_FILE)
+    except OSError:
+        data = b"".join(build_tables()[field] for field in HOLDING_FIELDS)
+    if len(data) != HOLDINGS * len(HOLDING_FIELDS):
+        raise ValueError("Invalid holding table file %r" % DATA_FILE)
+    return {
+        field: array.array("B", data[n * HOLDINGS:(n + 1) * HOLDINGS])
+        for n, field in enumerate(HOLDING_FIELDS)}
+
+
+TABLES = _load_tables()
+_HCP = TABLES["hcp"]
+_LENGTH = TABLES["length"]
+
+
+def _masks(hand):
+    if hand and isinstance(hand[0], int):
+        return hand
+    return hand_masks(hand)
+
+
+def holding_value(field, mask):
+    """Return the value of a field for a holding
+
+    Keyword Arguments:
+    field -- the field (see HOLDING_FIELDS)
+    mask  -- the holding
+    """
+    return TABLES[field][mask]
+
+
+def evaluate_hand(hand):
+    """Return the sums of the fields over the suits of a hand
+
+    Returns dictionary from field to the sum of the values of the four
+    holdings.
+
+    Keyword Arguments:
+    hand -- the cards, or the suit masks in SUIT_ORDER (see
+            double_dummy.hand_masks)
+    """
+    masks = _masks(hand)
+    return {
+        field: sum(table[mask] for mask in masks)
+        for field, table in TABLES.items()}
+
+
+def suit_lengths(hand):
+    """Return the suit lengths of a hand in SUIT_ORDER
+
+    Keyword Arguments:
+    hand -- the cards, or the suit masks in SUIT_ORDER
+    """
+    return [_LENGTH[mask] for mask in _masks(hand)]
+
+
+def hand_hcp(hand):
+    """Return the high card points of a hand
+
+    Keyword Arguments:
+    hand -- the cards, or the suit masks in SUIT_ORDER
+    """
+    return sum(_HCP[mask] for mask in _masks(hand))
+
+
+def suit_distribution(lengths):
+    """Return the distribution string of suit lengths
+
+    The string lists the clubs, diamonds, hearts and spades, as
+    utils2.get_suit_distribution ("2-3-3-5").
+
+    Keyword Arguments:
+    lengths -- the suit lengths in SUIT_ORDER (see suit_lengths)
+    """
+    return "-".join(str(length) for length in reversed(lengths))
+
+
+def dominant_suit(lengths):
+    """Return the dominant suit of suit lengths
+
+    The dominant suit is the highest ranking suit of five or more cards, as in
+    utils2.dominant_suit_function.
+
+    Keyword Arguments:
+    lengths -- the suit lengths in SUIT_ORDER (see suit_lengths)
+    """
+    for suit, length in zip(SUIT_ORDER, lengths):
+        if length >= 5:
+            return suit
+    return NO_DOMINANT_SUIT
+
+
+def evaluate_batch(masks, fields=HOLDING_FIELDS):
+    """Evaluate many hands with NumPy
+
+    Returns dictionary from field to an array of shape (hands, 4) with the
+    value of the field for each holding. The sum over the last axis gives the
+    value for the hands.
+
+    Keyword Arguments:
+    masks  -- integer array of shape (hands, 4) with the suit masks of the
+              hands in SUIT_ORDER
+    fields -- the fields to read (see HOLDING_FIELDS)
+    """
+    import numpy
+    masks = numpy.asarray(masks, dtype=numpy.intp)
+    return {
+        field: numpy.frombuffer(TABLES[field], dtype=numpy.uint8)[masks]
+        for field in fields}
+
+
+def main():
+    """Write the holding tables to the data file"""
+    path = pkg_resources.resource_filename(__name__, DATA_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tables = build_tables()
+    with open(path, "wb") as data:
+        for field in HOLDING_FIELDS:
+            data.write(tables[field])
+
+
+if __name__ == "__main__":
+    main()
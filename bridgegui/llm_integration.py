@@ -1,46 +1,28 @@
-import json
 import logging
+import os
 
 from openai import OpenAI
+from bridgegui import llm_journal, notation
 from bridgegui.bridge_broker_agent import get_bridge_advice
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 
-class LLMIntegration:
-
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
+# The instructions, the strategy and the examples of each prompt are sent as an
+# invariant system message and only the game state as the user message, so
+# that provider-side prompt caching applies (see prompt_prefix)
 
-    def get_allowed_bidding(self, allowed_bidding):
-        prompt = self._get_allowed_bidding_prompt(allowed_bidding)
-        response = self.client.chat.completions.create(model="gpt-3.5-turbo",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],temperature=0)
-        return response.choices[0].message.content
-    
-    def _get_allowed_bidding_prompt(self, allowed_bidding):
-        template = '''Convert Allowed Biddings to string format.
+ALLOWED_BIDDING_PROMPT = StaticPrefixPrompt(
+    prefix='''Convert Allowed Biddings to string format.
         
         Example 1 starts here:
-            Allowed Biddings: [type:pass,bid: level: 5,strain:diamonds,type:bid,bid:level: 5,strain:hearts]
+            Allowed Biddings: P,5D,5H
             Your answer: pass, 5 diamonds, 5 hearts
-        Example 1 ends here
+        Example 1 ends here''',
+    suffix='''Allowed Biddings: {allowed_bidding}''',
+    input_variables=['allowed_bidding']
+)
 
-        Allowed Biddings: {allowed_bidding}
-        
-        '''
-        return template.format(allowed_bidding=json.dumps(allowed_bidding, indent=4))
-
-
-    def get_card_play_suggestion(self, play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history, model="gpt-4-turbo"):
-        prompt = self._get_card_play_suggestion_prompt(play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history)
-        response = self.client.chat.completions.create(model=model,
-        messages=[
-            {"role": "user", "content": prompt}
-        ],temperature=0)
-        return response.choices[0].message.content
-    
-    def _get_card_play_suggestion_prompt(self, play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history):
-        template = '''You are an expert Bridge player. Your position is {position}.
+CARD_PLAY_SUGGESTION_PROMPT = StaticPrefixPrompt(
+    prefix='''You are an expert Bridge player.
 
 Your task:
 1. Read the **hand** you hold, the **partner’s hand** (if known), and the **cards played so far**.
@@ -82,18 +64,14 @@ Your task:
 ### **Example 1** (Demonstration)
 
 - **Play card from:** Your hand (West)  
-- **Your hand:** "jack of spades, queen of spades, 2 of diamonds, 9 of spades, king of hearts, 8 of diamonds, 10 of diamonds, 7 of diamonds, 10 of clubs, 4 of clubs, 5 of clubs, 10 of hearts, jack of hearts"  
-- **Partner’s hand:** Unknown  
-- **Trick:** "Trick 5: North → 2 of spades, East → 3 of spades, South → 4 of spades"  
-- **Allowed cards:** "5 of spades, 6 of spades, 7 of spades, 8 of spades, 9 of spades, 10 of spades, jack of spades, queen of spades, king of spades, ace of spades, [etc.]"  
-- **Contract:** 3 Spades (Declarer: South)  
-- **Contractors:** North–South  
-- **Bids history:** "North: 1S, East: pass, South: 2S, West: pass, North: 3S, East: pass, South: pass"  
-- **Tricks history:** 
-  - Trick 1: N=2♥, E=3♥, S=4♥, W=5♥  
-  - Trick 2: N=2♣, E=3♣, S=4♣, W=5♣  
-  - Trick 3: N=2♦, E=3♦, S=4♦, W=5♦  
-  - Trick 4: N=2♠, E=3♠, S=4♠  
+- **Your hand:** QJ9.KJT.T872.T54  
+- **Partner’s hand:** unknown  
+- **Trick:** N:S2 E:S3 S:S4  
+- **Allowed cards:** S:QJ9  
+- **Contract:** 3S (Declarer: South)  
+- **Contractors:** north, south  
+- **Bids history:** N:1S-P-2S-P-3S-P-P-P  
+- **Tricks history:** N:H2 E:H3 S:H4 W:H5 (W) / W:C5 N:C2 E:C3 S:C4 (W) / W:D5 N:D2 E:D3 S:D4 (W)  
 
 **Your card:**  
 1. **Decide on the best card**  
@@ -106,7 +84,9 @@ Your task:
 
 ---
 
-## **Your Input**
+{notation}''',
+    suffix='''## **Your Input**
+- **Your position:** {position}  
 - **Play card from:** {play_from}  
 - **Your hand:** {own_hand}  
 - **Partner’s hand:** {partners_hand}  
@@ -116,83 +96,43 @@ Your task:
 - **Contractors:** {contractors}  
 - **Bids history:** {bids_history}  
 - **Tricks history:** {tricks_history}
+- **Hidden hands:** {hidden_hands}
 
-**Now, follow the 3-step response format to select and justify the best card from your allowed options.**
-'''
-
-        return template.format(position=position,
-                               play_from=play_from,
-                               own_hand=json.dumps(own_hand),
-                               partners_hand=json.dumps(partners_hand),
-                               trick=json.dumps(trick),
-                               allowed_cards=json.dumps(allowed_cards, indent=4),
-                               contract=json.dumps(contract),
-                               contractors=json.dumps(contractors),
-                               bids_history=json.dumps(bids_history),
-                               tricks_history=json.dumps(tricks_history))
-    
-    def get_card_play_prompt(self, analysis, allowed_cards):
-        logging.info(f"analysis: {analysis}")
-        logging.info(f"allowed_cards: {allowed_cards}")
-        # Convert allowed_cards to a properly formatted string
-        allowed_cards_str = json.dumps(allowed_cards)
-        prompt = self._get_card_play_prompt(analysis, allowed_cards_str)
-        response = self.client.chat.completions.create(model="gpt-3.5-turbo",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],temperature=0)
-        return response.choices[0].message.content
-    
-    def _get_card_play_prompt(self, analysis, allowed_cards):
-        # Check what is the type of allowed_cards
-        template = '''You are bridge player. Based on the following analysis, choose the best card to play. 
+**Now, follow the 3-step response format to select and justify the best card from your allowed options.**''',
+    input_variables=['position', 'play_from', 'own_hand', 'partners_hand', 'trick', 'allowed_cards', 'contract', 'contractors', 'bids_history', 'tricks_history', 'hidden_hands'],
+    partial_variables={"notation": notation.NOTATION_LEGEND}
+)
+
+CARD_PLAY_PROMPT = StaticPrefixPrompt(
+    prefix='''You are bridge player. Based on the following analysis, choose the best card to play. 
         Choose the best card to play from allowed cards based on the cards you have in hand, the cards your partner has, the cards played so far, the contract, the bidding and tricks played so far.
+        Allowed cards are grouped by suit (S:AK2 = ace, king and 2 of spades, T = 10).
         Respond only with json object. The structure of the json object should be as follows:
         {{
             "rank": "rank",
             "suit": "suit"
         }}
+        where rank is one of 2, 3, 4, 5, 6, 7, 8, 9, 10, jack, queen, king, ace and suit is one of clubs, diamonds, hearts, spades.
 
         Example 1 starts here:
             Analysis: I would play the 9 of spades
-            Allowed cards: "5 of spades, 6 of spades, 7 of spades, 8 of spades, 9 of spades, 10 of spades, jack of spades, queen of spades, king of spades, ace of spades, 2 of diamonds, 3 of diamonds, 4 of diamonds, 5 of diamonds, 6 of diamonds, 7 of diamonds, 8 of diamonds, 9 of diamonds, 10 of diamonds, jack of diamonds, queen of diamonds, king of diamonds, ace of diamonds, 2 of hearts, 3 of hearts, 4 of hearts, 5 of hearts, 6 of hearts, 7 of hearts, 8 of hearts, 9 of hearts, 10 of hearts, jack of hearts, queen of hearts, king of hearts, ace of hearts, 2 of clubs, 3 of clubs, 4 of clubs, 5 of clubs, 6 of clubs, 7 of clubs, 8 of clubs, 9 of clubs, 10 of clubs, jack of clubs, queen of clubs, king of clubs, ace of clubs"
+            Allowed cards: S:AKQJT98765 H:AKQJT98765432 D:AKQJT98765432 C:AKQJT98765432
             Card played: {{"rank": "9", "suit": "spades"}}
         Example 1 ends here
 
         Example 2 starts here:
             Analysis: I would play the 3 of diamonds
-            Allowed cards: "5 of spades, 6 of spades, 7 of spades, 8 of spades, 9 of spades, 10 of spades, jack of spades, queen of spades, king of spades, ace of spades, 2 of diamonds, 3 of diamonds, 4 of diamonds, 5 of diamonds, 6 of diamonds, 7 of diamonds, 8 of diamonds, 9 of diamonds, 10 of diamonds, jack of diamonds, queen of diamonds, king of diamonds, ace of diamonds, 2 of hearts, 3 of hearts, 4 of hearts, 5 of hearts, 6 of hearts, 7 of hearts, 8 of hearts, 9 of hearts, 10 of hearts, jack of hearts, queen of hearts, king of hearts, ace of hearts, 2 of clubs, 3 of clubs, 4 of clubs, 5 of clubs, 6 of clubs, 7 of clubs, 8 of clubs, 9 of clubs, 10 of clubs, jack of clubs, queen of clubs, king of clubs, ace of clubs"
+            Allowed cards: S:AKQJT98765 H:AKQJT98765432 D:AKQJT98765432 C:AKQJT98765432
             Card played: {{"rank": "3", "suit": "diamonds"}}
-        Example 2 ends here
-
-        Analysis: {analysis}
+        Example 2 ends here''',
+    suffix='''Analysis: {analysis}
         Allowed cards: {allowed_cards}
-        Your card: '''
+        Your card:''',
+    input_variables=['analysis', 'allowed_cards']
+)
 
-        return template.format(analysis=analysis,
-                               allowed_cards=allowed_cards)
-
-
-
-    def get_bid_suggestion(self, position, hand, allowed_bidding, bidding_so_far, model="gpt-4-turbo"):
-        prompt = self._get_bid_suggestion_prompt(position, hand, allowed_bidding, bidding_so_far)
-        response = self.client.chat.completions.create(model=model,
-        messages=[
-            {"role": "user", "content": prompt}
-        ], temperature=0)
-        return response.choices[0].message.content
-    
-    def get_bid_suggestion_v2(self, position, hand, allowed_bidding, bidding_so_far):
-        response = get_bridge_advice(
-            position=position,
-            hand=hand,
-            allowed_bidding=allowed_bidding,
-            bidding_so_far=bidding_so_far
-        )
-        return response
-
-    def _get_bid_suggestion_prompt(self, position, hand, allowed_bidding, bidding_so_far):
-        template = '''You are an expert Bridge player. Your position is {position}.
+BID_SUGGESTION_PROMPT = StaticPrefixPrompt(
+    prefix='''You are an expert Bridge player.
 
 Your task:
 1. Read the **hand** you hold and the **bidding so far**.
@@ -336,42 +276,23 @@ Use this table to compare *bids* numerically. **Pass** is *not* included here be
 
 ---
 
-## **Your Input**
+{notation}''',
+    suffix='''## **Your Input**
+- **Your position:** {position}  
 - **Hand:** {hand}  
 - **Allowed Biddings:** {allowed_bidding}  
 - **Bidding so far:** {bidding_so_far}
 
-**Use the 5-step response format.** Remember in Step 4: “Pass” does **not** require an index check and is always allowed.
+**Use the 5-step response format.** Remember in Step 4: “Pass” does **not** require an index check and is always allowed.''',
+    input_variables=['position', 'hand', 'allowed_bidding', 'bidding_so_far'],
+    partial_variables={"notation": notation.NOTATION_LEGEND}
+)
 
-'''
-
-        prompt = template.format(position=position,
-                               hand=json.dumps(hand),
-                               allowed_bidding=json.dumps(allowed_bidding, indent=4),
-                               bidding_so_far=json.dumps(bidding_so_far))
-        
-        logging.info(f"_get_bid_suggestion_prompt: {prompt}")
-
-        return prompt
-    
-    def get_bid_prompt(self, analysis, allowed_bidding, model="gpt-3.5-turbo"):
-        # Convert allowed_bidding to a properly formatted string
-        allowed_bidding_str = json.dumps(allowed_bidding, indent=4)
-        prompt = self._get_bid_prompt(analysis, allowed_bidding_str)
-        print(f"prompt: {prompt}")
-        response = self.client.chat.completions.create(model=model,
-        messages=[
-            {"role": "user", "content": prompt}
-        ], temperature=0
-        )
-        print(f"response: {response}")
-        return response.choices[0].message.content
-    
-    def _get_bid_prompt(self, analysis, allowed_bidding):
-        logging.debug(f"Allowed bidding structure: {allowed_bidding}")
-        template = '''You are bridge player. Based on the following analysis, choose the best bidding. 
+BID_PROMPT = StaticPrefixPrompt(
+    prefix='''You are bridge player. Based on the following analysis, choose the best bidding. 
         Choose the best bidding from allowed bidding based on the cards you have in hand and the bidding so far.
         Pass if annalysis suggest bidding that is not allowed.
+        Allowed biddings are separated by commas (P = pass, X = double, XX = redouble, 1NT = 1 notrump).
         Respond only with json object. The structure of the json object should be as follows:
         {{
             "type": "bid",
@@ -383,31 +304,120 @@ Use this table to compare *bids* numerically. **Pass** is *not* included here be
 
         Example 1:
         Analysis: I would bid 1 spade
-        Allowed biddings: "Allowed biddings: pass, 1 clubs, 1 diamonds, 1 hearts, 1 spades, 1 notrump, 2 clubs, 2 diamonds, 2 hearts, 2 spades, 2 notrump, 3 clubs, 3 diamonds, 3 hearts, 3 spades, 3 notrump, 4 clubs, 4 diamonds, 4 hearts, 4 spades, 4 notrump, 5 clubs, 5 diamonds, 5 hearts, 5 spades, 5 notrump, 6 clubs, 6 diamonds, 6 hearts, 6 spades, 6 notrump, 7 clubs, 7 diamonds, 7 hearts, 7 spades, 7 notrump"
+        Allowed biddings: P,1C,1D,1H,1S,1NT,2C,2D,2H,2S,2NT,3C,3D,3H,3S,3NT,4C,4D,4H,4S,4NT,5C,5D,5H,5S,5NT,6C,6D,6H,6S,6NT,7C,7D,7H,7S,7NT
         Your bid: {{"type": "bid", "bid": {{"level": 1, "strain": "spades"}}}}
 
         Example 2:
         Analysis: I would pass        
-        Allowed biddings: "Allowed biddings: pass, 1 clubs, 1 diamonds, 1 hearts, 1 spades, 1 notrump, 2 clubs, 2 diamonds, 2 hearts, 2 spades, 2 notrump, 3 clubs, 3 diamonds, 3 hearts, 3 spades, 3 notrump, 4 clubs, 4 diamonds, 4 hearts, 4 spades, 4 notrump, 5 clubs, 5 diamonds, 5 hearts, 5 spades, 5 notrump, 6 clubs, 6 diamonds, 6 hearts, 6 spades, 6 notrump, 7 clubs, 7 diamonds, 7 hearts, 7 spades, 7 notrump"
+        Allowed biddings: P,1C,1D,1H,1S,1NT,2C,2D,2H,2S,2NT,3C,3D,3H,3S,3NT,4C,4D,4H,4S,4NT,5C,5D,5H,5S,5NT,6C,6D,6H,6S,6NT,7C,7D,7H,7S,7NT
         Your bid: {{"type": "pass"}}
 
         Example 3:
         Analysis: I would bid 1 spade
-        Allowed biddings: "Allowed biddings: pass, 1 notrump, 2 clubs, 2 diamonds, 2 hearts, 2 spades, 2 notrump, 3 clubs, 3 diamonds, 3 hearts, 3 spades, 3 notrump, 4 clubs, 4 diamonds, 4 hearts, 4 spades, 4 notrump, 5 clubs, 5 diamonds, 5 hearts, 5 spades, 5 notrump, 6 clubs, 6 diamonds, 6 hearts, 6 spades, 6 notrump, 7 clubs, 7 diamonds, 7 hearts, 7 spades, 7 notrump"
-        Your bid: {{"type": "pass"}}
+        Allowed biddings: P,1NT,2C,2D,2H,2S,2NT,3C,3D,3H,3S,3NT,4C,4D,4H,4S,4NT,5C,5D,5H,5S,5NT,6C,6D,6H,6S,6NT,7C,7D,7H,7S,7NT
+        Your bid: {{"type": "pass"}}''',
+    suffix='''Analysis: {analysis}
+        Allowed bidding: {allowed_bidding}
+        Your bid:''',
+    input_variables=['analysis', 'allowed_bidding']
+)
 
 
-        Analysis: {analysis}
-        Allowed bidding: {allowed_bidding}
-        Your bid: '''
-
-        try:
-            return template.format(
-                analysis=analysis,
-                allowed_bidding=json.dumps(allowed_bidding, indent=4)
-            )
-        except KeyError as e:
-            logging.error(f"KeyError in allowed_bidding: {e}")
-            raise
+class LLMIntegration:
+
+    def __init__(self, api_key, base_url=None, http_client=None):
+        # The base URL defaults to the OPENAI_BASE_URL environment variable,
+        # and the HTTP client to the configured LLM journal, like the
+        # langchain models of the agents (see fake_llm_server, llm_journal)
+        self.client = OpenAI(
+            api_key=api_key, base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+            http_client=http_client or llm_journal.http_client())
+
+    def get_allowed_bidding(self, allowed_bidding):
+        messages = self._get_allowed_bidding_messages(allowed_bidding)
+        response = self.client.chat.completions.create(model="gpt-3.5-turbo",
+        messages=messages,temperature=0)
+        return response.choices[0].message.content
+    
+    def _get_allowed_bidding_messages(self, allowed_bidding):
+        return ALLOWED_BIDDING_PROMPT.format_chat_messages(
+            allowed_bidding=notation.format_calls(allowed_bidding))
+
+
+    def get_card_play_suggestion(self, play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history, model="gpt-4-turbo", hidden_hands=None):
+        messages = self._get_card_play_suggestion_messages(play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history, hidden_hands)
+        response = self.client.chat.completions.create(model=model,
+        messages=messages,temperature=0)
+        return response.choices[0].message.content
+    
+    def _get_card_play_suggestion_messages(self, play_from, position, own_hand, partners_hand, trick, allowed_cards, contract, contractors, bids_history, tricks_history, hidden_hands=None):
+        return CARD_PLAY_SUGGESTION_PROMPT.format_chat_messages(
+            position=position,
+            play_from=play_from,
+            own_hand=notation.format_hand(own_hand),
+            partners_hand=notation.format_hands(partners_hand),
+            trick=notation.format_trick(trick),
+            allowed_cards=notation.format_cards(allowed_cards),
+            contract=notation.format_contract(contract),
+            contractors=contractors,
+            bids_history=notation.format_auction(bids_history),
+            tricks_history=notation.format_tricks(tricks_history),
+            hidden_hands=hidden_hands or "unknown")
+    
+    def get_card_play_prompt(self, analysis, allowed_cards):
+        logging.info(f"analysis: {analysis}")
+        logging.info(f"allowed_cards: {allowed_cards}")
+        # Convert allowed_cards to a properly formatted string
+        allowed_cards_str = notation.format_cards(allowed_cards)
+        messages = self._get_card_play_messages(analysis, allowed_cards_str)
+        response = self.client.chat.completions.create(model="gpt-3.5-turbo",
+        messages=messages,temperature=0)
+        return response.choices[0].message.content
+    
+    def _get_card_play_messages(self, analysis, allowed_cards):
+        return CARD_PLAY_PROMPT.format_chat_messages(
+            analysis=analysis, allowed_cards=allowed_cards)
+
+
+
+    def get_bid_suggestion(self, position, hand, allowed_bidding, bidding_so_far, model="gpt-4-turbo"):
+        messages = self._get_bid_suggestion_messages(position, hand, allowed_bidding, bidding_so_far)
+        response = self.client.chat.completions.create(model=model,
+        messages=messages, temperature=0)
+        return response.choices[0].message.content
     
-    
\ No newline at end of file
+    def get_bid_suggestion_v2(self, position, hand, allowed_bidding, bidding_so_far):
+        response = get_bridge_advice(
+            position=position,
+            hand=hand,
+            allowed_bidding=allowed_bidding,
+            bidding_so_far=bidding_so_far
+        )
+        return response
+
+    def _get_bid_suggestion_messages(self, position, hand, allowed_bidding, bidding_so_far):
+        messages = BID_SUGGESTION_PROMPT.format_chat_messages(
+            position=position,
+            hand=notation.format_hand(hand),
+            allowed_bidding=notation.format_calls(allowed_bidding),
+            bidding_so_far=notation.format_auction(bidding_so_far))
+        
+        logging.info(f"_get_bid_suggestion_messages: {messages[-1]['content']}")
+
+        return messages
+    
+    def get_bid_prompt(self, analysis, allowed_bidding, model="gpt-3.5-turbo"):
+        messages = self._get_bid_messages(analysis, allowed_bidding)
+        print(f"prompt: {messages[-1]['content']}")
+        response = self.client.chat.completions.create(model=model,
+        messages=messages, temperature=0
+        )
+        print(f"response: {response}")
+        return response.choices[0].message.content
+    
+    def _get_bid_messages(self, analysis, allowed_bidding):
+        logging.debug(f"Allowed bidding structure: {allowed_bidding}")
+        return BID_PROMPT.format_chat_messages(
+            analysis=analysis,
+            allowed_bidding=notation.format_calls(allowed_bidding)
+        )
@@ -0,0 +1,251 @@
+"""Journal of the LLM calls
+
+The answers of the provider vary from run to run, so the parts of the advice
+pipeline around the LLM calls cannot be profiled or regression tested
+reproducibly. This module records the LLM calls under the OpenAI client of
+the LLM integration and of the langchain models (the HTTP transport), and
+replays them:
+
+- record     -- the calls are made and the successful ones are appended to
+                the journal
+- replay     -- the calls are answered from the journal without network, and
+                the calls missing from the journal fail with 404
+- passthrough -- the calls are made without journaling
+
+The journal is a file of JSON lines, one call per line with the request and
+the response, so the journals of two runs can be diffed. Calls are keyed by
+a hash of the normalized request (see request_key). A request made several
+times is answered with the recorded responses in order, and with the last
+one after them.
+
+The journal is configured with the LLM_JOURNAL (the path) and
+LLM_JOURNAL_MODE (record by default) environment variables, read when the
+clients are created.
+
+Functions:
+request_key      -- normalized hash of an LLM request
+http_client      -- HTTP client of the OpenAI client journaling the calls
+chat_completions -- chat completions client of the langchain models
+
+Classes:
+LLMJournal       -- append-only journal of the LLM calls
+JournalTransport -- HTTP transport recording or replaying the LLM calls
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpx
+import openai
+
+RECORD = "record"
+REPLAY = "replay"
+PASSTHROUGH = "passthrough"
+MODES = (RECORD, REPLAY, PASSTHROUGH)
+JOURNAL_ENVIRONMENT = "LLM_JOURNAL"
+MODE_ENVIRONMENT = "LLM_JOURNAL_MODE"
+
+# Request fields that do not change the answer
+_VOLATILE_FIELDS = ("user", "metadata")
+# Response headers that no longer apply to the read content
+_CONTENT_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def _normalize_text(text):
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def _normalize(payload):
+    if not isinstance(payload, dict):
+        return payload
+    payload = {
+        key: value for key, value in payload.items()
+        if key not in _VOLATILE_FIELDS}
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        payload["messages"] = [
+            dict(message, content=_normalize_text(message["content"]))
+            if isinstance(message, dict) and
+            isinstance(message.get("content"), str) else message
+            for message in messages]
+    return payload
+
+
+def _payload(body):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", "replace")
+
+
+def request_key(method, path, body):
+    """Return the hash of the normalized request
+
+    The request body is normalized by dropping the fields that do not change
+    the answer and the trailing whitespace of the message lines, and
+    serialized with sorted keys. The host is not part of the key, so calls
+    recorded from the provider are replayed at any base URL.
+
+    Keyword Arguments:
+    method -- the HTTP method
+    path   -- the path of the URL
+    body   -- the request body (bytes)
+    """
+    canonical = json.dumps(
+        [method.upper(), path, _normalize(_payload(body))], sort_keys=True,
+        separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class LLMJournal:
+    """Append-only journal of the LLM calls
+
+    The journal may be shared by the clients of several threads.
+    """
+
+    def __init__(self, path):
+        """Initialize journal
+
+        The calls already in the file are loaded for replaying.
+
+        Keyword Arguments:
+        path -- the path of the journal file
+        """
+        self.path = path
+        self._entries = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(
+                            entry["key"], []).append(entry)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, entry):
+        """Append a call (dictionary with the key of the request)"""
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+    def lookup(self, key):
+        """Return the next recorded call of the request key
+
+        Returns None if the request is not in the journal.
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return entries[min(cursor, len(entries) - 1)]
+
+
+class JournalTransport(httpx.BaseTransport):
+    """HTTP transport recording or replaying the LLM calls"""
+
+    def __init__(self, journal, mode=RECORD, transport=None):
+        """Initialize transport
+
+        Keyword Arguments:
+        journal   -- the LLMJournal
+        mode      -- RECORD, REPLAY or PASSTHROUGH
+        transport -- the transport making the calls (by default an HTTP
+                     transport)
+        """
+        if mode not in MODES:
+            raise ValueError("Unknown journal mode: %r" % mode)
+        self.journal = journal
+        self.mode = mode
+        self._transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        if self.mode == PASSTHROUGH:
+            return self._transport.handle_request(request)
+        body = request.read()
+        key = request_key(request.method, request.url.path, body)
+        if self.mode == REPLAY:
+            entry = self.journal.lookup(key)
+            if entry is None:
+                return httpx.Response(404, request=request, json={"error": {
+                    "message": "Request %s not in the journal %s" % (
+                        key, self.journal.path),
+                    "type": "not_found", "code": "not_in_journal"}})
+            return httpx.Response(
+                entry["status"], request=request,
+                headers={"content-type": entry["content_type"]},
+                content=entry["body"].encode())
+        start = time.perf_counter()
+        response = self._transport.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        if response.status_code < 400:
+            self.journal.append({
+                "key": key, "time": time.time(),
+                "elapsed": time.perf_counter() - start,
+                "method": request.method, "path": request.url.path,
+                "request": _payload(body), "status": response.status_code,
+                "content_type": response.headers.get("content-type", ""),
+                "body": content.decode("utf-8", "replace")})
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in _CONTENT_HEADERS]
+        return httpx.Response(
+            response.status_code, request=request, headers=headers,
+            content=content)
+
+    def close(self):
+        self._transport.close()
+
+
+def http_client(path=None, mode=None):
+    """Return HTTP client of the OpenAI client journaling the calls
+
+    Returns None (the default client) if no journal is configured. The
+    journal of a path is shared by the clients of the process.
+
+    Keyword Arguments:
+    path -- the path of the journal (by default LLM_JOURNAL)
+    mode -- the journal mode (by default LLM_JOURNAL_MODE, or RECORD)
+    """
+    path = path or os.getenv(JOURNAL_ENVIRONMENT)
+    if not path:
+        return None
+    mode = mode or os.getenv(MODE_ENVIRONMENT) or RECORD
+    with _journals_lock:
+        journal = _journals.get(os.path.abspath(path))
+        if journal is None:
+            journal = _journals[os.path.abspath(path)] = LLMJournal(path)
+    return openai.DefaultHttpxClient(
+        transport=JournalTransport(journal, mode))
+
+
+def chat_completions():
+    """Return chat completions client of the langchain models
+
+    The langchain chat models create their OpenAI clients themselves, and
+    only the synchronous client can be given one journaling HTTP client, so
+    the models are given this chat completions client instead. Returns None
+    (the default client of the models) if no journal is configured.
+    """
+    client = http_client()
+    if client is None:
+        return None
+    return openai.OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL"),
+        http_client=client).chat.completions
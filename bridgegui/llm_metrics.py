@@ -0,0 +1,69 @@
+"""LLM call accounting
+
+This module contains a langchain callback handler that counts LLM calls and the
+token usage reported by the provider. The counter is registered through a
+context variable, so every langchain model invoked inside count_llm_calls() is
+accounted without passing callbacks around explicitly.
+
+Functions:
+count_llm_calls -- context manager yielding an LLMCallCounter
+
+Classes:
+LLMCallCounter -- callback handler counting LLM calls and tokens
+"""
+
+import contextlib
+import threading
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """Callback handler counting LLM calls and token usage"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        with self._lock:
+            self.calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        with self._lock:
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+
+    def __repr__(self):
+        return "LLMCallCounter(calls=%d, prompt_tokens=%d, completion_tokens=%d)" % (
+            self.calls, self.prompt_tokens, self.completion_tokens)
+
+
+_llm_call_counter = ContextVar("bridgegui_llm_call_counter", default=None)
+register_configure_hook(_llm_call_counter, True)
+
+
+@contextlib.contextmanager
+def count_llm_calls():
+    """Count the LLM calls made inside the with block
+
+    Yields LLMCallCounter whose attributes are updated as calls are made.
+    Calls made from threads started with a copy of the current context (see
+    AdviceGraph) are counted too.
+    """
+    counter = LLMCallCounter()
+    token = _llm_call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _llm_call_counter.reset(token)
@@ -0,0 +1,532 @@
+"""Local stand-in of the bridge server
+
+The clients cannot be run, let alone load tested, without the upstream bridge
+server. This module implements the subset of the bridge protocol the
+frontend uses on the local rules engine (see rules_engine.RulesEngine):
+
+- the control socket (ROUTER at the base endpoint) answers the bridgehlo,
+  game, join, get, call and play commands
+- the event socket (PUB at the next endpoint) publishes the deal, turn,
+  call, bidding, play, dummy, trick, dealend and player events of each game,
+  prefixed by the UUID of the game
+
+A game deals its first board when four players have joined and asked for
+the initial state, and deals the next board when a deal ends, until the
+number of boards of the game is played. The turn event names the player
+who acts, so the declarer is named when the dummy is in turn, and the turn
+is published again if nobody acts for a while (events sent before a client
+subscribed are lost). The server measures the decision latency of the
+clients, from the turn event to the call or play made.
+
+BotClient is a protocol client playing random legal calls and cards, used to
+test the server and to measure its overhead without the frontend.
+
+Classes:
+LocalServer -- stand-in bridge server on the local rules engine
+BotClient   -- protocol client playing random legal calls and cards
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+import zmq
+
+from bridgegui import messaging, rules_engine
+from bridgegui.notation import POSITION_TAGS, as_protocol_call
+from bridgegui.rules_engine import BIDDING, ENDED, PLAYING, RulesEngine
+
+DEFAULT_START_DELAY = 0.2
+DEFAULT_TURN_INTERVAL = 5.0
+_POLL_INTERVAL = 50
+_STATE_TAGS = ("pubstate", "privstate", "self")
+
+
+class _Rejected(Exception):
+    # The command is rejected with the status of the reply
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Game:
+    # State of a game: the players by position, the deal being played and
+    # the public history of the deal
+
+    def __init__(self, uuid_, boards):
+        self.uuid = uuid_
+        self.boards = boards
+        self.players = {}
+        self.ready = set()
+        self.board = 0
+        self.completed = 0
+        self.engine = None
+        self.calls = []
+        self.tricks = []
+        self.counter = 0
+        self.start_time = None
+        self.turn_time = None
+        self.turn_sent = None
+
+    def position(self, player):
+        for position, player_ in self.players.items():
+            if player_ == player:
+                return position
+        return None
+
+    def acting(self):
+        # The position acting for the position in turn
+        engine = self.engine
+        if engine is None or engine.turn is None:
+            return None
+        if engine.turn == engine.dummy:
+            return engine.declarer
+        return engine.turn
+
+
+class LocalServer:
+    """Stand-in bridge server on the local rules engine
+
+    The server runs in a thread of its own (see start and stop). The games
+    and the statistics may be accessed from other threads.
+    """
+
+    def __init__(
+            self, endpoint, boards=None, seed=None, context=None,
+            start_delay=DEFAULT_START_DELAY,
+            turn_interval=DEFAULT_TURN_INTERVAL):
+        """Initialize the server
+
+        Keyword Arguments:
+        endpoint      -- the base endpoint (the control socket; the event
+                         socket is bound to the next port, see
+                         messaging.endpoints)
+        boards        -- the number of boards of each game (by default the
+                         games go on until the server is stopped)
+        seed          -- the seed of the deals (optional)
+        context       -- the ZeroMQ context (by default the global instance)
+        start_delay   -- the time in seconds from the last player asking for
+                         the initial state to the first deal
+        turn_interval -- the time in seconds after which the turn is
+                         published again if nobody acts
+        """
+        generator = messaging.endpoints(endpoint)
+        self.control_endpoint = next(generator)
+        self.event_endpoint = next(generator)
+        self.boards = boards
+        self.start_delay = start_delay
+        self.turn_interval = turn_interval
+        self._context = context or zmq.Context.instance()
+        self._generator = random.Random(seed)
+        self._games = {}
+        self._latencies = []
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._handlers = {
+            b"bridgehlo": self._hello, b"game": self._game,
+            b"join": self._join, b"get": self._get, b"call": self._call,
+            b"play": self._play,
+        }
+
+    def create_game(self, game=None):
+        """Create a game and return its UUID
+
+        Keyword Arguments:
+        game -- the UUID of the game (by default a new UUID)
+        """
+        game = game or str(uuid.uuid4())
+        with self._lock:
+            if game not in self._games:
+                self._games[game] = _Game(game, self.boards)
+        return game
+
+    def start(self):
+        """Bind the sockets and serve in a new thread"""
+        self._control_socket = self._context.socket(zmq.ROUTER)
+        self._control_socket.bind(self.control_endpoint)
+        self._event_socket = self._context.socket(zmq.PUB)
+        self._event_socket.bind(self.event_endpoint)
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._serve, name="local bridge server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the sockets"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._control_socket.close(linger=0)
+        self._event_socket.close(linger=0)
+
+    def statistics(self):
+        """Return the statistics of the server
+
+        Returns dictionary with the boards completed in all games, the boards
+        completed by game UUID, and the decision latencies in seconds.
+        """
+        with self._lock:
+            return {
+                "boards": sum(
+                    game.completed for game in self._games.values()),
+                "games": {
+                    uuid_: game.completed
+                    for uuid_, game in self._games.items()},
+                "latencies": list(self._latencies),
+            }
+
+    def _serve(self):
+        poller = zmq.Poller()
+        poller.register(self._control_socket, zmq.POLLIN)
+        while not self._stopping.is_set():
+            if poller.poll(_POLL_INTERVAL):
+                while self._control_socket.events & zmq.POLLIN:
+                    self._handle(self._control_socket.recv_multipart())
+            self._run_timers()
+
+    def _handle(self, frames):
+        if len(frames) < 4 or frames[1] != messaging.EMPTY_FRAME or \
+                len(frames) % 2:
+            logging.warning("Invalid command: %r", frames)
+            return
+        identity, _, tag, command = frames[:4]
+        reply, status = {}, b"OK"
+        try:
+            kwargs = {
+                frames[n].decode(): json.loads(frames[n + 1])
+                for n in range(4, len(frames), 2)}
+            handler = self._handlers.get(command)
+            if handler is None:
+                raise _Rejected(b"ERR", "Unknown command: %r" % command)
+            with self._lock:
+                reply = handler(tag=tag, **kwargs) or {}
+        except _Rejected as e:
+            logging.debug("Command %r rejected: %s", command, e)
+            status = e.status
+        except (ValueError, TypeError) as e:
+            logging.debug("Invalid command %r: %s", command, e)
+            status = b"ERR"
+        parts = [identity, messaging.EMPTY_FRAME, tag, status]
+        for key, value in reply.items():
+            parts.extend((key.encode(), json.dumps(value).encode()))
+        self._control_socket.send_multipart(parts)
+
+    def _run_timers(self):
+        now = time.time()
+        with self._lock:
+            for game in self._games.values():
+                if game.start_time is not None and now >= game.start_time:
+                    game.start_time = None
+                    self._deal(game)
+                elif game.turn_sent is not None and \
+                        now - game.turn_sent >= self.turn_interval:
+                    self._publish_turn(game, again=True)
+
+    def _publish(self, game, event, **kwargs):
+        game.counter += 1
+        kwargs["counter"] = game.counter
+        parts = [game.uuid.encode() + b":" + event.encode()]
+        for key, value in kwargs.items():
+            parts.extend((key.encode(), json.dumps(value).encode()))
+        self._event_socket.send_multipart(parts)
+
+    def _publish_turn(self, game, again=False):
+        acting = game.acting()
+        if acting is None:
+            game.turn_time = game.turn_sent = None
+            return
+        game.turn_sent = time.time()
+        if not again:
+            game.turn_time = game.turn_sent
+        self._publish(game, "turn", position=acting)
+
+    def _deal(self, game):
+        game.board += 1
+        game.engine = RulesEngine(
+            rules_engine.deal(self._generator),
+            rules_engine.board_dealer(game.board),
+            rules_engine.board_vulnerability(game.board))
+        game.calls = []
+        game.tricks = []
+        self._publish(
+            game, "deal", opener=game.engine.auction.opener,
+            vulnerability=game.engine.vulnerability)
+        self._publish_turn(game)
+
+    def _end_deal(self, game):
+        self._publish(game, "dealend", result=game.engine.result())
+        game.completed += 1
+        if game.boards and game.completed >= game.boards:
+            game.engine = None
+            game.turn_time = game.turn_sent = None
+        else:
+            self._deal(game)
+
+    def _find_game(self, game):
+        try:
+            return self._games[game]
+        except (KeyError, TypeError):
+            raise _Rejected(b"ERR", "Unknown game: %r" % game)
+
+    def _acting_game(self, game, player):
+        # The game and the position of the player, who must be acting
+        game = self._find_game(game)
+        position = game.position(player)
+        if position is None or position != game.acting():
+            raise _Rejected(b"ERR:RV", "Player %r not in turn" % player)
+        return game, position
+
+    def _record_latency(self, game):
+        if game.turn_time is not None:
+            self._latencies.append(time.time() - game.turn_time)
+
+    def _hello(self, tag=None, **kwargs):
+        return {}
+
+    def _game(self, tag=None, game=None, **kwargs):
+        return {"game": self.create_game(game)}
+
+    def _join(self, tag=None, player=None, game=None, position=None,
+              **kwargs):
+        if game is None:
+            game = next((
+                uuid_ for uuid_, game_ in self._games.items()
+                if len(game_.players) < 4), None) or self.create_game()
+        game = self._find_game(game)
+        joined = game.position(player)
+        if joined is None:
+            free = [
+                position_ for position_ in POSITION_TAGS
+                if position_ not in game.players]
+            if not free:
+                raise _Rejected(b"ERR", "Game %r is full" % game.uuid)
+            joined = position if position in free else free[0]
+            game.players[joined] = player
+            self._publish(game, "player", player=player, position=joined)
+        return {"game": game.uuid, "position": joined}
+
+    def _get(self, tag=None, game=None, player=None, get=None, **kwargs):
+        game = self._find_game(game)
+        position = game.position(player)
+        if tag == b"initget" and position is not None:
+            game.ready.add(position)
+            if len(game.ready) == 4 and game.board == 0 and \
+                    game.start_time is None:
+                game.start_time = time.time() + self.start_delay
+        state = {}
+        for key in get or _STATE_TAGS:
+            if key == "pubstate":
+                state[key] = self._pubstate(game)
+            elif key == "privstate":
+                state[key] = self._privstate(game, position)
+            elif key == "self":
+                state[key] = self._self(game, position)
+        return {"get": state, "counter": game.counter}
+
+    def _pubstate(self, game):
+        engine = game.engine
+        if engine is None:
+            return {"calls": [], "cards": {}, "tricks": []}
+        cards = {}
+        if engine.dummy_exposed:
+            cards[engine.dummy] = engine.hand(engine.dummy)
+        return {
+            "calls": game.calls, "declarer": engine.declarer,
+            "contract": engine.contract, "cards": cards,
+            "tricks": game.tricks, "vulnerability": engine.vulnerability}
+
+    def _privstate(self, game, position):
+        if game.engine is None or position is None:
+            return {"cards": {}}
+        return {"cards": {position: game.engine.hand(position)}}
+
+    def _self(self, game, position):
+        engine = game.engine
+        acting = engine is not None and position is not None and (
+            position == game.acting())
+        return {
+            "position": position,
+            "positionInTurn": engine.turn if acting else None,
+            "allowedCalls": [
+                as_protocol_call(call) for call in engine.legal_calls()]
+            if acting and engine.phase == BIDDING else [],
+            "allowedCards": engine.legal_cards()
+            if acting and engine.phase == PLAYING else [],
+        }
+
+    def _call(self, tag=None, game=None, player=None, call=None, **kwargs):
+        game, position = self._acting_game(game, player)
+        engine = game.engine
+        if not engine.is_legal_call(call):
+            raise _Rejected(b"ERR:RV", "Illegal call: %r" % (call,))
+        self._record_latency(game)
+        engine.call(call)
+        game.calls.append({"position": position, "call": call})
+        self._publish(game, "call", position=position, call=call)
+        if engine.phase == PLAYING:
+            self._publish(
+                game, "bidding", declarer=engine.declarer,
+                contract=engine.contract)
+        if engine.phase == ENDED:
+            self._end_deal(game)
+        else:
+            self._publish_turn(game)
+
+    def _play(self, tag=None, game=None, player=None, card=None, **kwargs):
+        game, _ = self._acting_game(game, player)
+        engine = game.engine
+        if engine.phase != PLAYING or not engine.is_legal_play(card):
+            raise _Rejected(b"ERR:RV", "Illegal play: %r" % (card,))
+        self._record_latency(game)
+        position = engine.turn
+        engine.play(card)
+        if len(engine.trick) == 1:
+            game.tricks.append({"cards": []})
+        game.tricks[-1]["cards"].append({"position": position, "card": card})
+        self._publish(game, "play", position=position, card=card)
+        if sum(engine.tricks) == 0 and len(engine.trick) == 1:
+            self._publish(
+                game, "dummy", position=engine.dummy,
+                cards=engine.hand(engine.dummy))
+        if not engine.trick:
+            game.tricks[-1]["winner"] = engine.last_winner
+            self._publish(game, "trick", winner=engine.last_winner)
+        if engine.phase == ENDED:
+            self._end_deal(game)
+        else:
+            self._publish_turn(game)
+
+
+class BotClient:
+    """Protocol client playing random legal calls and cards
+
+    The client follows the protocol like the frontend: it joins the game,
+    asks for the initial state, and asks for its own state when the turn
+    event names it. It runs in a thread of its own (see start and stop).
+    """
+
+    def __init__(self, endpoint, game, position=None, seed=None,
+                 context=None, recorder=None, pass_probability=0.7):
+        """Initialize the client
+
+        Keyword Arguments:
+        endpoint         -- the base endpoint of the server
+        game             -- the UUID of the game to join
+        position         -- the preferred position (optional)
+        seed             -- the seed of the random plays (optional)
+        context          -- the ZeroMQ context (by default the global
+                            instance)
+        recorder         -- the recorder of the events (optional, see
+                            messaging.MessageRecorder)
+        pass_probability -- the probability of passing when other calls
+                            are legal
+        """
+        generator = messaging.endpoints(endpoint)
+        self._control_endpoint = next(generator)
+        self._event_endpoint = next(generator)
+        self.game = game
+        self.position = position
+        self.player = str(uuid.uuid4())
+        self.decisions = 0
+        self._generator = random.Random(seed)
+        self._context = context or zmq.Context.instance()
+        self._recorder = recorder
+        self._pass_probability = pass_probability
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Connect and play in a new thread"""
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="bot %s" % self.position, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop playing and close the sockets"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        self._control = self._context.socket(zmq.DEALER)
+        self._control.connect(self._control_endpoint)
+        self._events = self._context.socket(zmq.SUB)
+        self._events.connect(self._event_endpoint)
+        self._events.setsockopt(zmq.SUBSCRIBE, self.game.encode())
+        prefix = self.game.encode() + b":"
+        queues = [
+            messaging.MessageQueue(
+                self._control, "bot control", messaging.validateControlReply,
+                {b"bridgehlo": self._handle_hello, b"join": self._handle_join,
+                 b"initget": self._handle_state, b"get": self._handle_state,
+                 b"call": self._ignore, b"play": self._ignore}),
+            messaging.MessageQueue(
+                self._events, "bot events", messaging.validateEventMessage,
+                {prefix + event: (
+                    self._handle_turn if event == b"turn" else self._ignore)
+                 for event in (
+                     b"deal", b"turn", b"call", b"bidding", b"play",
+                     b"dummy", b"trick", b"dealend", b"player")},
+                self._recorder),
+        ]
+        messaging.sendCommand(
+            self._control, b"bridgehlo", version="0.1", role="client")
+        poller = zmq.Poller()
+        poller.register(self._control, zmq.POLLIN)
+        poller.register(self._events, zmq.POLLIN)
+        try:
+            while not self._stopping.is_set():
+                if poller.poll(_POLL_INTERVAL):
+                    for queue in queues:
+                        queue.handleMessages()
+        finally:
+            self._control.close(linger=0)
+            self._events.close(linger=0)
+
+    def _ignore(self, **kwargs):
+        pass
+
+    def _handle_hello(self, **kwargs):
+        arguments = {"game": self.game, "player": self.player}
+        if self.position:
+            arguments["position"] = self.position
+        messaging.sendCommand(self._control, b"join", **arguments)
+
+    def _handle_join(self, game=None, position=None, **kwargs):
+        self.position = position
+        messaging.sendCommand(
+            self._control, b"get", b"initget", game=self.game,
+            player=self.player)
+
+    def _handle_turn(self, position=None, **kwargs):
+        if position == self.position:
+            messaging.sendCommand(
+                self._control, b"get", game=self.game, player=self.player,
+                get=["self"])
+
+    def _handle_state(self, get=None, **kwargs):
+        state = (get or {}).get("self") or {}
+        calls = state.get("allowedCalls") or []
+        cards = state.get("allowedCards") or []
+        if calls:
+            others = [call for call in calls if call["type"] != "pass"]
+            call = {"type": "pass"}
+            if others and self._generator.random() >= self._pass_probability:
+                call = self._generator.choice(others[:3])
+            self.decisions += 1
+            messaging.sendCommand(
+                self._control, b"call", game=self.game, player=self.player,
+                call=call)
+        elif cards:
+            self.decisions += 1
+            messaging.sendCommand(
+                self._control, b"play", game=self.game, player=self.player,
+                card=self._generator.choice(cards))
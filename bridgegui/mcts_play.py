@@ -0,0 +1,325 @@
+"""Information set Monte Carlo tree search for the card play
+
+Sampling deals and solving them double dummy assumes that every player sees
+all the cards, so it favors the lines that only work by peeking. This module
+searches the play with information set Monte Carlo tree search instead
+(single observer ISMCTS):
+
+- every iteration deals the hidden cards at random, consistent with what
+  the play has shown (see hand_inference.HandInference.sample), and walks
+  one tree shared by all the deals, keyed by the cards played
+- in each node only the cards legal in the deal of the iteration are
+  considered, and the children are selected by their upper confidence bound
+  counted over the iterations where they were available
+- the deal is played out from the new node by a rollout policy (random
+  cards, or simple card play heuristics), and the tricks each side takes
+  are propagated back
+- the search runs for a number of iterations or a time budget, whichever
+  ends first, and with several workers each worker searches its own tree
+  (root parallelism) and the visits of the cards are added up. The worker
+  processes are started once per policy, not forked from the client (see
+  simulation.worker_pool), and reused by every decision
+
+The card played is the most visited card of the root.
+
+Functions:
+rollout_policies -- names of the rollout policies
+
+Classes:
+MCTSPolicy -- card play policy searching the information sets
+"""
+
+import math
+import os
+import random
+import time
+
+from bridgegui.double_dummy import card_move, move_card
+from bridgegui.hand_inference import HandInference
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+from bridgegui.play_rules import PlayDecision, played_cards, representatives
+from bridgegui.simulation import worker_pool
+
+MCTS = "mcts"
+DEFAULT_ITERATIONS = 1000
+DEFAULT_TIME_BUDGET = 2.0
+DEFAULT_EXPLORATION = 0.7
+# Determinized deals sampled at once
+_SAMPLE_BATCH = 64
+
+
+def _moves(hand, led):
+    # The legal cards of a hand as (suit, card) pairs
+    suits = (led,) if led is not None and hand[led] else range(4)
+    moves = []
+    for suit in suits:
+        mask = hand[suit]
+        while mask:
+            card = mask & -mask
+            moves.append((suit, card))
+            mask ^= card
+    return moves
+
+
+def _beats(move, other, trump):
+    if move[0] == other[0]:
+        return move[1] > other[1]
+    return move[0] == trump
+
+
+class _State:
+    # Deal being played: the cards left in the hands, the plays of the
+    # current trick and the tricks taken by each side (north-south first)
+
+    __slots__ = ("hands", "trump", "turn", "trick", "tricks")
+
+    def __init__(self, hands, trump, turn, trick):
+        self.hands = hands
+        self.trump = trump
+        self.turn = turn
+        self.trick = trick
+        self.tricks = [0, 0]
+
+    def moves(self):
+        led = self.trick[0][1][0] if self.trick else None
+        return _moves(self.hands[self.turn], led)
+
+    def winning(self):
+        # (seat, move) winning the current trick so far
+        best = self.trick[0]
+        for play in self.trick[1:]:
+            if _beats(play[1], best[1], self.trump):
+                best = play
+        return best
+
+    def play(self, move):
+        self.hands[self.turn][move[0]] &= ~move[1]
+        self.trick.append((self.turn, move))
+        if len(self.trick) == 4:
+            winner = self.winning()[0]
+            self.tricks[winner % 2] += 1
+            self.trick = []
+            self.turn = winner
+        else:
+            self.turn = (self.turn + 1) % 4
+
+    def done(self):
+        return not self.trick and not any(self.hands[self.turn])
+
+
+def _random_policy(state, moves, generator):
+    return generator.choice(moves)
+
+
+def _heuristic_policy(state, moves, generator):
+    # Lead at random; follow with the partner winning, or without a card
+    # winning the trick, with the lowest card, and else win as cheaply as
+    # possible
+    if not state.trick:
+        return generator.choice(moves)
+    seat, winning = state.winning()
+    if seat % 2 != state.turn % 2:
+        winners = [
+            move for move in moves if _beats(move, winning, state.trump)]
+        if winners:
+            return min(winners, key=lambda move: (move[0] == state.trump,
+                                                  move[1]))
+    return min(moves, key=lambda move: (move[0] == state.trump, move[1]))
+
+
+_ROLLOUT_POLICIES = {"random": _random_policy, "heuristic": _heuristic_policy}
+
+
+def rollout_policies():
+    """Return the names of the rollout policies"""
+    return tuple(_ROLLOUT_POLICIES)
+
+
+class _Node:
+    __slots__ = ("seat", "visits", "available", "reward", "children")
+
+    def __init__(self, seat):
+        self.seat = seat
+        self.visits = 0
+        self.available = 0
+        self.reward = 0.0
+        self.children = {}
+
+
+def _search(base, inference, root_moves, iterations, time_budget, rollout,
+            exploration, seed):
+    # Worker: the visits and the rewards of the root moves after searching
+    # one tree. The time budget starts when the worker does, so a worker
+    # process still starting does not eat it.
+    deadline = time.time() + time_budget
+    generator = random.Random(seed)
+    policy = _ROLLOUT_POLICIES[rollout]
+    root = _Node(base.turn)
+    deals = []
+    for iteration in range(iterations):
+        if iteration % 16 == 0 and time.time() > deadline:
+            break
+        if not deals:
+            deals = inference.sample(_SAMPLE_BATCH, generator)
+            if not deals:
+                break
+        state = _State(deals.pop(), base.trump, base.turn, list(base.trick))
+        node = root
+        path = []
+        while not state.done():
+            moves = root_moves if node is root else state.moves()
+            children = node.children
+            untried = [move for move in moves if move not in children]
+            for move in moves:
+                if move in children:
+                    children[move].available += 1
+            if untried:
+                move = generator.choice(untried)
+                child = children[move] = _Node(state.turn)
+                child.available = 1
+                state.play(move)
+                path.append(child)
+                break
+            log_available = {
+                move: math.log(children[move].available) for move in moves}
+            move = max(moves, key=lambda move: (
+                children[move].reward / children[move].visits +
+                exploration * math.sqrt(
+                    log_available[move] / children[move].visits)))
+            node = children[move]
+            state.play(move)
+            path.append(node)
+        while not state.done():
+            state.play(policy(state, state.moves(), generator))
+        total = sum(state.tricks) or 1
+        for node in path:
+            node.visits += 1
+            node.reward += state.tricks[node.seat % 2] / total
+    return {
+        move: (child.visits, child.reward)
+        for move, child in root.children.items()}
+
+
+class MCTSPolicy:
+    """Card play policy searching the information sets
+
+    The policy decides the open card plays the local play rules leave (see
+    play_rules.PlayRules), in place of the LLM.
+    """
+
+    def __init__(
+            self, iterations=DEFAULT_ITERATIONS,
+            time_budget=DEFAULT_TIME_BUDGET, workers=1, rollout="heuristic",
+            exploration=DEFAULT_EXPLORATION, seed=None):
+        """Initialize the policy
+
+        Keyword Arguments:
+        iterations  -- the number of iterations per decision (per worker)
+        time_budget -- the time in seconds the search may take per decision
+                       (per worker, from the start of its search)
+        workers     -- the number of worker processes searching their own
+                       trees (1 to search in the calling process)
+        rollout     -- the name of the rollout policy (see
+                       rollout_policies)
+        exploration -- the exploration constant of the upper confidence
+                       bound
+        seed        -- the seed of the deal sampler (optional)
+        """
+        if rollout not in _ROLLOUT_POLICIES:
+            raise ValueError("Unknown rollout policy: %r" % rollout)
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.rollout = rollout
+        self.exploration = exploration
+        self._generator = random.Random(seed)
+        self._executor = None
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def decide(self, position, allowed_cards, trick, hands, trump, tricks,
+               declarer=None, inference=None):
+        """Return the decision for a play, or None if nothing was searched
+
+        Keyword Arguments:
+        position      -- the position the card is played from
+        allowed_cards -- the allowed cards
+        trick         -- the plays of the current trick
+        hands         -- dictionary from position to the cards of the visible
+                         hands (the cards left)
+        trump         -- the trump suit (None or "notrump" for notrump)
+        tricks        -- the trick objects of the deal so far (with cards
+                         key), the current trick included
+        declarer      -- the position of the declarer (optional)
+        inference     -- the inference of the hidden hands of the player
+                         (see hand_inference.HandInference), by default
+                         made from the visible hands and the tricks
+        """
+        if not allowed_cards:
+            return None
+        played = played_cards(tricks or [])
+        moves = [
+            card_move(card) for card in representatives(
+                position, allowed_cards, hands, played, trick)]
+        if len(moves) == 1:
+            return PlayDecision(move_card(*moves[0]), MCTS)
+        if inference is None:
+            inference = _inference(position, hands, tricks, declarer)
+        base = _State(
+            None, None if trump in (None, "notrump") else
+            SUIT_ORDER.index(trump), POSITION_TAGS.index(position),
+            [(POSITION_TAGS.index(play["position"]), card_move(play["card"]))
+             for play in trick])
+        statistics = self._search(base, inference, moves)
+        if not statistics:
+            return None
+        best = max(moves, key=lambda move: statistics.get(move, (0, 0.0)))
+        return PlayDecision(move_card(*best), MCTS)
+
+    def _search(self, base, inference, moves):
+        seeds = [
+            self._generator.getrandbits(32) for _ in range(self.workers)]
+        arguments = (
+            base, inference, moves, self.iterations, self.time_budget,
+            self.rollout,
+            self.exploration)
+        if self.workers == 1:
+            return _search(*arguments, seeds[0])
+        if self._executor is None:
+            self._executor = worker_pool(self.workers)
+        futures = [
+            self._executor.submit(_search, *arguments, seed)
+            for seed in seeds]
+        statistics = {}
+        for future in futures:
+            for move, (visits, reward) in future.result().items():
+                total = statistics.get(move, (0, 0.0))
+                statistics[move] = (total[0] + visits, total[1] + reward)
+        return statistics
+
+
+def _inference(position, hands, tricks, declarer):
+    # The inference of the hidden hands from the visible hands and the
+    # tricks, for the player seeing them (the declarer when playing from the
+    # dummy)
+    dummy = None
+    if declarer is not None:
+        dummy = POSITION_TAGS[(POSITION_TAGS.index(declarer) + 2) % 4]
+    observer = declarer if position == dummy else position
+    played = {position_: [] for position_ in POSITION_TAGS}
+    plays = [
+        play for trick in tricks or () for play in trick.get("cards") or ()]
+    for play in plays:
+        played[play["position"]].append(play["card"])
+    inference = HandInference(
+        observer, list(hands.get(observer, ())) + played[observer], declarer)
+    for position_, cards in hands.items():
+        if position_ != observer:
+            inference.reveal(position_, list(cards) + played[position_])
+    for play in plays:
+        inference.play(play["position"], play["card"])
+    return inference
@@ -0,0 +1,282 @@
+"""Binary journal of the protocol messages
+
+The journal records every message frame sent or received on the sockets of
+the client with the time, so the exact message sequence of a slow or wrong
+decision can be inspected, and replayed to the message queue handlers without
+a server (see replay).
+
+A journal is two files. The frames file starts with a magic number and
+holds the records one after another: the time (double), the direction
+(byte) and the number of frames (unsigned int), followed by each frame
+prefixed with its length (unsigned int). The first frame of a record is the
+name of the channel (for example control or events). The index file (the
+frames file name with the .idx suffix) holds the offset of each record in the
+frames file, its time and its direction, so that records are accessed
+without reading the frames before them. All numbers are little endian.
+
+Functions:
+replay -- feed the received messages of a journal to message queues
+
+Classes:
+MessageJournal  -- writer of a journal
+JournalReader   -- random access reader of a journal
+JournaledSocket -- socket wrapper journaling the messages
+"""
+
+import collections
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"BGJOURN1"
+RECEIVED = 0
+SENT = 1
+INDEX_SUFFIX = ".idx"
+
+_RECORD = struct.Struct("<dBI")
+_FRAME = struct.Struct("<I")
+_INDEX = struct.Struct("<QdB")
+
+Record = collections.namedtuple(
+    "Record", ("time", "direction", "channel", "parts"))
+
+
+class MessageJournal:
+    """Writer of a journal
+
+    Records are appended to the journal (an existing journal is continued),
+    and written through, so that the journal of a process that crashed is
+    readable up to the last message. The journal may be shared by the sockets
+    of several threads.
+    """
+
+    def __init__(self, path):
+        """Initialize journal
+
+        Keyword Arguments:
+        path -- the path of the frames file
+        """
+        self.path = path
+        self._frames = open(path, "ab")
+        if self._frames.tell() == 0:
+            self._frames.write(MAGIC)
+        self._index = open(path + INDEX_SUFFIX, "ab")
+        self._lock = threading.Lock()
+
+    def record(self, channel, direction, parts, timestamp=None):
+        """Append message to the journal
+
+        Keyword Arguments:
+        channel   -- the name of the channel (str)
+        direction -- RECEIVED or SENT
+        parts     -- the frames of the message (list of bytes)
+        timestamp -- the time of the message (by default the current time)
+
+        The messages of the sockets still in use after the journal is closed
+        are not recorded.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        frames = [channel.encode()] + [bytes(part) for part in parts]
+        data = [_RECORD.pack(timestamp, direction, len(frames))]
+        for frame in frames:
+            data.append(_FRAME.pack(len(frame)))
+            data.append(frame)
+        with self._lock:
+            if self._frames.closed:
+                return
+            offset = self._frames.tell()
+            self._frames.write(b"".join(data))
+            self._frames.flush()
+            self._index.write(_INDEX.pack(offset, timestamp, direction))
+            self._index.flush()
+
+    def close(self):
+        """Close the files of the journal"""
+        with self._lock:
+            self._frames.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JournalReader:
+    """Random access reader of a journal
+
+    The reader is a sequence of the records (see Record) of the journal. If
+    the index file is missing, or does not end with the last record of the
+    frames file, it is rebuilt in memory by scanning the frames file.
+    """
+
+    def __init__(self, path):
+        """Initialize reader
+
+        Keyword Arguments:
+        path -- the path of the frames file
+        """
+        self.path = path
+        self._frames = open(path, "rb")
+        if self._frames.read(len(MAGIC)) != MAGIC:
+            self._frames.close()
+            raise ValueError("Not a message journal: %r" % path)
+        size = os.fstat(self._frames.fileno()).st_size
+        try:
+            with open(path + INDEX_SUFFIX, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._entries = self._scan(size)
+        else:
+            data = data[:len(data) - len(data) % _INDEX.size]
+            self._entries = list(_INDEX.iter_unpack(data))
+            # An index not ending with the last record of the frames file
+            # (the writer crashed between the two files) is rebuilt
+            end = len(MAGIC)
+            if self._entries:
+                end = self._record_end(self._entries[-1][0], size)
+            if end != size:
+                self._entries = self._scan(size)
+
+    def _record_end(self, offset, size):
+        # The offset after the record at offset, or None if it is torn
+        if offset + _RECORD.size > size:
+            return None
+        self._frames.seek(offset)
+        _, _, count = _RECORD.unpack(self._frames.read(_RECORD.size))
+        end = offset + _RECORD.size
+        for _ in range(count):
+            header = self._frames.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return None
+            length, = _FRAME.unpack(header)
+            end += _FRAME.size + length
+            self._frames.seek(end)
+        return end if end <= size else None
+
+    def _scan(self, size):
+        entries = []
+        offset = len(MAGIC)
+        while True:
+            end = self._record_end(offset, size)
+            if end is None:
+                return entries
+            self._frames.seek(offset)
+            timestamp, direction, _ = _RECORD.unpack(
+                self._frames.read(_RECORD.size))
+            entries.append((offset, timestamp, direction))
+            offset = end
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, n):
+        offset, timestamp, direction = self._entries[n]
+        self._frames.seek(offset)
+        _, _, count = _RECORD.unpack(self._frames.read(_RECORD.size))
+        frames = []
+        for _ in range(count):
+            length, = _FRAME.unpack(self._frames.read(_FRAME.size))
+            frames.append(self._frames.read(length))
+        return Record(timestamp, direction, frames[0].decode(), frames[1:])
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def close(self):
+        """Close the frames file"""
+        self._frames.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JournaledSocket:
+    """Socket wrapper journaling the messages
+
+    The messages sent and received with send_multipart and recv_multipart are
+    recorded in the journal. Everything else is delegated to the socket, so
+    the wrapper is used in place of the socket by the message queues, the
+    socket notifiers and sendCommand.
+    """
+
+    def __init__(self, socket, journal, channel):
+        """Initialize wrapper
+
+        Keyword Arguments:
+        socket  -- the ZeroMQ socket
+        journal -- the MessageJournal
+        channel -- the name of the channel in the journal
+        """
+        self._socket = socket
+        self._journal = journal
+        self._channel = channel
+
+    def send_multipart(self, parts, *args, **kwargs):
+        self._journal.record(self._channel, SENT, parts)
+        return self._socket.send_multipart(parts, *args, **kwargs)
+
+    def recv_multipart(self, *args, **kwargs):
+        parts = self._socket.recv_multipart(*args, **kwargs)
+        self._journal.record(self._channel, RECEIVED, parts)
+        return parts
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
+
+
+def replay(records, queues, speed=None):
+    """Feed the received messages of a journal to message queues
+
+    The messages are handled like the messages received from the sockets (see
+    messaging.MessageQueue.handleMessage). The messages of the channels
+    without a queue and the sent messages are skipped.
+
+    Keyword Arguments:
+    records -- the records of the journal (for example a JournalReader)
+    queues  -- dictionary from channel name to message queue
+    speed   -- the factor of the recorded speed (by default the messages are
+               handled as fast as possible)
+
+    Returns the number of messages handled.
+    """
+    handled = 0
+    start = first = None
+    for record in records:
+        if record.direction != RECEIVED or record.channel not in queues:
+            continue
+        if speed:
+            if start is None:
+                start, first = time.perf_counter(), record.time
+            delay = (record.time - first) / speed - (
+                time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if not queues[record.channel].handleMessage(record.parts):
+            logging.warning("Replayed message not handled: %r", record)
+        handled += 1
+    return handled
+
+
+def main(path):
+    """Print the records of a journal"""
+    with JournalReader(path) as reader:
+        first = None
+        for record in reader:
+            first = record.time if first is None else first
+            print("%10.3f %-8s %-4s %r" % (
+                record.time - first, record.channel,
+                "sent" if record.direction == SENT else "recv",
+                record.parts))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -2,6 +2,7 @@
 
 import re
 import logging
+import time
 
 import json
 import zmq
@@ -113,7 +114,7 @@ class ProtocolError(Exception):
 class MessageQueue:
     """Object for handling messages coming from the bridge server"""
 
-    def __init__(self, socket, name, validator, handlers):
+    def __init__(self, socket, name, validator, handlers, recorder=None):
         """Initialize message queue
 
         Message queue keeps a reference to the given socket and wraps it into a
@@ -135,11 +136,15 @@ class MessageQueue:
         name      -- the name of the queue (for logging)
         validator -- Function for validating successful message
         handlers  -- mapping between commands and message handlers
+        recorder  -- function called with the command and the arguments of
+                     each valid message before it is handled (optional, see
+                     MessageRecorder)
         """
         self._socket = socket
         self._name = str(name)
         self._validator = validator
         self._handlers = dict(handlers)
+        self._recorder = recorder
 
     def handleMessages(self):
         """Notify the message queue that messages can be handled
@@ -161,15 +166,29 @@ class MessageQueue:
                     e.errno, self._name, str(e))
                 ret = False
             else:
-                try:
-                    self._handle_message(parts)
-                except ProtocolError as e:
-                    logging.warning(
-                        "Unexpected event while handling message %r from %s: %s",
-                        parts, self._name, str(e))
-                    ret = False
+                ret = self.handleMessage(parts) and ret
         return ret
 
+    def handleMessage(self, parts):
+        """Handle message received by other means than the socket
+
+        The message frames are handled like a message received from the
+        socket, for example when replaying a journal (see message_journal).
+        Returns False if handling the message results in an error, and True
+        otherwise.
+
+        Keyword Arguments:
+        parts -- the message frames (list of bytes)
+        """
+        try:
+            self._handle_message(parts)
+        except ProtocolError as e:
+            logging.warning(
+                "Unexpected event while handling message %r from %s: %s",
+                parts, self._name, str(e))
+            return False
+        return True
+
     def _handle_message(self, parts):
         logging.debug("Received message: %r", parts)
         command, parts = self._validator(parts)
@@ -190,4 +209,47 @@ class MessageQueue:
             except json.decoder.JSONDecodeError as e:
                 raise ProtocolError("Error while parsing %r: %r" % (value, e))
             kwargs[key] = value
+        if self._recorder:
+            self._recorder(command, kwargs)
         command_handler(**kwargs)
+
+
+class MessageRecorder:
+    """Recorder of the messages handled by a message queue
+
+    The recorder is given as the recorder of a MessageQueue, and writes each
+    message as a line of JSON with the time it was handled, the command and
+    the arguments. The recordings are read back with read_messages, for
+    example to verify the server against the local rules (see
+    rules_engine.verify_messages).
+    """
+
+    def __init__(self, file):
+        """Initialize message recorder
+
+        Keyword Arguments:
+        file -- the text file the messages are written to
+        """
+        self._file = file
+
+    def __call__(self, command, kwargs):
+        json.dump({
+            "time": time.time(), "command": command.decode(),
+            "arguments": kwargs}, self._file)
+        self._file.write("\n")
+        self._file.flush()
+
+
+def read_messages(file):
+    """Return the messages of a recording as (command, arguments) pairs
+
+    Keyword Arguments:
+    file -- the text file written by MessageRecorder
+    """
+    messages = []
+    for line in file:
+        if line.strip():
+            message = json.loads(line)
+            messages.append(
+                (message["command"].encode(), message["arguments"]))
+    return messages
@@ -0,0 +1,353 @@
+"""Compact text notation for prompts
+
+This module converts hands, cards, calls, auctions, tricks and contracts from
+the serialized representation of the bridge protocol into compact text. All
+prompt builders use it, so that the models see one notation and the prompts
+do not carry verbose JSON:
+
+- cards are written as suit letter and rank: "SA", "HT", "C2"
+- hands use PBN order spades.hearts.diamonds.clubs: "AKQ2.T9.J84.7532"
+- card lists are grouped by suit: "S:AK2 H:T9 C:3"
+- classes of equivalent cards are separated by commas: "S:QJT9, S:5, H:K"
+- calls: "1H", "3NT", "P", "X", "XX"
+- auctions start with the first caller followed by the calls in turn order:
+  "N:1H-P-2C-P"
+- tricks list the cards in play order: "N:SA E:S2 S:S5 W:S9"
+
+Functions:
+format_call               -- short text representation of a call ("1H", "Pass")
+parse_call                -- parse short or long text representation of a call
+find_calls                -- find all calls mentioned in text
+as_protocol_call          -- convert text representation into protocol call object
+normalize_bidding_history -- convert bidding history into (position, call) pairs
+format_calls              -- compact list of calls ("P,1S,1NT,X")
+format_auction            -- compact auction ("N:1H-P-2C-P")
+format_card               -- compact card ("SA")
+format_hand               -- hand in PBN notation ("AKQ2.T9.J84.7532")
+format_hands              -- hands of several positions in PBN notation
+format_cards              -- cards grouped by suit ("S:AK2 H:T9")
+format_card_classes       -- classes of equivalent cards ("S:QJT9, S:5")
+format_trick              -- compact trick ("N:SA E:S2 S:S5 W:S9")
+format_tricks             -- compact history of tricks
+format_contract           -- compact contract ("4SX")
+"""
+
+import re
+
+POSITION_TAGS = ("north", "east", "south", "west")
+POSITION_FORMATS = {
+    "north": "N", "east": "E", "south": "S", "west": "W"
+}
+PASS_FORMAT = "Pass"
+DOUBLE_FORMAT = "X"
+REDOUBLE_FORMAT = "XX"
+AUCTION_PASS_FORMAT = "P"
+STRAIN_FORMATS = {
+    "clubs": "C", "diamonds": "D", "hearts": "H", "spades": "S",
+    "notrump": "NT"
+}
+STRAIN_TAGS = {format_: tag for tag, format_ in STRAIN_FORMATS.items()}
+STRAIN_ALIASES = {
+    "c": "clubs", "club": "clubs", "clubs": "clubs", "♣": "clubs",
+    "d": "diamonds", "diamond": "diamonds", "diamonds": "diamonds", "♦": "diamonds",
+    "h": "hearts", "heart": "hearts", "hearts": "hearts", "♥": "hearts",
+    "s": "spades", "spade": "spades", "spades": "spades", "♠": "spades",
+    "n": "notrump", "nt": "notrump", "notrump": "notrump", "no trump": "notrump",
+    "no-trump": "notrump",
+}
+DOUBLING_FORMATS = {"undoubled": "", "doubled": "X", "redoubled": "XX"}
+# Suits in PBN order, highest first
+SUIT_ORDER = ("spades", "hearts", "diamonds", "clubs")
+SUIT_FORMATS = {"spades": "S", "hearts": "H", "diamonds": "D", "clubs": "C"}
+RANK_FORMATS = {
+    "2": "2", "3": "3", "4": "4", "5": "5", "6": "6", "7": "7", "8": "8",
+    "9": "9", "10": "T", "jack": "J", "queen": "Q", "king": "K", "ace": "A"
+}
+_RANK_ORDER = {rank: order for order, rank in enumerate("23456789TJQKA")}
+
+NOTATION_LEGEND = (
+    "Notation: cards are suit letter and rank (SA = ace of spades, T = 10); "
+    "hands are spades.hearts.diamonds.clubs; card lists are grouped by suit "
+    "(S:AK2 H:T9); auctions start with the first caller followed by the calls "
+    "in turn order (N:1H-P-2C-P, P = pass, X = double, XX = redouble); tricks "
+    "list the position and card in play order (N:SA E:S2).")
+
+AUCTION_LEGEND = (
+    "Auctions start with the first caller followed by the calls in turn order "
+    "(N:1H-P-2C-P, P = pass, X = double, XX = redouble).")
+
+_CALL_REGEX = re.compile(
+    r"\b(?P<level>[1-7])\s*(?P<strain>no[ -]?trump|notrump|nt|spades?|hearts?|"
+    r"diamonds?|clubs?|[cdhsn♣♦♥♠])(?![a-z])|(?P<pass>\bpass\b|\bp\b)|"
+    r"(?P<redouble>\bxx\b|\bredouble\b)|(?P<double>\bx\b|\bdouble\b)",
+    re.IGNORECASE)
+
+
+def _format_match(match):
+    if match.group("pass"):
+        return PASS_FORMAT
+    if match.group("redouble"):
+        return REDOUBLE_FORMAT
+    if match.group("double"):
+        return DOUBLE_FORMAT
+    strain = STRAIN_ALIASES[match.group("strain").lower()]
+    return "%s%s" % (match.group("level"), STRAIN_FORMATS[strain])
+
+
+def format_call(call):
+    """Return short text representation of call
+
+    The call can be given in the serialized representation (see bridge protocol
+    specification) or as text, in which case it is normalized.
+
+    Keyword Arguments:
+    call -- the call to format
+    """
+    if isinstance(call, str):
+        parsed = parse_call(call)
+        return parsed if parsed is not None else call.strip()
+    type_ = call.get("type")
+    if type_ == "pass":
+        return PASS_FORMAT
+    if type_ == "double":
+        return DOUBLE_FORMAT
+    if type_ == "redouble":
+        return REDOUBLE_FORMAT
+    bid = call.get("bid") or {}
+    return "%d%s" % (int(bid["level"]), STRAIN_FORMATS[bid["strain"]])
+
+
+def parse_call(text):
+    """Parse text representation of a call
+
+    Accepts both the short ("1H", "3NT", "X", "P") and the long ("1 hearts",
+    "pass") representation. Returns the short representation or None if the
+    text does not contain a call.
+    """
+    match = _CALL_REGEX.search(text.strip())
+    if not match:
+        return None
+    return _format_match(match)
+
+
+def find_calls(text):
+    """Return short representations of all calls mentioned in text"""
+    return [_format_match(match) for match in _CALL_REGEX.finditer(text or "")]
+
+
+def as_protocol_call(text):
+    """Convert text representation of a call into protocol call object
+
+    Returns None if the text is not a call.
+    """
+    call = parse_call(text) if text else None
+    if call is None:
+        return None
+    if call == PASS_FORMAT:
+        return {"type": "pass"}
+    if call == DOUBLE_FORMAT:
+        return {"type": "double"}
+    if call == REDOUBLE_FORMAT:
+        return {"type": "redouble"}
+    return {
+        "type": "bid",
+        "bid": {"level": int(call[0]), "strain": STRAIN_TAGS[call[1:]]}
+    }
+
+
+def normalize_bidding_history(bidding_history):
+    """Convert bidding history into list of (position, call) pairs
+
+    The bidding history is accepted both in the form stored by the frontend
+    (list of {position: call} mappings with serialized calls) and as list of
+    "position: call" strings used by the agents. Calls are returned in the
+    short text representation.
+    """
+    pairs = []
+    for item in bidding_history or ():
+        if isinstance(item, dict):
+            for position, call in item.items():
+                pairs.append((position.lower(), format_call(call)))
+        else:
+            position, _, call = str(item).replace(":", " ", 1).partition(" ")
+            pairs.append((position.strip().lower(), format_call(call)))
+    return pairs
+
+
+def _auction_call(call):
+    return AUCTION_PASS_FORMAT if call == PASS_FORMAT else call
+
+
+def format_calls(calls):
+    """Return compact list of calls ("P,1S,1NT,X")
+
+    Keyword Arguments:
+    calls -- serialized calls or their text representations, or a comma
+             separated string of calls
+    """
+    if isinstance(calls, str):
+        calls = calls.split(",")
+    formatted = []
+    for call in calls or ():
+        call = format_call(call)
+        if call:
+            formatted.append(_auction_call(call))
+    return ",".join(formatted)
+
+
+def format_auction(bidding_history):
+    """Return compact auction ("N:1H-P-2C-P")
+
+    The auction starts with the position of the first caller in the history,
+    followed by the calls in turn order. Returns "none" for an empty auction.
+
+    Keyword Arguments:
+    bidding_history -- the bidding history (see normalize_bidding_history)
+    """
+    pairs = normalize_bidding_history(bidding_history)
+    if not pairs:
+        return "none"
+    first = POSITION_FORMATS.get(pairs[0][0], pairs[0][0])
+    return "%s:%s" % (
+        first, "-".join(_auction_call(call) for _, call in pairs))
+
+
+def _rank_and_suit(card):
+    if isinstance(card, dict):
+        return card["rank"], card["suit"]
+    return card.rank, card.suit
+
+
+def format_card(card):
+    """Return compact card ("SA")
+
+    Keyword Arguments:
+    card -- serialized card, or object with rank and suit attributes
+    """
+    if isinstance(card, str):
+        return card
+    rank, suit = _rank_and_suit(card)
+    return SUIT_FORMATS[suit] + RANK_FORMATS[rank]
+
+
+def _holdings(cards):
+    holdings = {suit: [] for suit in SUIT_ORDER}
+    for card in cards:
+        rank, suit = _rank_and_suit(card)
+        holdings[suit].append(RANK_FORMATS[rank])
+    for ranks in holdings.values():
+        ranks.sort(key=_RANK_ORDER.__getitem__, reverse=True)
+    return holdings
+
+
+def format_hand(cards):
+    """Return hand in PBN notation ("AKQ2.T9.J84.7532")
+
+    Returns "unknown" if the hand is not known (None or empty).
+
+    Keyword Arguments:
+    cards -- the cards of the hand
+    """
+    if not cards:
+        return "unknown"
+    holdings = _holdings(cards)
+    return ".".join("".join(holdings[suit]) for suit in SUIT_ORDER)
+
+
+def format_hands(hands):
+    """Return hands of several positions in PBN notation
+
+    Keyword Arguments:
+    hands -- mapping from position to cards (as in the public state of the
+             bridge protocol) or a single list of cards
+    """
+    if not isinstance(hands, dict):
+        return format_hand(hands)
+    known = [
+        "%s:%s" % (POSITION_FORMATS.get(position, position), format_hand(cards))
+        for position, cards in hands.items() if cards]
+    return " ".join(known) if known else "unknown"
+
+
+def format_cards(cards):
+    """Return cards grouped by suit ("S:AK2 H:T9")
+
+    Keyword Arguments:
+    cards -- the cards
+    """
+    if not cards:
+        return "none"
+    holdings = _holdings(cards)
+    return " ".join(
+        "%s:%s" % (SUIT_FORMATS[suit], "".join(holdings[suit]))
+        for suit in SUIT_ORDER if holdings[suit])
+
+
+def format_card_classes(classes):
+    """Return classes of equivalent cards ("S:QJT9, S:5, H:K")
+
+    Keyword Arguments:
+    classes -- list of the classes, each a list of cards (see
+               play_rules.equivalence_classes)
+    """
+    if not classes:
+        return "none"
+    return ", ".join(format_cards(class_) for class_ in classes)
+
+
+def format_trick(trick):
+    """Return compact trick ("N:SA E:S2 S:S5 W:S9")
+
+    Keyword Arguments:
+    trick -- list of {"position": ..., "card": ...} mappings in play order, or
+             trick object of the bridge protocol (with cards and winner keys)
+    """
+    winner = None
+    if isinstance(trick, dict):
+        winner = trick.get("winner")
+        trick = trick.get("cards") or []
+    if not trick:
+        return "none"
+    formatted = " ".join(
+        "%s:%s" % (
+            POSITION_FORMATS.get(play["position"], play["position"]),
+            format_card(play["card"]))
+        for play in trick)
+    if winner:
+        formatted += " (%s)" % POSITION_FORMATS.get(winner, winner)
+    return formatted
+
+
+def format_tricks(tricks_history):
+    """Return compact history of tricks ("N:H2 E:H3 S:H4 W:H5 (W) / ...")
+
+    The winner of a trick is in parentheses. The frontend keeps a snapshot of
+    all tricks for each state update, in which case the latest snapshot is
+    used.
+
+    Keyword Arguments:
+    tricks_history -- list of tricks (see format_trick), or list of such lists
+    """
+    tricks = list(tricks_history or ())
+    if tricks and isinstance(tricks[-1], list) and (
+            not tricks[-1] or isinstance(tricks[-1][0], dict) and
+            "cards" in tricks[-1][0]):
+        tricks = tricks[-1]
+    if not tricks:
+        return "none"
+    return " / ".join(format_trick(trick) for trick in tricks)
+
+
+def format_contract(contract):
+    """Return compact contract ("4SX")
+
+    Keyword Arguments:
+    contract -- contract object of the bridge protocol (with bid and doubling
+                keys) or its text representation
+    """
+    if not contract:
+        return "none"
+    if isinstance(contract, str):
+        return contract
+    return format_call({"type": "bid", "bid": contract["bid"]}) + \
+        DOUBLING_FORMATS.get(contract.get("doubling"), "")
@@ -1,8 +1,9 @@
 import os
 from dotenv import load_dotenv
 from langchain_community.llms import OpenAI
-from langchain.prompts import PromptTemplate
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
 import logging
 from bridgegui.schemas import OpeningBidToolInput, OpeningBidToolOutput
 
@@ -18,9 +19,8 @@ from bridgegui.schemas import OpeningBidToolInput, OpeningBidToolOutput
 # 3) SET UP THE PROMPT FOR THE AGENT
 ########################################
 
-opening_bidding_prompt = PromptTemplate(
-    input_variables=["hcp", "distribution", "balanced_hand", "dominant_suit"],
-    template="""
+opening_bidding_prompt = StaticPrefixPrompt(
+    prefix="""
 You are a Bridge Advisor specialised in opening bid. 
 
 You assume the opening strategy is as described in bidding strategy below.
@@ -36,25 +36,26 @@ Bid Rules:
 - **24+ HCP, no 5-card suit**: Open **3 Notrump**.
 
 Respond with json format:
-    "hcp": {hcp},
-    "distribution": {distribution},
-    "balanced_hand": {balanced_hand},
-    "dominant_suit": {dominant_suit},
+    "hcp": <HCP from the input data>,
+    "distribution": <distribution from the input data>,
+    "balanced_hand": <balanced hand from the input data>,
+    "dominant_suit": <dominant suit from the input data>,
     "your_team_analysis": "Your team analysis here.",
     "bid_suggestion": "Your bid suggestion here."
 
 bid_suggestion must be unambiguous and in the format "1H", "2S", "3NT", etc.
 your_team_analysis must explain the reasoning behind the bid suggestion.
-
+""",
+    suffix="""
 Input data:
 - HCP: {hcp}
 - Distribution: {distribution}
 - Balanced hand: {balanced_hand}
 - Dominant suit: {dominant_suit}
 
-Execute now: 
-
-""".strip()
+Execute now:
+""",
+    input_variables=["hcp", "distribution", "balanced_hand", "dominant_suit"]
 )
 
 ########################################
@@ -68,6 +69,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -98,7 +101,7 @@ def get_opening_bid(
     print("DEBUG: Prompt input:", prompt_input)
 
     response = llm.invoke(
-        opening_bidding_prompt.format(
+        opening_bidding_prompt.format_messages(
             hcp=prompt_input["hcp"],
             distribution=prompt_input["distribution"],
             balanced_hand=prompt_input["balanced_hand"],
@@ -0,0 +1,227 @@
+"""Opening lead by simulation
+
+The opening lead is made before the dummy is seen, from the own hand and the
+auction only, and the generic card play prompt has little to go on. This
+module chooses the lead by simulation instead: deals consistent with the own
+hand and the hand ranges shown by the final auction (see hand_ranges) are
+sampled, the tricks the defenders take after each candidate lead are
+computed by the double dummy solver, and the leads are ranked by the mean
+tricks of the defenders, or by the share of the deals where the contract is
+beaten.
+
+As in the simulation of the bids, the deals are solved in parallel in worker
+processes until the time budget runs out, and the deals solved by then are
+used (see simulation.solve_chunks). The evaluations are cached by the
+signature of the decision (the position, the exact hand and the packed
+auction), so a board played again is answered at once.
+
+Functions:
+candidate_leads          -- one lead of each sequence of a hand
+lead_tricks              -- tricks of the defenders after each lead of a deal
+format_lead_evaluations  -- text summary of the best leads
+
+Classes:
+LeadEvaluation    -- mean tricks and beating chance of a lead
+OpeningLeadEngine -- rank the opening leads of a hand by simulation
+"""
+
+import collections
+import logging
+import os
+import random
+import time
+
+from bridgegui.auction import AuctionState
+from bridgegui.double_dummy import DoubleDummySolver, card_move, hand_masks
+from bridgegui.hand_ranges import infer_hand_ranges
+from bridgegui.notation import POSITION_TAGS, STRAIN_FORMATS, format_card
+from bridgegui.play_rules import equivalence_classes
+from bridgegui.simulation import sample_deals, solve_chunks, worker_pool
+
+TRICKS = "tricks"
+BEAT = "beat"
+CRITERIA = (TRICKS, BEAT)
+DEFAULT_DEALS = 32
+DEFAULT_TIME_BUDGET = 30.0
+DEFAULT_CACHE_SIZE = 256
+
+LeadEvaluation = collections.namedtuple(
+    "LeadEvaluation", ("card", "tricks", "beat", "deals"))
+
+
+def candidate_leads(position, hand):
+    """Return one lead of each sequence of a hand
+
+    The cards of a sequence are equivalent for the lead, and the highest is
+    returned (the top of the sequence is the conventional lead). No card is
+    played and no other hand is visible before the opening lead.
+
+    Keyword Arguments:
+    position -- the position of the player on lead
+    hand     -- the cards of the player
+    """
+    return [class_[-1] for class_ in equivalence_classes(position, hand)]
+
+
+def lead_tricks(deal, strain, leader, moves, deadline=None):
+    """Return the tricks of the defenders after each lead of a deal
+
+    Returns dictionary from (suit index, card mask) move to the tricks taken
+    by the side of the leader.
+
+    Keyword Arguments:
+    deal     -- list of the suit masks of the four hands in POSITION_TAGS
+                order
+    strain   -- the strain in the short text representation ("S", "NT")
+    leader   -- the index of the leader in POSITION_TAGS
+    moves    -- the leads as (suit index, card mask) pairs
+    deadline -- time after which TimeoutError is raised (optional)
+    """
+    solver = DoubleDummySolver(deal, strain, deadline)
+    return solver.play_tricks(leader, [], moves)
+
+
+def _solve_deals(deals, strain, leader, moves, deadline, solver):
+    # Worker: the tricks after each lead for each deal, until the deadline.
+    # The deals not solved in time are left out.
+    results = []
+    for deal in deals:
+        try:
+            results.append(solver(deal, strain, leader, moves, deadline))
+        except TimeoutError:
+            break
+    return results
+
+
+class OpeningLeadEngine:
+    """Rank the opening leads of a hand by simulation"""
+
+    def __init__(
+            self, deals=DEFAULT_DEALS, time_budget=DEFAULT_TIME_BUDGET,
+            workers=None, criterion=TRICKS, seed=None, solver=lead_tricks,
+            cache_size=DEFAULT_CACHE_SIZE):
+        """Initialize opening lead engine
+
+        Keyword Arguments:
+        deals       -- the number of deals sampled per decision
+        time_budget -- the time in seconds the deals are solved for
+        workers     -- the number of worker processes (by default the number
+                       of CPUs, 1 to solve in the calling process)
+        criterion   -- TRICKS to rank the leads by the mean tricks of the
+                       defenders, BEAT by the share of the deals where the
+                       contract is beaten
+        seed        -- the seed of the deal sampler (optional)
+        solver      -- function returning the tricks after each lead, with
+                       the signature of lead_tricks
+        cache_size  -- the number of decisions cached
+        """
+        if criterion not in CRITERIA:
+            raise ValueError("Unknown lead criterion: %r" % criterion)
+        self.deals = deals
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.criterion = criterion
+        self.cache_size = cache_size
+        self._generator = random.Random(seed)
+        self._solver = solver
+        self._cache = collections.OrderedDict()
+        self._executor = None
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def evaluate(self, position, hand, auction, contract, ranges=None):
+        """Return the evaluations of the leads, best first
+
+        Returns a list of LeadEvaluation. The list is empty if no deal
+        consistent with the auction could be sampled or solved in time.
+
+        Keyword Arguments:
+        position -- the position of the player on lead
+        hand     -- the cards of the player
+        auction  -- the auction state, or the bidding history
+        contract -- the contract object of the bridge protocol
+        ranges   -- the hand ranges of the seats (by default inferred from
+                    the auction)
+        """
+        if not isinstance(auction, AuctionState):
+            auction = AuctionState.from_history(auction)
+        key = (position, tuple(hand_masks(hand)), auction.pack(),
+               contract["bid"]["level"], contract["bid"]["strain"],
+               self.criterion)
+        evaluations = self._cache.get(key)
+        if evaluations is not None:
+            self._cache.move_to_end(key)
+            return evaluations
+        evaluations = self._evaluate(position, hand, auction, contract, ranges)
+        if evaluations:
+            self._cache[key] = evaluations
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return evaluations
+
+    def _evaluate(self, position, hand, auction, contract, ranges):
+        start = time.time()
+        if ranges is None:
+            ranges, _ = infer_hand_ranges(auction, hand, position)
+        leads = candidate_leads(position, hand)
+        moves = [card_move(card) for card in leads]
+        deals = sample_deals(
+            hand, position, ranges, self.deals, self._generator)
+        if not deals or not moves:
+            return []
+        strain = STRAIN_FORMATS[contract["bid"]["strain"]]
+        leader = POSITION_TAGS.index(position)
+        results = self._solve(
+            deals, strain, leader, moves, start + self.time_budget)
+        logging.debug(
+            "Lead simulation: %d of %d deals solved in %.1f s", len(results),
+            len(deals), time.time() - start)
+        if not results:
+            return []
+        # The defenders beat the contract with the tricks the declarer may
+        # not take
+        needed = 8 - contract["bid"]["level"]
+        evaluations = []
+        for card, move in zip(leads, moves):
+            tricks = [result[move] for result in results]
+            evaluations.append(LeadEvaluation(
+                card, sum(tricks) / len(tricks),
+                sum(1 for tricks_ in tricks if tricks_ >= needed) /
+                len(tricks), len(tricks)))
+        if self.criterion == BEAT:
+            evaluations.sort(key=lambda evaluation: (
+                -evaluation.beat, -evaluation.tricks))
+        else:
+            evaluations.sort(key=lambda evaluation: (
+                -evaluation.tricks, -evaluation.beat))
+        return evaluations
+
+    def _solve(self, deals, strain, leader, moves, deadline):
+        if self.workers > 1 and self._executor is None:
+            self._executor = worker_pool(self.workers)
+        return solve_chunks(
+            _solve_deals, deals, (strain, leader, moves, deadline,
+                                  self._solver),
+            self.workers, self._executor)
+
+
+def format_lead_evaluations(evaluations, limit=4):
+    """Return text summary of the best leads
+
+    Keyword Arguments:
+    evaluations -- the evaluations, best first (see
+                   OpeningLeadEngine.evaluate)
+    limit       -- the number of leads listed
+    """
+    if not evaluations:
+        return ""
+    return "Simulation of %d deals, defensive tricks per lead: %s." % (
+        evaluations[0].deals, ", ".join(
+            "%s %.2f (beats %.0f%%)" % (
+                format_card(evaluation.card), evaluation.tricks,
+                100 * evaluation.beat)
+            for evaluation in evaluations[:limit]))
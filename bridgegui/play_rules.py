@@ -0,0 +1,425 @@
+"""Local rules for trivial card play decisions
+
+Many card play decisions do not need the LLM: there is one allowed card, the
+allowed cards are equivalent, or standard technique decides. This module
+answers these decisions from the current trick, the visible hands and the
+cards played, and leaves the open decisions (leads, and the plays no rule
+covers) to the LLM.
+
+The rules are tried in order:
+
+- only card: a single allowed card
+- equivalent cards: the allowed cards are in one equivalence class (the
+  lowest is played)
+- claim and endgame: the decisions of the endgame solver, if the engine has
+  one (see endgame.EndgameSolver)
+- declarer plan: the card of the declarer's plan for the deal, if one is set
+  (see declarer_plan.DeclarerPlan)
+- partner wins: the partner is winning the trick and no later hand can beat
+  it (the lowest card is played, or a discard)
+- win cheaply: the last hand plays the cheapest card winning the trick
+- third hand high: the third hand plays its highest card (the lowest of
+  equivalent top cards), or only as high as needed to beat the visible last
+  hand
+- cover an honor: the second hand covers an honor led by an opponent with
+  the cheapest higher card, unless the honor is led from a visible
+  sequence
+- second hand low: the second hand plays low on a small card
+- cannot win: the lowest card if no allowed card can win the trick
+- discard: without cards of the suit led or trumps, the lowest card of the
+  longest suit without honors
+
+Allowed cards are equivalent when they are in one suit and no card between
+them can still be played by the opponents: the cards between them are
+played, or held by the own side (the own hand, and the partner's hand when
+it is visible). The cards of the current trick separate the cards, since
+playing below or above them matters. equivalence_classes partitions the
+allowed cards into these classes for the prompt builders, the copilot and
+the solvers.
+
+Functions:
+played_cards        -- suit masks of the cards in tricks
+equivalence_classes -- partition allowed cards into equivalent cards
+representatives     -- one card of each equivalence class
+
+Classes:
+PlayDecision -- card chosen by a rule
+PlayRules    -- rule engine with statistics of the decisions
+"""
+
+import collections
+import threading
+
+from bridgegui.double_dummy import RANKS, card_bit, hand_masks
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+
+ONLY_CARD = "only card"
+EQUIVALENT_CARDS = "equivalent cards"
+CLAIM = "claim"
+ENDGAME = "endgame"
+PLAN = "declarer plan"
+PARTNER_WINS = "partner wins"
+WIN_CHEAPLY = "win cheaply"
+THIRD_HAND_HIGH = "third hand high"
+COVER_AN_HONOR = "cover an honor"
+SECOND_HAND_LOW = "second hand low"
+CANNOT_WIN = "cannot win"
+DISCARD = "discard"
+RULES = (
+    ONLY_CARD, EQUIVALENT_CARDS, CLAIM, ENDGAME, PLAN, PARTNER_WINS,
+    WIN_CHEAPLY, THIRD_HAND_HIGH, COVER_AN_HONOR, SECOND_HAND_LOW, CANNOT_WIN,
+    DISCARD)
+
+# The jack and higher cards are honors
+_HONOR_BIT = RANKS.index("jack")
+_FULL_SUIT = (1 << len(RANKS)) - 1
+
+PlayDecision = collections.namedtuple("PlayDecision", ("card", "rule"))
+
+
+def played_cards(tricks):
+    """Return the suit masks of the cards in tricks
+
+    Keyword Arguments:
+    tricks -- list of trick objects of the bridge protocol (with cards key),
+              or list of {"position": ..., "card": ...} plays
+    """
+    masks = [0, 0, 0, 0]
+    for trick in tricks or ():
+        plays = (trick.get("cards") or []) if "cards" in trick else [trick]
+        for play in plays:
+            suit, bit = card_bit(play["card"])
+            masks[suit] |= 1 << bit
+    return masks
+
+
+def _partner(position):
+    return POSITION_TAGS[(POSITION_TAGS.index(position) + 2) % 4]
+
+
+def _sorted_cards(cards):
+    return sorted(
+        (card_bit(card) + (card,) for card in cards),
+        key=lambda card: card[:2])
+
+
+def _separators(position, cards, hands, played, in_trick):
+    # Cards that can separate equivalent cards: the cards not played before
+    # the current trick and not held by the own side
+    own_side = hand_masks(cards)
+    for position_ in (position, _partner(position)):
+        if hands.get(position_):
+            own_side = [
+                mask | hand_mask for mask, hand_mask in zip(
+                    own_side, hand_masks(hands[position_]))]
+    return [
+        _FULL_SUIT & ~(done | side) | trick_mask
+        for done, side, trick_mask in zip(played, own_side, in_trick)]
+
+
+def _classes(cards, separators):
+    # Partition sorted (suit, bit, card) tuples into equivalence classes
+    classes = []
+    previous = None
+    for card in cards:
+        if previous is None or card[0] != previous[0] or separators[
+                card[0]] & (1 << card[1]) - (1 << previous[1] + 1):
+            classes.append([])
+        classes[-1].append(card)
+        previous = card
+    return classes
+
+
+def equivalence_classes(
+        position, allowed_cards, hands=None, played=None, trick=None):
+    """Partition allowed cards into classes of equivalent cards
+
+    Returns list of the classes in SUIT_ORDER, each a list of the cards from
+    the lowest to the highest.
+
+    Keyword Arguments:
+    position      -- the position the cards are played from
+    allowed_cards -- the allowed cards
+    hands         -- dictionary from position to the cards of the visible
+                     hands (optional)
+    played        -- the suit masks of the cards played in the deal,
+                     including the current trick (see played_cards)
+    trick         -- the plays of the current trick
+    """
+    in_trick = played_cards(trick)
+    played = [
+        mask | trick_mask for mask, trick_mask in zip(
+            played or [0, 0, 0, 0], in_trick)]
+    separators = _separators(
+        position, allowed_cards, hands or {}, played, in_trick)
+    return [
+        [card[2] for card in class_]
+        for class_ in _classes(_sorted_cards(allowed_cards), separators)]
+
+
+def representatives(
+        position, allowed_cards, hands=None, played=None, trick=None):
+    """Return the lowest card of each equivalence class of allowed cards
+
+    The arguments are those of equivalence_classes.
+    """
+    return [
+        class_[0] for class_ in equivalence_classes(
+            position, allowed_cards, hands, played, trick)]
+
+
+def _beats(card, other, trump):
+    # Does card beat the other card (the winning card of the trick so far)
+    if card[0] == other[0]:
+        return card[1] > other[1]
+    return card[0] == trump
+
+
+class PlayRules:
+    """Rule engine for trivial card play decisions
+
+    The engine counts the decisions answered by each rule and the open
+    decisions, and keeps the time the open decisions took (see
+    record_open), so the report tells the share of the plays answered
+    locally and an estimate of the latency saved. The statistics are thread
+    safe.
+    """
+
+    def __init__(self, endgame=None):
+        """Initialize play rules
+
+        Keyword Arguments:
+        endgame -- the endgame solver consulted after the equivalent cards
+                   rule (see endgame.EndgameSolver, optional)
+        """
+        self._lock = threading.Lock()
+        self._endgame = endgame
+        self._plan = None
+        self.reset()
+
+    def reset(self):
+        """Reset the statistics"""
+        with self._lock:
+            self._rule_counts = collections.Counter()
+            self._open = 0
+            self._open_time = 0.0
+            self._timed = 0
+
+    def set_plan(self, plan):
+        """Set the declarer plan of the deal
+
+        Keyword Arguments:
+        plan -- the plan consulted after the endgame solver for the plays of
+                the declarer and the dummy (see declarer_plan.DeclarerPlan),
+                or None
+        """
+        self._plan = plan
+
+    @property
+    def open_decisions(self):
+        """Return the number of open decisions since the reset"""
+        return self._open
+
+    def decide(
+            self, position, allowed_cards, trick, hands, trump=None,
+            played=None, tricks=None):
+        """Return the decision of the rules, or None for an open decision
+
+        Keyword Arguments:
+        position      -- the position the card is played from
+        allowed_cards -- the allowed cards
+        trick         -- the plays of the current trick ({"position": ...,
+                         "card": ...} mappings in play order)
+        hands         -- dictionary from position to the cards of the visible
+                         hands (the own hand and the dummy), cards already
+                         played are ignored
+        trump         -- the trump suit (None or "notrump" for notrump)
+        played        -- the suit masks of the cards played in the deal (see
+                         played_cards)
+        tricks        -- the trick objects of the deal so far, the current
+                         trick included (needed by the endgame solver)
+        """
+        decision = self._decide(
+            position, list(allowed_cards), list(trick), hands,
+            None if trump in (None, "notrump") else SUIT_ORDER.index(trump),
+            played or played_cards(tricks), tricks)
+        with self._lock:
+            if decision is None:
+                self._open += 1
+            else:
+                self._rule_counts[decision.rule] += 1
+        return decision
+
+    def record_open(self, elapsed):
+        """Record the time an open decision took
+
+        Keyword Arguments:
+        elapsed -- the time in seconds
+        """
+        with self._lock:
+            self._open_time += elapsed
+            self._timed += 1
+
+    def report(self):
+        """Return text report of the decisions
+
+        The latency saved is estimated from the mean time of the open
+        decisions recorded.
+        """
+        with self._lock:
+            local = sum(self._rule_counts.values())
+            total = local + self._open
+            lines = ["Plays answered locally: %d of %d (%.0f%%)" % (
+                local, total, 100 * local / total if total else 0)]
+            lines.extend(
+                "  %-16s %d" % (rule, self._rule_counts[rule])
+                for rule in RULES if self._rule_counts[rule])
+            if self._timed:
+                mean = self._open_time / self._timed
+                lines.append(
+                    "Open decisions: mean %.2f s, latency saved about "
+                    "%.1f s" % (mean, mean * local))
+        return "\n".join(lines)
+
+    def _decide(
+            self, position, allowed_cards, trick, hands, trump, played,
+            tricks):
+        if len(allowed_cards) == 1:
+            return PlayDecision(allowed_cards[0], ONLY_CARD)
+        if not allowed_cards:
+            return None
+        in_trick = played_cards(trick)
+        played = [mask | trick_mask for mask, trick_mask in zip(
+            played, in_trick)]
+        own = [
+            mask & ~done for mask, done in zip(
+                hand_masks(hands.get(position) or allowed_cards), played)]
+        cards = _sorted_cards(allowed_cards)
+        # Cards of the other hands not played before the current trick
+        outstanding = [
+            _FULL_SUIT & ~(mask | done) | trick_mask
+            for mask, done, trick_mask in zip(own, played, in_trick)]
+        if len(_classes(cards, _separators(
+                position, allowed_cards, hands, played, in_trick))) == 1:
+            return PlayDecision(cards[0][2], EQUIVALENT_CARDS)
+        if self._endgame is not None and tricks is not None:
+            decision = self._endgame.decide(
+                position, allowed_cards, trick, hands, trump, tricks)
+            if decision is not None:
+                return decision
+        if self._plan is not None:
+            decision = self._plan.decide(
+                position, allowed_cards, trick, played)
+            if decision is not None:
+                return decision
+        if not trick:
+            return None
+        return self._follow(
+            position, cards, trick, hands, trump, played, outstanding)
+
+    def _follow(
+            self, position, cards, trick, hands, trump, played, outstanding):
+        led = card_bit(trick[0]["card"])
+        winner = 0
+        for n in range(1, len(trick)):
+            if _beats(card_bit(trick[n]["card"]),
+                      card_bit(trick[winner]["card"]), trump):
+                winner = n
+        winning = card_bit(trick[winner]["card"])
+        partner_winning = trick[winner]["position"] == _partner(position)
+        seat = len(trick)
+        following = cards[0][0] == led[0]
+        winners = [card for card in cards if _beats(card, winning, trump)]
+        later = [
+            (hands.get(play_position), played) for play_position in (
+                POSITION_TAGS[(POSITION_TAGS.index(position) + n) % 4]
+                for n in range(1, 4 - seat))]
+        if partner_winning:
+            if self._safe(winning, led, later, trump, outstanding):
+                return self._lowest_or_discard(
+                    cards, following, trump, PARTNER_WINS)
+            if winning[1] >= _HONOR_BIT:
+                # Overtaking or unblocking the honor of the partner is open
+                return None
+        if seat == 3:
+            if winners:
+                return PlayDecision(winners[0][2], WIN_CHEAPLY)
+            return self._lowest_or_discard(cards, following, trump, CANNOT_WIN)
+        if not winners:
+            return self._lowest_or_discard(cards, following, trump, CANNOT_WIN)
+        if not following:
+            # Ruffing or discarding before the last hand is open
+            return None
+        if seat == 2:
+            return self._third_hand(cards, winners, later[0], outstanding)
+        # The second hand
+        if led[1] >= _HONOR_BIT:
+            leader = hands.get(trick[0]["position"])
+            if leader:
+                below = hand_masks(leader)[led[0]] & ~played[led[0]]
+                if below >> (led[1] - 1) & 1:
+                    return None
+            return PlayDecision(winners[0][2], COVER_AN_HONOR)
+        return PlayDecision(cards[0][2], SECOND_HAND_LOW)
+
+    def _safe(self, winning, led, later, trump, outstanding):
+        # Can none of the later hands beat the winning card of the partner
+        for hand, played in later:
+            if hand is None:
+                # A hidden hand can hold any outstanding card
+                if winning[0] == led[0]:
+                    higher = outstanding[led[0]] >> (winning[1] + 1)
+                    if higher or trump is not None and winning[0] != trump:
+                        return False
+                elif outstanding[trump] >> (winning[1] + 1):
+                    return False
+                continue
+            masks = [
+                mask & ~done for mask, done in zip(hand_masks(hand), played)]
+            if masks[led[0]]:
+                if winning[0] == led[0] and masks[led[0]] >> (winning[1] + 1):
+                    return False
+            elif trump is not None and (
+                    masks[trump] >> (winning[1] + 1) if winning[0] == trump
+                    else masks[trump]):
+                return False
+        return True
+
+    def _third_hand(self, cards, winners, last, outstanding):
+        hand, played = last
+        suit = cards[0][0]
+        if hand is not None:
+            masks = [
+                mask & ~done for mask, done in zip(hand_masks(hand), played)]
+            if not masks[suit]:
+                # The visible last hand can ruff or discard: open
+                return None
+            top = masks[suit].bit_length() - 1
+            for card in winners:
+                if card[1] > top:
+                    return PlayDecision(card[2], THIRD_HAND_HIGH)
+            return PlayDecision(cards[0][2], CANNOT_WIN)
+        # The lowest of the winning cards equivalent to the highest card
+        high = len(winners) - 1
+        while high > 0 and not outstanding[suit] >> winners[high - 1][1] & (
+                (1 << (winners[high][1] - winners[high - 1][1])) - 1):
+            high -= 1
+        return PlayDecision(winners[high][2], THIRD_HAND_HIGH)
+
+    def _lowest_or_discard(self, cards, following, trump, rule):
+        if following:
+            return PlayDecision(cards[0][2], rule)
+        by_suit = collections.defaultdict(list)
+        for card in cards:
+            if card[0] != trump:
+                by_suit[card[0]].append(card)
+        if not by_suit:
+            return PlayDecision(cards[0][2], rule)
+        weak = [
+            suit_cards for suit_cards in by_suit.values()
+            if suit_cards[-1][1] < _HONOR_BIT]
+        if not weak:
+            return None
+        longest = max(weak, key=lambda suit_cards: (
+            len(suit_cards), -suit_cards[0][0]))
+        return PlayDecision(longest[0][2], DISCARD)
@@ -0,0 +1,72 @@
+"""Prompts with an invariant prefix
+
+The bidding strategy, the instructions and the examples make up most of every
+prompt and never change between calls. This module splits a prompt into an
+invariant prefix, sent as the system message, and a small variable suffix,
+sent as the user message. The prefix is formatted once when the prompt is
+defined, and since every request starts with the same text, provider-side
+prompt caching applies to it.
+
+Classes:
+StaticPrefixPrompt -- prompt made of an invariant prefix and a variable suffix
+"""
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+
+class StaticPrefixPrompt:
+    """Prompt made of an invariant prefix and a variable suffix
+
+    The prefix is a template formatted once with the partial variables. The
+    suffix is formatted with the input variables on every call. Literal braces
+    are escaped by doubling them in both, as with str.format.
+    """
+
+    def __init__(self, prefix, suffix, input_variables, partial_variables=None):
+        """Initialize prompt
+
+        Keyword Arguments:
+        prefix            -- the template of the invariant part
+        suffix            -- the template of the variable part
+        input_variables   -- the names of the variables of the suffix
+        partial_variables -- the variables of the prefix (optional)
+        """
+        self._prefix = prefix.format(**(partial_variables or {})).strip()
+        self._suffix = suffix.strip()
+        self._input_variables = tuple(input_variables)
+        self._system_message = SystemMessage(content=self._prefix)
+
+    @property
+    def prefix(self):
+        """Return the invariant prefix"""
+        return self._prefix
+
+    @property
+    def input_variables(self):
+        """Return the names of the variables of the suffix"""
+        return self._input_variables
+
+    def format_suffix(self, **kwargs):
+        """Return the variable suffix formatted with kwargs"""
+        missing = [name for name in self._input_variables if name not in kwargs]
+        if missing:
+            raise KeyError("Missing prompt variables: %r" % missing)
+        return self._suffix.format(**kwargs)
+
+    def format(self, **kwargs):
+        """Return the whole prompt as a single text"""
+        return "%s\n\n%s" % (self._prefix, self.format_suffix(**kwargs))
+
+    def format_messages(self, **kwargs):
+        """Return the prompt as langchain system and human messages"""
+        return [
+            self._system_message,
+            HumanMessage(content=self.format_suffix(**kwargs)),
+        ]
+
+    def format_chat_messages(self, **kwargs):
+        """Return the prompt as chat completion messages"""
+        return [
+            {"role": "system", "content": self._prefix},
+            {"role": "user", "content": self.format_suffix(**kwargs)},
+        ]
@@ -1,8 +1,9 @@
 import os
 from dotenv import load_dotenv
 from langchain_community.llms import OpenAI
-from langchain.prompts import PromptTemplate
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
 import logging
 
 
@@ -18,9 +19,8 @@ import logging
 # 3) SET UP THE PROMPT FOR THE AGENT
 ########################################
 
-response_bidding_prompt = PromptTemplate(
-    input_variables=["partners_opening_bid_analysis", "your_hand_analysis"],
-    template="""
+response_bidding_prompt = StaticPrefixPrompt(
+    prefix="""
 You are a Bridge Advisor specialised in responses to opening bid. 
 
 You assume that the response to opening strategy is as described in bidding strategy below.
@@ -97,12 +97,13 @@ Your partner is South, who has bid 1H.
 Your partner has betwen 12-18 HCP. You have 8 HCP. So you have a total of 20-26 HCP.
 Your partner has at least 5 hearts. You have 3 hearts. So you have a total of 8 hearts.
 Based on analisis of your partners opening and your hand analisis you should bid 2 Hearts.
-
+""",
+    suffix="""
 Partner's Opening Bid analysis: {partners_opening_bid_analysis}
 Your hand analisis: {your_hand_analysis}
 Analisis:
-
-""".strip()
+""",
+    input_variables=["partners_opening_bid_analysis", "your_hand_analysis"]
 )
 
 ########################################
@@ -116,6 +117,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -146,7 +149,7 @@ def get_response_analisis(
     print("DEBUG: Prompt input:", prompt_input)
 
     response = llm.invoke(
-        response_bidding_prompt.format(
+        response_bidding_prompt.format_messages(
             partners_opening_bid_analysis=prompt_input["partners_opening_bid_analysis"],
             your_hand_analysis=prompt_input["your_hand_analysis"]
             )
@@ -0,0 +1,549 @@
+"""Rules of bridge without the server
+
+Every legality check and state transition of a deal is made by the bridge
+server, so deals cannot be simulated or played offline. This module contains
+the rules of a duplicate deal in the package: dealing, the auction (see
+auction.AuctionState), the contract and the declarer, the legal plays
+(following suit), the winners of the tricks, the exposure of the dummy and
+the duplicate score with the vulnerability (see scoring).
+
+The state is compact: a card is the integer 13 * suit + rank (the suit index
+in SUIT_ORDER, rank 0 the two), a hand is the 52-bit mask of its cards and
+the legal plays are a mask, so legality is checked with bit operations. Each
+call and play can be taken back with undo without copying the state, so a
+search can walk the game tree on one engine.
+
+The engine is verified against the server with recordings of the messages
+handled by the frontend (see messaging.MessageRecorder): verify_messages
+replays the events of each deal on an engine and reports every call, play,
+trick, contract and result the server handled differently.
+
+Functions:
+card_code           -- the integer of a card
+code_card           -- the card of an integer
+hand_mask           -- the mask of cards
+mask_cards          -- the cards of a mask
+deal                -- random deal as hand masks
+board_dealer        -- the dealer of a duplicate board
+board_vulnerability -- the vulnerability of a duplicate board
+trick_winner        -- the winner of a trick
+verify_messages     -- compare recorded server events against the rules
+
+Classes:
+RulesEngine -- state of a deal under the rules of bridge
+"""
+
+import random
+
+from bridgegui.auction import AuctionState
+from bridgegui.double_dummy import RANKS
+from bridgegui.notation import (
+    POSITION_TAGS, STRAIN_TAGS, SUIT_ORDER, format_card)
+from bridgegui.positions import PARTNERSHIP_TAGS
+from bridgegui.scoring import contract_score
+
+BIDDING = "bidding"
+PLAYING = "playing"
+ENDED = "ended"
+
+_SUIT_MASKS = tuple(0x1FFF << 13 * suit for suit in range(4))
+_SUIT_INDEXES = {suit: index for index, suit in enumerate(SUIT_ORDER)}
+_RANK_INDEXES = {rank: index for index, rank in enumerate(RANKS)}
+# Vulnerable partnerships (north-south, east-west) of the boards 1-16
+_BOARD_VULNERABILITIES = (
+    (False, False), (True, False), (False, True), (True, True),
+    (True, False), (False, True), (True, True), (False, False),
+    (False, True), (True, True), (False, False), (True, False),
+    (True, True), (False, False), (True, False), (False, True))
+
+
+def card_code(card):
+    """Return the integer of a card
+
+    Keyword Arguments:
+    card -- the card object of the bridge protocol, or its integer
+    """
+    if isinstance(card, int):
+        return card
+    try:
+        return 13 * _SUIT_INDEXES[card["suit"]] + _RANK_INDEXES[card["rank"]]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid card: %r" % (card,))
+
+
+def code_card(code):
+    """Return the card object of an integer"""
+    return {"rank": RANKS[code % 13], "suit": SUIT_ORDER[code // 13]}
+
+
+def hand_mask(cards):
+    """Return the mask of cards
+
+    Keyword Arguments:
+    cards -- iterable of card objects or integers
+    """
+    mask = 0
+    for card in cards:
+        mask |= 1 << card_code(card)
+    return mask
+
+
+def mask_cards(mask):
+    """Return the card objects of a mask, spades first and lowest first"""
+    cards = []
+    while mask:
+        card = mask & -mask
+        cards.append(code_card(card.bit_length() - 1))
+        mask ^= card
+    return cards
+
+
+def deal(generator=None):
+    """Return a random deal as list of four hand masks in POSITION_TAGS order
+
+    Keyword Arguments:
+    generator -- the random number generator (optional)
+    """
+    codes = list(range(52))
+    (generator or random).shuffle(codes)
+    return [hand_mask(codes[13 * n:13 * (n + 1)]) for n in range(4)]
+
+
+def board_dealer(number):
+    """Return the dealer of a duplicate board (numbered from 1)"""
+    return POSITION_TAGS[(number - 1) % 4]
+
+
+def board_vulnerability(number):
+    """Return the vulnerability object of a duplicate board
+
+    The vulnerability follows the standard cycle of 16 boards, and is a
+    mapping from partnership tags to vulnerability as in the bridge
+    protocol.
+    """
+    return dict(zip(
+        PARTNERSHIP_TAGS, _BOARD_VULNERABILITIES[(number - 1) % 16]))
+
+
+def _trump_index(trump):
+    if trump in (None, "notrump", "NT"):
+        return None
+    if trump in STRAIN_TAGS:
+        trump = STRAIN_TAGS[trump]
+    return _SUIT_INDEXES[trump]
+
+
+def _winning_index(trick, trump):
+    best = 0
+    for n in range(1, len(trick)):
+        card, top = trick[n], trick[best]
+        if card // 13 == top // 13:
+            if card > top:
+                best = n
+        elif card // 13 == trump:
+            best = n
+    return best
+
+
+def trick_winner(leader, cards, trump=None):
+    """Return the position winning a trick
+
+    Keyword Arguments:
+    leader -- the position that led to the trick
+    cards  -- the cards of the trick in play order (objects or integers)
+    trump  -- the trump suit (None or "notrump" for notrump)
+    """
+    index = _winning_index(
+        [card_code(card) for card in cards], _trump_index(trump))
+    return POSITION_TAGS[(POSITION_TAGS.index(leader) + index) % 4]
+
+
+def _hand_masks(hands):
+    if isinstance(hands, dict):
+        hands = [hands.get(position, ()) for position in POSITION_TAGS]
+    return [
+        hand if isinstance(hand, int) else hand_mask(hand) for hand in hands]
+
+
+class RulesEngine:
+    """State of a deal under the rules of bridge
+
+    The deal starts with the auction, and after the auction the cards are
+    played until the thirteen tricks are complete (or the deal is passed
+    out). Calls and plays are made by the player in turn, the dummy's cards
+    included, and raise ValueError if they are not legal.
+    """
+
+    def __init__(self, hands, dealer="north", vulnerability=None):
+        """Initialize the deal
+
+        Keyword Arguments:
+        hands         -- the hands as list of four masks or card lists in
+                         POSITION_TAGS order, or as dictionary from position to
+                         the cards (see deal)
+        dealer        -- the position that makes the first call
+        vulnerability -- the vulnerability object of the bridge protocol
+                         (optional, by default nobody is vulnerable)
+        """
+        self._hands = _hand_masks(hands)
+        self._vulnerable = tuple(
+            bool((vulnerability or {}).get(tag)) for tag in PARTNERSHIP_TAGS)
+        self._auction = AuctionState(dealer)
+        self._declarer = None
+        self._trump = None
+        self._turn = None
+        self._leader = None
+        self._trick = []
+        self._tricks = [0, 0]
+        self._winner = None
+        # None for a call, (seat, card, completed trick or None, leader,
+        # previous winner) for a play
+        self._history = []
+
+    @property
+    def hands(self):
+        """Return the masks of the cards left in POSITION_TAGS order"""
+        return tuple(self._hands)
+
+    def hand(self, position):
+        """Return the cards left in the hand of position"""
+        return mask_cards(self._hands[POSITION_TAGS.index(position)])
+
+    @property
+    def vulnerability(self):
+        """Return the vulnerability object"""
+        return dict(zip(PARTNERSHIP_TAGS, self._vulnerable))
+
+    @property
+    def auction(self):
+        """Return the auction state (read only, see call and undo)"""
+        return self._auction
+
+    @property
+    def phase(self):
+        """Return the phase of the deal: BIDDING, PLAYING or ENDED"""
+        if self._declarer is None:
+            return ENDED if self._auction.completed else BIDDING
+        if sum(self._tricks) == 13 or (
+                not self._trick and not self._hands[self._turn]):
+            return ENDED
+        return PLAYING
+
+    @property
+    def turn(self):
+        """Return the position in turn, or None if the deal has ended
+
+        In the play the position is the hand the card is played from, the
+        dummy included.
+        """
+        phase = self.phase
+        if phase == BIDDING:
+            return self._auction.turn
+        if phase == PLAYING:
+            return POSITION_TAGS[self._turn]
+        return None
+
+    @property
+    def declarer(self):
+        """Return the position of the declarer, or None before the play"""
+        return None if self._declarer is None else POSITION_TAGS[
+            self._declarer]
+
+    @property
+    def dummy(self):
+        """Return the position of the dummy, or None before the play"""
+        return None if self._declarer is None else POSITION_TAGS[
+            (self._declarer + 2) % 4]
+
+    @property
+    def dummy_exposed(self):
+        """Return True if the dummy is exposed (after the opening lead)"""
+        return bool(self._declarer is not None and (
+            self._trick or any(self._tricks)))
+
+    @property
+    def contract(self):
+        """Return the contract object of the bridge protocol, or None"""
+        if self._declarer is None:
+            return None
+        bid = self._auction.last_bid
+        return {
+            "bid": {"level": int(bid[0]), "strain": STRAIN_TAGS[bid[1:]]},
+            "doubling": self._auction.doubling}
+
+    @property
+    def trick(self):
+        """Return the cards of the current trick as integers in play order"""
+        return tuple(self._trick)
+
+    @property
+    def leader(self):
+        """Return the position that led to the current trick"""
+        return None if self._leader is None else POSITION_TAGS[self._leader]
+
+    @property
+    def last_winner(self):
+        """Return the position that won the last complete trick, or None"""
+        return None if self._winner is None else POSITION_TAGS[self._winner]
+
+    @property
+    def tricks(self):
+        """Return the tricks taken by north-south and east-west"""
+        return tuple(self._tricks)
+
+    def legal_calls(self):
+        """Return the short text representations of the legal calls"""
+        if self.phase != BIDDING:
+            return []
+        return self._auction.legal_calls()
+
+    def is_legal_call(self, call):
+        """Determine if call is legal for the position in turn"""
+        return self.phase == BIDDING and self._auction.is_legal(call)
+
+    def call(self, call):
+        """Make a call for the position in turn
+
+        Keyword Arguments:
+        call -- the call (see auction.encode_call)
+        """
+        if self.phase != BIDDING:
+            raise ValueError("Call outside the auction: %r" % (call,))
+        self._auction.call(self._auction.turn, call)
+        self._history.append(None)
+        if self._auction.completed and self._auction.last_bid is not None:
+            self._start_play()
+
+    def _start_play(self):
+        # The declarer is the player of the declaring side who first bid the
+        # strain of the contract
+        strain = self._auction.last_bid[1:]
+        side = POSITION_TAGS.index(self._auction.last_bidder) % 2
+        for position, call in self._auction.calls:
+            index = POSITION_TAGS.index(position)
+            if index % 2 == side and call[0].isdigit() and call[1:] == strain:
+                self._declarer = index
+                break
+        self._trump = _trump_index(strain)
+        self._leader = self._turn = (self._declarer + 1) % 4
+
+    def legal_plays(self):
+        """Return the mask of the legal plays of the position in turn"""
+        if self.phase != PLAYING:
+            return 0
+        hand = self._hands[self._turn]
+        if self._trick:
+            follow = hand & _SUIT_MASKS[self._trick[0] // 13]
+            if follow:
+                return follow
+        return hand
+
+    def legal_cards(self):
+        """Return the card objects of the legal plays"""
+        return mask_cards(self.legal_plays())
+
+    def is_legal_play(self, card):
+        """Determine if card is a legal play of the position in turn"""
+        return bool(self.legal_plays() >> card_code(card) & 1)
+
+    def play(self, card):
+        """Play a card from the hand in turn
+
+        Keyword Arguments:
+        card -- the card object or integer
+        """
+        code = card_code(card)
+        if not self.legal_plays() >> code & 1:
+            raise ValueError("Illegal play: %s" % format_card(code_card(code)))
+        seat = self._turn
+        self._hands[seat] &= ~(1 << code)
+        self._trick.append(code)
+        if len(self._trick) < 4:
+            self._history.append((seat, code, None, None, None))
+            self._turn = (seat + 1) % 4
+            return
+        winner = (self._leader + _winning_index(self._trick, self._trump)) % 4
+        self._history.append(
+            (seat, code, tuple(self._trick), self._leader, self._winner))
+        self._tricks[winner % 2] += 1
+        self._trick = []
+        self._leader = self._turn = self._winner = winner
+
+    def undo(self):
+        """Take back the last call or play
+
+        Raises ValueError if nothing has been done.
+        """
+        if not self._history:
+            raise ValueError("Nothing to take back")
+        entry = self._history.pop()
+        if entry is None:
+            self._auction.undo()
+            self._declarer = self._trump = None
+            self._leader = self._turn = None
+            return
+        seat, code, completed, leader, winner = entry
+        if completed is None:
+            self._trick.pop()
+        else:
+            self._tricks[self._winner % 2] -= 1
+            self._trick = list(completed[:-1])
+            self._leader = leader
+            self._winner = winner
+        self._hands[seat] |= 1 << code
+        self._turn = seat
+
+    def declarer_tricks(self):
+        """Return the tricks taken by the declaring side"""
+        if self._declarer is None:
+            return 0
+        return self._tricks[self._declarer % 2]
+
+    def score(self):
+        """Return the duplicate score of the declaring side
+
+        The score is counted from the tricks taken so far, so it is final
+        when the deal has ended. A passed out deal scores 0.
+        """
+        if self._declarer is None:
+            return 0
+        bid = self._auction.last_bid
+        return contract_score(
+            int(bid[0]), bid[1:], self._auction.doubling,
+            self.declarer_tricks(), self._vulnerable[self._declarer % 2])
+
+    def result(self):
+        """Return the result object of the deal end event
+
+        The result is the partnership scoring and the score, as in the bridge
+        protocol. The partnership is None if the deal is passed out.
+        """
+        if self._declarer is None:
+            return {"partnership": None, "score": 0}
+        score = self.score()
+        side = self._declarer % 2 if score > 0 else 1 - self._declarer % 2
+        return {"partnership": PARTNERSHIP_TAGS[side], "score": abs(score)}
+
+
+def _event(command):
+    # The event name of a command, without the game prefix
+    if isinstance(command, str):
+        command = command.encode()
+    return command.rsplit(b":", 1)[-1].decode()
+
+
+def _deal_hands(messages, hands):
+    # The hands of a deal from the given hands, the dummy and the plays, and
+    # the cards found in two hands
+    masks = _hand_masks(hands or {})
+    for command, kwargs in messages:
+        event = _event(command)
+        if event == "dummy":
+            cards = kwargs.get("cards") or ()
+        elif event == "play":
+            cards = (kwargs.get("card"),)
+        else:
+            continue
+        index = POSITION_TAGS.index(kwargs.get("position"))
+        masks[index] |= hand_mask(cards)
+    conflicts = [
+        format_card(code_card(code)) for code in range(52)
+        if sum(mask >> code & 1 for mask in masks) > 1]
+    return masks, conflicts
+
+
+def _same_contract(contract, other):
+    return (other is not None and contract["bid"] == other.get("bid") and
+            contract["doubling"] == other.get("doubling", "undoubled"))
+
+
+def _verify_deal(messages, hands):
+    opener, vulnerability = None, None
+    if messages and _event(messages[0][0]) == "deal":
+        opener = messages[0][1].get("opener")
+        vulnerability = messages[0][1].get("vulnerability")
+    masks, conflicts = _deal_hands(messages, hands)
+    errors = ["Card %s held by two hands" % card for card in conflicts]
+    engine = RulesEngine(masks, opener or "north", vulnerability)
+    for command, kwargs in messages:
+        event = _event(command)
+        position = kwargs.get("position")
+        try:
+            if event == "turn" and position != engine.turn and not (
+                    engine.turn == engine.dummy and
+                    position == engine.declarer):
+                # The declarer may be reported in turn for the dummy
+                errors.append("Turn of %s, expected %s" % (
+                    position, engine.turn))
+            elif event == "call":
+                if position != engine.turn:
+                    errors.append("Call by %s, expected %s" % (
+                        position, engine.turn))
+                engine.call(kwargs.get("call"))
+            elif event == "bidding":
+                if kwargs.get("declarer") != engine.declarer:
+                    errors.append("Declarer %s, expected %s" % (
+                        kwargs.get("declarer"), engine.declarer))
+                if engine.contract is None or not _same_contract(
+                        engine.contract, kwargs.get("contract")):
+                    errors.append("Contract %r, expected %r" % (
+                        kwargs.get("contract"), engine.contract))
+            elif event == "play":
+                if position != engine.turn:
+                    errors.append("Play from %s, expected %s" % (
+                        position, engine.turn))
+                engine.play(kwargs.get("card"))
+            elif event == "dummy":
+                if position != engine.dummy or not engine.dummy_exposed:
+                    errors.append("Dummy %s exposed, expected %s after the "
+                                  "opening lead" % (position, engine.dummy))
+            elif event == "trick":
+                if kwargs.get("winner") != engine.last_winner or engine.trick:
+                    errors.append("Trick won by %s, expected %s" % (
+                        kwargs.get("winner"), engine.last_winner))
+            elif event == "dealend":
+                result = kwargs.get("result") or {}
+                expected = engine.result()
+                if engine.phase != ENDED:
+                    errors.append("Deal ended in the %s phase" % engine.phase)
+                elif result.get("partnership") != expected["partnership"] or (
+                        expected["partnership"] is not None and
+                        result.get("score") != expected["score"]):
+                    errors.append("Result %r, expected %r" % (
+                        result, expected))
+        except ValueError as e:
+            # The rest of the deal cannot be followed
+            errors.append("%s event rejected: %s" % (event.capitalize(), e))
+            break
+    return errors
+
+
+def verify_messages(messages, hands=None):
+    """Compare recorded server events against the rules
+
+    The events are split into deals at the deal events, the hands of each
+    deal are reconstructed from the cards played and the dummy (and the
+    hands given), and the calls, the contract, the plays, the tricks and
+    the result are checked on an engine. Returns the list of discrepancies,
+    each prefixed by the number of the deal in the recording. Messages other
+    than the deal events (replies, player events) are ignored.
+
+    Keyword Arguments:
+    messages -- the (command, arguments) pairs of the handled messages, as
+                read by messaging.read_messages
+    hands    -- dictionary from position to the cards known to be dealt to
+                the position, for example the own hand, in a recording of
+                one deal (optional)
+    """
+    deals = []
+    for command, kwargs in messages:
+        if _event(command) == "deal":
+            deals.append([])
+        if deals:
+            deals[-1].append((command, kwargs))
+    errors = []
+    for number, messages_ in enumerate(deals, 1):
+        errors.extend(
+            "Deal %d: %s" % (number, error)
+            for error in _verify_deal(messages_, hands))
+    return errors
@@ -0,0 +1,108 @@
+"""Duplicate bridge scoring
+
+This module scores a played contract with the duplicate scoring table (trick
+score, game and part score bonuses, slam bonuses, the insult for making a
+doubled contract, overtricks and undertricks), and compares the scores of a
+board played at several tables in IMPs and matchpoints.
+
+The contract is given by its level, its strain in the short text
+representation ("C", "D", "H", "S", "NT", see auction.STRAIN_ORDER) and its
+doubling state ("undoubled", "doubled" or "redoubled", as in the contract
+object of the bridge protocol).
+
+Functions:
+contract_score -- duplicate score of a contract for the declaring side
+imps           -- IMPs of a score difference
+matchpoints    -- matchpoints of the scores of a board
+"""
+
+import bisect
+
+from bridgegui.auction import DOUBLED, REDOUBLED, UNDOUBLED
+
+_DOUBLING_FACTORS = {UNDOUBLED: 1, DOUBLED: 2, REDOUBLED: 4}
+# The smallest score difference of each IMP from 1 to 24
+_IMP_THRESHOLDS = (
+    20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600, 750, 900, 1100,
+    1300, 1500, 1750, 2000, 2250, 2500, 3000, 3500, 4000)
+
+
+def _trick_score(level, strain):
+    if strain == "NT":
+        return 40 + 30 * (level - 1)
+    return (20 if strain in ("C", "D") else 30) * level
+
+
+def _undertricks(undertricks, doubling, vulnerable):
+    if doubling == UNDOUBLED:
+        return (100 if vulnerable else 50) * undertricks
+    if vulnerable:
+        penalty = 200 + 300 * (undertricks - 1)
+    else:
+        penalty = 100 + 200 * min(undertricks - 1, 2) + 300 * max(
+            undertricks - 3, 0)
+    return penalty * (2 if doubling == REDOUBLED else 1)
+
+
+def contract_score(level, strain, doubling, tricks, vulnerable=False):
+    """Return the duplicate score of a contract for the declaring side
+
+    The score is negative if the contract goes down.
+
+    Keyword Arguments:
+    level      -- the level of the contract (1-7)
+    strain     -- the strain in the short text representation
+    doubling   -- the doubling state of the contract
+    tricks     -- the tricks taken by the declarer
+    vulnerable -- True if the declaring side is vulnerable
+    """
+    if tricks < 6 + level:
+        return -_undertricks(6 + level - tricks, doubling, vulnerable)
+    factor = _DOUBLING_FACTORS[doubling]
+    score = _trick_score(level, strain) * factor
+    if score >= 100:
+        score += 500 if vulnerable else 300
+    else:
+        score += 50
+    if level == 6:
+        score += 750 if vulnerable else 500
+    elif level == 7:
+        score += 1500 if vulnerable else 1000
+    if doubling != UNDOUBLED:
+        score += 25 * factor
+    overtricks = tricks - 6 - level
+    if doubling == UNDOUBLED:
+        score += overtricks * (_trick_score(2, strain) - _trick_score(
+            1, strain) if strain == "NT" else _trick_score(1, strain))
+    else:
+        score += overtricks * (100 if vulnerable else 50) * factor
+    return score
+
+
+def imps(difference):
+    """Return the IMPs of a score difference
+
+    The IMPs have the sign of the difference.
+
+    Keyword Arguments:
+    difference -- the difference of the scores of the same side at two
+                  tables
+    """
+    value = bisect.bisect_right(_IMP_THRESHOLDS, abs(difference))
+    return value if difference >= 0 else -value
+
+
+def matchpoints(scores):
+    """Return the matchpoints of the scores of a board
+
+    Each score gets one matchpoint for every other score it beats and half a
+    matchpoint for every other score it ties, so the top is the number of
+    tables less one.
+
+    Keyword Arguments:
+    scores -- the scores of the pairs sitting in the same direction
+    """
+    return [
+        sum(1.0 if score > other else 0.5 if score == other else 0.0
+            for other in scores) - 0.5
+        for score in scores]
@@ -0,0 +1,366 @@
+"""Simulation-based bid evaluation
+
+For the decisions the bidding system does not cover, a call can be evaluated
+by simulation instead of asking the LLM: deals consistent with the own hand
+and the hand ranges shown by the auction (see hand_ranges) are sampled, the
+tricks the declarer takes in each deal are computed by the double dummy
+solver, and every candidate call is scored with duplicate scoring as if the
+auction ended in the contract the call leads to (the other players passing
+after it). The calls are ranked by their mean score for the own side.
+
+The double dummy solver is pure Python, so the deals are solved in parallel
+in worker processes until the time budget runs out, and the evaluation uses
+the deals solved by then. The worker processes are started once per
+evaluator, from a fresh interpreter rather than forked from the (threaded)
+client process, and reused by every decision.
+
+Functions:
+candidate_calls    -- calls worth evaluating in an auction
+final_contract     -- contract the auction ends in after a call
+sample_deals       -- sample deals consistent with a hand and hand ranges
+format_evaluations -- text summary of the best evaluations
+solve_chunks       -- results of a worker over deals solved in chunks
+is_vulnerable      -- whether the side of a position is vulnerable
+worker_pool        -- process pool of workers not forked from the caller
+
+Classes:
+CallEvaluation -- mean score of a call over the simulated deals
+BidEvaluator   -- rank the candidate calls of a decision by simulation
+"""
+
+import collections
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import random
+import time
+
+from bridgegui.auction import (
+    DOUBLE_CODE, FIRST_BID_CODE, PASS_CODE, REDOUBLE_CODE, STRAIN_ORDER,
+    AuctionState, decode_call, encode_call, partner_of)
+from bridgegui.double_dummy import RANKS, declarer_tricks, hand_masks
+from bridgegui.hand_ranges import infer_hand_ranges
+from bridgegui.holdings import TABLES
+from bridgegui.notation import POSITION_TAGS, SUIT_ORDER
+from bridgegui.positions import PARTNERSHIP_TAGS
+from bridgegui.scoring import contract_score
+
+DEFAULT_DEALS = 32
+DEFAULT_TIME_BUDGET = 10.0
+# Game and slam bids worth evaluating besides the cheapest bid of each strain
+_TARGET_BIDS = ("3NT", "4H", "4S", "5C", "5D", "6C", "6D", "6H", "6S", "6NT")
+# The deck as (suit index, card mask, HCP) in SUIT_ORDER
+_DECK = tuple(
+    (suit, 1 << bit, TABLES["hcp"][1 << bit])
+    for suit in range(len(SUIT_ORDER)) for bit in range(len(RANKS)))
+
+CallEvaluation = collections.namedtuple(
+    "CallEvaluation", ("call", "score", "contract", "deals"))
+
+
+def candidate_calls(auction):
+    """Return the calls worth evaluating in an auction
+
+    The candidates are pass, the legal double or redouble, the cheapest legal
+    bid of each strain and the legal game and slam bids, in the short text
+    representation.
+
+    Keyword Arguments:
+    auction -- the auction state (see auction.AuctionState)
+    """
+    mask = auction.legal_mask()
+    calls = [
+        decode_call(code) for code in (PASS_CODE, DOUBLE_CODE, REDOUBLE_CODE)
+        if mask >> code & 1]
+    for strain in STRAIN_ORDER:
+        for level in range(1, 8):
+            call = "%d%s" % (level, strain)
+            if mask >> encode_call(call) & 1:
+                calls.append(call)
+                break
+    for call in _TARGET_BIDS:
+        if mask >> encode_call(call) & 1 and call not in calls:
+            calls.append(call)
+    return calls
+
+
+def final_contract(auction, call, position=None):
+    """Return the contract the auction ends in after a call
+
+    The other players are assumed to pass after the call. Returns tuple
+    (level, strain, doubling, declarer), or None if the deal is passed out.
+    The declarer is the player of the declaring side who first bid the
+    strain.
+
+    Keyword Arguments:
+    auction  -- the auction state before the call
+    call     -- the call
+    position -- the position making the call (by default the position in
+                turn)
+    """
+    auction = AuctionState.unpack(auction.pack())
+    auction.call(position or auction.turn, call)
+    last_bid = auction.last_bid
+    if last_bid is None:
+        return None
+    level, strain = int(last_bid[0]), last_bid[1:]
+    side = (auction.last_bidder, partner_of(auction.last_bidder))
+    declarer = next(
+        position_ for position_, call_ in auction.calls
+        if position_ in side and encode_call(call_) >= FIRST_BID_CODE and
+        call_[1:] == strain)
+    return level, strain, auction.doubling, declarer
+
+
+def _features(hand):
+    hcp = 0
+    lengths = [0, 0, 0, 0]
+    for suit, _, value in hand:
+        hcp += value
+        lengths[suit] += 1
+    return (hcp,) + tuple(lengths)
+
+
+def sample_deals(
+        hand, position, ranges, count, generator=None, max_attempts=None):
+    """Sample deals consistent with a hand and hand ranges
+
+    The other hands are dealt at random and rejected until they are in the
+    ranges. Returns a list of at most count deals, each a list of the suit
+    masks of the four hands in POSITION_TAGS order (see
+    double_dummy.hand_masks). Fewer deals are returned if max_attempts deals
+    are rejected first.
+
+    Keyword Arguments:
+    hand         -- the cards of the player
+    position     -- the position of the player
+    ranges       -- dictionary from position to HandRange (see
+                    hand_ranges.infer_hand_ranges)
+    count        -- the number of deals
+    generator    -- the random number generator (optional)
+    max_attempts -- the maximum number of deals tried (by default 1000 per
+                    deal)
+    """
+    generator = generator or random.Random()
+    if max_attempts is None:
+        max_attempts = 1000 * count
+    own_masks = hand_masks(hand)
+    deck = [
+        card for card in _DECK if not own_masks[card[0]] & card[1]]
+    index = POSITION_TAGS.index(position)
+    others = [(index + offset) % 4 for offset in (1, 2, 3)]
+    others_ranges = [ranges[POSITION_TAGS[seat]] for seat in others]
+    deals = []
+    for _ in range(max_attempts):
+        if len(deals) == count:
+            break
+        generator.shuffle(deck)
+        hands = [deck[0:13], deck[13:26], deck[26:39]]
+        if not all(
+                range_.contains(_features(hand_))
+                for range_, hand_ in zip(others_ranges, hands)):
+            continue
+        deal = [None] * 4
+        deal[index] = list(own_masks)
+        for seat, hand_ in zip(others, hands):
+            masks = [0, 0, 0, 0]
+            for suit, card, _ in hand_:
+                masks[suit] |= card
+            deal[seat] = masks
+        deals.append(deal)
+    return deals
+
+
+def _solve_deals(deals, problems, deadline, solver):
+    # Worker: tricks of each (strain, declarer) problem for each deal, until
+    # the deadline. The deals not solved in time are left out.
+    results = []
+    for deal in deals:
+        tricks = {}
+        try:
+            for strain, declarer in problems:
+                tricks[strain, declarer] = solver(
+                    deal, strain, declarer, deadline)
+        except TimeoutError:
+            break
+        results.append(tricks)
+    return results
+
+
+def worker_pool(workers):
+    """Return process pool of workers not forked from the calling process
+
+    Forking a process running threads (Qt, ZeroMQ, the advice graph) may
+    deadlock the child, so the workers are started by the forkserver where
+    it is available, and spawned otherwise.
+
+    Keyword Arguments:
+    workers -- the number of worker processes
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn")
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=context)
+
+
+def solve_chunks(worker, deals, arguments, workers, executor=None):
+    """Return the results of a worker over deals solved in chunks
+
+    The deals are split into a chunk per worker process, and the results of
+    the chunks are concatenated. With one worker the deals are solved in the
+    calling process.
+
+    Keyword Arguments:
+    worker    -- function of a list of deals and the arguments returning a
+                 list of results, picklable by the worker processes
+    deals     -- the deals
+    arguments -- tuple of the other arguments of the worker
+    workers   -- the number of worker processes
+    executor  -- the reused process pool of the workers (see worker_pool,
+                 unused with one worker)
+    """
+    if workers == 1:
+        return worker(deals, *arguments)
+    chunks = [deals[n::workers] for n in range(workers)]
+    futures = [
+        executor.submit(worker, chunk, *arguments)
+        for chunk in chunks if chunk]
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def is_vulnerable(vulnerability, position):
+    """Return whether the side of position is vulnerable
+
+    Keyword Arguments:
+    vulnerability -- the vulnerability object of the bridge protocol
+                     (optional)
+    position      -- the position
+    """
+    if not vulnerability:
+        return False
+    return bool(vulnerability.get(PARTNERSHIP_TAGS[POSITION_TAGS.index(
+        position) % 2]))
+
+
+class BidEvaluator:
+    """Rank the candidate calls of a bidding decision by simulation"""
+
+    def __init__(
+            self, deals=DEFAULT_DEALS, time_budget=DEFAULT_TIME_BUDGET,
+            workers=None, seed=None, solver=declarer_tricks):
+        """Initialize bid evaluator
+
+        Keyword Arguments:
+        deals       -- the number of deals sampled per decision
+        time_budget -- the time in seconds the deals are solved for
+        workers     -- the number of worker processes (by default the number
+                       of CPUs, 1 to solve in the calling process)
+        seed        -- the seed of the deal sampler (optional)
+        solver      -- function returning the tricks of the declarer in a
+                       deal, with the signature of
+                       double_dummy.declarer_tricks
+        """
+        self.deals = deals
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self._generator = random.Random(seed)
+        self._solver = solver
+        self._executor = None
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def evaluate(
+            self, position, hand, auction, candidates=None, ranges=None,
+            vulnerability=None):
+        """Return the evaluations of the candidate calls, best first
+
+        Returns a list of CallEvaluation. The list is empty if no deal
+        consistent with the auction could be sampled or solved in time.
+
+        Keyword Arguments:
+        position      -- the position of the player
+        hand          -- the cards of the player
+        auction       -- the auction state, or the bidding history
+        candidates    -- the calls to evaluate (by default see
+                         candidate_calls); calls that are not legal are
+                         left out
+        ranges        -- the hand ranges of the seats (by default inferred
+                         from the auction)
+        vulnerability -- the vulnerability object of the bridge protocol
+                         (optional)
+        """
+        start = time.time()
+        if not isinstance(auction, AuctionState):
+            auction = AuctionState.from_history(auction)
+        if candidates is None:
+            candidates = candidate_calls(auction)
+        calls = []
+        for call in candidates:
+            if auction.is_legal(call, position):
+                calls.append(decode_call(encode_call(call)))
+        if ranges is None:
+            ranges, _ = infer_hand_ranges(auction, hand, position)
+        contracts = {
+            call: final_contract(auction, call, position) for call in calls}
+        problems = sorted({
+            (contract[1], contract[3]) for contract in contracts.values()
+            if contract is not None})
+        deals = sample_deals(
+            hand, position, ranges, self.deals, self._generator)
+        if not deals or not problems:
+            return []
+        results = self._solve(deals, problems, start + self.time_budget)
+        logging.debug(
+            "Simulation: %d of %d deals solved in %.1f s", len(results),
+            len(deals), time.time() - start)
+        if not results:
+            return []
+        evaluations = []
+        for call in calls:
+            contract = contracts[call]
+            total = 0
+            if contract is not None:
+                level, strain, doubling, declarer = contract
+                vulnerable = is_vulnerable(vulnerability, declarer)
+                sign = 1 if declarer in (
+                    position, partner_of(position)) else -1
+                for tricks in results:
+                    total += sign * contract_score(
+                        level, strain, doubling, tricks[strain, declarer],
+                        vulnerable)
+            evaluations.append(CallEvaluation(
+                call, total / len(results), contract, len(results)))
+        evaluations.sort(key=lambda evaluation: -evaluation.score)
+        return evaluations
+
+    def _solve(self, deals, problems, deadline):
+        if self.workers > 1 and self._executor is None:
+            self._executor = worker_pool(self.workers)
+        return solve_chunks(
+            _solve_deals, deals, (problems, deadline, self._solver),
+            self.workers, self._executor)
+
+
+def format_evaluations(evaluations, limit=5):
+    """Return text summary of the best evaluations
+
+    Keyword Arguments:
+    evaluations -- the evaluations, best first (see BidEvaluator.evaluate)
+    limit       -- the number of calls listed
+    """
+    if not evaluations:
+        return ""
+    return "Simulation of %d deals, mean score per call: %s." % (
+        evaluations[0].deals, ", ".join(
+            "%s %+.0f" % (evaluation.call, evaluation.score)
+            for evaluation in evaluations[:limit]))
+
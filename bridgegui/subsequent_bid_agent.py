@@ -5,6 +5,7 @@ from langchain.agents import AgentType
 from langchain_community.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
 import json
 import logging
 from typing import Dict
@@ -12,6 +13,7 @@ from bridgegui.llm_tools import count_hcp_tool, get_suit_distribution_tool, anal
 from bridgegui.llm_tools import is_allowed_bid_tool
 from bridgegui.bid_analisis import get_bid_analisis
 from bridgegui.subsequent_bid_suggestion_llm import get_subsequent_bid_suggestion
+from bridgegui.advice_graph import AdviceGraph
 
 ########################################
 # 1) DEFINE OUR CUSTOM BRIDGE TOOLS
@@ -51,11 +53,11 @@ def get_subsequent_bid_suggestion_wrapper(input_data: dict | str) -> str:
         raise ValueError("allowed_bids must be a list of strings.")
 
     return get_subsequent_bid_suggestion(
-        position,
-        updated_your_team_analisis,
-        updated_opponents_bid_analisis,
-        bidding_history,
-        allowed_bids
+        position=position,
+        your_team_analisis=updated_your_team_analisis,
+        opponents_analisis=updated_opponents_bid_analisis,
+        allowed_bids=allowed_bids,
+        bidding_history=bidding_history
     )
 
 def last_4_bids_tool_wrapper(input_data: dict | str) -> list[str]:
@@ -281,6 +283,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -352,6 +356,118 @@ def get_subsequent_bid_advice(
 
     return response
 
+########################################
+# 6) SUBSEQUENT BID GRAPH
+########################################
+
+# The team and the opponents analyses do not depend on each other, so they run
+# concurrently and only the final suggestion waits for both. The latency of a
+# decision is about two LLM calls instead of three.
+# When the caller keeps the analyses of the deal (see analysis_store), only the
+# bids made since the previous analyses are sent, and the suggestion sees a
+# bounded window of the history, so the prompts do not grow with the auction.
+
+RECENT_BIDS = 8
+
+def _analyzed_bids(bidding_history: list[str], new_bids: list[str] | None) -> list[str]:
+    if new_bids is None:
+        return last_n_bids_function(bidding_history, 4)
+    return new_bids
+
+def _your_team_analisis(position: str, analyzed_bids: list[str], your_team_analisis: str) -> str:
+    if not analyzed_bids and your_team_analisis:
+        return your_team_analisis
+    return get_bid_analisis(
+        position=position,
+        perspective="Your team",
+        previouse_analisis=your_team_analisis,
+        last_n_bids=analyzed_bids
+    )
+
+def _opponents_bid_analisis(position: str, analyzed_bids: list[str], opponents_bid_analisis: str) -> str:
+    if not analyzed_bids and opponents_bid_analisis:
+        return opponents_bid_analisis
+    return get_bid_analisis(
+        position=position,
+        perspective="Your opponents",
+        previouse_analisis=opponents_bid_analisis,
+        last_n_bids=analyzed_bids
+    )
+
+def _bid_suggestion(
+    position: str,
+    updated_your_team_analisis: str,
+    updated_opponents_bid_analisis: str,
+    allowed_bids: list[str],
+    bidding_history: list[str],
+) -> str:
+    return get_subsequent_bid_suggestion(
+        position=position,
+        your_team_analisis=updated_your_team_analisis,
+        opponents_analisis=updated_opponents_bid_analisis,
+        allowed_bids=allowed_bids,
+        bidding_history=bidding_history[-RECENT_BIDS:]
+    )
+
+subsequent_bid_graph = AdviceGraph("subsequent bid graph")
+subsequent_bid_graph.add_node("analyzed_bids", _analyzed_bids, ("bidding_history", "new_bids"))
+subsequent_bid_graph.add_node(
+    "updated_your_team_analisis", _your_team_analisis,
+    ("position", "analyzed_bids", "your_team_analisis"))
+subsequent_bid_graph.add_node(
+    "updated_opponents_bid_analisis", _opponents_bid_analisis,
+    ("position", "analyzed_bids", "opponents_bid_analisis"))
+subsequent_bid_graph.add_node(
+    "bid_suggestion", _bid_suggestion,
+    ("position", "updated_your_team_analisis", "updated_opponents_bid_analisis",
+     "allowed_bids", "bidding_history"))
+
+
+def get_subsequent_bid_graph_advice(
+    position: str,
+    your_team_analisis: str,
+    opponents_bid_analisis: str,
+    allowed_bids: list[str] = None,
+    bidding_history: list[str] = None,
+    new_bids: list[str] = None,
+) -> dict:
+    """
+    Runs the subsequent bid stage as a graph instead of a ReAct loop.
+    Both analyses are updated concurrently from the new bids (the last 4 bids
+    unless given) and feed the subsequent bid suggestion.
+    Args:
+        position (str): The position of the player (e.g., "north", "south").
+        your_team_analisis (str): The previous analisis of your team.
+        opponents_bid_analisis (str): The previous analisis of the opponents.
+        allowed_bids (list[str]): A list of allowed bids.
+        bidding_history (list[str]): A list of previous bids in the format "Player: Bid".
+        new_bids (list[str]): The bids made since the previous analyses were made.
+    Returns:
+        dict: The keys "your_team_analisis", "opponents_bid_analisis" and
+        "bid_suggestion".
+    """
+    if allowed_bids is None:
+        allowed_bids = []
+    if bidding_history is None:
+        bidding_history = []
+
+    results = subsequent_bid_graph.run(
+        position=position,
+        your_team_analisis=your_team_analisis,
+        opponents_bid_analisis=opponents_bid_analisis,
+        allowed_bids=allowed_bids,
+        bidding_history=bidding_history,
+        new_bids=new_bids
+    )
+    logging.debug("DEBUG: subsequent bid graph results: %s", results)
+
+    return {
+        "your_team_analisis": results["updated_your_team_analisis"],
+        "opponents_bid_analisis": results["updated_opponents_bid_analisis"],
+        "bid_suggestion": results["bid_suggestion"],
+    }
+
+
 # Example: BIDDING PHASE
 if __name__ == "__main__":
     
@@ -1,8 +1,10 @@
 import os
 from dotenv import load_dotenv
 import logging
-from langchain.prompts import PromptTemplate
+from bridgegui.prompt_prefix import StaticPrefixPrompt
 from langchain_community.chat_models import ChatOpenAI
+from bridgegui import llm_journal
+from bridgegui import notation
 
 
 ########################################
@@ -17,9 +19,8 @@ from langchain_community.chat_models import ChatOpenAI
 # 3) SET UP THE PROMPT FOR THE AGENT
 ########################################
 
-bid_analisis_prompt = PromptTemplate(
-    input_variables=["position","your_team_analisis","opponents_bid_analisis", "bidding_history", "allowed_bids"],
-    template="""
+bid_analisis_prompt = StaticPrefixPrompt(
+    prefix="""
 You are a Bridge Advisor specialised in subsequent bids analisis (after openning and response bids).
 
 You assume that the team follows strategy as described in bidding strategy below.
@@ -68,8 +69,8 @@ Counting High Card Points (HCP):
         Position: north
         Your team analisis: Your partner is South, and his first bid was pass but he responded to your opening 2S with 3S which indicates 3-4 cards in spades and 7 to 11 HCP. Your partner has betwen 7-11 HCP. You have 20 HCP. So in total you have between 27-31 HCP. Your partner has 3 to 4 spades. You have 5 spades. So in total you have at least 8 spades. In total you have at least 5 hearts. In total you have at least 3 diamonds. In total you have at least 3 clubs
         opponents analisis: Your opponents are West and East. West has passed. So it is likely that West has 0-12 HCP and no 5-card suit, East has bid 2NT. So it is likely that East has 12-18 HCP and no 5-card suit. West has passed again which indicates that West has below 6 HCP since was not able to respond to East's 2NT bid.
-        Bidding History: ["south: Pass","west: Pass", "north 2S", "east: 2NT", "south: 3S", "west: Pass"]
-        Allowed Bids: "Pass", "1S", "1NT", "2C", "2D", "2H", "2S", "2NT", "3C", "3D", "3H", "3S", "3NT", "4C", "4D", "4H", "4S", "4NT", "5C", "5D", "5H", "5S", "5NT", "6C", "6D", "6H", "6S","6NT", "7C", "7D", "7H", "7S", "7NT", "X", "XX"]
+        Bidding History: S:P-P-2S-2NT-3S-P
+        Allowed Bids: P,1S,1NT,2C,2D,2H,2S,2NT,3C,3D,3H,3S,3NT,4C,4D,4H,4S,4NT,5C,5D,5H,5S,5NT,6C,6D,6H,6S,6NT,7C,7D,7H,7S,7NT,X,XX
     Your answer:
         Your and your partner's combined HCP is between 27-31 HCP. You have at least 8 spades. So you should aim for minimu 3-level contract and maximum 4-level contract. Since you have at least 8 spades continue to bid in spades. Current highest bid is 3S by your partner. It is within your target bid level. Recomendation Pass.
 **End of Example 1**
@@ -79,22 +80,26 @@ Counting High Card Points (HCP):
         Position: north
         Your team analisis: Your partner is South, and his first bid was pass but he responded to your opening 2S with 3S which indicates 3-4 cards in spades and 7 to 11 HCP. Your partner has betwen 7-11 HCP. You have 20 HCP. So in total you have between 27-31 HCP. Your partner has 3 to 4 spades. You have 5 spades. So in total you have at least 8 spades. In total you have at least 5 hearts. In total you have at least 3 diamonds. In total you have at least 3 clubs
         Opponents analisis: Your opponents are West and East. West has passed. So it is likely that West has 0-12 HCP and no 5-card suit, East has bid 2NT. So it is likely that East has 12-18 HCP and no 5-card suit. West has passed again which indicates that West has below 6 HCP since was not able to respond to East's 2NT bid.
-        Bidding History: ["south: Pass","west: Pass", "north 2S", "east: 2NT", "south: 3S", "west: 3NT"]
-        Allowed Bids: "Pass", "1S", "1NT", "2C", "2D", "2H", "2S", "2NT", "3C", "3D", "3H", "3S", "3NT", "4C", "4D", "4H", "4S", "4NT", "5C", "5D", "5H", "5S", "5NT", "6C", "6D", "6H", "6S","6NT", "7C", "7D", "7H", "7S", "7NT", "X", "XX"]
+        Bidding History: S:P-P-2S-2NT-3S-3NT
+        Allowed Bids: P,1S,1NT,2C,2D,2H,2S,2NT,3C,3D,3H,3S,3NT,4C,4D,4H,4S,4NT,5C,5D,5H,5S,5NT,6C,6D,6H,6S,6NT,7C,7D,7H,7S,7NT,X,XX
     Your answer:
         Your and your partner's combined HCP is between 27-31 HCP. You have at least 8 spades. So you should aim for minimu 3-level contract and maximum 4-level contract. Since you have at least 8 spades continue to bid in spades. Current highest bid is 3NT by your opponent. You are safe to bid 4S since 4s is in your target bid level. 4S is allowed bid. So your bid is 4S.
 **End of Example 2**
 
 ## End of Examples
 
+{notation}
+""",
+    suffix="""
 Position: {position}
 Your team analisis: {your_team_analisis}
 Opponents analisis: {opponents_bid_analisis}
 Bidding History: {bidding_history}
 Allowed Bids: {allowed_bids}
 Analisis:
-
-""".strip()
+""",
+    input_variables=["position","your_team_analisis","opponents_bid_analisis", "bidding_history", "allowed_bids"],
+    partial_variables={"notation": notation.AUCTION_LEGEND}
 )
 
 ########################################
@@ -108,6 +113,8 @@ llm = ChatOpenAI(
     temperature=0.0,
     model="gpt-3.5-turbo",  # Use the correct model name
     openai_api_key=os.getenv("OPENAI_API_KEY"),
+    openai_api_base=os.getenv("OPENAI_BASE_URL"),
+    client=llm_journal.chat_completions(),
     verbose=True
 )
 
@@ -147,12 +154,12 @@ def get_subsequent_bid_suggestion(
     print("DEBUG: Prompt input:", prompt_input)
 
     response = llm.invoke(
-        bid_analisis_prompt.format(
+        bid_analisis_prompt.format_messages(
             position=prompt_input["position"],
             your_team_analisis=prompt_input["your_team_analisis"],
             opponents_bid_analisis=prompt_input["opponents_bid_analisis"],
-            bidding_history=prompt_input["bidding_history"],
-            allowed_bids=prompt_input["allowed_bids"],
+            bidding_history=notation.format_auction(prompt_input["bidding_history"]),
+            allowed_bids=notation.format_calls(prompt_input["allowed_bids"]),
             )
         )
     # Debug: Log the response
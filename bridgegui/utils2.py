@@ -6,6 +6,8 @@ import ast
 import re
 import json
 from bridgegui.analyze_opening_llm import get_opening_analisis  
+from bridgegui.auction import AuctionState
+from bridgegui.notation import DOUBLE_FORMAT, parse_call
 from bridgegui.response_bid_llm import get_response_analisis
 import logging
 from typing import List
@@ -238,18 +240,18 @@ def is_allowed_bid_function(proposed_bid: str, allowed_bids: list, bidding_histo
 
     if proposed_bid in allowed_bids:
         return f"The proposed bid '{proposed_bid}' is allowed."
-    else:
-        last_bid = None
-        last_bid_element = bidding_history[-1] if bidding_history else None
-        #Check if proposed bid is same as last bid of your opponent on your left hand side
-        if last_bid_element:
-            last_bid = last_bid_element.split(":")[-1].strip()
-            if proposed_bid == last_bid:
-                return f"The proposed bid '{proposed_bid}' is same as last bid of your opponent on your left hand side. You can bid contra (X) to opponents last bid. So your bid is: 'X'"
-            else:
-                #check if proposed bid was already used in the bidding history
-                for bid in bidding_history:
-                    if proposed_bid in bid:
-                        return f"The proposed bid '{proposed_bid}' was already used in the bidding history. You can not use it again. Your bid is 'Pass'."
-                # If the last bid is not found, return a message indicating the issue
-                return f"The proposed bid '{proposed_bid}' is not allowed and the last bid of your opponent on your left hand side is not found in the bidding history. Please check the input data."
+
+    # Legality is read from the auction state instead of searching the history strings
+    try:
+        auction = AuctionState.from_history(bidding_history)
+    except ValueError:
+        return f"The proposed bid '{proposed_bid}' can not be checked, the bidding history is not valid. Please check the input data."
+    call = parse_call(proposed_bid)
+    if call is None:
+        return f"The proposed bid '{proposed_bid}' is not a valid call. Your bid is 'Pass'."
+    if auction.is_legal(call):
+        return f"The proposed bid '{proposed_bid}' is allowed."
+    #Check if proposed bid is same as last bid of your opponent on your left hand side
+    if call == auction.last_bid and auction.is_legal(DOUBLE_FORMAT):
+        return f"The proposed bid '{proposed_bid}' is same as last bid of your opponent on your left hand side. You can bid contra (X) to opponents last bid. So your bid is: 'X'"
+    return f"The proposed bid '{proposed_bid}' is not higher than the last bid '{auction.last_bid}'. You can not use it. Your bid is 'Pass'."
@@ -9,7 +9,7 @@ setup(
         "gui_scripts": ["bridgegui=bridgegui.__main__:main"]
     },
     package_data={
-        "bridgegui": ["images/*.png"]
+        "bridgegui": ["images/*.png", "data/*.bin"]
     },
     install_requires=["pyzmq>=15.4","PyQt5>=5.7", "openai>=0.10.2", "python-dotenv>=0.10.3", "langchain>=0.1.0", "langchain-openai>=0.1.0"],
     test_suite="tests",
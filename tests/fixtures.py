@@ -0,0 +1,51 @@
+"""Card fixtures shared by the card play tests
+
+Functions:
+card          -- card from its text, e.g. "ace spades"
+cards         -- cards from their texts
+suit          -- cards of a suit from their ranks
+trick         -- plays from (position, card text) pairs
+played_tricks -- trick objects of cards played in turn
+"""
+
+POSITIONS = ("north", "east", "south", "west")
+
+
+def card(text):
+    """Return the card from its text (e.g. "ace spades")"""
+    rank, suit_ = text.split()
+    return {"rank": rank, "suit": suit_}
+
+
+def cards(*texts):
+    """Return the cards from their texts"""
+    return [card(text) for text in texts]
+
+
+def suit(suit_, ranks):
+    """Return the cards of a suit from their ranks"""
+    return [{"rank": rank, "suit": suit_} for rank in ranks]
+
+
+def trick(*plays):
+    """Return the plays from (position, card text) pairs"""
+    return [
+        {"position": position, "card": card(text)}
+        for position, text in plays]
+
+
+def played_tricks(played, winner="north"):
+    """Return the trick objects of cards played in turn
+
+    The cards are played four per trick, from north to west in every trick.
+
+    Keyword Arguments:
+    played -- the cards in the order they are played
+    winner -- the position winning every trick
+    """
+    return [
+        {"cards": [
+            {"position": position, "card": card_}
+            for position, card_ in zip(POSITIONS, played[n:n + 4])],
+         "winner": winner}
+        for n in range(0, len(played), 4)]
@@ -0,0 +1,266 @@
+import threading
+import unittest
+from unittest import mock
+
+from bridgegui import advice_pipeline, subsequent_bid_agent
+from bridgegui.advice_graph import AdviceGraph
+from bridgegui.analysis_store import AnalysisStore
+from bridgegui.auction import AuctionState
+from bridgegui.decision_cache import DecisionCache
+from bridgegui.simulation import CallEvaluation
+
+
+def _bid(level, strain):
+    return {"type": "bid", "bid": {"level": level, "strain": strain}}
+
+
+HAND = [
+    {"rank": rank, "suit": suit}
+    for suit, ranks in (
+        ("spades", ("ace", "king", "9", "5")), ("hearts", ("queen", "8", "2")),
+        ("diamonds", ("king", "jack", "4")), ("clubs", ("7", "6", "3")))
+    for rank in ranks]
+
+
+class AdviceGraphTest(unittest.TestCase):
+    """Test suite for advice graph"""
+
+    def testResultsOfDependenciesArePassed(self):
+        graph = AdviceGraph("test")
+        graph.add_node("double", lambda x: 2 * x, ("x",))
+        graph.add_node("sum", lambda x, double: x + double, ("x", "double"))
+        results = graph.run(x=3)
+        self.assertEqual(results["double"], 6)
+        self.assertEqual(results["sum"], 9)
+
+    def testIndependentNodesRunConcurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        graph = AdviceGraph("test")
+        graph.add_node("left", lambda: barrier.wait() is not None)
+        graph.add_node("right", lambda: barrier.wait() is not None)
+        results = graph.run()
+        self.assertTrue(results["left"] and results["right"])
+
+    def testUnsatisfiableDependency(self):
+        graph = AdviceGraph("test")
+        graph.add_node("node", lambda missing: None, ("missing",))
+        with self.assertRaises(ValueError):
+            graph.run()
+
+    def testInputShadowingNode(self):
+        graph = AdviceGraph("test")
+        graph.add_node("node", lambda: None)
+        with self.assertRaises(ValueError):
+            graph.run(node=1)
+
+    def testDuplicateNode(self):
+        graph = AdviceGraph("test")
+        graph.add_node("node", lambda: None)
+        with self.assertRaises(ValueError):
+            graph.add_node("node", lambda: None)
+
+
+class AdvicePipelineTest(unittest.TestCase):
+    """Test suite for advice pipeline"""
+
+    def testRecognizeBiddingStage(self):
+        recognize = advice_pipeline.recognize_bidding_stage
+        self.assertEqual(recognize("north", []), "Opening")
+        self.assertEqual(
+            recognize("north", [{"south": {"type": "pass"}}]), "Opening")
+        self.assertEqual(
+            recognize("north", [{"south": _bid(1, "hearts")}]), "Response")
+        self.assertEqual(
+            recognize("north", [
+                {"north": _bid(1, "spades")}, {"east": {"type": "pass"}},
+                {"south": _bid(2, "spades")}]),
+            "Subsequent")
+        with self.assertRaises(ValueError):
+            recognize("nowhere", [])
+
+    def testRecognizeBiddingStageFromAuction(self):
+        history = [{"north": _bid(1, "hearts")}, {"east": _bid(1, "spades")}]
+        auction = AuctionState.from_history(history)
+        recognize = advice_pipeline.recognize_bidding_stage
+        self.assertEqual(recognize("south", history, auction), "Response")
+        self.assertEqual(recognize("west", history, auction), "Response")
+        self.assertEqual(recognize("north", history, auction), "Subsequent")
+        # An auction that does not account for the history is not used
+        self.assertEqual(
+            recognize("north", history[:1], auction), "Subsequent")
+        self.assertEqual(recognize("east", history[:1], auction), "Opening")
+
+    def testExtractBidTakesLastCall(self):
+        self.assertEqual(
+            advice_pipeline.extract_bid(
+                "Partner bid 1 hearts with 12 HCP. So your bid is 4 Hearts."),
+            "4H")
+
+    def testExtractBidPassesWhenNotAllowed(self):
+        self.assertEqual(
+            advice_pipeline.extract_bid("I bid 1S", "pass, 2 spades"), "Pass")
+        self.assertEqual(
+            advice_pipeline.extract_bid("I bid 2S", "pass, 2 spades"), "2S")
+
+    def testOpeningDecisionMakesSingleLeafCall(self):
+        with mock.patch.object(
+                advice_pipeline, "get_opening_bid",
+                return_value='{"bid_suggestion": "1S"}') as opening_bid:
+            advice = advice_pipeline.run_bidding_advice(
+                "north", HAND, ["Pass", "1S"], [], decision_table=None)
+        opening_bid.assert_called_once()
+        self.assertEqual(advice["bid_suggestion"], "1S")
+
+    def testOvercallDecisionFromCache(self):
+        cache = DecisionCache()
+        store = AnalysisStore()
+        similar_hand = [
+            dict(card, suit="clubs") if card["suit"] == "diamonds" else
+            dict(card, suit="diamonds") if card["suit"] == "clubs" else card
+            for card in HAND]
+        with mock.patch.object(
+                advice_pipeline, "get_opening_bid",
+                return_value='{"bid_suggestion": "X"}') as opening_bid:
+            for hand in (HAND, similar_hand):
+                store.reset()
+                advice = advice_pipeline.run_bidding_advice(
+                    "north", hand, ["Pass", "X", "1S"], ["west: 1C"],
+                    decision_table=None, decision_cache=cache,
+                    analysis_store=store)
+                self.assertEqual(advice["bid_suggestion"], "X")
+        opening_bid.assert_called_once()
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertTrue(
+            advice["your_team_analysis"].startswith("Decision cache: "))
+        self.assertEqual(store.lookup("north", ["west: 1C"]), ("", "", None))
+
+    def testSystemDecisionMakesNoLeafCall(self):
+        hand = (
+            [{"rank": rank, "suit": "spades"}
+             for rank in ("ace", "king", "queen", "2", "3")] +
+            [{"rank": rank, "suit": "hearts"} for rank in ("ace", "5", "6")] +
+            [{"rank": rank, "suit": "clubs"}
+             for rank in ("7", "8", "9", "10", "jack")])
+        with mock.patch.object(
+                advice_pipeline, "get_opening_bid") as opening_bid:
+            advice = advice_pipeline.run_bidding_advice(
+                "north", hand, ["Pass", "1S"], [])
+        opening_bid.assert_not_called()
+        self.assertEqual(advice["bid_suggestion"], "1S")
+
+    def testSubsequentAnalysesRunConcurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def analisis(position, perspective, previouse_analisis, last_n_bids):
+            barrier.wait()
+            return "%s: %s" % (perspective, " ".join(last_n_bids))
+
+        history = [
+            {"north": _bid(2, "notrump")}, {"east": {"type": "pass"}},
+            {"south": _bid(3, "notrump")}, {"west": {"type": "pass"}}]
+        with mock.patch.object(
+                subsequent_bid_agent, "get_bid_analisis",
+                side_effect=analisis), \
+                mock.patch.object(
+                    subsequent_bid_agent, "get_subsequent_bid_suggestion",
+                    return_value="So your bid is 4S.") as suggestion:
+            advice = advice_pipeline.run_bidding_advice(
+                "north", [], ["Pass", "4S"], history)
+        self.assertEqual(advice["bid_suggestion"], "4S")
+        self.assertEqual(
+            advice["your_team_analysis"],
+            "Your team: north: 2NT east: Pass south: 3NT west: Pass")
+        self.assertEqual(
+            suggestion.call_args.kwargs["opponents_analisis"],
+            "Your opponents: north: 2NT east: Pass south: 3NT west: Pass")
+
+    def testSubsequentDecisionAnalyzesOnlyNewCalls(self):
+        store = AnalysisStore()
+        history = [
+            {"north": _bid(2, "notrump")}, {"east": {"type": "pass"}},
+            {"south": _bid(3, "notrump")}, {"west": {"type": "pass"}}]
+        store.update(
+            "north", ["north: 2NT", "east: Pass"], "Team.", "Opponents.")
+        with mock.patch.object(
+                subsequent_bid_agent, "get_bid_analisis",
+                return_value="Updated.") as analisis, \
+                mock.patch.object(
+                    subsequent_bid_agent, "get_subsequent_bid_suggestion",
+                    return_value="Pass"):
+            advice_pipeline.run_bidding_advice(
+                "north", [], ["Pass"], history, analysis_store=store)
+        previous = {
+            call.kwargs["previouse_analisis"]
+            for call in analisis.call_args_list}
+        self.assertEqual(previous, {"Team.", "Opponents."})
+        for call in analisis.call_args_list:
+            self.assertEqual(
+                call.kwargs["last_n_bids"], ["south: 3NT", "west: Pass"])
+        self.assertEqual(
+            store.lookup("north", advice_pipeline._history(history)),
+            ("Updated.", "Updated.", []))
+
+
+    def testSubsequentDecisionFromHandRanges(self):
+        history = [
+            {"north": _bid(1, "spades")}, {"east": {"type": "pass"}},
+            {"south": _bid(2, "spades")}, {"west": {"type": "pass"}}]
+        with mock.patch.object(
+                subsequent_bid_agent, "get_bid_analisis") as analisis, \
+                mock.patch.object(
+                    subsequent_bid_agent, "get_subsequent_bid_suggestion",
+                    return_value="So your bid is 4S.") as suggestion:
+            advice = advice_pipeline.run_bidding_advice(
+                "north", [], ["Pass", "4S"], history)
+        analisis.assert_not_called()
+        self.assertEqual(advice["bid_suggestion"], "4S")
+        self.assertIn(
+            "Partner (south): 7-10 HCP, S 3-8",
+            suggestion.call_args.kwargs["your_team_analisis"])
+
+    def testSubsequentDecisionBySimulation(self):
+        history = [
+            {"north": _bid(1, "spades")}, {"east": {"type": "pass"}},
+            {"south": _bid(2, "spades")}, {"west": {"type": "pass"}}]
+        evaluator = mock.Mock()
+        evaluator.evaluate.return_value = [
+            CallEvaluation("4S", 180.0, (4, "S", "undoubled", "north"), 8),
+            CallEvaluation("Pass", 140.0, (2, "S", "undoubled", "south"), 8)]
+        store = AnalysisStore()
+        with mock.patch.object(
+                subsequent_bid_agent,
+                "get_subsequent_bid_suggestion") as suggestion:
+            advice = advice_pipeline.run_bidding_advice(
+                "north", HAND, ["Pass", "3S", "4S"], history,
+                bid_evaluator=evaluator, analysis_store=store)
+        suggestion.assert_not_called()
+        self.assertEqual(advice["bid_suggestion"], "4S")
+        self.assertTrue(advice["your_team_analysis"].startswith(
+            "Simulation of 8 deals, mean score per call: 4S +180, Pass +140"))
+        team, _, new_bids = store.lookup(
+            "north", advice_pipeline._history(history))
+        self.assertIn("Partner (south): 7-10 HCP", team)
+        self.assertEqual(new_bids, [])
+        self.assertEqual(
+            evaluator.evaluate.call_args.kwargs["candidates"],
+            ["Pass", "3S", "4S"])
+
+    def testSubsequentDecisionFallsBackWithoutSimulation(self):
+        history = [
+            {"north": _bid(1, "spades")}, {"east": {"type": "pass"}},
+            {"south": _bid(2, "spades")}, {"west": {"type": "pass"}}]
+        evaluator = mock.Mock()
+        evaluator.evaluate.return_value = []
+        with mock.patch.object(
+                subsequent_bid_agent,
+                "get_subsequent_bid_suggestion",
+                return_value="So your bid is 3S."):
+            advice = advice_pipeline.run_bidding_advice(
+                "north", HAND, ["Pass", "3S", "4S"], history,
+                bid_evaluator=evaluator)
+        evaluator.evaluate.assert_called_once()
+        self.assertEqual(advice["bid_suggestion"], "3S")
+
+
+if __name__ == '__main__':
+    unittest.main()
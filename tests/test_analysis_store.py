@@ -0,0 +1,61 @@
+import unittest
+
+from bridgegui.analysis_store import AnalysisStore, compact_analysis
+
+
+class CompactAnalysisTest(unittest.TestCase):
+    """Test suite for analysis compaction"""
+
+    def testShortAnalysisIsKept(self):
+        self.assertEqual(
+            compact_analysis("Partner has 12+ HCP.  Five hearts."),
+            "Partner has 12+ HCP. Five hearts.")
+
+    def testOldestSentencesAreDropped(self):
+        self.assertEqual(
+            compact_analysis("First. Second. Third.", max_length=14),
+            "Second. Third.")
+
+    def testLongSentenceIsCut(self):
+        self.assertEqual(compact_analysis("abcdefgh", max_length=3), "fgh")
+
+
+class AnalysisStoreTest(unittest.TestCase):
+    """Test suite for analysis store"""
+
+    def setUp(self):
+        self.store = AnalysisStore(max_length=20)
+        self.history = ["north: 1S", "east: 2D", "south: 2S", "west: Pass"]
+
+    def testNothingStored(self):
+        self.assertEqual(
+            self.store.lookup("north", self.history), ("", "", None))
+
+    def testOnlyNewCallsAreReturned(self):
+        self.store.update("north", self.history[:2], "Team.", "Opponents.")
+        self.assertEqual(
+            self.store.lookup("north", self.history),
+            ("Team.", "Opponents.", self.history[2:]))
+        self.assertEqual(
+            self.store.lookup("south", self.history), ("", "", None))
+
+    def testStoredAnalysesAreCompacted(self):
+        self.store.update(
+            "north", self.history, "Old conclusion. New conclusion.", "")
+        self.assertEqual(
+            self.store.lookup("north", self.history)[0], "New conclusion.")
+
+    def testDifferentHistoryInvalidatesEntry(self):
+        self.store.update("north", self.history, "Team.", "Opponents.")
+        self.assertEqual(
+            self.store.lookup("north", ["north: 1H"]), ("", "", None))
+
+    def testReset(self):
+        self.store.update("north", self.history, "Team.", "Opponents.")
+        self.store.reset()
+        self.assertEqual(
+            self.store.lookup("north", self.history), ("", "", None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import json
+import unittest
+
+from bridgegui import arena
+from bridgegui.arena import Arena, TablePolicy
+from bridgegui.scoring import contract_score
+
+
+class _SpyPolicy(TablePolicy):
+    # Table policy keeping the views of its decisions, and revoking when it
+    # can
+
+    views = []
+
+    def call(self, view):
+        self.views.append(view)
+        return super().call(view)
+
+    def play(self, view):
+        self.views.append(view)
+        revokes = [card for card in view.hand if card not in view.allowed]
+        return revokes[0] if revokes else super().play(view)
+
+
+class ArenaTest(unittest.TestCase):
+    """Test suite for the self-play arena"""
+
+    def setUp(self):
+        self.boards = arena.make_boards(4, seed=1)
+
+    def testBoards(self):
+        self.assertEqual(
+            [board.number for board in self.boards], [1, 2, 3, 4])
+        self.assertEqual(self.boards[1].dealer, "east")
+        self.assertEqual(
+            self.boards[1].vulnerability,
+            {"northSouth": True, "eastWest": False})
+
+    def testPlayTable(self):
+        result = arena.play_table(self.boards[0], TablePolicy(), TablePolicy())
+        self.assertEqual(result["declarer"], "north")
+        self.assertEqual(result["contract"], "2C")
+        self.assertEqual(result["auction"], "N:2C-P-P-P")
+        self.assertEqual(result["illegal"], 0)
+        self.assertEqual(result["score"], contract_score(
+            2, "C", "undoubled", result["tricks"]))
+
+    def testViewsShowTheVisibleHandsOnly(self):
+        _SpyPolicy.views = []
+        result = arena.play_table(self.boards[0], _SpyPolicy(), TablePolicy())
+        views = _SpyPolicy.views
+        calls = [view for view in views if view.contract is None]
+        plays = [view for view in views if view.contract is not None]
+        self.assertTrue(calls and plays)
+        self.assertTrue(all(len(view.hands) == 1 for view in calls))
+        for view in plays:
+            self.assertIn(view.position, view.hands)
+            self.assertTrue(set(view.hands) <= {"north", "south"})
+        self.assertGreater(result["illegal"], 0)
+
+    def testDuplicateOfEqualPolicies(self):
+        output = io.StringIO()
+        records = list(Arena(
+            [("first", TablePolicy), ("second", TablePolicy)],
+            workers=1).run(self.boards, output))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(len(output.getvalue().splitlines()), 4)
+        self.assertEqual(json.loads(output.getvalue().splitlines()[0]),
+                         records[0])
+        tables = records[0]["tables"]
+        self.assertEqual(tables[0]["north_south"], "first")
+        self.assertEqual(tables[1]["north_south"], "second")
+        self.assertEqual(arena.summarize(records), (4, 0, 0.5))
+
+    def testParallel(self):
+        policies = [("first", TablePolicy), ("second", TablePolicy)]
+        records = Arena(policies, workers=2, chunk_size=1).run(self.boards)
+        self.assertEqual(
+            sorted(records, key=lambda record: record["board"]),
+            list(Arena(policies, workers=1).run(self.boards)))
+
+    def testPoliciesOfTheSameName(self):
+        records = list(Arena(
+            [("table", TablePolicy), ("table", TablePolicy)],
+            workers=1).run(self.boards[:1]))
+        self.assertEqual(
+            [table["north_south"] for table in records[0]["tables"]],
+            ["table", "table-2"])
+
+    def testTwoPoliciesNeeded(self):
+        with self.assertRaises(ValueError):
+            Arena([("table", TablePolicy)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import random
+import unittest
+
+from bridgegui import auction
+from bridgegui.auction import AuctionState
+
+
+def _bid(level, strain):
+    return {"type": "bid", "bid": {"level": level, "strain": strain}}
+
+
+PASS = {"type": "pass"}
+DOUBLE = {"type": "double"}
+REDOUBLE = {"type": "redouble"}
+
+
+class AuctionStateTest(unittest.TestCase):
+    """Test suite for auction state"""
+
+    def setUp(self):
+        self.auction = AuctionState("north")
+
+    def testTurn(self):
+        self.assertEqual(self.auction.turn, "north")
+        self.auction.call("north", PASS)
+        self.assertEqual(self.auction.turn, "east")
+        with self.assertRaises(ValueError):
+            self.auction.call("west", PASS)
+
+    def testOpenerFromFirstCall(self):
+        auction_ = AuctionState()
+        self.assertIsNone(auction_.turn)
+        auction_.call("west", "1S")
+        self.assertEqual(auction_.opener, "west")
+        self.assertEqual(auction_.turn, "north")
+
+    def testStages(self):
+        self.assertEqual(self.auction.stage("north"), auction.OPENING_STAGE)
+        self.auction.call("north", _bid(1, "hearts"))
+        self.assertEqual(self.auction.stage(), auction.OVERCALL_STAGE)
+        self.assertEqual(self.auction.stage("south"), auction.RESPONSE_STAGE)
+        self.assertEqual(self.auction.stage("north"), auction.SUBSEQUENT_STAGE)
+        self.auction.call("east", _bid(1, "spades"))
+        self.assertEqual(self.auction.stage("south"), auction.RESPONSE_STAGE)
+        self.assertEqual(
+            self.auction.stage("north"), auction.COMPETITIVE_STAGE)
+        with self.assertRaises(ValueError):
+            self.auction.stage("nowhere")
+
+    def testLastBidAndDoubling(self):
+        self.auction.call("north", _bid(1, "hearts"))
+        self.auction.call("east", DOUBLE)
+        self.assertEqual(self.auction.last_bid, "1H")
+        self.assertEqual(self.auction.last_bidder, "north")
+        self.assertEqual(self.auction.doubling, auction.DOUBLED)
+        self.assertEqual(self.auction.doubler, "east")
+        self.auction.call("south", REDOUBLE)
+        self.assertEqual(self.auction.doubling, auction.REDOUBLED)
+        self.assertEqual(self.auction.doubler, "south")
+        self.auction.call("west", _bid(1, "notrump"))
+        self.assertEqual(self.auction.doubling, auction.UNDOUBLED)
+        self.assertIsNone(self.auction.doubler)
+
+    def testLegality(self):
+        self.assertFalse(self.auction.is_legal(DOUBLE))
+        self.auction.call("north", _bid(1, "hearts"))
+        self.assertTrue(self.auction.is_legal("1S"))
+        self.assertFalse(self.auction.is_legal("1D"))
+        self.assertFalse(self.auction.is_legal("1H"))
+        self.assertTrue(self.auction.is_legal(DOUBLE))
+        self.assertFalse(self.auction.is_legal(REDOUBLE))
+        self.assertFalse(self.auction.is_legal(DOUBLE, "south"))
+        with self.assertRaises(ValueError):
+            self.auction.call("east", _bid(1, "clubs"))
+
+    def testCompletion(self):
+        self.auction.call("north", _bid(1, "hearts"))
+        for position in ("east", "south"):
+            self.auction.call(position, PASS)
+        self.assertFalse(self.auction.completed)
+        self.auction.call("west", PASS)
+        self.assertTrue(self.auction.completed)
+        self.assertIsNone(self.auction.turn)
+        self.assertFalse(self.auction.is_legal(PASS))
+
+    def testFromHistory(self):
+        auction_ = AuctionState.from_history(
+            ["east: 1C", "south: Pass", "west: 1 hearts"])
+        self.assertEqual(len(auction_), 3)
+        self.assertEqual(auction_.turn, "north")
+        self.assertEqual(auction_.last_bid, "1H")
+        self.assertEqual(auction_.stage("east"), auction.SUBSEQUENT_STAGE)
+
+    def testReset(self):
+        self.auction.call("north", _bid(1, "hearts"))
+        self.auction.reset("east")
+        self.assertEqual(len(self.auction), 0)
+        self.assertIsNone(self.auction.last_bid)
+        self.assertEqual(self.auction.turn, "east")
+
+    def testUndo(self):
+        self.auction.call("north", _bid(1, "hearts"))
+        self.auction.call("east", DOUBLE)
+        self.auction.undo()
+        self.assertEqual(self.auction.doubling, auction.UNDOUBLED)
+        self.assertEqual(self.auction.turn, "east")
+        self.auction.undo()
+        self.assertIsNone(self.auction.last_bid)
+        self.assertEqual(self.auction.turn, "north")
+        with self.assertRaises(ValueError):
+            self.auction.undo()
+
+
+class CallCodeTest(unittest.TestCase):
+    """Test suite for call codes and masks"""
+
+    def testEncodeCall(self):
+        self.assertEqual(auction.encode_call(PASS), 0)
+        self.assertEqual(auction.encode_call("X"), 1)
+        self.assertEqual(auction.encode_call(REDOUBLE), 2)
+        self.assertEqual(auction.encode_call(_bid(1, "clubs")), 3)
+        self.assertEqual(auction.encode_call("1NT"), 7)
+        self.assertEqual(auction.encode_call(_bid(7, "notrump")), 37)
+        with self.assertRaises(ValueError):
+            auction.encode_call("nonsense")
+        with self.assertRaises(ValueError):
+            auction.encode_call(38)
+
+    def testDecodeCall(self):
+        for code in range(auction.CALL_CODES):
+            self.assertEqual(
+                auction.encode_call(auction.decode_call(code)), code)
+
+    def testMasks(self):
+        mask = auction.calls_mask([PASS, "1S", _bid(2, "hearts")])
+        self.assertEqual(auction.mask_calls(mask), ["Pass", "1S", "2H"])
+
+    def testLegalCalls(self):
+        auction_ = AuctionState.from_history(["north: 7S"])
+        self.assertEqual(auction_.legal_calls(), ["Pass", "X", "7NT"])
+        auction_.call("east", DOUBLE)
+        self.assertEqual(auction_.legal_calls(), ["Pass", "XX", "7NT"])
+
+    def testLegalMaskMatchesRules(self):
+        generator = random.Random(7)
+        for _ in range(50):
+            auction_ = AuctionState("west")
+            while not auction_.completed:
+                legal = set(auction_.legal_calls())
+                for code in range(auction.CALL_CODES):
+                    self.assertEqual(
+                        auction.decode_call(code) in legal,
+                        self._isLegal(auction_, code))
+                call = generator.choice(sorted(legal))
+                if generator.random() < 0.6:
+                    call = "Pass"
+                auction_.call(auction_.turn, call)
+
+    def _isLegal(self, auction_, code):
+        # Reference rules applied to the history
+        calls = auction_.calls
+        turn = auction_.turn
+        bids = [
+            (n, call) for n, (_, call) in enumerate(calls)
+            if auction.encode_call(call) >= auction.FIRST_BID_CODE]
+        if code == auction.PASS_CODE:
+            return True
+        if code >= auction.FIRST_BID_CODE:
+            return not bids or code > auction.encode_call(bids[-1][1])
+        if not bids:
+            return False
+        bidder = calls[bids[-1][0]][0]
+        after = [call for _, call in calls[bids[-1][0] + 1:] if call != "Pass"]
+        opponents = auction.partner_of(bidder) != turn and bidder != turn
+        if code == auction.DOUBLE_CODE:
+            return opponents and not after
+        return not opponents and after == ["X"]
+
+    def testPack(self):
+        auction_ = AuctionState.from_history(["south: 1H", "west: X"])
+        packed = auction_.pack()
+        self.assertEqual(packed, bytes((2, 5, 1)))
+        self.assertEqual({packed: True}[auction_.pack()], True)
+        unpacked = AuctionState.unpack(packed)
+        self.assertEqual(unpacked.calls, auction_.calls)
+        self.assertEqual(unpacked.doubler, "west")
+        self.assertEqual(AuctionState.unpack(b"").opener, None)
+
+    def testStartswith(self):
+        prefix = AuctionState.from_history(["south: 1H"])
+        auction_ = AuctionState.from_history(["south: 1H", "west: Pass"])
+        self.assertTrue(auction_.startswith(prefix))
+        self.assertFalse(prefix.startswith(auction_))
+        self.assertFalse(auction_.startswith(
+            AuctionState.from_history(["north: 1H"])))
+
+
+if __name__ == '__main__':
+    unittest.main()
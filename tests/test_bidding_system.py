@@ -0,0 +1,96 @@
+import unittest
+
+from bridgegui import bidding_system
+from bridgegui.auction import AuctionState
+
+RANKS = {
+    "A": "ace", "K": "king", "Q": "queen", "J": "jack", "T": "10", "9": "9",
+    "8": "8", "7": "7", "6": "6", "5": "5", "4": "4", "3": "3", "2": "2"}
+
+
+def _hand(pbn):
+    # Hand from PBN notation, e.g. "AK32.Q2.J54.T987"
+    return [
+        {"rank": RANKS[rank], "suit": suit}
+        for suit, holding in zip(
+            ("spades", "hearts", "diamonds", "clubs"), pbn.split("."))
+        for rank in holding]
+
+
+class BiddingSystemTest(unittest.TestCase):
+    """Test suite for bidding system decision table"""
+
+    def setUp(self):
+        self.table = bidding_system.DecisionTable()
+
+    def _call(self, history, pbn):
+        rule = self.table.lookup(history, _hand(pbn))
+        return rule.call if rule else None
+
+    def testHandFeatures(self):
+        self.assertEqual(
+            bidding_system.hand_features(_hand("AK32.Q2.J54.T987")),
+            (10, 4, 2, 3, 4))
+
+    def testOpenings(self):
+        self.assertEqual(self._call([], "AKQ32.Q2.J54.T98"), "1S")
+        self.assertEqual(self._call([], "AK32.Q2.QJ4.T987"), "1C")
+        self.assertEqual(self._call([], "AK32.KQ2.J54.K98"), "1NT")
+        self.assertEqual(self._call([], "A532.Q2.J54.T987"), "Pass")
+        self.assertEqual(
+            self._call(["north: Pass", "east: Pass"], "AKQ32.AK2.A4.K98"),
+            "2S")
+
+    def testResponses(self):
+        history = ["north: 1H", "east: Pass"]
+        self.assertEqual(self._call(history, "Q32.K52.QJ4.T987"), "2H")
+        self.assertEqual(self._call(history, "QJ32.K2.J54.T987"), "1S")
+        self.assertEqual(
+            self._call(["north: 1NT", "east: Pass"], "QJ932.K2.543.T98"),
+            "2H")
+        self.assertEqual(
+            self._call([
+                "north: 1NT", "east: Pass", "south: 2H", "west: Pass"],
+                "AK2.KQ2.J54.K982"),
+            "2S")
+
+    def testMissesAreLeftToLlm(self):
+        # Competitive auction and strong raise are not in the system
+        self.assertIsNone(
+            self._call(["north: 1H", "east: 1S"], "Q32.K52.J54.T987"))
+        self.assertIsNone(
+            self._call(["north: 1H", "east: Pass"], "AK2.AK52.KJ4.A98"))
+        self.assertIsNone(self._call([], "AKQ3"))
+
+    def testIllegalCallIsNotServed(self):
+        table = bidding_system.DecisionTable("- | 1C | hcp 0+")
+        auction = AuctionState.from_history(["north: 1S"])
+        self.assertIsNone(table.match(auction, _hand("AK32.Q2.J54.T987")))
+
+    def testInvalidRule(self):
+        with self.assertRaises(ValueError):
+            bidding_system.compile_system("- | 8C | hcp 0+")
+        with self.assertRaises(ValueError):
+            bidding_system.compile_system("- | 1C | points 12")
+
+    def testHcpBoundaries(self):
+        self.assertEqual(
+            bidding_system.hcp_boundaries(
+                "- | P | hcp 0-11\n- | 1NT | hcp 15-17 balanced\n"
+                "1C-P | 1H | hcp 6+ H 4+"),
+            (6, 12, 15, 18))
+
+    def testCoverage(self):
+        self.table.lookup([], _hand("AK32.Q2.J54.T987"), "Opening")
+        self.table.lookup(
+            ["north: 1H", "east: 1S"], _hand("AK32.Q2.J54.T987"),
+            "Subsequent")
+        self.assertEqual(
+            self.table.coverage(), {"Opening": (1, 1), "Subsequent": (0, 1)})
+        self.assertIn("50%", self.table.coverage_report())
+        self.table.reset_coverage()
+        self.assertEqual(self.table.coverage(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+
+from bridgegui import decision_cache
+from bridgegui.auction import AuctionState
+from bridgegui.decision_cache import DecisionCache, decision_key
+
+
+def _hand(spades, hearts, diamonds, clubs):
+    hand = []
+    for suit, ranks in (
+            ("spades", spades), ("hearts", hearts),
+            ("diamonds", diamonds), ("clubs", clubs)):
+        hand.extend({"rank": rank, "suit": suit} for rank in ranks)
+    return hand
+
+
+HAND = _hand(
+    ["ace", "king", "9", "8", "2"], ["queen", "3", "4"], ["jack", "5"],
+    ["6", "7", "10"])
+# Same HCP range, suit lengths and long suit as HAND
+SIMILAR_HAND = _hand(
+    ["ace", "queen", "10", "8", "3"], ["king", "5", "4"], ["6", "7"],
+    ["jack", "2", "9"])
+ADVICE = {
+    "your_team_analysis": "Team.", "opponent_analysis": "",
+    "bid_suggestion": "1S", "play_suggestion": ""}
+CALL = "1S"
+
+
+class DecisionKeyTest(unittest.TestCase):
+    """Test suite for the decision keys"""
+
+    def testSimilarHandsShareKey(self):
+        auction = AuctionState.from_history(["west: 1C"])
+        self.assertEqual(
+            decision_key("north", HAND, auction),
+            decision_key("north", SIMILAR_HAND, auction))
+        weak_suit = _hand(
+            ["king", "10", "9", "8", "2"], ["queen", "ace", "4"],
+            ["jack", "5"], ["6", "7", "3"])
+        self.assertNotEqual(
+            decision_key("north", HAND, auction),
+            decision_key("north", weak_suit, auction))
+
+    def testSuitsTellHandsApart(self):
+        auction = AuctionState.from_history(["east: 1D", "south: 1NT"])
+        honors_in_spades = _hand(
+            ["king", "queen", "3", "2"], ["5", "4", "3", "2"],
+            ["8", "7", "6"], ["3", "2"])
+        honors_in_hearts = _hand(
+            ["5", "4", "3", "2"], ["king", "queen", "3", "2"],
+            ["8", "7", "6"], ["3", "2"])
+        three_spades = _hand(
+            ["king", "queen", "2"], ["5", "4", "3", "2"],
+            ["8", "7", "6", "5"], ["3", "2"])
+        keys = {
+            decision_key("north", hand, auction) for hand in (
+                honors_in_spades, honors_in_hearts, three_spades)}
+        self.assertEqual(len(keys), 3)
+
+    def testVulnerabilityFromPlayerView(self):
+        auction = AuctionState.from_history(["west: 1C"])
+        vulnerability = {"northSouth": True, "eastWest": False}
+        north = decision_key("north", HAND, auction, vulnerability)
+        self.assertEqual(north[-3:-1], (1, 0))
+        self.assertNotEqual(north, decision_key("north", HAND, auction))
+
+    def testPassesBeforeFirstBidAreLeftOut(self):
+        self.assertEqual(
+            decision_key(
+                "north", HAND,
+                AuctionState.from_history(["south: Pass", "west: 1C"])),
+            decision_key("north", HAND, AuctionState.from_history(
+                ["west: 1C"])))
+        self.assertNotEqual(
+            decision_key("north", HAND, AuctionState.from_history(
+                ["west: Pass"])),
+            decision_key("north", HAND, AuctionState("north")))
+
+
+class DecisionCacheTest(unittest.TestCase):
+    """Test suite for the decision cache"""
+
+    def testLookupCountsHitsAndMisses(self):
+        cache = DecisionCache()
+        self.assertIsNone(cache.lookup(("key",)))
+        cache.store(("key",), CALL)
+        self.assertEqual(cache.lookup(("key",)), CALL)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+        cache.reset_statistics()
+        self.assertEqual(cache.hit_rate, 0.0)
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = DecisionCache(max_size=2)
+        cache.store(("first",), CALL)
+        cache.store(("second",), CALL)
+        cache.lookup(("first",))
+        cache.store(("third",), CALL)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup(("second",)))
+        self.assertIsNotNone(cache.lookup(("first",)))
+
+    def testSaveAndLoad(self):
+        cache = DecisionCache()
+        key = decision_key("north", HAND, AuctionState.from_history(
+            ["west: 1C"]))
+        cache.store(key, CALL)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.json")
+            cache.save(path)
+            loaded = DecisionCache.load(path)
+        self.assertEqual(loaded.lookup(key), CALL)
+
+    def testLoadAdviceOfOlderFiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.json")
+            with open(path, "w") as output:
+                output.write('[[["key"], {"bid_suggestion": "2H"}]]')
+            self.assertEqual(DecisionCache.load(path).lookup(("key",)), "2H")
+
+    def testDescribeKey(self):
+        key = decision_key("north", HAND, AuctionState.from_history(
+            ["west: 1C"]))
+        self.assertEqual(
+            decision_cache.describe_key(key),
+            "Decision cache: 10 HCP, shape 5-3-3-2 (5=3=2=3), "
+            "good spades.")
+
+    def testPrewarm(self):
+        decisions = []
+
+        def advise(position, hand, allowed_bids, bidding_history, **kwargs):
+            decisions.append(kwargs["decision_cache"])
+            return dict(ADVICE, bid_suggestion="Pass")
+
+        cache = DecisionCache()
+        decision_cache.prewarm(
+            cache, decision_cache.random_deals(2, seed=1), advise)
+        # Every deal is passed out after four calls
+        self.assertEqual(len(decisions), 8)
+        self.assertTrue(all(used is cache for used in decisions))
+
+
+if __name__ == '__main__':
+    unittest.main()
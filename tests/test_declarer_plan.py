@@ -0,0 +1,112 @@
+import unittest
+
+from bridgegui import declarer_plan
+from bridgegui.declarer_plan import DeclarerPlan, Step, analyze_suit
+from bridgegui.double_dummy import RANKS
+from bridgegui.play_rules import PLAN, PlayRules, played_cards
+from tests.fixtures import card, cards, trick
+
+ACE, KING, QUEEN, TWO = 1 << 12, 1 << 11, 1 << 10, 1 << 0
+
+
+def _contract(level, strain):
+    return {"bid": {"level": level, "strain": strain}, "doubling": "undoubled"}
+
+
+# South declares 4S: five sure spades, the heart ace, the diamond ace and
+# king, and a heart finesse against the king
+SOUTH = cards(
+    "ace spades", "king spades", "queen spades", "jack spades", "10 spades",
+    "ace hearts", "queen hearts", "4 diamonds", "3 diamonds", "2 diamonds",
+    "3 clubs", "2 clubs", "4 clubs")
+NORTH = cards(
+    "4 spades", "3 spades", "2 spades", "5 hearts", "4 hearts", "3 hearts",
+    "2 hearts", "ace diamonds", "king diamonds", "5 diamonds", "7 clubs",
+    "6 clubs", "5 clubs")
+
+
+class AnalyzeSuitTest(unittest.TestCase):
+    """Test suite for the suit analysis"""
+
+    def testWinnersLosersAndLengthTricks(self):
+        ace_king = ACE | KING | 0b111
+        outstanding = ((1 << 13) - 1) & ~(ace_king | 0b11000)
+        self.assertEqual(
+            analyze_suit(ace_king, 0b11000, outstanding), (2, 1, 2, None))
+
+    def testFinesse(self):
+        outstanding = ((1 << 13) - 1) & ~(ACE | QUEEN | TWO)
+        self.assertEqual(
+            analyze_suit(TWO, ACE | QUEEN, outstanding).finesse,
+            ("dummy", QUEEN, KING))
+        # The jack is also missing: no finesse of the ten
+        self.assertIsNone(analyze_suit(
+            TWO, ACE | 1 << 8, outstanding | QUEEN).finesse)
+
+
+class DeclarerPlanTest(unittest.TestCase):
+    """Test suite for the declarer plan"""
+
+    def setUp(self):
+        self.plan = DeclarerPlan("south", _contract(4, "spades"), SOUTH, NORTH)
+
+    def testSteps(self):
+        self.assertEqual(self.plan.sure_winners, 8)
+        self.assertEqual(self.plan.steps[:2], [
+            Step(declarer_plan.DRAW_TRUMPS, 0),
+            Step(declarer_plan.FINESSE, 1)])
+        self.assertIn("Plan: draw trumps spades, finesse hearts",
+                      self.plan.summary())
+
+    def testDrawTrumps(self):
+        no_plays = [0, 0, 0, 0]
+        self.assertEqual(
+            self.plan.decide("south", SOUTH, [], no_plays).card,
+            card("ace spades"))
+        self.assertEqual(
+            self.plan.decide("north", NORTH, [], no_plays).card,
+            card("2 spades"))
+
+    def testFinesseAfterTrumpsDrawn(self):
+        trumps = played_cards(trick(*(
+            ("east", "%s spades" % rank) for rank in RANKS[3:9])))
+        decision = self.plan.decide("north", NORTH, [], trumps)
+        self.assertEqual(decision.card, card("2 hearts"))
+        self.assertEqual(decision.rule, PLAN)
+        plays = trick(("north", "2 hearts"), ("east", "5 hearts"))
+        played = played_cards(plays)
+        played[0] |= trumps[0]
+        self.assertEqual(
+            self.plan.decide("south", SOUTH, plays, played).card,
+            card("queen hearts"))
+        plays[1]["card"] = card("king hearts")
+        self.assertIsNone(self.plan.decide(
+            "south", SOUTH, plays, played_cards(plays)))
+
+    def testRuffInShortTrumpHand(self):
+        south = cards(
+            "ace hearts", "king hearts", "queen hearts", "jack hearts",
+            "10 hearts", "9 hearts", "ace spades", "4 spades", "3 spades",
+            "2 spades")
+        north = cards("4 hearts", "3 hearts", "2 hearts", "2 clubs")
+        plan = DeclarerPlan("south", _contract(4, "hearts"), south, north)
+        self.assertEqual(plan.steps[0], Step(declarer_plan.RUFF, 0))
+        self.assertEqual(
+            plan.decide("south", south, [], [0, 0, 0, 0]).card,
+            card("2 spades"))
+        plays = trick(("south", "2 spades"), ("west", "king spades"))
+        self.assertEqual(
+            plan.decide("north", north, plays, played_cards(plays)).card,
+            card("2 hearts"))
+
+    def testPlayRulesConsultPlan(self):
+        rules = PlayRules()
+        rules.set_plan(self.plan)
+        decision = rules.decide(
+            "south", SOUTH, [], {"south": SOUTH, "north": NORTH}, "spades")
+        self.assertEqual(decision, (card("ace spades"), PLAN))
+        self.assertIn(PLAN, rules.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import random
+import time
+import unittest
+
+from bridgegui import double_dummy
+from bridgegui.double_dummy import DoubleDummySolver
+
+ACE, KING, QUEEN, TWO = 1 << 12, 1 << 11, 1 << 10, 1 << 0
+
+
+def _deck_deal(seed, cards):
+    generator = random.Random(seed)
+    deck = [(suit, 1 << bit) for suit in range(4) for bit in range(13)]
+    generator.shuffle(deck)
+    hands = [[0, 0, 0, 0] for _ in range(4)]
+    for seat in range(4):
+        for suit, card in deck[seat * cards:(seat + 1) * cards]:
+            hands[seat][suit] |= card
+    return hands
+
+
+def _brute_force(hands, trump, leader):
+    # Plain minimax over every legal card, in tricks of the side on lead
+    side = leader % 2
+
+    def winner(played):
+        best = 0
+        for n in range(1, 4):
+            suit, card = played[n]
+            best_suit, best_card = played[best]
+            if suit == best_suit and card > best_card or \
+                    suit == trump and best_suit != trump:
+                best = n
+        return best
+
+    def search(leader, played):
+        seat = (leader + len(played)) % 4
+        hand = hands[seat]
+        if not played and not any(hand):
+            return 0
+        if played and hand[played[0][0]]:
+            suits = [played[0][0]]
+        else:
+            suits = range(4)
+        results = []
+        for suit in suits:
+            for bit in range(13):
+                card = 1 << bit
+                if not hand[suit] & card:
+                    continue
+                hand[suit] ^= card
+                played.append((suit, card))
+                if len(played) == 4:
+                    trick = list(played)
+                    won = (leader + winner(trick)) % 4
+                    del played[:]
+                    result = (won % 2 == side) + search(won, [])
+                    played.extend(trick)
+                else:
+                    result = search(leader, played)
+                played.pop()
+                hand[suit] ^= card
+                results.append(result)
+        return max(results) if seat % 2 == side else min(results)
+
+    return search(leader, [])
+
+
+class DoubleDummyTest(unittest.TestCase):
+    """Test suite for the double dummy solver"""
+
+    def testHandMasks(self):
+        hand = [
+            {"rank": "ace", "suit": "spades"}, {"rank": "2", "suit": "spades"},
+            {"rank": "10", "suit": "clubs"}]
+        self.assertEqual(
+            double_dummy.hand_masks(hand), [ACE | TWO, 0, 0, 1 << 8])
+
+    def testCardMoves(self):
+        card = {"rank": "10", "suit": "clubs"}
+        self.assertEqual(double_dummy.card_bit(card), (3, 8))
+        self.assertEqual(double_dummy.card_move(card), (3, 1 << 8))
+        self.assertEqual(double_dummy.move_card(3, 1 << 8), card)
+        self.assertEqual(double_dummy.move_card(0, ACE),
+                         {"rank": "ace", "suit": "spades"})
+
+    def testFinesseAndRuff(self):
+        small = [1 << 1, 1 << 2, 1 << 3, 1 << 4]
+        hands = [
+            [0, ACE | QUEEN, 0, 0], [0, small[2] | small[3], 0, 0],
+            [0, TWO | small[0], 0, 0], [0, KING | small[1], 0, 0]]
+        # Leading towards the tenace the queen wins
+        self.assertEqual(double_dummy.solve(hands, "NT", "south"), 2)
+        self.assertEqual(double_dummy.solve(hands, "NT", "north"), 1)
+        # East ruffs the queen and cashes a club
+        hands[1] = [TWO, 0, 0, TWO]
+        self.assertEqual(double_dummy.solve(hands, "S", "south"), 0)
+        self.assertEqual(double_dummy.solve(hands, "NT", "south"), 2)
+
+    def testDeclarerTricks(self):
+        hands = {
+            "north": [ACE | KING, 0, 0, 0], "east": [0, ACE | KING, 0, 0],
+            "south": [0, 0, ACE | KING, 0], "west": [0, 0, 0, ACE | KING]}
+        # The left hand opponent cashes the first two tricks
+        self.assertEqual(double_dummy.declarer_tricks(hands, "NT", "north"), 0)
+        self.assertEqual(double_dummy.declarer_tricks(hands, "S", "north"), 2)
+
+    def testAgreesWithBruteForce(self):
+        for seed in range(60):
+            hands = _deck_deal(seed, 1 + seed % 3)
+            strain = ("S", "H", "D", "C", "NT")[seed % 5]
+            leader = double_dummy.POSITION_TAGS[seed % 4]
+            expected = _brute_force(
+                [list(hand) for hand in hands],
+                double_dummy.TRUMP_INDEXES[strain], seed % 4)
+            self.assertEqual(
+                double_dummy.solve(hands, strain, leader), expected,
+                (hands, strain, leader))
+
+    def testPlayTricks(self):
+        small = [1 << 1, 1 << 2, 1 << 3, 1 << 4]
+        # South has led the two and west followed low
+        hands = [
+            [0, ACE | QUEEN, 0, 0], [0, small[2] | small[3], 0, 0],
+            [0, small[0], 0, 0], [0, KING, 0, 0]]
+        solver = DoubleDummySolver(hands, "NT")
+        self.assertEqual(
+            solver.play_tricks("south", [(1, TWO), (1, small[1])]),
+            {(1, QUEEN): 2, (1, ACE): 1})
+        for seed in range(20):
+            hands = _deck_deal(seed, 1 + seed % 3)
+            solver = DoubleDummySolver(hands, "NT")
+            self.assertEqual(
+                max(solver.play_tricks(seed % 4, []).values()),
+                double_dummy.solve(hands, "NT", seed % 4))
+
+    def testDeadline(self):
+        solver = DoubleDummySolver(_deck_deal(1, 13), "NT", time.time() - 1)
+        with self.assertRaises(TimeoutError):
+            solver.tricks("north")
+
+
+if __name__ == '__main__':
+    unittest.main()
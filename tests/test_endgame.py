@@ -0,0 +1,81 @@
+import unittest
+
+from bridgegui import play_rules
+from bridgegui.double_dummy import RANKS
+from bridgegui.endgame import EndgameSolver
+from bridgegui.play_rules import PlayRules
+from tests.fixtures import card, cards, played_tricks, suit, trick
+
+
+# The cards of eleven tricks in which everybody followed suit: the spades
+# from the two to the jack except the four and the five, and the hearts,
+# diamonds and clubs from the three up
+EARLY_CARDS = (
+    suit("spades", [rank for rank in RANKS[:10] if rank not in ("4", "5")]) +
+    suit("hearts", RANKS[1:]) + suit("diamonds", RANKS[1:]) +
+    suit("clubs", RANKS[1:]))
+
+# Two cards left each: north AQ of spades, east the deuces of diamonds and
+# clubs, south the four of spades and the deuce of hearts, west K5 of spades
+NORTH = cards("ace spades", "queen spades")
+SOUTH = cards("4 spades", "2 hearts")
+
+
+class EndgameSolverTest(unittest.TestCase):
+    """Test suite for the endgame solver"""
+
+    def setUp(self):
+        self.rules = PlayRules(endgame=EndgameSolver())
+
+    def _finesse(self, rules):
+        plays = trick(("south", "4 spades"), ("west", "5 spades"))
+        tricks = played_tricks(EARLY_CARDS) + [{"cards": plays}]
+        return rules.decide(
+            "north", NORTH, plays, {"north": NORTH, "south": SOUTH},
+            tricks=tricks)
+
+    def testBestCardOverAllLayouts(self):
+        # The king is with west in one of the three layouts: the queen wins
+        # two tricks there but none if east wins the king and cashes a minor
+        self.assertEqual(
+            self._finesse(self.rules),
+            (card("ace spades"), play_rules.ENDGAME))
+
+    def testTooManyCardsLeftIsOpen(self):
+        rules = PlayRules(endgame=EndgameSolver(max_cards=1))
+        self.assertNotEqual(self._finesse(rules).rule, play_rules.ENDGAME)
+
+    def testLayoutDeterminedByVoids(self):
+        # East showed out of spades, so west holds the king
+        tricks = played_tricks(EARLY_CARDS)
+        tricks[0]["cards"][1], tricks[2]["cards"][1] = (
+            tricks[2]["cards"][1], tricks[0]["cards"][1])
+        plays = trick(("south", "4 spades"), ("west", "5 spades"))
+        rules = PlayRules(endgame=EndgameSolver(max_cards=1))
+        decision = rules.decide(
+            "north", NORTH, plays, {"north": NORTH, "south": SOUTH},
+            tricks=tricks + [{"cards": plays}])
+        self.assertEqual(
+            decision, (card("queen spades"), play_rules.ENDGAME))
+
+    def testClaim(self):
+        hand = cards("ace hearts", "king spades", "ace spades")
+        decision = self.rules.decide(
+            "north", hand, [], {"north": hand}, tricks=[])
+        self.assertEqual(decision, (card("ace spades"), play_rules.CLAIM))
+        self.assertIsNone(self.rules.decide(
+            "north", hand, [], {"north": hand}, trump="clubs", tricks=[]))
+
+    def testClaimDrawsTrumps(self):
+        hand = cards("ace hearts", "king clubs", "ace clubs")
+        played = [{"cards": trick(*(
+            (position, "%s clubs" % rank)
+            for position, rank in zip(("east", "south", "west") * 4, RANKS)
+            if rank not in ("king", "ace")))}]
+        decision = self.rules.decide(
+            "north", hand, [], {"north": hand}, trump="clubs", tricks=played)
+        self.assertEqual(decision, (card("ace clubs"), play_rules.CLAIM))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import time
+import unittest
+
+import openai
+from langchain_community.chat_models import ChatOpenAI
+
+from bridgegui import fake_llm_server
+from bridgegui.fake_llm_server import FakeLLMServer
+from bridgegui.llm_integration import LLMIntegration
+
+ALLOWED_BIDDING = [{"type": "pass"}, {
+    "type": "bid", "bid": {"level": 5, "strain": "diamonds"}}]
+
+
+class FakeLLMServerTest(unittest.TestCase):
+    """Test suite for the fake chat completions server"""
+
+    def _server(self, **kwargs):
+        server = FakeLLMServer(seed=1, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _client(self, server):
+        return openai.OpenAI(
+            api_key="sk-test", base_url=server.base_url, max_retries=0)
+
+    def testResponders(self):
+        respond = fake_llm_server.scripted(["first"], default="done")
+        self.assertEqual(respond([], "model"), "first")
+        self.assertEqual(respond([], "model"), "done")
+        respond = fake_llm_server.rule_based(
+            [(r"level (\d)", lambda match: match.group(1)), ("pass", "P")])
+        self.assertEqual(
+            respond([{"role": "user", "content": "level 3"}], "model"), "3")
+        self.assertEqual(respond([{"role": "user", "content": "x"}], "model"),
+                         fake_llm_server.DEFAULT_RESPONSE)
+
+    def testLLMIntegration(self):
+        server = self._server(responder=fake_llm_server.rule_based(
+            [("Allowed Biddings: P,5D", "pass, 5 diamonds")]))
+        llm = LLMIntegration("sk-test", base_url=server.base_url)
+        self.assertEqual(
+            llm.get_allowed_bidding(ALLOWED_BIDDING), "pass, 5 diamonds")
+        statistics = server.statistics()
+        self.assertEqual(statistics["requests"], 1)
+        self.assertEqual(statistics["completion_tokens"],
+                         fake_llm_server.count_tokens("pass, 5 diamonds"))
+        self.assertGreater(statistics["prompt_tokens"], 0)
+
+    def testLatencyAndUsage(self):
+        server = self._server(
+            latency=fake_llm_server.fixed_latency(0.2),
+            responder=fake_llm_server.scripted(["one two three"]))
+        start = time.perf_counter()
+        response = self._client(server).chat.completions.create(
+            model="gpt-4-turbo", messages=[{"role": "user", "content": "hi"}])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        self.assertEqual(response.choices[0].message.content, "one two three")
+        statistics = server.statistics()
+        self.assertEqual(response.usage.prompt_tokens,
+                         statistics["prompt_tokens"])
+        self.assertEqual(response.usage.total_tokens,
+                         statistics["prompt_tokens"] +
+                         statistics["completion_tokens"])
+        self.assertEqual(statistics["latencies"], [0.2])
+
+    def testStreamingThroughLangchain(self):
+        server = self._server(
+            responder=fake_llm_server.scripted(["1 no trump "]))
+        model = ChatOpenAI(
+            openai_api_key="sk-test", openai_api_base=server.base_url,
+            streaming=True)
+        chunks = [chunk.content for chunk in model.stream("bid")]
+        self.assertEqual("".join(chunks), "1 no trump ")
+        self.assertGreaterEqual(len([chunk for chunk in chunks if chunk]), 3)
+
+    def testInjectedErrors(self):
+        server = self._server(error_rates={503: 1.0})
+        with self.assertRaises(openai.InternalServerError):
+            self._client(server).chat.completions.create(
+                model="gpt-4-turbo", messages=[])
+        server.error_rates = {}
+        server.fail_next(429)
+        with self.assertRaises(openai.RateLimitError):
+            self._client(server).chat.completions.create(
+                model="gpt-4-turbo", messages=[])
+        # The client retries the rate limited request
+        server.fail_next(429)
+        llm = LLMIntegration("sk-test", base_url=server.base_url)
+        self.assertEqual(llm.get_allowed_bidding(ALLOWED_BIDDING),
+                         fake_llm_server.DEFAULT_RESPONSE)
+        statistics = server.statistics()
+        self.assertEqual(statistics["requests"], 4)
+        self.assertEqual(statistics["errors"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import random
+import unittest
+
+from bridgegui import hand_inference
+from bridgegui.double_dummy import RANKS
+from bridgegui.hand_inference import HandInference
+from bridgegui.hand_ranges import HandRange, UNKNOWN_RANGE
+from tests.fixtures import card, suit
+
+
+# South holds all the clubs, north (the dummy) all the diamonds
+SOUTH = suit("clubs", RANKS)
+NORTH = suit("diamonds", RANKS)
+
+
+class HandInferenceTest(unittest.TestCase):
+    """Test suite for the hand inference"""
+
+    def setUp(self):
+        self.inference = HandInference("south", SOUTH, declarer="south")
+        self.inference.reveal("north", NORTH)
+
+    def testKnownAndUnknownCards(self):
+        self.assertEqual(
+            self.inference.probability("south", card("ace clubs")), 1.0)
+        self.assertEqual(
+            self.inference.probability("west", card("ace clubs")), 0.0)
+        self.assertAlmostEqual(
+            self.inference.probability("west", card("ace spades")), 0.5)
+        self.assertEqual(
+            self.inference.expected_lengths("north"), [0.0, 0.0, 13.0, 0.0])
+
+    def testShowOut(self):
+        self.inference.play("west", card("2 hearts"))
+        self.inference.play("north", card("2 diamonds"))
+        self.inference.play("east", card("2 spades"))
+        self.assertEqual(
+            self.inference.probability("east", card("king hearts")), 0.0)
+        self.assertEqual(
+            self.inference.probability("west", card("king hearts")), 1.0)
+        summary = self.inference.summary()
+        self.assertIn("E: S 11.9, H void", summary)
+        self.assertIn("H 12.0, D 0.0, C 0.0 (likely HA, HK, HQ, HJ)", summary)
+
+    def testSignals(self):
+        self.inference.play("west", card("2 hearts"))
+        self.inference.play("north", card("2 diamonds"))
+        self.inference.play("east", card("9 hearts"))
+        king = card("king hearts")
+        self.assertGreater(self.inference.probability("east", king), 0.6)
+        upside_down = HandInference(
+            "south", SOUTH, declarer="south",
+            convention=hand_inference.UPSIDE_DOWN)
+        for position, text in (
+                ("west", "2 hearts"), ("north", "2 diamonds"),
+                ("east", "9 hearts")):
+            upside_down.play(position, card(text))
+        self.assertLess(upside_down.probability("east", king), 0.4)
+
+    def testHonorThirdInHandDeniesCardBelow(self):
+        for position, text in (
+                ("west", "2 hearts"), ("north", "2 diamonds"),
+                ("east", "king hearts")):
+            self.inference.play(position, card(text))
+        self.assertLess(
+            self.inference.probability("east", card("queen hearts")), 0.25)
+
+    def testPriorFromHandRanges(self):
+        ranges = {
+            "north": UNKNOWN_RANGE, "south": UNKNOWN_RANGE,
+            "east": HandRange((0, 6, 0, 0, 0), (10, 6, 3, 3, 3)),
+            "west": HandRange((0, 0, 0, 0, 0), (10, 2, 7, 7, 7))}
+        inference = HandInference("south", SOUTH, ranges=ranges)
+        inference.reveal("north", NORTH)
+        lengths = inference.expected_lengths("east")
+        self.assertAlmostEqual(sum(lengths), 13)
+        self.assertGreater(lengths[0], inference.expected_lengths("west")[0])
+
+    def testSample(self):
+        self.inference.play("west", card("2 hearts"))
+        self.inference.play("north", card("2 diamonds"))
+        self.inference.play("east", card("2 spades"))
+        deals = self.inference.sample(10, random.Random(1))
+        self.assertEqual(len(deals), 10)
+        for deal in deals:
+            self.assertEqual(deal[1][1], 0)
+            self.assertEqual(sum(bin(mask).count("1") for mask in deal[1]), 12)
+            self.assertEqual(sum(bin(mask).count("1") for mask in deal[3]), 12)
+            self.assertEqual(deal[2][3], (1 << 13) - 1)
+
+    def testSampleRejectsDealsOutOfRange(self):
+        ranges = {
+            "north": UNKNOWN_RANGE, "south": UNKNOWN_RANGE,
+            "east": HandRange((10, 0, 0, 0, 0), (10, 13, 13, 13, 13)),
+            "west": UNKNOWN_RANGE}
+        inference = HandInference("south", SOUTH, ranges=ranges)
+        inference.reveal("north", NORTH)
+        deals = inference.sample(5, random.Random(1))
+        self.assertTrue(deals)
+        for deal in deals:
+            hcp = sum(
+                (mask >> bit & 1) * (bit - 8)
+                for mask in deal[1] for bit in range(9, 13))
+            self.assertEqual(hcp, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
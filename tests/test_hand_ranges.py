@@ -0,0 +1,108 @@
+import unittest
+
+from bridgegui import hand_ranges
+from bridgegui.auction import AuctionState
+from bridgegui.hand_ranges import HandRange
+
+
+def _hand(spades, hearts, diamonds, clubs):
+    hand = []
+    for suit, ranks in (
+            ("spades", spades), ("hearts", hearts),
+            ("diamonds", diamonds), ("clubs", clubs)):
+        hand.extend({"rank": rank, "suit": suit} for rank in ranks)
+    return hand
+
+
+class HandRangeTest(unittest.TestCase):
+    """Test suite for hand ranges"""
+
+    def testIntersectAndHull(self):
+        first = HandRange((12, 5, 0, 0, 0), (18, 13, 13, 13, 13))
+        second = HandRange((0, 0, 0, 0, 0), (10, 13, 3, 13, 13))
+        self.assertEqual(
+            first.intersect(second),
+            HandRange((12, 5, 0, 0, 0), (10, 13, 3, 13, 13)))
+        self.assertEqual(
+            first.hull(second),
+            HandRange((0, 0, 0, 0, 0), (18, 13, 13, 13, 13)))
+        self.assertTrue(first.contains((15, 6, 3, 2, 2)))
+        self.assertFalse(first.contains((15, 4, 3, 3, 3)))
+
+    def testFormatHandRange(self):
+        self.assertEqual(
+            hand_ranges.format_hand_range(hand_ranges.UNKNOWN_RANGE),
+            "no information")
+        self.assertEqual(
+            hand_ranges.format_hand_range(
+                HandRange((12, 5, 0, 0, 0), (18, 13, 3, 13, 13))),
+            "12-18 HCP, S 5+, H 0-3")
+
+
+class InferHandRangesTest(unittest.TestCase):
+    """Test suite for hand range inference"""
+
+    def testPromisesAndPropagation(self):
+        ranges, complete = hand_ranges.infer_hand_ranges(
+            ["north: 1H", "east: Pass", "south: 2H", "west: Pass"])
+        self.assertTrue(complete)
+        self.assertEqual(ranges["north"].low[:3], (12, 0, 5))
+        self.assertEqual(ranges["north"].high[:3], (18, 8, 10))
+        self.assertEqual(ranges["south"].low[:3], (7, 0, 3))
+        self.assertEqual(ranges["south"].high[0], 10)
+        # At most 13 - 5 - 3 hearts are left for the opponents
+        self.assertEqual(ranges["east"].high[2], 5)
+        self.assertEqual(ranges["west"].high[2], 5)
+
+    def testLeadingPassesAndOpponentPasses(self):
+        auction = AuctionState.from_history(
+            ["west: Pass", "north: 1NT", "east: Pass"])
+        ranges, complete = hand_ranges.infer_hand_ranges(auction)
+        self.assertTrue(complete)
+        self.assertEqual(ranges["north"].low[0], 15)
+        self.assertEqual(ranges["west"].high[0], 11)
+
+    def testAuctionOffTheSystem(self):
+        ranges, complete = hand_ranges.infer_hand_ranges(
+            ["north: 1NT", "east: 2C", "south: Pass"])
+        self.assertFalse(complete)
+        self.assertEqual(ranges["north"].low[0], 15)
+        self.assertEqual(ranges["east"], ranges["south"])
+
+    def testOwnHand(self):
+        hand = _hand(
+            ["ace", "king", "10", "9", "8"], ["queen", "2", "3"],
+            ["jack", "4", "5"], ["6", "7"])
+        ranges, _ = hand_ranges.infer_hand_ranges(
+            ["north: 1S", "east: Pass"], hand, "south")
+        self.assertEqual(ranges["south"], HandRange(
+            (10, 5, 3, 3, 2), (10, 5, 3, 3, 2)))
+        # The opener has at most 13 - 5 spades left
+        self.assertEqual(ranges["north"].high[1], 8)
+        self.assertEqual(ranges["north"].high[0], 18)
+
+    def testContradictionIsEmptyRange(self):
+        # North passed, then responds with the strength of an opening
+        hand = _hand(
+            ["ace", "king", "queen", "jack", "9", "5", "2"],
+            ["ace", "jack", "9"], ["king", "9"], ["6"])
+        ranges, _ = hand_ranges.infer_hand_ranges(
+            ["west: Pass", "north: Pass", "east: Pass", "south: 1S",
+             "west: Pass", "north: 2D", "east: Pass"], hand, "south")
+        self.assertGreater(ranges["north"].low[0], ranges["north"].high[0])
+
+    def testDescribeHandRanges(self):
+        ranges, _ = hand_ranges.infer_hand_ranges(
+            ["north: 1S", "east: Pass"])
+        your_team, opponents = hand_ranges.describe_hand_ranges(
+            ranges, "south")
+        self.assertTrue(your_team.startswith(
+            "Shown by the auction: You (south): 0-28 HCP, S 0-8."))
+        self.assertIn("Partner (north): 12-18 HCP, S 5+, H 0-8", your_team)
+        self.assertTrue(opponents.startswith(
+            "Shown by the auction: Left hand opponent (west): 0-28 HCP"))
+        self.assertIn("Right hand opponent (east): 0-28 HCP", opponents)
+
+
+if __name__ == '__main__':
+    unittest.main()
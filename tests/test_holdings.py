@@ -0,0 +1,75 @@
+import random
+import unittest
+
+import numpy
+import pkg_resources
+
+from bridgegui import holdings, utils2
+from bridgegui.double_dummy import RANKS, hand_masks
+from bridgegui.notation import SUIT_ORDER
+from bridgegui.schemas import Card
+
+ACE, KING, QUEEN, JACK, TEN = (1 << bit for bit in range(12, 7, -1))
+
+
+def _hands(seed):
+    deck = [
+        {"rank": rank, "suit": suit} for suit in SUIT_ORDER for rank in RANKS]
+    random.Random(seed).shuffle(deck)
+    return [deck[n:n + 13] for n in range(0, 52, 13)]
+
+
+class HoldingTablesTest(unittest.TestCase):
+    """Test suite for the holding lookup tables"""
+
+    def testShippedTablesAreCurrent(self):
+        data = pkg_resources.resource_string(
+            holdings.__name__, holdings.DATA_FILE)
+        tables = holdings.build_tables()
+        self.assertEqual(
+            data, b"".join(tables[field] for field in holdings.HOLDING_FIELDS))
+
+    def testHoldingValues(self):
+        expected = {
+            ACE | KING: (7, 2, 2, 4, 0, 2, 2),
+            ACE | QUEEN | 1: (6, 3, 2, 3, 1, 2, 1),
+            KING | 1: (3, 2, 1, 1, 1, 2, 1),
+            KING: (3, 1, 1, 0, 1, 0, 1),
+            QUEEN | 2: (2, 2, 1, 0, 2, 1, 1),
+            KING | QUEEN | JACK | TEN: (6, 4, 2, 2, 1, 2, 4),
+            JACK | 4 | 2 | 1: (1, 4, 0, 0, 3, 2, 1),
+            0: (0, 0, 0, 0, 0, 0, 0),
+        }
+        for mask, values in expected.items():
+            self.assertEqual(
+                tuple(
+                    holdings.holding_value(field, mask)
+                    for field in holdings.HOLDING_FIELDS),
+                values, bin(mask))
+
+    def testAgreesWithUtils(self):
+        for seed in range(20):
+            for hand in _hands(seed):
+                cards = [Card(**card) for card in hand]
+                lengths = holdings.suit_lengths(hand)
+                self.assertEqual(
+                    holdings.hand_hcp(hand), utils2.count_hcp(cards))
+                self.assertEqual(
+                    holdings.suit_distribution(lengths),
+                    utils2.get_suit_distribution(cards))
+                self.assertEqual(
+                    holdings.dominant_suit(lengths),
+                    utils2.dominant_suit_function(cards))
+
+    def testBatchAgreesWithScalar(self):
+        hands = [
+            hand_masks(hand) for seed in range(5) for hand in _hands(seed)]
+        batch = holdings.evaluate_batch(numpy.array(hands))
+        for n, hand in enumerate(hands):
+            evaluation = holdings.evaluate_hand(hand)
+            for field in holdings.HOLDING_FIELDS:
+                self.assertEqual(batch[field][n].sum(), evaluation[field])
+
+
+if __name__ == '__main__':
+    unittest.main()
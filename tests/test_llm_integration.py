@@ -30,5 +30,44 @@ class TestLLMIntegration(unittest.TestCase):
             ]
         )
 
+class TestPromptNotation(unittest.TestCase):
+    def setUp(self):
+        self.llm_integration = LLMIntegration("sk-test")
+        self.hand = [
+            {"rank": "ace", "suit": "spades"}, {"rank": "10", "suit": "hearts"},
+            {"rank": "2", "suit": "clubs"}]
+
+    def test_bid_suggestion_prompt(self):
+        messages = self.llm_integration._get_bid_suggestion_messages(
+            "north", self.hand, [{"type": "pass"}],
+            [{"east": {"type": "bid", "bid": {"level": 1, "strain": "clubs"}}}])
+        prompt = messages[-1]["content"]
+        self.assertIn("**Hand:** A.T..2", prompt)
+        self.assertIn("**Allowed Biddings:** P", prompt)
+        self.assertIn("**Bidding so far:** E:1C", prompt)
+
+    def test_card_play_suggestion_prompt(self):
+        messages = self.llm_integration._get_card_play_suggestion_messages(
+            "Own hand", "north", self.hand, {}, [], self.hand[:2],
+            {"bid": {"level": 3, "strain": "notrump"}, "doubling": "doubled"},
+            "north, south", [], [])
+        prompt = messages[-1]["content"]
+        self.assertIn("**Your hand:** A.T..2", prompt)
+        self.assertIn("**Allowed cards:** S:A H:T", prompt)
+        self.assertIn("**Contract:** 3NTX", prompt)
+        self.assertIn("**Hidden hands:** unknown", prompt)
+        self.assertNotIn('"rank"', prompt)
+
+    def test_prompt_prefix_is_invariant(self):
+        first = self.llm_integration._get_bid_suggestion_messages(
+            "north", self.hand, [{"type": "pass"}], [])
+        second = self.llm_integration._get_bid_suggestion_messages(
+            "south", self.hand[:1], [{"type": "pass"}],
+            [{"east": {"type": "pass"}}])
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[0]["role"], "system")
+        self.assertNotIn("north", first[0]["content"])
+        self.assertIn("**Your position:** north", first[1]["content"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import openai
+from langchain_community.chat_models import ChatOpenAI
+
+from bridgegui import fake_llm_server, llm_journal
+from bridgegui.fake_llm_server import FakeLLMServer
+from bridgegui.llm_integration import LLMIntegration
+from bridgegui.llm_journal import (
+    JournalTransport, LLMJournal, PASSTHROUGH, RECORD, REPLAY)
+
+ALLOWED_BIDDING = [{"type": "pass"}]
+PATH = "/v1/chat/completions"
+
+
+def _body(content, **fields):
+    return json.dumps(dict(fields, model="gpt-3.5-turbo", messages=[
+        {"role": "user", "content": content}])).encode()
+
+
+class LLMJournalTest(unittest.TestCase):
+    """Test suite for the LLM call journal"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "llm.jsonl")
+        self.server = FakeLLMServer(responder=fake_llm_server.scripted(
+            ["first", "second", "1 no trump "]))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def _client(self, mode):
+        return openai.DefaultHttpxClient(
+            transport=JournalTransport(LLMJournal(self.path), mode))
+
+    def _integration(self, mode):
+        return LLMIntegration(
+            "sk-test", base_url=self.server.base_url,
+            http_client=self._client(mode))
+
+    def testRequestKey(self):
+        key = llm_journal.request_key("POST", PATH, _body("Bid \nnow"))
+        self.assertEqual(key, llm_journal.request_key(
+            "post", PATH, _body("Bid\nnow  ", user="someone")))
+        self.assertNotEqual(key, llm_journal.request_key(
+            "POST", PATH, _body("Bid\nlater")))
+        self.assertNotEqual(key, llm_journal.request_key(
+            "POST", PATH, _body("Bid\nnow", temperature=1)))
+
+    def testRecordAndReplay(self):
+        llm = self._integration(RECORD)
+        recorded = [llm.get_allowed_bidding(ALLOWED_BIDDING)
+                    for _ in range(2)]
+        self.assertEqual(recorded, ["first", "second"])
+        self.assertEqual(len(LLMJournal(self.path)), 2)
+        self.server.stop()
+        llm = self._integration(REPLAY)
+        self.assertEqual(
+            [llm.get_allowed_bidding(ALLOWED_BIDDING) for _ in range(3)],
+            ["first", "second", "second"])
+        with self.assertRaises(openai.NotFoundError):
+            llm.get_allowed_bidding([{"type": "double"}])
+        self.assertEqual(len(LLMJournal(self.path)), 2)
+
+    def testPassthrough(self):
+        llm = self._integration(PASSTHROUGH)
+        self.assertEqual(llm.get_allowed_bidding(ALLOWED_BIDDING), "first")
+        self.assertFalse(os.path.exists(self.path))
+
+    def testErrorsNotRecorded(self):
+        self.server.fail_next(503)
+        self.assertEqual(
+            self._integration(RECORD).get_allowed_bidding(ALLOWED_BIDDING),
+            "first")
+        self.assertEqual(self.server.statistics()["errors"], 1)
+        self.assertEqual(len(LLMJournal(self.path)), 1)
+
+    def testStreamingThroughLangchain(self):
+        def model(mode):
+            return ChatOpenAI(openai_api_key="sk-test", streaming=True,
+                              client=openai.OpenAI(
+                                  api_key="sk-test",
+                                  base_url=self.server.base_url,
+                                  http_client=self._client(mode)
+                              ).chat.completions)
+        self.server.responder = fake_llm_server.scripted(["1 no trump "])
+        recorded = [chunk.content for chunk in model(RECORD).stream("bid")]
+        replayed = [chunk.content for chunk in model(REPLAY).stream("bid")]
+        self.assertEqual("".join(recorded), "1 no trump ")
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(self.server.statistics()["requests"], 1)
+
+    def testUnknownMode(self):
+        with self.assertRaises(ValueError):
+            JournalTransport(LLMJournal(self.path), "rewind")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import socket
+import time
+import unittest
+
+import zmq
+
+from bridgegui import rules_engine
+from bridgegui.local_server import BotClient, LocalServer
+from bridgegui.messaging import MessageRecorder, read_messages, sendCommand
+from bridgegui.notation import POSITION_TAGS
+
+TIMEOUT = 60
+
+
+def _free_endpoint():
+    # A base endpoint whose port and the next port are both free
+    while True:
+        with socket.socket() as first:
+            first.bind(("127.0.0.1", 0))
+            port = first.getsockname()[1]
+            with socket.socket() as second:
+                try:
+                    second.bind(("127.0.0.1", port + 1))
+                except OSError:
+                    continue
+        return "tcp://127.0.0.1:%d" % port
+
+
+class LocalServerTest(unittest.TestCase):
+    """Test suite for the local stand-in server"""
+
+    def setUp(self):
+        self.context = zmq.Context()
+        self.endpoint = _free_endpoint()
+        self.server = LocalServer(
+            self.endpoint, boards=2, seed=1, context=self.context,
+            start_delay=0.5, turn_interval=0.5)
+        self.game = self.server.create_game()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.context.destroy()
+
+    def testBotsPlayTheBoards(self):
+        recording = io.StringIO()
+        bots = [
+            BotClient(
+                self.endpoint, self.game, position, seed=n,
+                context=self.context,
+                recorder=MessageRecorder(recording) if n == 0 else None)
+            for n, position in enumerate(POSITION_TAGS)]
+        for bot in bots:
+            bot.start()
+        deadline = time.time() + TIMEOUT
+        while self.server.statistics()["boards"] < 2 and \
+                time.time() < deadline:
+            time.sleep(0.05)
+        for bot in bots:
+            bot.stop()
+        statistics = self.server.statistics()
+        self.assertEqual(statistics["boards"], 2)
+        self.assertEqual(statistics["games"], {self.game: 2})
+        self.assertEqual(len(statistics["latencies"]),
+                         sum(bot.decisions for bot in bots))
+        self.assertTrue(all(
+            latency >= 0 for latency in statistics["latencies"]))
+        recording.seek(0)
+        messages = read_messages(recording)
+        deals = [
+            command for command, _ in messages if command.endswith(b":deal")]
+        self.assertEqual(len(deals), 2)
+        self.assertEqual(rules_engine.verify_messages(messages), [])
+
+    def testIllegalCommands(self):
+        control = self.context.socket(zmq.DEALER)
+        control.connect(self.endpoint)
+        try:
+            sendCommand(control, b"join", game=self.game, player="a",
+                        position="south")
+            self.assertEqual(control.recv_multipart()[2:], [
+                b"OK", b"game", ('"%s"' % self.game).encode(), b"position",
+                b'"south"'])
+            sendCommand(control, b"call", game=self.game, player="a",
+                        call={"type": "pass"})
+            self.assertEqual(control.recv_multipart()[2], b"ERR:RV")
+            sendCommand(control, b"join", game="unknown", player="a")
+            self.assertEqual(control.recv_multipart()[2], b"ERR")
+        finally:
+            control.close(linger=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
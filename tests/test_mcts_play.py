@@ -0,0 +1,82 @@
+import unittest
+
+from bridgegui import mcts_play
+from bridgegui.double_dummy import RANKS
+from bridgegui.mcts_play import MCTSPolicy
+from bridgegui.notation import SUIT_ORDER
+from tests.fixtures import card, cards, played_tricks, suit
+
+
+# Two cards left each: north cashes the ace of spades, or the defenders win
+# the heart and keep a diamond or a heart to lead
+NORTH = cards("ace spades", "2 hearts")
+EAST = cards("ace hearts", "2 diamonds")
+SOUTH = cards("2 spades", "2 clubs")
+WEST = cards("king hearts", "3 diamonds")
+
+
+def _early_cards():
+    # The cards of eleven tricks led by north with the other cards, east and
+    # west always following suit and south playing the cards left over
+    left = NORTH + EAST + SOUTH + WEST
+    suits = {
+        suit_: [card_ for card_ in suit(suit_, RANKS) if card_ not in left]
+        for suit_ in SUIT_ORDER}
+    leads = [
+        [suits[suit_].pop() for _ in range(3)]
+        for suit_, count in zip(SUIT_ORDER, (3, 3, 3, 2))
+        for _ in range(count)]
+    south = [card_ for cards_ in suits.values() for card_ in cards_]
+    return [
+        card_ for (north, east, west), south_card in zip(leads, south)
+        for card_ in (north, east, south_card, west)]
+
+
+class MCTSPolicyTest(unittest.TestCase):
+    """Test suite for the information set tree search"""
+
+    def _decide(self, policy, hands):
+        return policy.decide(
+            "north", NORTH, [], hands, "notrump",
+            played_tricks(_early_cards()), declarer="south")
+
+    def testCashesWinnerWithAllHandsVisible(self):
+        hands = {
+            "north": NORTH, "east": EAST, "south": SOUTH, "west": WEST}
+        decision = self._decide(MCTSPolicy(iterations=200, seed=1), hands)
+        self.assertEqual(decision, (card("ace spades"), mcts_play.MCTS))
+
+    def testCashesWinnerOverHiddenLayouts(self):
+        hands = {"north": NORTH, "south": SOUTH}
+        for rollout in mcts_play.rollout_policies():
+            policy = MCTSPolicy(iterations=300, rollout=rollout, seed=1)
+            self.assertEqual(
+                self._decide(policy, hands).card, card("ace spades"))
+
+    def testRootParallelism(self):
+        policy = MCTSPolicy(iterations=100, workers=2, seed=1)
+        hands = {"north": NORTH, "south": SOUTH}
+        try:
+            self.assertEqual(
+                self._decide(policy, hands).card, card("ace spades"))
+            executor = policy._executor
+            self.assertIsNotNone(executor)
+            self._decide(policy, hands)
+            self.assertIs(policy._executor, executor)
+        finally:
+            policy.close()
+        self.assertIsNone(policy._executor)
+
+    def testOneClassIsPlayedWithoutSearch(self):
+        hand = cards("king spades", "queen spades")
+        decision = MCTSPolicy(iterations=0).decide(
+            "north", hand, [], {"north": hand}, "spades", [])
+        self.assertEqual(decision, (card("queen spades"), mcts_play.MCTS))
+
+    def testUnknownRolloutPolicy(self):
+        with self.assertRaises(ValueError):
+            MCTSPolicy(rollout="perfect")
+
+
+if __name__ == '__main__':
+    unittest.main()
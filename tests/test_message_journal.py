@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import zmq
+
+from bridgegui import message_journal
+from bridgegui.message_journal import (
+    JournalReader, JournaledSocket, MessageJournal, RECEIVED, SENT)
+from bridgegui.messaging import (
+    MessageQueue, sendCommand, validateControlReply, validateEventMessage)
+
+DEAL = [b"game:deal", b"opener", b'"north"']
+TURN = [b"game:turn", b"position", b'"east"']
+
+
+class MessageJournalTest(unittest.TestCase):
+    """Test suite for the protocol message journal"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "messages.journal")
+
+    def _handlers(self, handled):
+        return {
+            command: lambda command=command, **kwargs: handled.append(
+                (command, kwargs))
+            for command in (b"game:deal", b"game:turn")}
+
+    def testJournaledSockets(self):
+        context = zmq.Context()
+        try:
+            with MessageJournal(self.path) as journal:
+                back = context.socket(zmq.PAIR)
+                back.bind("inproc://journal")
+                front = JournaledSocket(
+                    context.socket(zmq.PAIR), journal, "control")
+                front.connect("inproc://journal")
+                sendCommand(front, b"bridgehlo", version="0.1")
+                back.send_multipart(
+                    back.recv_multipart()[:2] + [b"OK", b"version", b'"0.1"'])
+                self.assertEqual(front.poll(1000), zmq.POLLIN)
+                reply = front.recv_multipart()
+        finally:
+            context.destroy()
+        with JournalReader(self.path) as reader:
+            records = list(reader)
+        self.assertEqual([record.direction for record in records],
+                         [SENT, RECEIVED])
+        self.assertEqual([record.channel for record in records],
+                         ["control", "control"])
+        self.assertEqual(records[0].parts[:3], [b"", b"bridgehlo", b"bridgehlo"])
+        self.assertEqual(records[1].parts, reply)
+        self.assertLessEqual(records[0].time, records[1].time)
+
+    def testReadWithoutIndex(self):
+        with MessageJournal(self.path) as journal:
+            journal.record("events", RECEIVED, DEAL, 10.0)
+            journal.record("events", RECEIVED, TURN, 11.0)
+        with MessageJournal(self.path) as journal:
+            journal.record("events", RECEIVED, [b"game:trick"], 12.0)
+        with JournalReader(self.path) as reader:
+            indexed = list(reader)
+        os.remove(self.path + message_journal.INDEX_SUFFIX)
+        with open(self.path, "ab") as f:
+            f.write(b"\x00\x01")  # a record torn by a crash
+        with JournalReader(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(list(reader), indexed)
+            self.assertEqual(reader[1].parts, TURN)
+            self.assertEqual(reader[-1].time, 12.0)
+
+    def testReadWithStaleIndex(self):
+        with MessageJournal(self.path) as journal:
+            journal.record("events", RECEIVED, DEAL, 10.0)
+            journal.record("events", RECEIVED, TURN, 11.0)
+        index = self.path + message_journal.INDEX_SUFFIX
+        with open(index, "rb") as f:
+            data = f.read()
+        # The writer crashed after writing the frames of the last record
+        with open(index, "wb") as f:
+            f.write(data[:len(data) // 2])
+        with JournalReader(self.path) as reader:
+            self.assertEqual(
+                [record.parts for record in reader], [DEAL, TURN])
+
+    def testRecordAfterClose(self):
+        journal = MessageJournal(self.path)
+        journal.record("events", RECEIVED, DEAL, 10.0)
+        journal.close()
+        journal.record("events", RECEIVED, TURN, 11.0)
+        with JournalReader(self.path) as reader:
+            self.assertEqual(len(reader), 1)
+
+    def testNotAJournal(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{}")
+        with self.assertRaises(ValueError):
+            JournalReader(self.path)
+
+    def testReplay(self):
+        with MessageJournal(self.path) as journal:
+            journal.record("events", RECEIVED, DEAL, 100.0)
+            journal.record("control", SENT, [b"", b"get", b"get"], 100.1)
+            journal.record("events", RECEIVED, [b"game:unknown"], 100.1)
+            journal.record("events", RECEIVED, TURN, 100.2)
+        handled = []
+        queues = {"events": MessageQueue(
+            None, "events", validateEventMessage, self._handlers(handled))}
+        with JournalReader(self.path) as reader:
+            start = time.perf_counter()
+            self.assertEqual(message_journal.replay(reader, queues), 3)
+            fast = time.perf_counter() - start
+            start = time.perf_counter()
+            message_journal.replay(reader, queues, speed=1.0)
+            recorded = time.perf_counter() - start
+        self.assertEqual(handled[:2], [
+            (b"game:deal", {"opener": "north"}),
+            (b"game:turn", {"position": "east"})])
+        self.assertEqual(handled[:2], handled[2:])
+        self.assertLess(fast, 0.1)
+        self.assertGreaterEqual(recorded, 0.2)
+
+    def testHandleMessage(self):
+        handled = []
+        queue = MessageQueue(
+            None, "control", validateControlReply,
+            {b"game:deal": lambda **kwargs: handled.append(kwargs)})
+        self.assertTrue(queue.handleMessage(
+            [b"", b"game:deal", b"OK", b"opener", b'"south"']))
+        self.assertFalse(queue.handleMessage([b"", b"game:deal", b"ERR"]))
+        self.assertEqual(handled, [{"opener": "south"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+from bridgegui import notation
+
+
+def _bid(level, strain):
+    return {"type": "bid", "bid": {"level": level, "strain": strain}}
+
+
+def _card(rank, suit):
+    return {"rank": rank, "suit": suit}
+
+
+HAND = [
+    _card("2", "spades"), _card("ace", "spades"), _card("queen", "spades"),
+    _card("king", "spades"), _card("10", "hearts"), _card("9", "hearts"),
+    _card("jack", "diamonds"), _card("8", "diamonds"), _card("4", "diamonds"),
+    _card("7", "clubs"), _card("5", "clubs"), _card("3", "clubs"),
+    _card("2", "clubs"),
+]
+
+
+class CallNotationTest(unittest.TestCase):
+    """Test suite for call notation"""
+
+    def testFormatCall(self):
+        self.assertEqual(notation.format_call(_bid(3, "notrump")), "3NT")
+        self.assertEqual(notation.format_call({"type": "pass"}), "Pass")
+        self.assertEqual(notation.format_call({"type": "double"}), "X")
+        self.assertEqual(notation.format_call("2 hearts"), "2H")
+
+    def testParseCall(self):
+        self.assertEqual(notation.parse_call("P"), "Pass")
+        self.assertEqual(notation.parse_call("XX"), "XX")
+        self.assertEqual(notation.parse_call("7 no trump"), "7NT")
+        self.assertIsNone(notation.parse_call("no idea"))
+
+    def testAsProtocolCall(self):
+        self.assertEqual(notation.as_protocol_call("1S"), _bid(1, "spades"))
+        self.assertEqual(notation.as_protocol_call("pass"), {"type": "pass"})
+        self.assertEqual(
+            notation.as_protocol_call("XX"), {"type": "redouble"})
+        self.assertIsNone(notation.as_protocol_call("no idea"))
+
+    def testNormalizeBiddingHistory(self):
+        history = [{"south": _bid(1, "hearts")}, "west: Pass", "north 2S"]
+        self.assertEqual(
+            notation.normalize_bidding_history(history),
+            [("south", "1H"), ("west", "Pass"), ("north", "2S")])
+
+    def testFormatCalls(self):
+        self.assertEqual(
+            notation.format_calls(
+                [{"type": "pass"}, _bid(1, "notrump"), {"type": "double"}]),
+            "P,1NT,X")
+        self.assertEqual(
+            notation.format_calls("pass, 5 diamonds, 5 hearts"), "P,5D,5H")
+
+    def testFormatAuction(self):
+        self.assertEqual(
+            notation.format_auction([
+                {"south": _bid(1, "hearts")}, {"west": {"type": "pass"}},
+                {"north": _bid(2, "clubs")}, {"east": {"type": "pass"}}]),
+            "S:1H-P-2C-P")
+        self.assertEqual(
+            notation.format_auction(["north: 1S", "east: X"]), "N:1S-X")
+        self.assertEqual(notation.format_auction([]), "none")
+
+
+class CardNotationTest(unittest.TestCase):
+    """Test suite for card notation"""
+
+    def testFormatCard(self):
+        self.assertEqual(notation.format_card(_card("10", "hearts")), "HT")
+        self.assertEqual(notation.format_card(_card("ace", "spades")), "SA")
+
+    def testFormatHand(self):
+        self.assertEqual(notation.format_hand(HAND), "AKQ2.T9.J84.7532")
+        self.assertEqual(
+            notation.format_hand([_card("ace", "spades")]), "A...")
+        self.assertEqual(notation.format_hand([]), "unknown")
+
+    def testFormatHands(self):
+        self.assertEqual(
+            notation.format_hands({"north": HAND, "south": []}),
+            "N:AKQ2.T9.J84.7532")
+        self.assertEqual(notation.format_hands({}), "unknown")
+
+    def testFormatCards(self):
+        self.assertEqual(
+            notation.format_cards(HAND[:6]), "S:AKQ2 H:T9")
+        self.assertEqual(notation.format_cards([]), "none")
+
+    def testFormatCardClasses(self):
+        self.assertEqual(
+            notation.format_card_classes([HAND[1:4], HAND[:1], HAND[4:6]]),
+            "S:AKQ, S:2, H:T9")
+        self.assertEqual(notation.format_card_classes([]), "none")
+
+    def testFormatTrick(self):
+        trick = [
+            {"position": "north", "card": _card("ace", "spades")},
+            {"position": "east", "card": _card("2", "spades")}]
+        self.assertEqual(notation.format_trick(trick), "N:SA E:S2")
+        self.assertEqual(
+            notation.format_trick({"cards": trick, "winner": "north"}),
+            "N:SA E:S2 (N)")
+
+    def testFormatTricksUsesLatestSnapshot(self):
+        first = {
+            "cards": [{"position": "west", "card": _card("5", "hearts")}],
+            "winner": None}
+        second = {
+            "cards": [{"position": "north", "card": _card("ace", "clubs")}],
+            "winner": "north"}
+        self.assertEqual(
+            notation.format_tricks([[first], [first, second]]),
+            "W:H5 / N:CA (N)")
+        self.assertEqual(notation.format_tricks([]), "none")
+
+    def testFormatContract(self):
+        self.assertEqual(
+            notation.format_contract(
+                {"bid": {"level": 4, "strain": "spades"},
+                 "doubling": "doubled"}),
+            "4SX")
+        self.assertEqual(notation.format_contract(None), "none")
+
+
+if __name__ == '__main__':
+    unittest.main()
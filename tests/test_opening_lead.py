@@ -0,0 +1,94 @@
+import unittest
+
+from bridgegui import opening_lead
+from bridgegui.opening_lead import OpeningLeadEngine
+
+HAND = [
+    {"rank": rank, "suit": suit}
+    for suit, ranks in (
+        ("spades", ("king", "queen", "jack", "5", "2")),
+        ("hearts", ("ace", "8", "3")), ("diamonds", ("9", "6", "4")),
+        ("clubs", ("7", "3")))
+    for rank in ranks]
+AUCTION = ["south: 1NT", "west: Pass", "north: 3NT", "east: Pass",
+           "south: Pass", "west: Pass"]
+CONTRACT = {"bid": {"level": 3, "strain": "notrump"}, "doubling": "undoubled"}
+SPADES, HEARTS = 0, 1
+
+
+def _card(rank, suit):
+    return {"rank": rank, "suit": suit}
+
+
+class _Solver:
+    # Five tricks after the spade king, after the heart ace five tricks in
+    # every other deal and none in the others, and three tricks otherwise
+
+    def __init__(self):
+        self.deals = 0
+
+    def __call__(self, deal, strain, leader, moves, deadline=None):
+        self.deals += 1
+        tricks = {}
+        for suit, card in moves:
+            if (suit, card) == (SPADES, 1 << 11):
+                tricks[suit, card] = 5
+            elif (suit, card) == (HEARTS, 1 << 12):
+                tricks[suit, card] = 5 if self.deals % 2 else 0
+            else:
+                tricks[suit, card] = 3
+        return tricks
+
+
+class OpeningLeadTest(unittest.TestCase):
+    """Test suite for the opening lead simulation"""
+
+    def testCandidateLeads(self):
+        leads = opening_lead.candidate_leads("west", HAND)
+        self.assertEqual(leads[:3], [
+            _card("2", "spades"), _card("5", "spades"),
+            _card("king", "spades")])
+        self.assertEqual(len(leads), 11)
+
+    def _engine(self, solver, criterion=opening_lead.TRICKS):
+        return OpeningLeadEngine(
+            deals=8, workers=1, criterion=criterion, seed=1, solver=solver)
+
+    def testRankByTricks(self):
+        evaluations = self._engine(_Solver()).evaluate(
+            "west", HAND, AUCTION, CONTRACT)
+        self.assertEqual(evaluations[0].card, _card("king", "spades"))
+        self.assertEqual(evaluations[0].tricks, 5)
+        self.assertEqual(evaluations[0].beat, 1.0)
+        self.assertEqual(evaluations[0].deals, 8)
+        self.assertIn(
+            "Simulation of 8 deals, defensive tricks per lead: SK 5.00 "
+            "(beats 100%)", opening_lead.format_lead_evaluations(evaluations))
+
+    def testRankByBeatingChance(self):
+        solver = _Solver()
+        evaluations = self._engine(solver, opening_lead.BEAT).evaluate(
+            "west", HAND, AUCTION, CONTRACT)
+        self.assertEqual(evaluations[1].card, _card("ace", "hearts"))
+        self.assertEqual(evaluations[1].beat, 0.5)
+        self.assertEqual(evaluations[1].tricks, 2.5)
+
+    def testCachedBySignature(self):
+        solver = _Solver()
+        engine = self._engine(solver)
+        first = engine.evaluate("west", HAND, AUCTION, CONTRACT)
+        self.assertEqual(solver.deals, 8)
+        self.assertIs(engine.evaluate("west", HAND, AUCTION, CONTRACT), first)
+        self.assertEqual(solver.deals, 8)
+        engine.evaluate("west", HAND, AUCTION[:-2] + [
+            "south: 4S", "west: Pass", "north: Pass", "east: Pass"],
+            {"bid": {"level": 4, "strain": "spades"}})
+        self.assertEqual(solver.deals, 16)
+
+    def testUnknownCriterion(self):
+        with self.assertRaises(ValueError):
+            OpeningLeadEngine(criterion="best")
+
+
+if __name__ == '__main__':
+    unittest.main()
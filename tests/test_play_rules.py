@@ -0,0 +1,190 @@
+import unittest
+
+from bridgegui import play_rules
+from bridgegui.play_rules import (
+    PlayRules, equivalence_classes, played_cards, representatives)
+from tests.fixtures import card, cards, trick
+
+
+class EquivalenceClassesTest(unittest.TestCase):
+    """Test suite for the equivalence classes of allowed cards"""
+
+    ALLOWED = cards(
+        "queen spades", "jack spades", "10 spades", "9 spades", "5 spades",
+        "king hearts")
+
+    def testSequencesAreClasses(self):
+        self.assertEqual(
+            equivalence_classes("north", self.ALLOWED), [
+                cards("5 spades"),
+                cards(
+                    "9 spades", "10 spades", "jack spades", "queen spades"),
+                cards("king hearts")])
+        self.assertEqual(
+            representatives("north", self.ALLOWED),
+            cards("5 spades", "9 spades", "king hearts"))
+
+    def testCardsOfOwnSideAndPlayedCardsJoinClasses(self):
+        played = played_cards(trick(("east", "7 spades")))
+        classes = equivalence_classes(
+            "north", self.ALLOWED,
+            hands={"south": cards("8 spades", "6 spades")}, played=played)
+        self.assertEqual(classes[0][0], card("5 spades"))
+        self.assertEqual(len(classes), 2)
+
+    def testCardsOfVisibleOpponentSeparateClasses(self):
+        played = played_cards(trick(
+            ("east", "8 spades"), ("east", "7 spades"), ("east", "6 spades")))
+        self.assertEqual(len(equivalence_classes(
+            "north", self.ALLOWED, played=played)), 2)
+        self.assertEqual(len(equivalence_classes(
+            "north", self.ALLOWED, played=played,
+            trick=trick(("west", "7 spades")))), 3)
+
+
+class PlayRulesTest(unittest.TestCase):
+    """Test suite for the local card play rules"""
+
+    def setUp(self):
+        self.rules = PlayRules()
+
+    def _decide(self, position, hand, trick, allowed=None, **kwargs):
+        hands = kwargs.pop("hands", {})
+        hands[position] = hand
+        allowed = hand if allowed is None else allowed
+        return self.rules.decide(position, allowed, trick, hands, **kwargs)
+
+    def testOnlyCard(self):
+        decision = self._decide(
+            "north", cards("ace spades", "2 hearts"), trick(),
+            allowed=cards("2 hearts"))
+        self.assertEqual(
+            decision, (card("2 hearts"), play_rules.ONLY_CARD))
+
+    def testLeadIsOpen(self):
+        self.assertIsNone(self._decide(
+            "north", cards("ace spades", "2 hearts"), trick()))
+
+    def testEquivalentCards(self):
+        decision = self._decide(
+            "west", cards("king spades", "queen spades", "3 hearts"),
+            trick(("north", "2 spades"), ("east", "4 spades")),
+            allowed=cards("king spades", "queen spades"))
+        self.assertEqual(
+            decision, (card("queen spades"), play_rules.EQUIVALENT_CARDS))
+
+    def testCardOfTrickSeparatesCards(self):
+        decision = self._decide(
+            "west", cards("king spades", "jack spades"),
+            trick(("east", "2 spades"), ("south", "queen spades")))
+        self.assertEqual(
+            decision, (card("king spades"), play_rules.THIRD_HAND_HIGH))
+
+    def testPartnerWins(self):
+        decision = self._decide(
+            "south", cards("king spades", "5 spades"),
+            trick(
+                ("west", "2 spades"), ("north", "ace spades"),
+                ("east", "3 spades")))
+        self.assertEqual(
+            decision, (card("5 spades"), play_rules.PARTNER_WINS))
+
+    def testThirdHandDoesNotOvertakeSafeHonor(self):
+        decision = self._decide(
+            "south", cards("ace spades", "3 spades"),
+            trick(("north", "king spades"), ("east", "2 spades")))
+        self.assertEqual(
+            decision, (card("3 spades"), play_rules.PARTNER_WINS))
+
+    def testHiddenHandMayRuffHonorOfPartner(self):
+        self.assertIsNone(self._decide(
+            "south", cards("ace spades", "3 spades"),
+            trick(("north", "king spades"), ("east", "2 spades")),
+            trump="hearts"))
+
+    def testWinCheaply(self):
+        decision = self._decide(
+            "south", cards("king spades", "10 spades", "4 spades"),
+            trick(
+                ("west", "2 spades"), ("north", "3 spades"),
+                ("east", "9 spades")))
+        self.assertEqual(
+            decision, (card("10 spades"), play_rules.WIN_CHEAPLY))
+
+    def testCannotWin(self):
+        decision = self._decide(
+            "south", cards("king spades", "10 spades"),
+            trick(
+                ("west", "2 spades"), ("north", "3 spades"),
+                ("east", "ace spades")))
+        self.assertEqual(
+            decision, (card("10 spades"), play_rules.CANNOT_WIN))
+
+    def testDiscardFromWeakSuit(self):
+        decision = self._decide(
+            "south", cards(
+                "ace hearts", "3 hearts", "5 diamonds", "4 diamonds",
+                "2 diamonds"),
+            trick(
+                ("west", "2 spades"), ("north", "3 spades"),
+                ("east", "ace spades")))
+        self.assertEqual(decision, (card("2 diamonds"), play_rules.DISCARD))
+
+    def testRuffBeforeLastHandIsOpen(self):
+        self.assertIsNone(self._decide(
+            "north", cards("3 hearts", "5 diamonds"),
+            trick(("west", "king spades")), trump="hearts"))
+
+    def testSecondHandLow(self):
+        decision = self._decide(
+            "north", cards("king spades", "3 spades"),
+            trick(("west", "5 spades")))
+        self.assertEqual(
+            decision, (card("3 spades"), play_rules.SECOND_HAND_LOW))
+
+    def testCoverAnHonor(self):
+        decision = self._decide(
+            "north", cards("king spades", "3 spades"),
+            trick(("west", "queen spades")))
+        self.assertEqual(
+            decision, (card("king spades"), play_rules.COVER_AN_HONOR))
+
+    def testHonorLedFromSequenceIsOpen(self):
+        self.assertIsNone(self._decide(
+            "north", cards("king spades", "3 spades"),
+            trick(("west", "queen spades")),
+            hands={"west": cards("queen spades", "jack spades", "2 hearts")}))
+
+    def testThirdHandBeatsVisibleLastHand(self):
+        decision = self._decide(
+            "south", cards("ace spades", "queen spades", "3 spades"),
+            trick(("north", "2 spades"), ("east", "5 spades")),
+            hands={"west": cards("jack spades", "4 spades")})
+        self.assertEqual(
+            decision, (card("queen spades"), play_rules.THIRD_HAND_HIGH))
+
+    def testPlayedCardsMakeCardsEquivalent(self):
+        played = played_cards([{
+            "cards": trick(
+                ("north", "queen spades"), ("east", "jack spades"),
+                ("south", "2 spades"), ("west", "3 spades")),
+            "winner": "north"}])
+        decision = self._decide(
+            "west", cards("king spades", "10 spades"),
+            trick(("east", "4 spades"), ("south", "5 spades")),
+            played=played)
+        self.assertEqual(
+            decision, (card("10 spades"), play_rules.EQUIVALENT_CARDS))
+
+    def testReport(self):
+        self._decide(
+            "north", cards("ace spades", "2 hearts"), trick(),
+            allowed=cards("2 hearts"))
+        self._decide("north", cards("ace spades", "2 hearts"), trick())
+        self.rules.record_open(2.0)
+        report = self.rules.report()
+        self.assertIn("Plays answered locally: 1 of 2 (50%)", report)
+        self.assertIn(play_rules.ONLY_CARD, report)
+        self.assertIn("latency saved about 2.0 s", report)
+        self.rules.reset()
+        self.assertIn("0 of 0", self.rules.report())
@@ -0,0 +1,42 @@
+import unittest
+
+from bridgegui.prompt_prefix import StaticPrefixPrompt
+
+
+class StaticPrefixPromptTest(unittest.TestCase):
+    """Test suite for static prefix prompt"""
+
+    def setUp(self):
+        self.prompt = StaticPrefixPrompt(
+            prefix="Strategy {{json}}\n{legend}\n",
+            suffix="Position: {position}\n",
+            input_variables=["position"],
+            partial_variables={"legend": "Legend"})
+
+    def testPrefixIsFormattedOnce(self):
+        self.assertEqual(self.prompt.prefix, "Strategy {json}\nLegend")
+
+    def testFormat(self):
+        self.assertEqual(
+            self.prompt.format(position="north"),
+            "Strategy {json}\nLegend\n\nPosition: north")
+
+    def testSystemMessageIsShared(self):
+        first = self.prompt.format_messages(position="north")
+        second = self.prompt.format_messages(position="south")
+        self.assertIs(first[0], second[0])
+        self.assertEqual(second[1].content, "Position: south")
+
+    def testChatMessages(self):
+        self.assertEqual(
+            self.prompt.format_chat_messages(position="west"), [
+                {"role": "system", "content": "Strategy {json}\nLegend"},
+                {"role": "user", "content": "Position: west"}])
+
+    def testMissingVariable(self):
+        with self.assertRaises(KeyError):
+            self.prompt.format_suffix()
+
+
+if __name__ == '__main__':
+    unittest.main()
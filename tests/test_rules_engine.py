@@ -0,0 +1,251 @@
+import io
+import json
+import random
+import unittest
+
+import zmq
+
+from bridgegui import rules_engine
+from bridgegui.messaging import (
+    MessageQueue, MessageRecorder, read_messages, validateEventMessage)
+from bridgegui.notation import POSITION_TAGS
+from bridgegui.rules_engine import RulesEngine
+
+RANKS = ("ace", "king", "queen", "jack", "10", "9", "8", "7", "6", "5", "4",
+         "3", "2")
+# Every hand holds one suit: east runs the hearts against 1NT by north
+SUITS = {"north": "spades", "east": "hearts", "south": "diamonds",
+         "west": "clubs"}
+HANDS = {
+    position: [{"rank": rank, "suit": suit} for rank in RANKS]
+    for position, suit in SUITS.items()}
+PASS = {"type": "pass"}
+NOTRUMP = {"type": "bid", "bid": {"level": 1, "strain": "notrump"}}
+CONTRACT = {"bid": {"level": 1, "strain": "notrump"}, "doubling": "undoubled"}
+GAME = b"game:"
+
+
+def _card(rank, suit):
+    return {"rank": rank, "suit": suit}
+
+
+def _messages():
+    # The events of the deal as handled by the event queue of the frontend
+    messages = [(GAME + b"deal", {
+        "opener": "north", "counter": 1,
+        "vulnerability": {"northSouth": True, "eastWest": False}})]
+    for position, call in zip(POSITION_TAGS, (NOTRUMP, PASS, PASS, PASS)):
+        messages.append((GAME + b"turn", {"position": position}))
+        messages.append((GAME + b"call", {"position": position, "call": call}))
+    messages.append((GAME + b"bidding", {
+        "declarer": "north", "contract": CONTRACT}))
+    for rank in RANKS:
+        for position in ("east", "south", "west", "north"):
+            messages.append((GAME + b"play", {
+                "position": position, "card": _card(rank, SUITS[position])}))
+            if position == "east" and rank == "ace":
+                messages.append((GAME + b"dummy", {
+                    "position": "south", "cards": HANDS["south"]}))
+        messages.append((GAME + b"trick", {"winner": "east"}))
+    messages.append((GAME + b"dealend", {
+        "result": {"partnership": "eastWest", "score": 700}}))
+    return messages
+
+
+class RulesEngineTest(unittest.TestCase):
+    """Test suite for the rules engine"""
+
+    def _engine(self, hands=HANDS):
+        engine = RulesEngine(hands, "north", {"northSouth": True})
+        for call in (NOTRUMP, PASS, PASS, PASS):
+            engine.call(call)
+        return engine
+
+    def testCardCodes(self):
+        card = _card("queen", "hearts")
+        self.assertEqual(rules_engine.card_code(card), 23)
+        self.assertEqual(rules_engine.code_card(23), card)
+        self.assertEqual(
+            rules_engine.mask_cards(rules_engine.hand_mask([card])), [card])
+        with self.assertRaises(ValueError):
+            rules_engine.card_code({"rank": "one", "suit": "hearts"})
+
+    def testDeal(self):
+        hands = rules_engine.deal(random.Random(1))
+        self.assertEqual(sum(bin(hand).count("1") for hand in hands), 52)
+        self.assertEqual(hands[0] | hands[1] | hands[2] | hands[3],
+                         (1 << 52) - 1)
+
+    def testBoards(self):
+        self.assertEqual(rules_engine.board_dealer(6), "east")
+        self.assertEqual(rules_engine.board_vulnerability(1), {
+            "northSouth": False, "eastWest": False})
+        self.assertEqual(rules_engine.board_vulnerability(20), {
+            "northSouth": True, "eastWest": True})
+
+    def testTrickWinner(self):
+        trick = [_card("king", "hearts"), _card("ace", "hearts"),
+                 _card("2", "spades"), _card("3", "hearts")]
+        self.assertEqual(rules_engine.trick_winner("west", trick), "north")
+        self.assertEqual(
+            rules_engine.trick_winner("west", trick, "spades"), "east")
+
+    def testContractAndDeclarer(self):
+        engine = RulesEngine(HANDS, "east")
+        for call in ("1H", "Pass", "2H", "X", "Pass", "Pass", "XX", "Pass",
+                     "Pass", "Pass"):
+            self.assertEqual(engine.phase, rules_engine.BIDDING)
+            engine.call(call)
+        self.assertEqual(engine.declarer, "east")
+        self.assertEqual(engine.dummy, "west")
+        self.assertEqual(engine.contract, {
+            "bid": {"level": 2, "strain": "hearts"}, "doubling": "redoubled"})
+        self.assertEqual(engine.turn, "south")
+        with self.assertRaises(ValueError):
+            engine.call(PASS)
+
+    def testIllegalCall(self):
+        engine = RulesEngine(HANDS, "north")
+        engine.call("1S")
+        self.assertFalse(engine.is_legal_call("1C"))
+        with self.assertRaises(ValueError):
+            engine.call("1C")
+
+    def testPassedOut(self):
+        engine = RulesEngine(HANDS, "west")
+        for _ in range(4):
+            engine.call(PASS)
+        self.assertEqual(engine.phase, rules_engine.ENDED)
+        self.assertIsNone(engine.turn)
+        self.assertEqual(engine.result(), {"partnership": None, "score": 0})
+
+    def testFollowSuit(self):
+        hands = dict(HANDS)
+        hands["south"] = HANDS["south"][1:] + [_card("2", "hearts")]
+        hands["east"] = HANDS["east"][:-1] + [_card("ace", "diamonds")]
+        engine = self._engine(hands)
+        engine.play(_card("ace", "hearts"))
+        self.assertEqual(engine.legal_cards(), [_card("2", "hearts")])
+        self.assertTrue(engine.dummy_exposed)
+        with self.assertRaises(ValueError):
+            engine.play(_card("king", "diamonds"))
+
+    def testPlayToTheEnd(self):
+        engine = self._engine()
+        self.assertFalse(engine.dummy_exposed)
+        for rank in RANKS:
+            for position in ("east", "south", "west", "north"):
+                self.assertEqual(engine.turn, position)
+                engine.play(_card(rank, SUITS[position]))
+            self.assertEqual(engine.last_winner, "east")
+        self.assertEqual(engine.phase, rules_engine.ENDED)
+        self.assertEqual(engine.tricks, (0, 13))
+        self.assertEqual(engine.score(), -700)
+        self.assertEqual(
+            engine.result(), {"partnership": "eastWest", "score": 700})
+
+    def testUndo(self):
+        generator = random.Random(2)
+        hands = rules_engine.deal(generator)
+        engine = RulesEngine(hands, "south")
+        for call in ("1S", "Pass", "4S", "Pass", "Pass", "Pass"):
+            engine.call(call)
+        for _ in range(52):
+            engine.play(generator.choice(engine.legal_cards()))
+        taken = engine.tricks
+        for _ in range(51):
+            engine.undo()
+        self.assertEqual(engine.tricks, (0, 0))
+        self.assertEqual(engine.turn, "north")
+        for _ in range(7):
+            engine.undo()
+        self.assertEqual(engine.hands, tuple(hands))
+        self.assertEqual(engine.phase, rules_engine.BIDDING)
+        self.assertIsNone(engine.declarer)
+        self.assertEqual(sum(taken), 13)
+        with self.assertRaises(ValueError):
+            engine.undo()
+
+
+class VerifyMessagesTest(unittest.TestCase):
+    """Test suite for verifying recorded server events"""
+
+    def testRecordedThroughMessageQueue(self):
+        context = zmq.Context()
+        try:
+            back = context.socket(zmq.PAIR)
+            back.bind("inproc://rules")
+            front = context.socket(zmq.PAIR)
+            front.connect("inproc://rules")
+            recording = io.StringIO()
+            handlers = {
+                command: lambda **kwargs: None
+                for command in {command for command, _ in _messages()}}
+            queue = MessageQueue(
+                back, "events", validateEventMessage, handlers,
+                recorder=MessageRecorder(recording))
+            for command, kwargs in _messages():
+                front.send_multipart([command] + [
+                    part for key, value in kwargs.items()
+                    for part in (key.encode(), _json(value))])
+            self.assertTrue(queue.handleMessages())
+        finally:
+            context.destroy()
+        recording.seek(0)
+        messages = read_messages(recording)
+        self.assertEqual(messages, _messages())
+        self.assertEqual(rules_engine.verify_messages(messages), [])
+
+    def testWrongWinnerAndResult(self):
+        messages = _messages()
+        messages[-2] = (GAME + b"trick", {"winner": "north"})
+        messages[-1] = (GAME + b"dealend", {
+            "result": {"partnership": "eastWest", "score": 650}})
+        errors = rules_engine.verify_messages(messages)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith("Deal 1: Trick won by north"))
+
+    def testDeclarerInTurnForTheDummyOnly(self):
+        messages = _messages()
+        dummy = next(
+            n for n, (command, _) in enumerate(messages)
+            if command.endswith(b"dummy"))
+        bidding = next(
+            n for n, (command, _) in enumerate(messages)
+            if command.endswith(b"bidding"))
+        turn = (GAME + b"turn", {"position": "north"})
+        messages.insert(dummy + 1, turn)
+        self.assertEqual(rules_engine.verify_messages(messages), [])
+        messages.insert(bidding + 1, turn)
+        self.assertEqual(
+            rules_engine.verify_messages(messages),
+            ["Deal 1: Turn of north, expected east"])
+
+    def testIllegalCall(self):
+        messages = _messages()
+        messages[4] = (GAME + b"call", {"position": "east", "call": {
+            "type": "bid", "bid": {"level": 1, "strain": "clubs"}}})
+        errors = rules_engine.verify_messages(messages)
+        self.assertEqual(errors, ["Deal 1: Call event rejected: Illegal "
+                                  "call: '1C'"])
+
+    def testRevoke(self):
+        # East leads the club king to the second trick and west follows with
+        # the heart king, so west held a heart in the first trick
+        messages = _messages()
+        plays = [
+            n for n, (command, kwargs) in enumerate(messages)
+            if command.endswith(b"play") and kwargs["card"]["rank"] == "king"]
+        east, west = plays[0], plays[2]
+        messages[east][1]["card"] = _card("king", "clubs")
+        messages[west][1]["card"] = _card("king", "hearts")
+        errors = rules_engine.verify_messages(messages)
+        self.assertIn("Play event rejected: Illegal play: CA", errors[0])
+
+
+def _json(value):
+    return json.dumps(value).encode()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from bridgegui.scoring import contract_score, imps, matchpoints
+
+
+class ContractScoreTest(unittest.TestCase):
+    """Test suite for duplicate scoring"""
+
+    def testMadeContracts(self):
+        self.assertEqual(contract_score(4, "S", "undoubled", 10, True), 620)
+        self.assertEqual(contract_score(3, "NT", "undoubled", 10), 430)
+        self.assertEqual(contract_score(2, "C", "undoubled", 8), 90)
+        self.assertEqual(contract_score(6, "H", "undoubled", 12), 980)
+        self.assertEqual(contract_score(7, "NT", "undoubled", 13, True), 2220)
+
+    def testDoubledContracts(self):
+        self.assertEqual(contract_score(2, "H", "doubled", 8), 470)
+        self.assertEqual(contract_score(1, "NT", "doubled", 8, True), 380)
+        self.assertEqual(contract_score(7, "NT", "redoubled", 13, True), 2980)
+
+    def testUndertricks(self):
+        self.assertEqual(contract_score(4, "S", "undoubled", 8), -100)
+        self.assertEqual(contract_score(1, "NT", "doubled", 5, True), -500)
+        self.assertEqual(contract_score(4, "S", "doubled", 6), -800)
+        self.assertEqual(contract_score(3, "D", "redoubled", 6), -1000)
+
+
+class ComparisonTest(unittest.TestCase):
+    """Test suite for IMPs and matchpoints"""
+
+    def testImps(self):
+        self.assertEqual(imps(0), 0)
+        self.assertEqual(imps(10), 0)
+        self.assertEqual(imps(20), 1)
+        self.assertEqual(imps(620 - 170), 10)
+        self.assertEqual(imps(-1430 + 680), -13)
+        self.assertEqual(imps(5000), 24)
+
+    def testMatchpoints(self):
+        self.assertEqual(matchpoints([420, 420, -50]), [1.5, 1.5, 0.0])
+        self.assertEqual(matchpoints([100, 200]), [0.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
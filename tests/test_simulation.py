@@ -0,0 +1,125 @@
+import random
+import unittest
+
+from bridgegui import simulation
+from bridgegui.auction import AuctionState
+from bridgegui.hand_ranges import HandRange, infer_hand_ranges
+from bridgegui.simulation import BidEvaluator
+
+HAND = [
+    {"rank": rank, "suit": suit}
+    for suit, ranks in (
+        ("spades", ("ace", "king", "9", "5")), ("hearts", ("queen", "8", "2")),
+        ("diamonds", ("king", "jack", "4")), ("clubs", ("7", "6", "3")))
+    for rank in ranks]
+
+
+def _fixed_tricks(deal, strain, declarer, deadline=None):
+    # Ten tricks in spades and eight elsewhere, whatever the deal
+    return 10 if strain == "S" else 8
+
+
+def _scaled(deals, factor):
+    return [deal * factor for deal in deals]
+
+
+class SimulationTest(unittest.TestCase):
+    """Test suite for simulation-based bid evaluation"""
+
+    def testCandidateCalls(self):
+        auction = AuctionState.from_history(
+            ["north: 1S", "east: Pass", "south: 2S", "west: Pass"])
+        self.assertEqual(
+            simulation.candidate_calls(auction),
+            ["Pass", "3C", "3D", "3H", "3S", "2NT", "3NT", "4H", "4S", "5C",
+             "5D", "6C", "6D", "6H", "6S", "6NT"])
+        auction.call("north", "3S")
+        auction.call("east", "X")
+        self.assertEqual(
+            simulation.candidate_calls(auction)[:3], ["Pass", "XX", "4C"])
+
+    def testFinalContract(self):
+        auction = AuctionState.from_history(
+            ["north: 1S", "east: Pass", "south: 2S", "west: Pass"])
+        self.assertEqual(
+            simulation.final_contract(auction, "4S"),
+            (4, "S", "undoubled", "north"))
+        self.assertEqual(
+            simulation.final_contract(auction, "Pass"),
+            (2, "S", "undoubled", "north"))
+        self.assertEqual(
+            simulation.final_contract(auction, "3NT"),
+            (3, "NT", "undoubled", "north"))
+        self.assertIsNone(simulation.final_contract(
+            AuctionState.from_history(
+                ["north: Pass", "east: Pass", "south: Pass"]), "Pass"))
+
+    def testSampleDealsRespectRanges(self):
+        ranges, _ = infer_hand_ranges(
+            ["north: 1S", "east: Pass", "south: 2S", "west: Pass"], HAND,
+            "north")
+        deals = simulation.sample_deals(
+            HAND, "north", ranges, 4, random.Random(1))
+        self.assertEqual(len(deals), 4)
+        for deal in deals:
+            self.assertEqual(deal[0], simulation.hand_masks(HAND))
+            cards = [mask for hand in deal for mask in hand]
+            self.assertEqual(sum(bin(mask).count("1") for mask in cards), 52)
+            south = deal[2]
+            self.assertTrue(3 <= bin(south[0]).count("1") <= 8)
+
+    def testSampleDealsGivesUp(self):
+        impossible = HandRange((30, 0, 0, 0, 0), (37, 13, 13, 13, 13))
+        ranges = dict.fromkeys(("north", "east", "south", "west"), impossible)
+        self.assertEqual(simulation.sample_deals(
+            HAND, "north", ranges, 2, random.Random(1), max_attempts=50), [])
+
+    def testEvaluate(self):
+        evaluator = BidEvaluator(
+            deals=3, workers=1, seed=1, solver=_fixed_tricks)
+        evaluations = evaluator.evaluate(
+            "north", HAND,
+            ["north: 1S", "east: Pass", "south: 2S", "west: Pass"],
+            candidates=["Pass", "4S", "3NT", "1C"],
+            vulnerability={"northSouth": True, "eastWest": False})
+        self.assertEqual(
+            [(evaluation.call, evaluation.score)
+             for evaluation in evaluations],
+            [("4S", 620), ("Pass", 170), ("3NT", -100)])
+        self.assertEqual(evaluations[0].deals, 3)
+        self.assertEqual(
+            simulation.format_evaluations(evaluations, 2),
+            "Simulation of 3 deals, mean score per call: 4S +620, Pass +170.")
+
+    def testWorkerPoolIsReused(self):
+        evaluator = BidEvaluator(deals=2, time_budget=1.0, workers=2, seed=1)
+        auction = ["north: 1S", "east: Pass", "south: 2S", "west: Pass"]
+        try:
+            evaluator.evaluate(
+                "north", HAND, auction, candidates=["Pass", "4S"])
+            executor = evaluator._executor
+            self.assertIsNotNone(executor)
+            evaluator.evaluate(
+                "north", HAND, auction, candidates=["Pass", "4S"])
+            self.assertIs(evaluator._executor, executor)
+        finally:
+            evaluator.close()
+        self.assertIsNone(evaluator._executor)
+
+    def testSolveChunks(self):
+        deals = list(range(7))
+        self.assertEqual(
+            simulation.solve_chunks(_scaled, deals, (2,), 1),
+            [0, 2, 4, 6, 8, 10, 12])
+        executor = simulation.worker_pool(3)
+        try:
+            self.assertEqual(
+                sorted(simulation.solve_chunks(
+                    _scaled, deals, (2,), 3, executor)),
+                [0, 2, 4, 6, 8, 10, 12])
+        finally:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()